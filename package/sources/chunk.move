@@ -30,6 +30,15 @@ public struct RegisterChunkCap has key, store {
     size: u32,
 }
 
+// Immutable chunk data identified by the hash of the data alone, so that the
+// manifests of any number of files can point to it.
+public struct SharedChunk has key {
+    id: UID,
+    data: vector<u8>,
+    hash: vector<u8>,
+    size: u32,
+}
+
 public struct VerifyChunkCap {
     chunk_id: ID,
     file_id: ID,
@@ -48,6 +57,12 @@ public struct ChunkVerifiedEvent has copy, drop {
     register_chunk_cap_id: ID,
 }
 
+public struct SharedChunkCreatedEvent has copy, drop {
+    chunk_id: ID,
+    chunk_hash: vector<u8>,
+    size: u32,
+}
+
 const EChunkHashMismatch: u64 = 1;
 const EInvalidVerifyChunkCapForChunk: u64 = 2;
 
@@ -126,6 +141,51 @@ public fun verify(cap: VerifyChunkCap, mut chunk: Chunk, ctx: &mut TxContext) {
     let VerifyChunkCap { .. } = cap;
 }
 
+// Like verify, but freezes the chunk's data as a SharedChunk that other files can
+// reference with file::add_shared_chunk, and registers that with the chunk's file.
+public fun verify_and_share(cap: VerifyChunkCap, chunk: Chunk, ctx: &mut TxContext) {
+    assert!(cap.chunk_id == object::id(&chunk), EInvalidVerifyChunkCapForChunk);
+
+    let Chunk { id, data, hash, index, size: _ } = chunk;
+    let chunk_bytes_hash = calculate_hash(&data);
+    let chunk_identifier_hash = calculate_chunk_identifier_hash(index, chunk_bytes_hash);
+    assert!(chunk_identifier_hash == hash, EChunkHashMismatch);
+
+    let shared_chunk = SharedChunk {
+        id: object::new(ctx),
+        size: data.length() as u32,
+        data: data,
+        hash: chunk_bytes_hash,
+    };
+
+    let register_chunk_cap = RegisterChunkCap {
+        id: object::new(ctx),
+        chunk_id: object::id(&shared_chunk),
+        hash: hash,
+        index: index,
+        size: shared_chunk.size,
+    };
+
+    // The chunk's original ID, which the chunk was created under.
+    emit(ChunkVerifiedEvent {
+        chunk_id: id.to_inner(),
+        file_id: cap.file_id,
+        register_chunk_cap_id: register_chunk_cap.register_chunk_cap_id(),
+    });
+
+    emit(SharedChunkCreatedEvent {
+        chunk_id: object::id(&shared_chunk),
+        chunk_hash: shared_chunk.hash,
+        size: shared_chunk.size,
+    });
+
+    id.delete();
+    transfer::freeze_object(shared_chunk);
+    transfer::public_transfer(register_chunk_cap, cap.file_id.to_address());
+
+    let VerifyChunkCap { .. } = cap;
+}
+
 // === Public-View Functions ===
 
 public fun id(chunk: &Chunk): ID {
@@ -148,6 +208,22 @@ public fun size(chunk: &Chunk): u32 {
     chunk.size
 }
 
+public fun shared_chunk_id(chunk: &SharedChunk): ID {
+    chunk.id.to_inner()
+}
+
+public fun shared_chunk_data(chunk: &SharedChunk): vector<u8> {
+    chunk.data
+}
+
+public fun shared_chunk_hash(chunk: &SharedChunk): vector<u8> {
+    chunk.hash
+}
+
+public fun shared_chunk_size(chunk: &SharedChunk): u32 {
+    chunk.size
+}
+
 public fun register_chunk_cap_id(cap: &RegisterChunkCap): ID {
     cap.chunk_id
 }
@@ -0,0 +1,106 @@
+// Copyright (c) Studio Mirai, Ltd.
+// SPDX-License-Identifier: Apache-2.0
+
+module miraifs::directory;
+
+use std::string::String;
+use sui::table::{Self, Table};
+
+const EPathAlreadyExists: u64 = 1;
+const EPathNotFound: u64 = 2;
+const EDirectoryNotEmpty: u64 = 3;
+const EEmptyPath: u64 = 4;
+
+// Maps the paths of a site or collection to the IDs of their files. Entries are
+// kept inline, so that a single object read resolves every path, and indexed by
+// path like the chunks of a file's manifest, so that updates don't scan them.
+public struct Directory has key, store {
+    id: UID,
+    entries: vector<DirectoryEntry>,
+    indices: Table<String, u64>,
+}
+
+public struct DirectoryEntry has copy, drop, store {
+    path: String,
+    file_id: ID,
+}
+
+public fun new(ctx: &mut TxContext): Directory {
+    Directory {
+        id: object::new(ctx),
+        entries: vector[],
+        indices: table::new(ctx),
+    }
+}
+
+public fun add(directory: &mut Directory, path: String, file_id: ID) {
+    assert!(!path.is_empty(), EEmptyPath);
+    assert!(!directory.indices.contains(path), EPathAlreadyExists);
+
+    directory.indices.add(path, directory.entries.length());
+    directory.entries.push_back(DirectoryEntry { path, file_id });
+}
+
+// Point an existing path to another file, and return the file it pointed to.
+public fun replace(directory: &mut Directory, path: String, file_id: ID): ID {
+    assert!(directory.indices.contains(path), EPathNotFound);
+
+    let entry = &mut directory.entries[*directory.indices.borrow(path)];
+    let previous_file_id = entry.file_id;
+    entry.file_id = file_id;
+    previous_file_id
+}
+
+// Remove a path, and return the file it pointed to. The last entry takes the
+// removed entry's place.
+public fun remove(directory: &mut Directory, path: String): ID {
+    assert!(directory.indices.contains(path), EPathNotFound);
+
+    let index = directory.indices.remove(path);
+    let DirectoryEntry { file_id, .. } = directory.entries.swap_remove(index);
+    if (index < directory.entries.length()) {
+        *directory.indices.borrow_mut(directory.entries[index].path) = index;
+    };
+    file_id
+}
+
+public fun destroy_empty(directory: Directory) {
+    assert!(directory.entries.is_empty(), EDirectoryNotEmpty);
+
+    let Directory { id, indices, .. } = directory;
+    id.delete();
+    indices.destroy_empty();
+}
+
+// === Public-View Functions ===
+
+public fun id(directory: &Directory): ID {
+    directory.id.to_inner()
+}
+
+public fun contains(directory: &Directory, path: String): bool {
+    directory.indices.contains(path)
+}
+
+public fun file_id(directory: &Directory, path: String): Option<ID> {
+    if (!directory.indices.contains(path)) {
+        return option::none()
+    };
+    option::some(directory.entries[*directory.indices.borrow(path)].file_id)
+}
+
+public fun length(directory: &Directory): u64 {
+    directory.entries.length()
+}
+
+public fun entries(directory: &Directory): vector<DirectoryEntry> {
+    directory.entries
+}
+
+public fun entry_path(entry: &DirectoryEntry): String {
+    entry.path
+}
+
+public fun entry_file_id(entry: &DirectoryEntry): ID {
+    entry.file_id
+}
@@ -3,13 +3,14 @@
 
 module miraifs::file;
 
-use miraifs::chunk::{Self, Chunk, CreateChunkCap, RegisterChunkCap};
-use miraifs::utils::calculate_hash;
+use miraifs::chunk::{Self, Chunk, CreateChunkCap, RegisterChunkCap, SharedChunk};
+use miraifs::utils::{calculate_chunk_identifier_hash, calculate_hash};
 use std::string::String;
 use sui::clock::Clock;
 use sui::dynamic_field;
 use sui::event::emit;
 use sui::package;
+use sui::table::{Self, Table};
 use sui::transfer::Receiving;
 use sui::vec_map::{Self, VecMap};
 
@@ -20,6 +21,9 @@ const EInvalidHashLength: u64 = 2;
 const EInvalidVerifyFileCapForFile: u64 = 3;
 const EMaxChunkSizeExceeded: u64 = 4;
 const EVerificationHashMismatch: u64 = 5;
+const ESharedChunkNotInFile: u64 = 6;
+const EChunkNotRemoved: u64 = 7;
+const EChunkNotReplaced: u64 = 8;
 
 public struct FILE has drop {}
 
@@ -31,6 +35,8 @@ public struct File has key, store {
     size: u64,
 }
 
+// Files created by the first version of the package keep their chunks here until
+// they're migrated. Newer files leave chunks empty and keep a ChunkIndex instead.
 public struct Manifest has store {
     count: u32,
     hash: vector<u8>,
@@ -38,10 +44,37 @@ public struct Manifest has store {
     size: u32,
 }
 
+// Chunk hashes are kept in index order for verification, and indexed by hash
+// so that registering or dropping a chunk doesn't scan the manifest. Stored as a
+// dynamic field of the file, so that the File's layout stays upgrade compatible.
+public struct ChunkIndex has store {
+    chunks: vector<ManifestEntry>,
+    indices: Table<vector<u8>, u64>,
+}
+
+public struct ManifestEntry has copy, drop, store {
+    hash: vector<u8>,
+    id: Option<ID>,
+}
+
+// The IDs of a file's CreateChunkCaps in index order, until all chunks are registered.
+// Files that aren't migrated yet keep a VecMap of IDs by hash under the same key.
+public struct CreateChunkCapIds has store {
+    ids: vector<ID>,
+    unregistered: u64,
+}
+
 public struct VerifyFileCap {
     file_id: ID,
 }
 
+// Holds a file's verification open across transactions, so that files with more
+// chunks than fit in one PTB can add their chunk hashes in stages.
+public struct StagedFileCap has key, store {
+    id: UID,
+    file_id: ID,
+}
+
 public struct FileCreatedEvent has copy, drop {
     chunk_size: u32,
     created_at: u64,
@@ -50,6 +83,11 @@ public struct FileCreatedEvent has copy, drop {
     chunks_hash: vector<u8>,
 }
 
+public struct FileUpdatedEvent has copy, drop {
+    file_id: ID,
+    chunks_hash: vector<u8>,
+}
+
 public struct ChunkRegisteredEvent has copy, drop {
     chunk_hash: vector<u8>,
     chunk_id: ID,
@@ -72,32 +110,216 @@ public fun add_chunk_hash(
     assert!(hash.length() == 32, EInvalidHashLength);
 
     // let chunk_identifier_hash = calculate_chunk_identifier_hash(index, hash);
+    let index = borrow_chunk_index(&file.id).chunks.length();
     let create_chunk_cap = chunk::new_create_chunk_cap(
         object::id(file),
         hash,
-        (file.manifest.chunks.size() as u16),
+        (index as u16),
         ctx,
     );
 
-    let create_chunk_cap_ids: &mut VecMap<vector<u8>, ID> = dynamic_field::borrow_mut(
+    let create_chunk_cap_ids: &mut CreateChunkCapIds = dynamic_field::borrow_mut(
         &mut file.id,
         b"create_chunk_cap_ids",
     );
-    create_chunk_cap_ids.insert(hash, object::id(&create_chunk_cap));
+    create_chunk_cap_ids.ids.push_back(object::id(&create_chunk_cap));
+    create_chunk_cap_ids.unregistered = create_chunk_cap_ids.unregistered + 1;
 
-    file
-        .manifest
+    let chunk_index = borrow_chunk_index_mut(&mut file.id);
+    // Aborts on a duplicate hash.
+    chunk_index.indices.add(hash, index);
+    chunk_index
         .chunks
-        .insert(
-            hash,
-            option::none(),
+        .push_back(ManifestEntry {
+            hash: hash,
+            id: option::none(),
+        });
+
+    create_chunk_cap
+}
+
+// Add a chunk that's already stored as a SharedChunk, instead of a hash to create
+// a new chunk for. The chunk is registered right away.
+public fun add_shared_chunk(
+    verify_file_cap: &VerifyFileCap,
+    file: &mut File,
+    chunk: &SharedChunk,
+) {
+    assert!(verify_file_cap.file_id == object::id(file), EInvalidVerifyFileCapForFile);
+
+    let chunk_index = borrow_chunk_index_mut(&mut file.id);
+    let index = chunk_index.chunks.length();
+    let hash = calculate_chunk_identifier_hash((index as u16), chunk.shared_chunk_hash());
+    let chunk_id = chunk.shared_chunk_id();
+
+    // Aborts on a duplicate hash.
+    chunk_index.indices.add(hash, index);
+    chunk_index
+        .chunks
+        .push_back(ManifestEntry {
+            hash: hash,
+            id: option::some(chunk_id),
+        });
+    file.size = file.size + (chunk.shared_chunk_size() as u64);
+
+    emit(ChunkRegisteredEvent {
+        chunk_id: chunk_id,
+        chunk_index: (index as u16),
+        chunk_hash: hash,
+        file_id: file.id(),
+    });
+}
+
+// The counterpart of receive_and_drop_chunk for SharedChunks, which stay in place
+// for the other files that reference them.
+public fun remove_shared_chunk(file: &mut File, chunk: &SharedChunk, index: u64) {
+    let chunk_index = borrow_chunk_index_mut(&mut file.id);
+    let entry = chunk_index.chunks.borrow_mut(index);
+    assert!(entry.id == option::some(chunk.shared_chunk_id()), ESharedChunkNotInFile);
+    chunk_index.indices.remove(entry.hash);
+    entry.id = option::none();
+    file.size = file.size - (chunk.shared_chunk_size() as u64);
+}
+
+// Move the chunks of a file created by the first version of the package from its
+// Manifest into a ChunkIndex, along with the IDs of its CreateChunkCaps that are
+// still unregistered. Files that have a ChunkIndex already are left as they are.
+public fun migrate(file: &mut File, ctx: &mut TxContext) {
+    if (is_indexed(file)) {
+        return
+    };
+
+    let legacy_chunks = file.manifest.chunks;
+    file.manifest.chunks = vec_map::empty();
+    let (hashes, ids) = legacy_chunks.into_keys_values();
+    let mut chunk_index = ChunkIndex {
+        chunks: vector[],
+        indices: table::new(ctx),
+    };
+    let mut i = 0;
+    while (i < hashes.length()) {
+        chunk_index.indices.add(hashes[i], i);
+        chunk_index
+            .chunks
+            .push_back(ManifestEntry {
+                hash: hashes[i],
+                id: ids[i],
+            });
+        i = i + 1;
+    };
+    dynamic_field::add(&mut file.id, b"chunk_index", chunk_index);
+
+    if (
+        dynamic_field::exists_with_type<vector<u8>, VecMap<vector<u8>, ID>>(
+            &file.id,
+            b"create_chunk_cap_ids",
+        )
+    ) {
+        let legacy_ids: VecMap<vector<u8>, ID> = dynamic_field::remove(
+            &mut file.id,
+            b"create_chunk_cap_ids",
+        );
+        let (_, ids) = legacy_ids.into_keys_values();
+        let unregistered = ids.length();
+        dynamic_field::add(
+            &mut file.id,
+            b"create_chunk_cap_ids",
+            CreateChunkCapIds { ids: ids, unregistered: unregistered },
         );
+    };
+}
+
+// Reopen a file's verification to update its contents to the chunks with the
+// given manifest hash. Chunks that changed are removed with receive_and_drop_chunk
+// or remove_shared_chunk and replaced with replace_chunk_hash, chunks past the
+// end of the new contents are added with add_chunk_hash, or removed and cut off
+// with truncate. Unchanged chunks stay as they are. verify completes the update.
+public fun begin_update(
+    file: &mut File,
+    chunks_hash: vector<u8>,
+    ctx: &mut TxContext,
+): VerifyFileCap {
+    assert!(chunks_hash.length() == 32, EInvalidHashLength);
+
+    migrate(file, ctx);
+    file.manifest.hash = chunks_hash;
+    if (!dynamic_field::exists_(&file.id, b"create_chunk_cap_ids")) {
+        dynamic_field::add(
+            &mut file.id,
+            b"create_chunk_cap_ids",
+            CreateChunkCapIds { ids: vector[], unregistered: 0 },
+        );
+    };
+
+    emit(FileUpdatedEvent {
+        file_id: file.id(),
+        chunks_hash: chunks_hash,
+    });
+
+    VerifyFileCap {
+        file_id: file.id(),
+    }
+}
+
+// Like add_chunk_hash, but for the chunk at an index whose chunk was removed.
+public fun replace_chunk_hash(
+    verify_file_cap: &VerifyFileCap,
+    file: &mut File,
+    index: u64,
+    hash: vector<u8>,
+    ctx: &mut TxContext,
+): CreateChunkCap {
+    assert!(verify_file_cap.file_id == object::id(file), EInvalidVerifyFileCapForFile);
+    assert!(hash.length() == 32, EInvalidHashLength);
+
+    let chunk_index = borrow_chunk_index_mut(&mut file.id);
+    let entry = chunk_index.chunks.borrow_mut(index);
+    assert!(entry.id.is_none() && !chunk_index.indices.contains(entry.hash), EChunkNotRemoved);
+    entry.hash = hash;
+    // Aborts on a duplicate hash.
+    chunk_index.indices.add(hash, index);
+
+    let create_chunk_cap = chunk::new_create_chunk_cap(
+        object::id(file),
+        hash,
+        (index as u16),
+        ctx,
+    );
+
+    let create_chunk_cap_ids: &mut CreateChunkCapIds = dynamic_field::borrow_mut(
+        &mut file.id,
+        b"create_chunk_cap_ids",
+    );
+    create_chunk_cap_ids.ids.push_back(object::id(&create_chunk_cap));
+    create_chunk_cap_ids.unregistered = create_chunk_cap_ids.unregistered + 1;
 
     create_chunk_cap
 }
 
-public fun destroy_empty(file: File) {
+// Cut the manifest off after count chunks. The chunks past it must be removed.
+public fun truncate(verify_file_cap: &VerifyFileCap, file: &mut File, count: u64) {
+    assert!(verify_file_cap.file_id == object::id(file), EInvalidVerifyFileCapForFile);
+
+    let chunk_index = borrow_chunk_index_mut(&mut file.id);
+    while (chunk_index.chunks.length() > count) {
+        let entry = chunk_index.chunks.pop_back();
+        assert!(
+            entry.id.is_none() && !chunk_index.indices.contains(entry.hash),
+            EChunkNotRemoved,
+        );
+    };
+}
+
+public fun destroy_empty(mut file: File) {
     assert!(file.manifest.chunks.is_empty(), EChunksNotDeleted);
+    if (is_indexed(&file)) {
+        let ChunkIndex { indices, .. } = dynamic_field::remove<vector<u8>, ChunkIndex>(
+            &mut file.id,
+            b"chunk_index",
+        );
+        assert!(indices.is_empty(), EChunksNotDeleted);
+        indices.destroy_empty();
+    };
 
     let File {
         id,
@@ -136,7 +358,16 @@ public fun new(
         size: 0,
     };
 
-    dynamic_field::add(&mut file.id, b"create_chunk_cap_ids", vec_map::empty<vector<u8>, ID>());
+    dynamic_field::add(
+        &mut file.id,
+        b"chunk_index",
+        ChunkIndex { chunks: vector[], indices: table::new(ctx) },
+    );
+    dynamic_field::add(
+        &mut file.id,
+        b"create_chunk_cap_ids",
+        CreateChunkCapIds { ids: vector[], unregistered: 0 },
+    );
 
     let verify_file_cap = VerifyFileCap {
         file_id: file.id.to_inner(),
@@ -157,28 +388,47 @@ public fun receive_and_register_chunk(
     file: &mut File,
     cap_to_receive: Receiving<RegisterChunkCap>,
 ) {
-    // TODO: Implement create_chunk_cap_ids df cleanup.
     let cap = transfer::public_receive(&mut file.id, cap_to_receive);
     let chunk_id = cap.register_chunk_cap_id();
     let chunk_hash = cap.register_chunk_cap_hash();
     let chunk_size = cap.register_chunk_cap_size();
 
-    let create_chunk_cap_ids_mut: &mut VecMap<vector<u8>, ID> = dynamic_field::borrow_mut(
-        &mut file.id,
-        b"create_chunk_cap_ids",
-    );
-    create_chunk_cap_ids_mut.remove(&chunk_hash);
-
-    file.manifest.chunks.get_mut(&chunk_hash).fill(chunk_id);
-    file.size = file.size + (chunk_size as u64);
+    if (is_indexed(file)) {
+        let chunk_index = borrow_chunk_index_mut(&mut file.id);
+        // Aborts if the chunk is already registered.
+        let index = *chunk_index.indices.borrow(chunk_hash);
+        chunk_index.chunks.borrow_mut(index).id.fill(chunk_id);
 
-    if (create_chunk_cap_ids_mut.is_empty()) {
-        let create_chunk_cap_ids: VecMap<vector<u8>, ID> = dynamic_field::remove(
+        let create_chunk_cap_ids_mut: &mut CreateChunkCapIds = dynamic_field::borrow_mut(
+            &mut file.id,
+            b"create_chunk_cap_ids",
+        );
+        create_chunk_cap_ids_mut.unregistered = create_chunk_cap_ids_mut.unregistered - 1;
+
+        if (create_chunk_cap_ids_mut.unregistered == 0) {
+            let CreateChunkCapIds { .. } = dynamic_field::remove<vector<u8>, CreateChunkCapIds>(
+                &mut file.id,
+                b"create_chunk_cap_ids",
+            );
+        };
+    } else {
+        let create_chunk_cap_ids_mut: &mut VecMap<vector<u8>, ID> = dynamic_field::borrow_mut(
             &mut file.id,
             b"create_chunk_cap_ids",
         );
-        create_chunk_cap_ids.destroy_empty();
+        create_chunk_cap_ids_mut.remove(&chunk_hash);
+
+        if (create_chunk_cap_ids_mut.is_empty()) {
+            let create_chunk_cap_ids: VecMap<vector<u8>, ID> = dynamic_field::remove(
+                &mut file.id,
+                b"create_chunk_cap_ids",
+            );
+            create_chunk_cap_ids.destroy_empty();
+        };
+
+        file.manifest.chunks.get_mut(&chunk_hash).fill(chunk_id);
     };
+    file.size = file.size + (chunk_size as u64);
 
     emit(ChunkRegisteredEvent {
         chunk_id: chunk_id,
@@ -192,18 +442,48 @@ public fun receive_and_register_chunk(
 
 public fun receive_and_drop_chunk(file: &mut File, chunk_to_receive: Receiving<Chunk>) {
     let chunk = transfer::public_receive(&mut file.id, chunk_to_receive);
-    file.manifest.chunks.remove(&chunk.hash());
+    if (is_indexed(file)) {
+        // The entry keeps its place in the manifest, but no longer points to a chunk.
+        let chunk_index = borrow_chunk_index_mut(&mut file.id);
+        let index = chunk_index.indices.remove(chunk.hash());
+        chunk_index.chunks.borrow_mut(index).id = option::none();
+    } else {
+        file.manifest.chunks.remove(&chunk.hash());
+    };
+    file.size = file.size - (chunk.size() as u64);
     chunk.drop();
 }
 
+public fun stage(cap: VerifyFileCap, ctx: &mut TxContext): StagedFileCap {
+    let VerifyFileCap { file_id } = cap;
+    StagedFileCap {
+        id: object::new(ctx),
+        file_id: file_id,
+    }
+}
+
+public fun unstage(cap: StagedFileCap): VerifyFileCap {
+    let StagedFileCap { id, file_id } = cap;
+    id.delete();
+    VerifyFileCap {
+        file_id: file_id,
+    }
+}
+
 public fun verify(cap: VerifyFileCap, file: &mut File) {
     assert!(cap.file_id == object::id(file), EInvalidVerifyFileCapForFile);
 
+    let entries = manifest_entries(file);
+    let indexed = is_indexed(file);
     let mut concat_chunk_hashes_bytes: vector<u8> = vector[];
     let mut i = 0;
-    while (i < file.manifest.chunks.size()) {
-        let (chunk_hash, _) = file.manifest.chunks.get_entry_by_idx(i);
-        concat_chunk_hashes_bytes.append(*chunk_hash);
+    while (i < entries.length()) {
+        // A chunk dropped by an update and never replaced would leave a hole.
+        assert!(
+            !indexed || borrow_chunk_index(&file.id).indices.contains(entries[i].hash),
+            EChunkNotReplaced,
+        );
+        concat_chunk_hashes_bytes.append(entries[i].hash);
         i = i + 1;
     };
 
@@ -212,11 +492,44 @@ public fun verify(cap: VerifyFileCap, file: &mut File) {
         EVerificationHashMismatch,
     );
 
-    file.manifest.count = file.manifest.chunks.size() as u32;
+    file.manifest.count = entries.length() as u32;
+
+    // Files made up of SharedChunks alone have no chunks left to register.
+    // Files that aren't migrated keep the first version's VecMap, which is removed
+    // once it's empty instead.
+    if (
+        dynamic_field::exists_with_type<vector<u8>, CreateChunkCapIds>(
+            &file.id,
+            b"create_chunk_cap_ids",
+        )
+    ) {
+        let create_chunk_cap_ids: &CreateChunkCapIds = dynamic_field::borrow(
+            &file.id,
+            b"create_chunk_cap_ids",
+        );
+        if (create_chunk_cap_ids.unregistered == 0) {
+            let CreateChunkCapIds { .. } = dynamic_field::remove<vector<u8>, CreateChunkCapIds>(
+                &mut file.id,
+                b"create_chunk_cap_ids",
+            );
+        };
+    };
 
     let VerifyFileCap { .. } = cap;
 }
 
+fun is_indexed(file: &File): bool {
+    dynamic_field::exists_(&file.id, b"chunk_index")
+}
+
+fun borrow_chunk_index(id: &UID): &ChunkIndex {
+    dynamic_field::borrow(id, b"chunk_index")
+}
+
+fun borrow_chunk_index_mut(id: &mut UID): &mut ChunkIndex {
+    dynamic_field::borrow_mut(id, b"chunk_index")
+}
+
 public fun id(file: &File): ID {
     file.id.to_inner()
 }
@@ -229,8 +542,64 @@ public fun chunks_hash(file: &File): vector<u8> {
     file.manifest.hash
 }
 
+// Deprecated, use manifest_entries. The chunks by hash in index order, as the first
+// version of the package returned them, kept because upgrades can't change public
+// signatures. Chunks that were removed, which keep their place in a ChunkIndex, are
+// left out. For indexed files the map is rebuilt with VecMap::insert, whose duplicate
+// check makes it quadratic in the number of chunks, and sui::vec_map has no
+// unchecked constructor. manifest_entries returns the entries vector instead.
 public fun chunks_manifest(file: &File): VecMap<vector<u8>, Option<ID>> {
-    file.manifest.chunks
+    if (!is_indexed(file)) {
+        return file.manifest.chunks
+    };
+    let chunk_index = borrow_chunk_index(&file.id);
+    let mut chunks = vec_map::empty();
+    let mut i = 0;
+    while (i < chunk_index.chunks.length()) {
+        let entry = &chunk_index.chunks[i];
+        if (chunk_index.indices.contains(entry.hash)) {
+            chunks.insert(entry.hash, entry.id);
+        };
+        i = i + 1;
+    };
+    chunks
+}
+
+// The entries of the manifest in index order, including removed ones.
+public fun manifest_entries(file: &File): vector<ManifestEntry> {
+    if (is_indexed(file)) {
+        return borrow_chunk_index(&file.id).chunks
+    };
+    let mut entries = vector[];
+    let mut i = 0;
+    while (i < file.manifest.chunks.size()) {
+        let (hash, id) = file.manifest.chunks.get_entry_by_idx(i);
+        entries.push_back(ManifestEntry {
+            hash: *hash,
+            id: *id,
+        });
+        i = i + 1;
+    };
+    entries
+}
+
+public fun chunk_id(file: &File, hash: vector<u8>): Option<ID> {
+    if (!is_indexed(file)) {
+        return file.manifest.chunks.try_get(&hash).destroy_with_default(option::none())
+    };
+    let chunk_index = borrow_chunk_index(&file.id);
+    if (!chunk_index.indices.contains(hash)) {
+        return option::none()
+    };
+    chunk_index.chunks[*chunk_index.indices.borrow(hash)].id
+}
+
+public fun manifest_entry_hash(entry: &ManifestEntry): vector<u8> {
+    entry.hash
+}
+
+public fun manifest_entry_id(entry: &ManifestEntry): Option<ID> {
+    entry.id
 }
 
 public fun created_at(file: &File): u64 {
@@ -244,3 +613,63 @@ public fun mime_type(file: &File): String {
 public fun size(file: &File): u64 {
     file.size
 }
+
+// === Test Functions ===
+
+// A file as the first version of the package created it, with its chunks in the
+// Manifest's VecMap instead of a ChunkIndex.
+#[test_only]
+public fun new_legacy_for_testing(
+    chunk_size: u32,
+    mime_type: String,
+    chunks_hash: vector<u8>,
+    clock: &Clock,
+    ctx: &mut TxContext,
+): (File, VerifyFileCap) {
+    let mut file = File {
+        id: object::new(ctx),
+        manifest: Manifest {
+            count: 0,
+            hash: chunks_hash,
+            chunks: vec_map::empty(),
+            size: chunk_size,
+        },
+        created_at: clock.timestamp_ms(),
+        mime_type: mime_type,
+        size: 0,
+    };
+    dynamic_field::add(&mut file.id, b"create_chunk_cap_ids", vec_map::empty<vector<u8>, ID>());
+    let verify_file_cap = VerifyFileCap {
+        file_id: file.id.to_inner(),
+    };
+    (file, verify_file_cap)
+}
+
+// add_chunk_hash as the first version of the package implemented it.
+#[test_only]
+public fun add_legacy_chunk_hash_for_testing(
+    verify_file_cap: &VerifyFileCap,
+    file: &mut File,
+    hash: vector<u8>,
+    ctx: &mut TxContext,
+): CreateChunkCap {
+    assert!(verify_file_cap.file_id == object::id(file), EInvalidVerifyFileCapForFile);
+    let create_chunk_cap = chunk::new_create_chunk_cap(
+        object::id(file),
+        hash,
+        (file.manifest.chunks.size() as u16),
+        ctx,
+    );
+    let create_chunk_cap_ids: &mut VecMap<vector<u8>, ID> = dynamic_field::borrow_mut(
+        &mut file.id,
+        b"create_chunk_cap_ids",
+    );
+    create_chunk_cap_ids.insert(hash, object::id(&create_chunk_cap));
+    file.manifest.chunks.insert(hash, option::none());
+    create_chunk_cap
+}
+
+#[test_only]
+public fun is_indexed_for_testing(file: &File): bool {
+    is_indexed(file)
+}
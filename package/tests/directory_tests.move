@@ -0,0 +1,114 @@
+// Copyright (c) Studio Mirai, Ltd.
+// SPDX-License-Identifier: Apache-2.0
+
+#[test_only]
+module miraifs::directory_tests;
+
+use miraifs::directory::{Self, Directory};
+use std::string::String;
+use sui::test_scenario::{Self, Scenario};
+
+const SENDER: address = @0xA;
+
+#[test]
+fun resolve_paths() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let directory = new_directory(&mut scenario, 4);
+
+    assert!(directory.length() == 4);
+    assert!(directory.file_id(path(2)) == option::some(file_id(2)));
+    assert!(directory.file_id(b"missing".to_string()).is_none());
+
+    let entries = directory.entries();
+    let mut i = 0;
+    while (i < entries.length()) {
+        assert!(entries[i].entry_path() == path(i));
+        assert!(entries[i].entry_file_id() == file_id(i));
+        i = i + 1;
+    };
+
+    transfer::public_transfer(directory, SENDER);
+    scenario.end();
+}
+
+#[test]
+fun replace_path() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let mut directory = new_directory(&mut scenario, 3);
+
+    assert!(directory.replace(path(1), file_id(7)) == file_id(1));
+    assert!(directory.file_id(path(1)) == option::some(file_id(7)));
+    assert!(directory.length() == 3);
+
+    transfer::public_transfer(directory, SENDER);
+    scenario.end();
+}
+
+#[test]
+fun remove_paths() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let mut directory = new_directory(&mut scenario, 4);
+
+    // The last entry moves into the removed entry's place, and is still found by path.
+    assert!(directory.remove(path(1)) == file_id(1));
+    assert!(!directory.contains(path(1)));
+    assert!(directory.file_id(path(3)) == option::some(file_id(3)));
+    assert!(directory.entries()[1].entry_path() == path(3));
+
+    directory.remove(path(3));
+    directory.remove(path(0));
+    directory.remove(path(2));
+    directory.destroy_empty();
+    scenario.end();
+}
+
+#[test, expected_failure(abort_code = directory::EPathAlreadyExists)]
+fun add_rejects_duplicate_paths() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let mut directory = new_directory(&mut scenario, 2);
+
+    directory.add(path(1), file_id(7));
+
+    transfer::public_transfer(directory, SENDER);
+    scenario.end();
+}
+
+#[test, expected_failure(abort_code = directory::EPathNotFound)]
+fun remove_rejects_missing_paths() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let mut directory = new_directory(&mut scenario, 2);
+
+    directory.remove(path(2));
+
+    transfer::public_transfer(directory, SENDER);
+    scenario.end();
+}
+
+#[test, expected_failure(abort_code = directory::EDirectoryNotEmpty)]
+fun destroy_empty_rejects_entries() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let directory = new_directory(&mut scenario, 1);
+
+    directory.destroy_empty();
+    scenario.end();
+}
+
+fun new_directory(scenario: &mut Scenario, count: u64): Directory {
+    let mut directory = directory::new(scenario.ctx());
+    let mut i = 0;
+    while (i < count) {
+        directory.add(path(i), file_id(i));
+        i = i + 1;
+    };
+    directory
+}
+
+fun path(index: u64): String {
+    let mut path = b"assets/".to_string();
+    path.append(index.to_string());
+    path
+}
+
+fun file_id(index: u64): ID {
+    object::id_from_address(sui::address::from_u256((index + 1) as u256))
+}
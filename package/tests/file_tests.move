@@ -0,0 +1,537 @@
+// Copyright (c) Studio Mirai, Ltd.
+// SPDX-License-Identifier: Apache-2.0
+
+// Each lifecycle test creates, registers and drops a file of a different chunk count.
+// Compare their gas with `sui move test --statistics`: it should grow linearly with
+// the chunk count, i.e. the gas per chunk should stay flat.
+#[test_only]
+module miraifs::file_tests;
+
+use miraifs::chunk::{Self, Chunk, CreateChunkCap, RegisterChunkCap, SharedChunk};
+use miraifs::file::{Self, File, StagedFileCap};
+use miraifs::utils::{calculate_chunk_identifier_hash, calculate_hash};
+use sui::bcs;
+use sui::clock;
+use sui::test_scenario::{Self, Scenario};
+
+const SENDER: address = @0xA;
+const CHUNK_SIZE: u32 = 8;
+
+#[test]
+fun lifecycle_16_chunks() {
+    lifecycle(16);
+}
+
+#[test]
+fun lifecycle_64_chunks() {
+    lifecycle(64);
+}
+
+#[test]
+fun lifecycle_256_chunks() {
+    lifecycle(256);
+}
+
+#[test]
+fun lookup_chunk_id_by_hash() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_file(&mut scenario, 4);
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+
+    let manifest = file.manifest_entries();
+    let entry = &manifest[2];
+    assert!(file.chunk_id(entry.manifest_entry_hash()) == entry.manifest_entry_id());
+    assert!(file.chunk_id(chunk_hash(7)).is_none());
+
+    transfer::public_transfer(file, SENDER);
+    scenario.end();
+}
+
+#[test]
+fun create_file_in_stages() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let clock = clock::create_for_testing(scenario.ctx());
+
+    let hashes = vector[chunk_hash(0), chunk_hash(1), chunk_hash(2)];
+    let (mut file, verify_file_cap) = file::new(
+        CHUNK_SIZE,
+        b"application/octet-stream".to_string(),
+        manifest_hash(&hashes),
+        &clock,
+        scenario.ctx(),
+    );
+    let mut caps = vector[];
+    caps.push_back(file::add_chunk_hash(&verify_file_cap, &mut file, hashes[0], scenario.ctx()));
+    transfer::public_transfer(file::stage(verify_file_cap, scenario.ctx()), SENDER);
+    transfer::public_transfer(file, SENDER);
+
+    // Each later stage resumes where the previous one left off.
+    let mut i = 1;
+    while (i < hashes.length()) {
+        scenario.next_tx(SENDER);
+        let mut file = scenario.take_from_sender<File>();
+        let verify_file_cap = file::unstage(scenario.take_from_sender<StagedFileCap>());
+        caps.push_back(file::add_chunk_hash(&verify_file_cap, &mut file, hashes[i], scenario.ctx()));
+        if (i + 1 < hashes.length()) {
+            transfer::public_transfer(file::stage(verify_file_cap, scenario.ctx()), SENDER);
+        } else {
+            file::verify(verify_file_cap, &mut file);
+            assert!(file.chunks_count() == 3);
+        };
+        scenario.return_to_sender(file);
+        i = i + 1;
+    };
+
+    create_chunks(&mut scenario, caps);
+    clock.destroy_for_testing();
+    scenario.end();
+}
+
+#[test, expected_failure(abort_code = file::EVerificationHashMismatch)]
+fun verify_rejects_out_of_order_chunks() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let clock = clock::create_for_testing(scenario.ctx());
+
+    let hashes = vector[chunk_hash(0), chunk_hash(1)];
+    let (mut file, verify_file_cap) = file::new(
+        CHUNK_SIZE,
+        b"application/octet-stream".to_string(),
+        manifest_hash(&hashes),
+        &clock,
+        scenario.ctx(),
+    );
+    let cap_1 = file::add_chunk_hash(&verify_file_cap, &mut file, hashes[1], scenario.ctx());
+    let cap_0 = file::add_chunk_hash(&verify_file_cap, &mut file, hashes[0], scenario.ctx());
+    file::verify(verify_file_cap, &mut file);
+
+    chunk::drop_create_chunk_cap(cap_0);
+    chunk::drop_create_chunk_cap(cap_1);
+    transfer::public_transfer(file, SENDER);
+    clock.destroy_for_testing();
+    scenario.end();
+}
+
+#[test, expected_failure(abort_code = sui::dynamic_field::EFieldAlreadyExists)]
+fun add_chunk_hash_rejects_duplicate_hashes() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let clock = clock::create_for_testing(scenario.ctx());
+
+    let hashes = vector[chunk_hash(0), chunk_hash(0)];
+    let (mut file, verify_file_cap) = file::new(
+        CHUNK_SIZE,
+        b"application/octet-stream".to_string(),
+        manifest_hash(&hashes),
+        &clock,
+        scenario.ctx(),
+    );
+    let cap_0 = file::add_chunk_hash(&verify_file_cap, &mut file, hashes[0], scenario.ctx());
+    let cap_1 = file::add_chunk_hash(&verify_file_cap, &mut file, hashes[1], scenario.ctx());
+    file::verify(verify_file_cap, &mut file);
+
+    chunk::drop_create_chunk_cap(cap_0);
+    chunk::drop_create_chunk_cap(cap_1);
+    transfer::public_transfer(file, SENDER);
+    clock.destroy_for_testing();
+    scenario.end();
+}
+
+#[test]
+fun share_chunks_across_files() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut first, mut caps) = new_file(&mut scenario, 2);
+
+    // Share chunk 1 of the first file, and create chunk 0 as usual.
+    let cap = caps.pop_back();
+    let (mut chunk, verify_chunk_cap) = chunk::new(cap, scenario.ctx());
+    chunk.add_data(vector[chunk_data(1)]);
+    chunk::verify_and_share(verify_chunk_cap, chunk, scenario.ctx());
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut first);
+    assert!(first.size() == 2 * (CHUNK_SIZE as u64));
+    let shared_chunk = scenario.take_immutable<SharedChunk>();
+    assert!(first.manifest_entries()[1].manifest_entry_id() == option::some(object::id(&shared_chunk)));
+
+    // A second file reuses the shared chunk at index 1 without creating it again.
+    let clock = clock::create_for_testing(scenario.ctx());
+    let hashes = vector[chunk_hash(2), chunk_hash(1)];
+    let (mut second, verify_file_cap) = file::new(
+        CHUNK_SIZE,
+        b"application/octet-stream".to_string(),
+        manifest_hash(&hashes),
+        &clock,
+        scenario.ctx(),
+    );
+    let cap = file::add_chunk_hash(&verify_file_cap, &mut second, hashes[0], scenario.ctx());
+    file::add_shared_chunk(&verify_file_cap, &mut second, &shared_chunk);
+    file::verify(verify_file_cap, &mut second);
+    assert!(second.size() == (CHUNK_SIZE as u64));
+    assert!(second.chunk_id(hashes[1]) == option::some(object::id(&shared_chunk)));
+
+    // Removing the shared chunk from one file leaves it in place for the other.
+    second.remove_shared_chunk(&shared_chunk, 1);
+    assert!(second.chunk_id(hashes[1]).is_none());
+    assert!(first.chunk_id(hashes[1]) == option::some(object::id(&shared_chunk)));
+
+    chunk::drop_create_chunk_cap(cap);
+    test_scenario::return_immutable(shared_chunk);
+    transfer::public_transfer(first, SENDER);
+    transfer::public_transfer(second, SENDER);
+    clock.destroy_for_testing();
+    scenario.end();
+}
+
+#[test, expected_failure(abort_code = file::ESharedChunkNotInFile)]
+fun remove_shared_chunk_rejects_other_chunks() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, mut caps) = new_file(&mut scenario, 2);
+
+    let cap = caps.pop_back();
+    let (mut chunk, verify_chunk_cap) = chunk::new(cap, scenario.ctx());
+    chunk.add_data(vector[chunk_data(1)]);
+    chunk::verify_and_share(verify_chunk_cap, chunk, scenario.ctx());
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    let shared_chunk = scenario.take_immutable<SharedChunk>();
+    file.remove_shared_chunk(&shared_chunk, 0);
+
+    test_scenario::return_immutable(shared_chunk);
+    transfer::public_transfer(file, SENDER);
+    scenario.end();
+}
+
+#[test]
+fun update_replaces_and_appends_chunks() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_file(&mut scenario, 3);
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    let manifest = file.manifest_entries();
+    let unchanged_id = manifest[0].manifest_entry_id();
+
+    // Chunk 1 changes to chunk 4's data, and chunk 3 is appended.
+    let hashes = vector[chunk_hash(0), updated_chunk_hash(1, 4), chunk_hash(2), chunk_hash(3)];
+    let verify_file_cap = file.begin_update(manifest_hash(&hashes), scenario.ctx());
+    let ticket = test_scenario::receiving_ticket_by_id<Chunk>(manifest[1].manifest_entry_id().destroy_some());
+    file.receive_and_drop_chunk(ticket);
+    assert!(file.size() == 2 * (CHUNK_SIZE as u64));
+    let cap_1 = file::replace_chunk_hash(&verify_file_cap, &mut file, 1, hashes[1], scenario.ctx());
+    let cap_3 = file::add_chunk_hash(&verify_file_cap, &mut file, hashes[3], scenario.ctx());
+    file::verify(verify_file_cap, &mut file);
+    assert!(file.chunks_count() == 4);
+
+    let (mut chunk, verify_chunk_cap) = chunk::new(cap_1, scenario.ctx());
+    chunk.add_data(vector[chunk_data(4)]);
+    chunk::verify(verify_chunk_cap, chunk, scenario.ctx());
+    let (mut chunk, verify_chunk_cap) = chunk::new(cap_3, scenario.ctx());
+    chunk.add_data(vector[chunk_data(3)]);
+    chunk::verify(verify_chunk_cap, chunk, scenario.ctx());
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    assert!(file.size() == 4 * (CHUNK_SIZE as u64));
+    assert!(file.manifest_entries()[0].manifest_entry_id() == unchanged_id);
+    assert!(file.chunk_id(hashes[1]).is_some());
+
+    transfer::public_transfer(file, SENDER);
+    scenario.end();
+}
+
+#[test]
+fun update_truncates_chunks() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_file(&mut scenario, 3);
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    let manifest = file.manifest_entries();
+
+    let hashes = vector[chunk_hash(0)];
+    let verify_file_cap = file.begin_update(manifest_hash(&hashes), scenario.ctx());
+    let mut i = 1;
+    while (i < 3) {
+        let ticket = test_scenario::receiving_ticket_by_id<Chunk>(manifest[i].manifest_entry_id().destroy_some());
+        file.receive_and_drop_chunk(ticket);
+        i = i + 1;
+    };
+    file::truncate(&verify_file_cap, &mut file, 1);
+    file::verify(verify_file_cap, &mut file);
+    assert!(file.chunks_count() == 1);
+    assert!(file.size() == (CHUNK_SIZE as u64));
+
+    transfer::public_transfer(file, SENDER);
+    scenario.end();
+}
+
+#[test, expected_failure(abort_code = file::EChunkNotRemoved)]
+fun truncate_rejects_chunks_not_removed() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_file(&mut scenario, 2);
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+
+    let hashes = vector[chunk_hash(0)];
+    let verify_file_cap = file.begin_update(manifest_hash(&hashes), scenario.ctx());
+    file::truncate(&verify_file_cap, &mut file, 1);
+    file::verify(verify_file_cap, &mut file);
+
+    transfer::public_transfer(file, SENDER);
+    scenario.end();
+}
+
+#[test, expected_failure(abort_code = file::EChunkNotReplaced)]
+fun verify_rejects_dropped_chunks_not_replaced() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_file(&mut scenario, 3);
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    let manifest = file.manifest_entries();
+
+    // The manifest hash is unchanged, but chunk 1 is dropped and not replaced.
+    let hashes = vector[chunk_hash(0), chunk_hash(1), chunk_hash(2)];
+    let verify_file_cap = file.begin_update(manifest_hash(&hashes), scenario.ctx());
+    let ticket = test_scenario::receiving_ticket_by_id<Chunk>(manifest[1].manifest_entry_id().destroy_some());
+    file.receive_and_drop_chunk(ticket);
+    file::verify(verify_file_cap, &mut file);
+
+    transfer::public_transfer(file, SENDER);
+    scenario.end();
+}
+
+#[test]
+fun legacy_file_lifecycle() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_legacy_file(&mut scenario, 3);
+    assert!(file.chunks_count() == 3);
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    assert!(!file.is_indexed_for_testing());
+    assert!(file.size() == 3 * (CHUNK_SIZE as u64));
+    assert!(file.chunks_manifest().size() == 3);
+    let entries = file.manifest_entries();
+    assert!(entries[1].manifest_entry_hash() == chunk_hash(1));
+    assert!(file.chunk_id(chunk_hash(1)) == entries[1].manifest_entry_id());
+    assert!(file.chunk_id(chunk_hash(1)).is_some());
+
+    let file_address = object::id(&file).to_address();
+    let mut chunk_ids = test_scenario::ids_for_address<Chunk>(file_address);
+    while (!chunk_ids.is_empty()) {
+        let ticket = test_scenario::receiving_ticket_by_id<Chunk>(chunk_ids.pop_back());
+        file.receive_and_drop_chunk(ticket);
+    };
+    assert!(file.size() == 0);
+    file.destroy_empty();
+
+    scenario.end();
+}
+
+#[test]
+fun update_migrates_legacy_file() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_legacy_file(&mut scenario, 3);
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    let manifest = file.manifest_entries();
+    let unchanged_id = manifest[0].manifest_entry_id();
+
+    let hashes = vector[chunk_hash(0), updated_chunk_hash(1, 4), chunk_hash(2)];
+    let verify_file_cap = file.begin_update(manifest_hash(&hashes), scenario.ctx());
+    assert!(file.is_indexed_for_testing());
+    assert!(file.manifest_entries() == manifest);
+    let ticket = test_scenario::receiving_ticket_by_id<Chunk>(manifest[1].manifest_entry_id().destroy_some());
+    file.receive_and_drop_chunk(ticket);
+    let cap_1 = file::replace_chunk_hash(&verify_file_cap, &mut file, 1, hashes[1], scenario.ctx());
+    file::verify(verify_file_cap, &mut file);
+
+    let (mut chunk, verify_chunk_cap) = chunk::new(cap_1, scenario.ctx());
+    chunk.add_data(vector[chunk_data(4)]);
+    chunk::verify(verify_chunk_cap, chunk, scenario.ctx());
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    assert!(file.size() == 3 * (CHUNK_SIZE as u64));
+    assert!(file.manifest_entries()[0].manifest_entry_id() == unchanged_id);
+    assert!(file.chunk_id(hashes[1]).is_some());
+    assert!(file.manifest_entries().length() == 3);
+    // The deprecated view still returns the indexed chunks.
+    assert!(file.chunks_manifest().size() == 3);
+
+    transfer::public_transfer(file, SENDER);
+    scenario.end();
+}
+
+#[test]
+fun migrate_keeps_unregistered_chunks() {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_legacy_file(&mut scenario, 2);
+    file.migrate(scenario.ctx());
+    // Migrating again does nothing.
+    file.migrate(scenario.ctx());
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    assert!(file.size() == 2 * (CHUNK_SIZE as u64));
+    assert!(file.manifest_entries()[1].manifest_entry_id().is_some());
+
+    let file_address = object::id(&file).to_address();
+    let mut chunk_ids = test_scenario::ids_for_address<Chunk>(file_address);
+    while (!chunk_ids.is_empty()) {
+        let ticket = test_scenario::receiving_ticket_by_id<Chunk>(chunk_ids.pop_back());
+        file.receive_and_drop_chunk(ticket);
+    };
+    file.destroy_empty();
+
+    scenario.end();
+}
+
+fun lifecycle(count: u64) {
+    let mut scenario = test_scenario::begin(SENDER);
+    let (mut file, caps) = new_file(&mut scenario, count);
+    assert!(file.chunks_count() == (count as u32));
+    create_chunks(&mut scenario, caps);
+
+    scenario.next_tx(SENDER);
+    register_chunks(&mut file);
+    assert!(file.size() == count * (CHUNK_SIZE as u64));
+
+    // The manifest stays in index order, with every chunk registered.
+    let manifest = file.manifest_entries();
+    let mut i = 0;
+    while (i < count) {
+        assert!(manifest[i].manifest_entry_hash() == chunk_hash(i));
+        assert!(manifest[i].manifest_entry_id().is_some());
+        i = i + 1;
+    };
+
+    let file_address = object::id(&file).to_address();
+    let mut chunk_ids = test_scenario::ids_for_address<Chunk>(file_address);
+    while (!chunk_ids.is_empty()) {
+        let ticket = test_scenario::receiving_ticket_by_id<Chunk>(chunk_ids.pop_back());
+        file.receive_and_drop_chunk(ticket);
+    };
+    file.destroy_empty();
+
+    scenario.end();
+}
+
+fun new_file(scenario: &mut Scenario, count: u64): (File, vector<CreateChunkCap>) {
+    let clock = clock::create_for_testing(scenario.ctx());
+
+    let mut hashes = vector[];
+    let mut i = 0;
+    while (i < count) {
+        hashes.push_back(chunk_hash(i));
+        i = i + 1;
+    };
+
+    let (mut file, verify_file_cap) = file::new(
+        CHUNK_SIZE,
+        b"application/octet-stream".to_string(),
+        manifest_hash(&hashes),
+        &clock,
+        scenario.ctx(),
+    );
+    let mut caps = vector[];
+    let mut i = 0;
+    while (i < count) {
+        caps.push_back(file::add_chunk_hash(&verify_file_cap, &mut file, hashes[i], scenario.ctx()));
+        i = i + 1;
+    };
+    file::verify(verify_file_cap, &mut file);
+
+    clock.destroy_for_testing();
+    (file, caps)
+}
+
+// A file with count chunks as the first version of the package created it.
+fun new_legacy_file(scenario: &mut Scenario, count: u64): (File, vector<CreateChunkCap>) {
+    let clock = clock::create_for_testing(scenario.ctx());
+
+    let mut hashes = vector[];
+    let mut i = 0;
+    while (i < count) {
+        hashes.push_back(chunk_hash(i));
+        i = i + 1;
+    };
+
+    let (mut file, verify_file_cap) = file::new_legacy_for_testing(
+        CHUNK_SIZE,
+        b"application/octet-stream".to_string(),
+        manifest_hash(&hashes),
+        &clock,
+        scenario.ctx(),
+    );
+    let mut caps = vector[];
+    let mut i = 0;
+    while (i < count) {
+        caps.push_back(file::add_legacy_chunk_hash_for_testing(&verify_file_cap, &mut file, hashes[i], scenario.ctx()));
+        i = i + 1;
+    };
+    file::verify(verify_file_cap, &mut file);
+
+    clock.destroy_for_testing();
+    (file, caps)
+}
+
+// Create and verify each chunk, which sends it and its RegisterChunkCap to the file.
+fun create_chunks(scenario: &mut Scenario, mut caps: vector<CreateChunkCap>) {
+    while (!caps.is_empty()) {
+        // The caps are in index order.
+        let data = chunk_data(caps.length() - 1);
+        let cap = caps.pop_back();
+        let (mut chunk, verify_chunk_cap) = chunk::new(cap, scenario.ctx());
+        chunk.add_data(vector[data]);
+        chunk::verify(verify_chunk_cap, chunk, scenario.ctx());
+    };
+    caps.destroy_empty();
+}
+
+fun register_chunks(file: &mut File) {
+    let file_address = object::id(file).to_address();
+    let mut cap_ids = test_scenario::ids_for_address<RegisterChunkCap>(file_address);
+    while (!cap_ids.is_empty()) {
+        let ticket = test_scenario::receiving_ticket_by_id<RegisterChunkCap>(cap_ids.pop_back());
+        file.receive_and_register_chunk(ticket);
+    };
+}
+
+fun chunk_data(index: u64): vector<u8> {
+    bcs::to_bytes(&index)
+}
+
+fun chunk_hash(index: u64): vector<u8> {
+    calculate_chunk_identifier_hash((index as u16), calculate_hash(&chunk_data(index)))
+}
+
+// The hash of chunk data_index's data at another index.
+fun updated_chunk_hash(index: u64, data_index: u64): vector<u8> {
+    calculate_chunk_identifier_hash((index as u16), calculate_hash(&chunk_data(data_index)))
+}
+
+fun manifest_hash(hashes: &vector<vector<u8>>): vector<u8> {
+    let mut bytes = vector[];
+    let mut i = 0;
+    while (i < hashes.length()) {
+        bytes.append(hashes[i]);
+        i = i + 1;
+    };
+    calculate_hash(&bytes)
+}
@@ -0,0 +1,193 @@
+"""
+Benchmark adaptive upload concurrency against a congested fullnode stand-in
+(see fullnode.py). The node executes a limited number of transactions at once,
+queues the rest and rejects transactions beyond its backlog as overloaded, so
+too little concurrency leaves throughput unused and too much only adds latency
+and rejections.
+
+Each fixed concurrency is compared with the AIMD controller, whose limit should
+converge near the node's capacity wherever it starts.
+
+    uv run python benchmarks/bench_concurrency.py
+    uv run python benchmarks/bench_concurrency.py --capacity 16 --max-pending 32 --fixed 4 16 64 --initial 1 32
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+os.environ.setdefault("MIRAIFS_PACKAGE_ID", "0x" + "ab" * 32)
+
+from bench_upload import FUNDS, GAS_BUDGET_PER_CHUNK, deterministic_bytes, new_config  # noqa: E402
+from fullnode import Faults, Fullnode, Latency  # noqa: E402
+from miraifs_sdk.concurrency import AimdController  # noqa: E402
+from miraifs_sdk.metrics import RecordingInstrumentation, set_instrumentation  # noqa: E402
+from miraifs_sdk.miraifs import MiraiFs  # noqa: E402
+from miraifs_sdk.utils import build_chunks  # noqa: E402
+
+
+def run_case(
+    mfs: MiraiFs,
+    path: Path,
+    chunk_size: int,
+    new_controller: Callable[[], AimdController],
+) -> tuple[dict, AimdController]:
+    instrumentation = RecordingInstrumentation()
+    set_instrumentation(instrumentation)
+    chunks = build_chunks(path.read_bytes(), chunk_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        gas_coins = mfs.allocate_gas_coins(len(chunks) + 1, GAS_BUDGET_PER_CHUNK)
+        file, path = mfs.create_file(
+            path,
+            chunks,
+            chunk_size,
+            recipient=mfs.config.active_address,
+            gas_coin=gas_coins.pop(0),
+        )
+        # Only the chunk upload stage is under the controller.
+        controller = new_controller()
+        instrumentation.start()
+        mfs.upload_chunks(file, path, None, gas_coins, chunks, controller)
+        report = instrumentation.report()
+        mfs.consolidate_coins(mfs.get_all_gas_coins(mfs.config.active_address))
+    return report, controller
+
+
+def steady_state(
+    history: list[tuple[float, int]],
+    duration: float,
+) -> float:
+    """The time-weighted mean limit over the second half of the run."""
+    start = duration / 2
+    weighted = 0.0
+    for (at, limit), (until, _) in zip(history, history[1:] + [(duration, 0)]):
+        weighted += limit * max(0.0, min(until, duration) - max(at, start))
+    return weighted / (duration - start)
+
+
+def trajectory(
+    history: list[tuple[float, int]],
+    duration: float,
+    width: int = 60,
+) -> str:
+    """The limit sampled at even intervals over the run."""
+    samples = []
+    for i in range(width):
+        at = duration * i / width
+        samples.append(next(limit for t, limit in reversed(history) if t <= at))
+    return " ".join(str(limit) for limit in samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file-size", type=int, default=400_000)
+    parser.add_argument("--chunk-size", type=int, default=2_000)
+    parser.add_argument(
+        "--capacity", type=int, default=8, help="Transactions the node executes at once"
+    )
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=16,
+        help="Transactions the node accepts before rejecting as overloaded",
+    )
+    parser.add_argument(
+        "--read-latency", type=float, default=0.005, help="Seconds per read request"
+    )
+    parser.add_argument(
+        "--write-latency", type=float, default=0.25, help="Seconds per transaction"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.1, help="Latency jitter as a fraction"
+    )
+    parser.add_argument(
+        "--fixed",
+        type=int,
+        nargs="*",
+        default=[2, 8, 32],
+        help="Fixed concurrencies to compare",
+    )
+    parser.add_argument(
+        "--initial",
+        type=int,
+        nargs="+",
+        default=[1, 32],
+        help="Initial limits of the adaptive controller",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    latency = Latency(
+        read=args.read_latency,
+        write=args.write_latency,
+        jitter=args.jitter,
+        capacity=args.capacity,
+        seed=args.seed,
+    )
+    faults = Faults(max_pending=args.max_pending, seed=args.seed)
+    cases = [
+        (f"fixed {n}", functools.partial(AimdController.fixed, n)) for n in args.fixed
+    ]
+    cases += [
+        (f"adaptive from {n}", functools.partial(AimdController, initial=n))
+        for n in args.initial
+    ]
+
+    converged = True
+    with (
+        Fullnode(latency=latency, faults=faults) as node,
+        tempfile.TemporaryDirectory() as tmp,
+    ):
+        mfs = MiraiFs(new_config(node.url, args.seed))
+        node.fund(mfs.config.active_address, FUNDS)
+        path = Path(tmp) / "file.bin"
+        path.write_bytes(deterministic_bytes(args.file_size, args.seed))
+
+        print(
+            f"capacity={args.capacity} max_pending={args.max_pending} write_latency={args.write_latency}s"
+        )
+        for name, new_controller in cases:
+            node.reset_stats()
+            report, controller = run_case(mfs, path, args.chunk_size, new_controller)
+            duration = report["duration_s"]
+            submit = report["phases"]["create_chunk.submit"]
+            counters = report["counters"]
+            line = (
+                f"{name:<18}"
+                f"  upload={duration:>7.3f}s ({report['bytes_per_s'] / 1000:>6.1f} KB/s)"
+                f"  submit p50={submit['p50_ms']:>7.1f}ms p90={submit['p90_ms']:>7.1f}ms"
+                f"  overloaded={node.stats.get('overloaded', 0):>3}"
+                f"  retries={counters.get('concurrency.retries', 0):>3}"
+            )
+            if controller.minimum != controller.maximum:
+                limit = steady_state(controller.history, duration)
+                # Halving on congestion means the limit saws between capacity * backoff and
+                # the point where the node's queue makes latency exceed the tolerance.
+                converged &= (
+                    args.capacity * controller.backoff <= limit <= args.max_pending
+                )
+                line += (
+                    f"  limit={limit:>5.1f}"
+                    f" (+{counters.get('concurrency.increases', 0)}"
+                    f" -{counters.get('concurrency.decreases', 0)})"
+                )
+                line += f"\n{'':<18}  limit over time: {trajectory(controller.history, duration)}"
+            print(line)
+
+    if not converged:
+        print(
+            "The adaptive limit did not converge near the node's capacity",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
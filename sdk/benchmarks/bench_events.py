@@ -0,0 +1,134 @@
+"""
+Benchmark MiraiFS event decoding over large batches of synthetic events.
+
+    uv run python benchmarks/bench_events.py --count 100000
+"""
+
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("MIRAIFS_PACKAGE_ID", "0x" + "ab" * 32)
+
+from miraifs_sdk import MIRAIFS_PACKAGE_ID  # noqa: E402
+from miraifs_sdk.events import EventDecoderRegistry, decode_events, new_event_registry  # noqa: E402
+from miraifs_sdk.utils import parse_events  # noqa: E402
+from pysui.sui.sui_txresults.complex_tx import Event  # noqa: E402
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def b58encode(data: bytes) -> str:
+    value = int.from_bytes(data, "big")
+    encoded = ""
+    while value:
+        value, rem = divmod(value, 58)
+        encoded = B58_ALPHABET[rem] + encoded
+    return "1" * (len(data) - len(data.lstrip(b"\x00"))) + encoded
+
+
+def uleb128(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def random_id() -> bytes:
+    return random.randbytes(32)
+
+
+def make_event(i: int) -> Event:
+    chunk_id, file_id, chunk_hash = random_id(), random_id(), random.randbytes(32)
+    if i % 2 == 0:
+        event_type = "chunk::ChunkCreatedEvent"
+        bcs = (
+            chunk_id
+            + (i % 65536).to_bytes(2, "little")
+            + uleb128(32)
+            + chunk_hash
+            + file_id
+        )
+        parsed = {
+            "chunk_id": "0x" + chunk_id.hex(),
+            "chunk_index": i % 65536,
+            "chunk_hash": list(chunk_hash),
+            "file_id": "0x" + file_id.hex(),
+        }
+    else:
+        event_type = "file::FileCreatedEvent"
+        mime_type = b"text/plain"
+        bcs = (
+            (128_000).to_bytes(4, "little")
+            + (1_700_000_000_000 + i).to_bytes(8, "little")
+            + file_id
+            + uleb128(len(mime_type))
+            + mime_type
+            + uleb128(32)
+            + chunk_hash
+        )
+        parsed = {
+            "chunk_size": 128_000,
+            "created_at": str(1_700_000_000_000 + i),
+            "file_id": "0x" + file_id.hex(),
+            "mime_type": mime_type.decode(),
+            "chunks_hash": list(chunk_hash),
+        }
+    return Event.from_dict(
+        {
+            "bcs": b58encode(bcs),
+            "packageId": MIRAIFS_PACKAGE_ID,
+            "parsedJson": parsed,
+            "sender": "0x" + "00" * 32,
+            "transactionModule": event_type.split("::")[0],
+            "type": f"{EventDecoderRegistry(MIRAIFS_PACKAGE_ID).package_id}::{event_type}",
+            "id": {"txDigest": "digest", "eventSeq": str(i)},
+        }
+    )
+
+
+def bench(name: str, fn, events: list[Event], rounds: int) -> None:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(events)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28} {best * 1000:>10.1f} ms  {len(events) / best:>12,.0f} events/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    events = [make_event(i) for i in range(args.count)]
+    # Quotes in a string field force decoding from BCS.
+    bcs_only = [
+        Event.from_dict(
+            {
+                **event.to_dict(),
+                "parsedJson": str(event.parsed_json).replace("text/plain", "text/it's"),
+            }
+        )
+        for event in events
+    ]
+
+    registry = new_event_registry(MIRAIFS_PACKAGE_ID)
+    assert registry.decode_all(events)[0] == registry.decode_all(bcs_only)[0]
+
+    print(f"{args.count:,} events, best of {args.rounds}")
+    bench("utils.parse_events", parse_events, events, args.rounds)
+    bench("decode_events (parsed json)", decode_events, events, args.rounds)
+    bench("decode_events (bcs)", decode_events, bcs_only, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark how long the `mfs` CLI takes to start, for `mfs --help`, which shouldn't
+touch the SDK at all, and `mfs file view`, which reads one file from a local
+fullnode stand-in (see fullnode.py). Each command runs in a fresh interpreter,
+the way scripts invoke it, with a Sui client config for the stand-in in a
+temporary home directory.
+
+Runs are appended to a JSONL history file and compared with the previous run,
+like bench_upload.py. `mfs --help` also fails the benchmark if it imports any of
+the heavy dependencies the commands load on demand.
+
+    uv run python benchmarks/bench_startup.py
+    uv run python benchmarks/bench_startup.py --runs 50 --threshold 0.2
+"""
+
+import argparse
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+os.environ.setdefault("MIRAIFS_PACKAGE_ID", "0x" + "ab" * 32)
+
+from bench_upload import (
+    FUNDS,
+    GAS_BUDGET_PER_CHUNK,
+    deterministic_bytes,
+    git_revision,
+    load_history,
+    new_config,
+)  # noqa: E402
+from fullnode import Fullnode  # noqa: E402
+from miraifs_sdk.cli.file import upload_encoded  # noqa: E402
+from miraifs_sdk.compression import encode_file  # noqa: E402
+from miraifs_sdk.miraifs import MiraiFs  # noqa: E402
+from miraifs_sdk.utils import build_chunks  # noqa: E402
+
+RESULTS_PATH = Path(__file__).parent / "results" / "bench_startup.jsonl"
+# Runs the CLI the way the `mfs` console script does.
+MFS = [sys.executable, "-c", "from miraifs_sdk.cli import app; app(prog_name='mfs')"]
+HEAVY_MODULES = ("pysui", "pydantic", "magic", "cryptography", "zstandard", "httpx")
+
+
+def write_client_config(home: Path, url: str, seed: int) -> None:
+    """A Sui client config and keystore for the key new_config derives from seed."""
+    config = new_config(url, seed)
+    key = hashlib.blake2b(f"miraifs-bench:{seed}".encode(), digest_size=32).digest()
+    config_dir = home / ".sui" / "sui_config"
+    config_dir.mkdir(parents=True)
+    (config_dir / "sui.keystore").write_text(
+        json.dumps([base64.b64encode(b"\x00" + key).decode()])
+    )
+    (config_dir / "client.yaml").write_text(
+        "---\n"
+        f"keystore:\n  File: {config_dir / 'sui.keystore'}\n"
+        f'envs:\n  - alias: bench\n    rpc: "{url}"\n    ws: ~\n'
+        "active_env: bench\n"
+        f'active_address: "{config.active_address}"\n'
+    )
+
+
+def run_command(args: list[str], env: dict[str, str], runs: int) -> dict:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(MFS + args, env=env, capture_output=True, check=True)
+        durations.append(time.perf_counter() - start)
+    # One more run to see which top-level modules the command imports.
+    result = subprocess.run(
+        MFS + args,
+        env={**env, "PYTHONPROFILEIMPORTTIME": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {
+        line.split("|")[-1].strip().split(".")[0]
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    return {
+        "median_s": statistics.median(durations),
+        "min_s": min(durations),
+        "max_s": max(durations),
+        "heavy_modules": sorted(modules & set(HEAVY_MODULES)),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--threshold", type=float, default=0.10, help="Allowed slowdown before failing"
+    )
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+    parser.add_argument(
+        "--no-save", action="store_true", help="Don't append this run to the history"
+    )
+    args = parser.parse_args()
+
+    history = load_history(args.results)
+    record = {
+        "benchmark": "startup",
+        "revision": git_revision(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "params": {"runs": args.runs},
+        "commands": {},
+    }
+    regressions = []
+
+    with Fullnode() as node, tempfile.TemporaryDirectory() as tmp:
+        mfs = MiraiFs(new_config(node.url, args.seed))
+        node.fund(mfs.config.active_address, FUNDS)
+        path = Path(tmp) / "file.bin"
+        path.write_bytes(deterministic_bytes(10_000, args.seed))
+        with contextlib.redirect_stdout(io.StringIO()):
+            encoded = encode_file(path)
+            chunks = build_chunks(encoded.data, 4_000)
+            gas_coins = mfs.allocate_gas_coins(len(chunks) + 2, GAS_BUDGET_PER_CHUNK)
+            file = upload_encoded(mfs, path, encoded, chunks, 4_000, 1, gas_coins)
+
+        home = Path(tmp) / "home"
+        write_client_config(home, node.url, args.seed)
+        env = {**os.environ, "HOME": str(home)}
+        commands = {
+            "mfs --help": ["--help"],
+            "mfs file view": ["file", "view", file.id],
+        }
+        for name, command in commands.items():
+            result = run_command(command, env, args.runs)
+            record["commands"][name] = result
+            print(
+                f"{name:<16} median={result['median_s'] * 1000:>7.1f}ms  min={result['min_s'] * 1000:>7.1f}ms  max={result['max_s'] * 1000:>7.1f}ms  heavy imports: {', '.join(result['heavy_modules']) or 'none'}"
+            )
+
+    if record["commands"]["mfs --help"]["heavy_modules"]:
+        regressions.append(
+            f"mfs --help imports {', '.join(record['commands']['mfs --help']['heavy_modules'])}"
+        )
+    previous = next(
+        (r for r in reversed(history) if r.get("params") == record["params"]), None
+    )
+    if previous:
+        for name, result in record["commands"].items():
+            before = previous["commands"].get(name, {}).get("median_s", 0)
+            after = result["median_s"]
+            if before > 0 and (after - before) / before > args.threshold:
+                regressions.append(
+                    f"{name} {before * 1000:.1f}ms -> {after * 1000:.1f}ms (+{(after - before) / before:.0%})"
+                )
+
+    if not args.no_save:
+        args.results.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.results, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
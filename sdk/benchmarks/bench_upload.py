@@ -0,0 +1,323 @@
+"""
+Benchmark file upload and download end to end against a local fullnode stand-in
+(see fullnode.py), across a matrix of file sizes, chunk sizes and concurrency.
+
+Every run is appended to a JSONL history file, and each case is compared with the
+previous run of the same case. A case that got slower than the threshold fails
+the benchmark, so it can be used to catch regressions over time.
+
+    uv run python benchmarks/bench_upload.py
+    uv run python benchmarks/bench_upload.py --file-sizes 1000000 --chunk-sizes 64000 128000 --concurrency 1 8 --write-latency 0.5
+"""
+
+import argparse
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+os.environ.setdefault("MIRAIFS_PACKAGE_ID", "0x" + "ab" * 32)
+
+from fullnode import Fullnode, Latency  # noqa: E402
+from miraifs_sdk.compression import encode_file  # noqa: E402
+from miraifs_sdk.metrics import RecordingInstrumentation, set_instrumentation  # noqa: E402
+from miraifs_sdk.miraifs import MiraiFs  # noqa: E402
+from miraifs_sdk.utils import build_chunks  # noqa: E402
+from pysui import SuiConfig  # noqa: E402
+
+RESULTS_PATH = Path(__file__).parent / "results" / "bench_upload.jsonl"
+GAS_BUDGET_PER_CHUNK = 5_000_000_000
+FUNDS = 10**15
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def deterministic_bytes(size: int, seed: int) -> bytes:
+    out = bytearray()
+    counter = 0
+    while len(out) < size:
+        out += hashlib.blake2b(f"{seed}:{counter}".encode(), digest_size=64).digest()
+        counter += 1
+    return bytes(out[:size])
+
+
+def deterministic_json(size: int, seed: int) -> bytes:
+    """NFT-style metadata records, which compress well but not trivially."""
+    out = bytearray(b"[")
+    counter = 0
+    while len(out) < size:
+        digest = hashlib.blake2b(
+            f"{seed}:{counter}".encode(), digest_size=8
+        ).hexdigest()
+        record = {
+            "name": f"Token #{counter}",
+            "image": f"https://mfs.sm.xyz/0x{digest * 8}/",
+            "attributes": [
+                {"trait_type": "Background", "value": digest[:4]},
+                {"trait_type": "Rarity", "value": int(digest[4:8], 16) % 100},
+            ],
+        }
+        out += json.dumps(record).encode() + b","
+        counter += 1
+    return bytes(out[: size - 1]) + b"]"
+
+
+def new_config(url: str, seed: int, keys: int = 1) -> SuiConfig:
+    prv_keys = []
+    for i in range(keys):
+        name = f"miraifs-bench:{seed}" if i == 0 else f"miraifs-bench:{seed}:{i}"
+        key = hashlib.blake2b(name.encode(), digest_size=32).digest()
+        prv_keys.append(base64.b64encode(b"\x00" + key).decode())
+    return SuiConfig.user_config(
+        rpc_url=url,
+        prv_keys=prv_keys,
+    )
+
+
+def run_case(
+    node: Fullnode,
+    mfs: MiraiFs,
+    path: Path,
+    chunk_size: int,
+    concurrency: int,
+    compress: bool,
+    signers: list[str],
+) -> dict:
+    data = path.read_bytes()
+    node.reset_stats()
+
+    upload = RecordingInstrumentation()
+    set_instrumentation(upload)
+    # The SDK prints progress for every chunk, which would dominate small runs.
+    with contextlib.redirect_stdout(io.StringIO()):
+        encoded = encode_file(path, compress)
+        chunks = build_chunks(encoded.data, chunk_size)
+        gas_coins = mfs.allocate_gas_coins(
+            len(chunks) + 2,
+            GAS_BUDGET_PER_CHUNK,
+            mfs.upload_gas_recipients(len(chunks), signers),
+        )
+        upload.start()
+        file, path = mfs.create_file(
+            path,
+            chunks,
+            chunk_size,
+            recipient=mfs.config.active_address,
+            gas_coin=gas_coins.pop(0),
+            mime_type=encoded.mime_type,
+            signers=signers,
+        )
+        mfs.upload_chunks(
+            file,
+            path,
+            concurrency,
+            [gas_coins.pop(0) for _ in range(len(chunks))],
+            chunks,
+        )
+        mfs.register_chunks(file, gas_coin=gas_coins.pop(0))
+        file = mfs.get_file(file.id)
+        upload_report = upload.report()
+        for signer in signers[1:]:
+            mfs.sweep_gas_coins(signer)
+        mfs.consolidate_coins(mfs.get_all_gas_coins(mfs.config.active_address))
+    upload_requests = dict(node.stats)
+
+    node.reset_stats()
+    download = RecordingInstrumentation()
+    set_instrumentation(download)
+    file = mfs.get_file(file.id)
+    downloaded = b"".join(mfs.read_file(file))
+    download.count("bytes", len(downloaded))
+    download_report = download.report()
+    if downloaded != data:
+        raise AssertionError(
+            f"Downloaded file {file.id} does not match the uploaded file"
+        )
+
+    return {
+        "chunks": len(chunks),
+        "upload": upload_report,
+        "upload_requests": upload_requests,
+        "download": download_report,
+        "download_requests": dict(node.stats),
+    }
+
+
+def load_history(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(
+    previous: dict,
+    current: dict,
+    threshold: float,
+) -> list[str]:
+    regressions = []
+    for direction in ("upload", "download"):
+        before = previous[direction]["duration_s"]
+        after = current[direction]["duration_s"]
+        if before > 0 and (after - before) / before > threshold:
+            regressions.append(
+                f"{direction} {before:.3f}s -> {after:.3f}s (+{(after - before) / before:.0%})"
+            )
+    before = previous["upload"]["gas_used_mist"]
+    after = current["upload"]["gas_used_mist"]
+    if before > 0 and (after - before) / before > threshold:
+        regressions.append(
+            f"gas {before} -> {after} MIST (+{(after - before) / before:.0%})"
+        )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--file-sizes", type=int, nargs="+", default=[100_000, 1_000_000]
+    )
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[64_000, 128_000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--content", choices=["random", "json"], default="random")
+    parser.add_argument(
+        "--compress", action="store_true", help="Upload with zstd compression"
+    )
+    parser.add_argument(
+        "--signers",
+        type=int,
+        default=1,
+        help="Keystore addresses to create chunks with",
+    )
+    parser.add_argument(
+        "--read-latency", type=float, default=0.0, help="Seconds per read request"
+    )
+    parser.add_argument(
+        "--write-latency", type=float, default=0.0, help="Seconds per transaction"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Latency jitter as a fraction"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--threshold", type=float, default=0.10, help="Allowed slowdown before failing"
+    )
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+    parser.add_argument(
+        "--no-save", action="store_true", help="Don't append this run to the history"
+    )
+    args = parser.parse_args()
+
+    latency = Latency(
+        read=args.read_latency,
+        write=args.write_latency,
+        jitter=args.jitter,
+        seed=args.seed,
+    )
+    history = load_history(args.results)
+    revision = git_revision()
+    timestamp = datetime.now(UTC).isoformat()
+    records = []
+    regressions = []
+
+    with Fullnode(latency=latency) as node, tempfile.TemporaryDirectory() as tmp:
+        mfs = MiraiFs(new_config(node.url, args.seed, args.signers))
+        node.fund(mfs.config.active_address, FUNDS)
+        signers = (
+            [str(address) for address in mfs.config.addresses]
+            if args.signers > 1
+            else []
+        )
+
+        for file_size in args.file_sizes:
+            if args.content == "json":
+                path = Path(tmp) / f"{file_size}.json"
+                path.write_bytes(deterministic_json(file_size, args.seed))
+            else:
+                path = Path(tmp) / f"{file_size}.bin"
+                path.write_bytes(deterministic_bytes(file_size, args.seed))
+            for chunk_size in args.chunk_sizes:
+                for concurrency in args.concurrency:
+                    params = {
+                        "file_size": file_size,
+                        "chunk_size": chunk_size,
+                        "concurrency": concurrency,
+                        "content": args.content,
+                        "compress": args.compress,
+                        **({"signers": args.signers} if args.signers > 1 else {}),
+                        "read_latency": args.read_latency,
+                        "write_latency": args.write_latency,
+                        "jitter": args.jitter,
+                        "seed": args.seed,
+                    }
+                    start = time.perf_counter()
+                    result = run_case(
+                        node, mfs, path, chunk_size, concurrency, args.compress, signers
+                    )
+                    record = {
+                        "benchmark": "upload",
+                        "revision": revision,
+                        "timestamp": timestamp,
+                        "params": params,
+                        **result,
+                    }
+                    records.append(record)
+
+                    previous = next(
+                        (r for r in reversed(history) if r.get("params") == params),
+                        None,
+                    )
+                    case_regressions = (
+                        compare(previous, record, args.threshold) if previous else []
+                    )
+                    regressions += [f"{params}: {r}" for r in case_regressions]
+                    print(
+                        f"file_size={file_size:>10,} chunk_size={chunk_size:>7,} concurrency={concurrency:>3}"
+                        f"  chunks={result['chunks']:>4}"
+                        f"  upload={result['upload']['duration_s']:>8.3f}s ({result['upload']['bytes_per_s'] / 1000:>9,.1f} KB/s)"
+                        f"  download={result['download']['duration_s']:>7.3f}s"
+                        f"  txs={result['upload']['transactions']:>4}"
+                        f"  gas={result['upload']['gas_used_mist'] / 10**9:.4f} SUI"
+                        f"  [{time.perf_counter() - start:.1f}s]"
+                        + ("  REGRESSION" if case_regressions else "")
+                    )
+                    for signer in signers:
+                        counters = result["upload"]["counters"]
+                        bytes_per_s = result["upload"]["gauges"][
+                            f"signers.{signer}.bytes_per_s"
+                        ]["last"]
+                        print(
+                            f"    signer {signer[:10]}…  chunks={counters[f'signers.{signer}.chunks']:>4}  {bytes_per_s / 1000:>9,.1f} KB/s"
+                        )
+
+    if not args.no_save:
+        args.results.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.results, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
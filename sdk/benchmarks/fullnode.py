@@ -0,0 +1,2749 @@
+"""
+A local, in-process stand-in for a Sui fullnode, used to benchmark the SDK
+without spending SUI on a live network.
+
+It serves the subset of the JSON-RPC API that pysui and the SDK use, decodes
+the programmable transactions the SDK builds, and executes them against an
+in-memory object store with the same semantics (and abort codes) as the
+MiraiFS Move package. Gas, object versions and events are modelled closely
+enough for the SDK to run unmodified; signatures are not verified.
+
+    node = Fullnode(latency=Latency(read=0.02, write=0.3))
+    node.start()
+    node.fund(address, balance=10**13)
+    ...
+    node.stop()
+"""
+
+import base64
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+RPC_VERSION = "1.38.0"
+PROTOCOL_VERSION = "68"
+REFERENCE_GAS_PRICE = 1000
+# Sui's JSON-RPC error code for transient failures like overload.
+TRANSIENT_ERROR_CODE = -32050
+# Storage is charged per byte of object data at 76 storage units of 100 MIST,
+# and 99% of it is rebated when the object is mutated or deleted.
+STORAGE_PRICE_PER_BYTE = 7_600
+STORAGE_REBATE_RATE = 0.99
+# Sui charges computation in buckets of gas units.
+COMPUTATION_BUCKETS = (
+    1_000,
+    5_000,
+    10_000,
+    20_000,
+    50_000,
+    200_000,
+    1_000_000,
+    5_000_000,
+)
+
+MAX_TX_SIZE_BYTES = 131_072
+MAX_PURE_ARGUMENT_SIZE = 16_384
+MAX_PROGRAMMABLE_TX_COMMANDS = 1_024
+MAX_ARGUMENTS = 512
+MAX_INPUT_OBJECTS = 2_048
+MAX_TX_GAS = 50_000_000_000
+SIMULATION_GAS_COIN_VALUE = 10**18
+
+CLOCK_ID = "0x" + "6".rjust(64, "0")
+SUI_FRAMEWORK = "0x2"
+COIN_TYPE = "0x2::coin::Coin<0x2::sui::SUI>"
+CLOCK_TYPE = "0x2::clock::Clock"
+MAX_CHUNK_SIZE_BYTES = 128_000
+
+PROTOCOL_ATTRIBUTES = {
+    "max_arguments": {"u32": str(MAX_ARGUMENTS)},
+    "max_input_objects": {"u64": str(MAX_INPUT_OBJECTS)},
+    "max_num_transferred_move_object_ids": {"u64": "2048"},
+    "max_programmable_tx_commands": {"u32": str(MAX_PROGRAMMABLE_TX_COMMANDS)},
+    "max_pure_argument_size": {"u32": str(MAX_PURE_ARGUMENT_SIZE)},
+    "max_tx_size_bytes": {"u64": str(MAX_TX_SIZE_BYTES)},
+    "max_type_argument_depth": {"u32": "16"},
+    "max_type_arguments": {"u32": "16"},
+    "max_tx_gas": {"u64": str(MAX_TX_GAS)},
+}
+
+# Parameter names of every method served, in the order pysui sends them.
+# Array parameters are declared so pysui's validator unpacks them.
+RPC_METHODS = {
+    "rpc.discover": [],
+    "suix_getReferenceGasPrice": [],
+    "sui_getProtocolConfig": ["version"],
+    "sui_getObject": ["object_id", "options"],
+    "sui_multiGetObjects": [("object_ids", "array"), "options"],
+    "suix_getCoins": ["owner", "coin_type", "cursor", "limit"],
+    "suix_getBalance": ["owner", "coin_type"],
+    "suix_getOwnedObjects": ["address", "query", "cursor", "limit"],
+    "suix_getDynamicFieldObject": ["parent_object_id", "name"],
+    "suix_queryEvents": ["query", "cursor", "limit", "descending_order"],
+    "sui_getNormalizedMoveFunction": ["package", "module_name", "function_name"],
+    "sui_executeTransactionBlock": [
+        "tx_bytes",
+        ("signatures", "array"),
+        "options",
+        "request_type",
+    ],
+    "sui_dryRunTransactionBlock": ["tx_bytes"],
+}
+
+WRITE_METHODS = {"sui_executeTransactionBlock"}
+
+
+def b58encode(data: bytes) -> str:
+    value = int.from_bytes(data, "big")
+    encoded = ""
+    while value:
+        value, rem = divmod(value, 58)
+        encoded = B58_ALPHABET[rem] + encoded
+    return "1" * (len(data) - len(data.lstrip(b"\x00"))) + encoded
+
+
+def blake2b256(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def normalize_address(address: str) -> str:
+    return "0x" + str(address).removeprefix("0x").rjust(64, "0").lower()
+
+
+def uleb128(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+class RpcError(Exception):
+    """Rejects a request before execution, e.g. a stale object reference."""
+
+    def __init__(
+        self,
+        message: str,
+        code: int = -32002,
+    ) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class ExecutionError(Exception):
+    """Fails a transaction during execution. Gas is still charged."""
+
+
+class MoveAbort(ExecutionError):
+    def __init__(
+        self,
+        package: str,
+        module: str,
+        function: str,
+        code: int,
+    ) -> None:
+        super().__init__(
+            f"MoveAbort(MoveLocation {{ module: ModuleId {{ address: {package.removeprefix('0x')}, "
+            f'name: Identifier("{module}") }}, function_name: Some("{function}") }}, {code})'
+        )
+        self.module = module
+        self.function = function
+        self.code = code
+
+
+@dataclass
+class Latency:
+    """
+    Simulated network latency in seconds. Reads and transaction submission are
+    delayed separately; jitter is a fraction of the delay applied uniformly.
+    A node with a write capacity executes at most that many transactions at
+    once and queues the rest, so confirmation latency grows with load.
+    """
+
+    read: float = 0.0
+    write: float = 0.0
+    jitter: float = 0.0
+    capacity: int | None = None
+    seed: int = 0
+    rng: random.Random = field(init=False, repr=False)
+    lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self.rng = random.Random(self.seed)
+
+    def delay(
+        self,
+        write: bool,
+    ) -> float:
+        base = self.write if write else self.read
+        if base <= 0:
+            return 0.0
+        with self.lock:
+            factor = 1 + self.rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, base * factor)
+
+
+@dataclass
+class Faults:
+    """
+    Injected failures. Requests over the rate limit (per second) and a random
+    fraction of all requests are rejected with HTTP 429, like a throttling
+    fullnode. A node that is down answers every request with HTTP 503.
+    Transactions submitted while max_pending are already waiting or executing
+    are rejected with the transient JSON-RPC error Sui uses when overloaded.
+    """
+
+    throttle_rate: float = 0.0
+    rate_limit: float | None = None
+    max_pending: int | None = None
+    down: bool = False
+    seed: int = 0
+    rng: random.Random = field(init=False, repr=False)
+    lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+    tokens: float = field(init=False, repr=False, default=0.0)
+    refilled_at: float = field(init=False, repr=False, default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        self.rng = random.Random(self.seed)
+        self.tokens = self.rate_limit or 0.0
+
+    def status(
+        self,
+    ) -> int:
+        """The HTTP status to answer the next request with."""
+        if self.down:
+            return 503
+        with self.lock:
+            if self.throttle_rate and self.rng.random() < self.throttle_rate:
+                return 429
+            if self.rate_limit is None:
+                return 200
+            now = time.monotonic()
+            self.tokens = min(
+                self.rate_limit,
+                self.tokens + (now - self.refilled_at) * self.rate_limit,
+            )
+            self.refilled_at = now
+            if self.tokens < 1:
+                return 429
+            self.tokens -= 1
+            return 200
+
+
+@dataclass(slots=True)
+class MoveObject:
+    id: str
+    type: str
+    fields: dict
+    # None while the object is held by value inside a transaction.
+    owner: dict | str | None = None
+    version: int = 0
+    digest: str = ""
+    previous_transaction: str = ""
+    storage_rebate: int = 0
+    has_public_transfer: bool = True
+
+
+@dataclass(slots=True)
+class MoveStruct:
+    """A struct without `key`, e.g. a hot potato such as VerifyFileCap."""
+
+    type: str
+    fields: dict
+    consumed: bool = False
+
+
+@dataclass(slots=True)
+class ObjectRef:
+    id: str
+    version: int
+    digest: str
+
+
+@dataclass(slots=True)
+class TransactionData:
+    inputs: list[tuple[str, Any]]
+    commands: list[tuple[str, Any]]
+    sender: str
+    gas_payment: list[ObjectRef]
+    gas_owner: str
+    gas_price: int
+    gas_budget: int
+
+
+class BcsReader:
+    __slots__ = ("data", "pos")
+
+    def __init__(
+        self,
+        data: bytes,
+    ) -> None:
+        self.data = data
+        self.pos = 0
+
+    def take(self, n: int) -> bytes:
+        if self.pos + n > len(self.data):
+            raise ValueError("Unexpected end of BCS data")
+        value = self.data[self.pos : self.pos + n]
+        self.pos += n
+        return value
+
+    def u8(self) -> int:
+        return self.take(1)[0]
+
+    def u16(self) -> int:
+        return int.from_bytes(self.take(2), "little")
+
+    def u32(self) -> int:
+        return int.from_bytes(self.take(4), "little")
+
+    def u64(self) -> int:
+        return int.from_bytes(self.take(8), "little")
+
+    def uleb128(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            byte = self.u8()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def address(self) -> str:
+        return "0x" + self.take(32).hex()
+
+    def bytes(self) -> bytes:
+        return self.take(self.uleb128())
+
+    def string(self) -> str:
+        return self.bytes().decode("utf-8")
+
+    def bool(self) -> bool:
+        return self.u8() == 1
+
+    def vector(self, read: Callable) -> list:
+        return [read() for _ in range(self.uleb128())]
+
+    def done(self) -> bool:
+        return self.pos == len(self.data)
+
+
+def decode_transaction_data(
+    data: bytes,
+) -> TransactionData:
+    r = BcsReader(data)
+    if r.uleb128() != 0:
+        raise RpcError("Unsupported TransactionData version")
+    if r.uleb128() != 0:
+        raise RpcError("Only programmable transactions are supported")
+    inputs = r.vector(lambda: _decode_call_arg(r))
+    commands = r.vector(lambda: _decode_command(r))
+    sender = r.address()
+    gas_payment = r.vector(lambda: _decode_object_ref(r))
+    gas_owner = r.address()
+    gas_price = r.u64()
+    gas_budget = r.u64()
+    if r.uleb128() == 1:
+        r.u64()
+    return TransactionData(
+        inputs, commands, sender, gas_payment, gas_owner, gas_price, gas_budget
+    )
+
+
+def _decode_object_ref(r: BcsReader) -> ObjectRef:
+    return ObjectRef(r.address(), r.u64(), b58encode(r.bytes()))
+
+
+def _decode_call_arg(r: BcsReader) -> tuple[str, Any]:
+    kind = r.uleb128()
+    if kind == 0:
+        return ("Pure", r.bytes())
+    object_kind = r.uleb128()
+    if object_kind == 0:
+        return ("ImmOrOwnedObject", _decode_object_ref(r))
+    if object_kind == 1:
+        return ("SharedObject", (r.address(), r.u64(), r.bool()))
+    if object_kind == 2:
+        return ("Receiving", _decode_object_ref(r))
+    raise RpcError(f"Unsupported object argument kind {object_kind}")
+
+
+def _decode_argument(r: BcsReader) -> tuple:
+    kind = r.uleb128()
+    if kind == 0:
+        return ("GasCoin",)
+    if kind == 1:
+        return ("Input", r.u16())
+    if kind == 2:
+        return ("Result", r.u16())
+    return ("NestedResult", r.u16(), r.u16())
+
+
+def _decode_type_tag(r: BcsReader) -> str:
+    kind = r.uleb128()
+    primitives = {
+        0: "bool",
+        1: "u8",
+        2: "u64",
+        3: "u128",
+        4: "address",
+        5: "signer",
+        8: "u16",
+        9: "u32",
+        10: "u256",
+    }
+    if kind in primitives:
+        return primitives[kind]
+    if kind == 6:
+        return f"vector<{_decode_type_tag(r)}>"
+    address, module, name = r.address(), r.string(), r.string()
+    type_params = r.vector(lambda: _decode_type_tag(r))
+    tag = f"{address}::{module}::{name}"
+    return f"{tag}<{', '.join(type_params)}>" if type_params else tag
+
+
+def _decode_command(r: BcsReader) -> tuple[str, Any]:
+    kind = r.uleb128()
+    if kind == 0:
+        package, module, function = r.address(), r.string(), r.string()
+        type_arguments = r.vector(lambda: _decode_type_tag(r))
+        arguments = r.vector(lambda: _decode_argument(r))
+        return ("MoveCall", (package, module, function, type_arguments, arguments))
+    if kind == 1:
+        objects = r.vector(lambda: _decode_argument(r))
+        return ("TransferObjects", (objects, _decode_argument(r)))
+    if kind == 2:
+        coin = _decode_argument(r)
+        return ("SplitCoins", (coin, r.vector(lambda: _decode_argument(r))))
+    if kind == 3:
+        coin = _decode_argument(r)
+        return ("MergeCoins", (coin, r.vector(lambda: _decode_argument(r))))
+    if kind == 5:
+        type_tag = _decode_type_tag(r) if r.u8() else None
+        return ("MakeMoveVec", (type_tag, r.vector(lambda: _decode_argument(r))))
+    raise RpcError(f"Unsupported command kind {kind}")
+
+
+def _command_argument_count(
+    kind: str,
+    command: Any,
+) -> int:
+    """Arguments of a command, its coin or recipient included."""
+    if kind == "MoveCall":
+        return len(command[4])
+    if kind == "MakeMoveVec":
+        return len(command[1])
+    return len(command[0] if kind == "TransferObjects" else command[1]) + 1
+
+
+def decode_pure(
+    data: bytes,
+    type_: str,
+) -> Any:
+    r = BcsReader(data)
+    value = _decode_pure_value(r, type_)
+    if not r.done():
+        raise ExecutionError(f"InvalidBCSBytes for {type_}")
+    return value
+
+
+def _decode_pure_value(r: BcsReader, type_: str) -> Any:
+    match type_:
+        case "u8":
+            return r.u8()
+        case "u16":
+            return r.u16()
+        case "u32":
+            return r.u32()
+        case "u64":
+            return r.u64()
+        case "bool":
+            return r.bool()
+        case "address" | "ID":
+            return r.address()
+        case "String":
+            return r.string()
+        case "vector<u8>":
+            return r.bytes()
+        case "Option<ID>":
+            return r.address() if r.u8() else None
+    if type_.startswith("vector<"):
+        inner = type_[len("vector<") : -1]
+        return r.vector(lambda: _decode_pure_value(r, inner))
+    raise ExecutionError(f"Unsupported pure type {type_}")
+
+
+def _encode_event(values: list[tuple[str, Any]]) -> bytes:
+    out = bytearray()
+    for kind, value in values:
+        match kind:
+            case "u16":
+                out += value.to_bytes(2, "little")
+            case "u32":
+                out += value.to_bytes(4, "little")
+            case "u64":
+                out += value.to_bytes(8, "little")
+            case "ID":
+                out += bytes.fromhex(value.removeprefix("0x"))
+            case "vector<u8>":
+                out += uleb128(len(value)) + bytes(value)
+            case "String":
+                encoded = value.encode("utf-8")
+                out += uleb128(len(encoded)) + encoded
+    return bytes(out)
+
+
+def _object_size(value: Any) -> int:
+    """An approximation of the BCS size of a Move value, for storage accounting."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value) + len(uleb128(len(value)))
+    if isinstance(value, str):
+        return 32 if value.startswith("0x") else len(value.encode()) + 1
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, int):
+        return 8
+    if value is None:
+        return 1
+    if isinstance(value, dict):
+        return sum(_object_size(k) + _object_size(v) for k, v in value.items())
+    if isinstance(value, list):
+        return sum(_object_size(v) for v in value) + 1
+    return 0
+
+
+class Ledger:
+    """
+    The in-memory object store plus the MiraiFS Move package it simulates.
+    Transactions execute one at a time under a lock, like a single validator.
+    """
+
+    def __init__(
+        self,
+        package_id: str,
+        clock: Callable[[], int] = lambda: int(time.time() * 1000),
+    ) -> None:
+        self.package_id = normalize_address(package_id)
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.objects: dict[str, MoveObject] = {}
+        self.deleted: dict[str, MoveObject] = {}
+        self.dynamic_fields: dict[tuple[str, bytes], str] = {}
+        self.events: list[dict] = []
+        self.checkpoint = 0
+        self.functions = self._build_functions()
+        self._install(
+            MoveObject(
+                id=CLOCK_ID,
+                type=CLOCK_TYPE,
+                fields={"timestamp_ms": 0},
+                owner={"Shared": {"initial_shared_version": 1}},
+                version=1,
+                has_public_transfer=False,
+            )
+        )
+
+    # Types
+
+    def type_of(
+        self,
+        module: str,
+        name: str,
+    ) -> str:
+        return f"{self.package_id}::{module}::{name}"
+
+    # State
+
+    def _install(
+        self,
+        obj: MoveObject,
+    ) -> None:
+        if not obj.digest:
+            obj.digest = b58encode(
+                blake2b256(
+                    bytes.fromhex(obj.id[2:]) + obj.version.to_bytes(8, "little")
+                )
+            )
+        self.objects[obj.id] = obj
+
+    def fund(
+        self,
+        address: str,
+        balance: int,
+        count: int = 1,
+    ) -> list[str]:
+        """Mint SUI gas coins to an address and return their IDs."""
+        ids = []
+        with self.lock:
+            for _ in range(count):
+                coin_id = "0x" + os.urandom(32).hex()
+                self._install(
+                    MoveObject(
+                        id=coin_id,
+                        type=COIN_TYPE,
+                        fields={"balance": balance},
+                        owner={"AddressOwner": normalize_address(address)},
+                        version=1,
+                    )
+                )
+                ids.append(coin_id)
+        return ids
+
+    def balance(
+        self,
+        address: str,
+    ) -> int:
+        address = normalize_address(address)
+        with self.lock:
+            return sum(
+                obj.fields["balance"]
+                for obj in self.objects.values()
+                if obj.type == COIN_TYPE and obj.owner == {"AddressOwner": address}
+            )
+
+    # Rendering
+
+    def render_object(
+        self,
+        object_id: str,
+        options: dict | None,
+    ) -> dict:
+        options = options or {}
+        object_id = normalize_address(object_id)
+        with self.lock:
+            obj = self.objects.get(object_id)
+            if obj is None:
+                deleted = self.deleted.get(object_id)
+                if deleted is not None:
+                    return {
+                        "error": {
+                            "code": "deleted",
+                            "object_id": object_id,
+                            "version": str(deleted.version),
+                            "digest": deleted.digest,
+                        }
+                    }
+                return {"error": {"code": "notExists", "object_id": object_id}}
+            data = {
+                "objectId": obj.id,
+                "version": str(obj.version),
+                "digest": obj.digest,
+            }
+            if options.get("showType"):
+                data["type"] = obj.type
+            if options.get("showOwner"):
+                data["owner"] = obj.owner
+            if options.get("showPreviousTransaction"):
+                data["previousTransaction"] = obj.previous_transaction
+            if options.get("showStorageRebate"):
+                data["storageRebate"] = str(obj.storage_rebate)
+            if options.get("showContent"):
+                data["content"] = {
+                    "dataType": "moveObject",
+                    "type": obj.type,
+                    "hasPublicTransfer": obj.has_public_transfer,
+                    "fields": self.render_fields(obj),
+                }
+            return {"data": data}
+
+    def render_fields(
+        self,
+        obj: MoveObject,
+    ) -> dict:
+        f = obj.fields
+        uid = {"id": obj.id}
+        if obj.type == COIN_TYPE:
+            return {"id": uid, "balance": str(f["balance"])}
+        if obj.type == CLOCK_TYPE:
+            return {"id": uid, "timestamp_ms": str(self.clock())}
+        if obj.type == self.type_of("file", "File"):
+            manifest = f["manifest"]
+            return {
+                "id": uid,
+                "created_at": str(f["created_at"]),
+                "mime_type": f["mime_type"],
+                "size": str(f["size"]),
+                "manifest": {
+                    "type": self.type_of("file", "Manifest"),
+                    "fields": {
+                        "count": manifest["count"],
+                        "hash": list(manifest["hash"]),
+                        "size": manifest["size"],
+                        "chunks": {
+                            "type": "0x2::vec_map::VecMap<vector<u8>, 0x1::option::Option<0x2::object::ID>>",
+                            "fields": {
+                                "contents": [
+                                    {
+                                        "type": "0x2::vec_map::Entry<vector<u8>, 0x1::option::Option<0x2::object::ID>>",
+                                        "fields": {
+                                            "key": list(entry["hash"]),
+                                            "value": entry["id"],
+                                        },
+                                    }
+                                    for entry in manifest["chunks"]
+                                ],
+                            },
+                        },
+                    },
+                },
+            }
+        if obj.type == self.type_of("directory", "Directory"):
+            return {
+                "id": uid,
+                "entries": [
+                    {
+                        "type": self.type_of("directory", "DirectoryEntry"),
+                        "fields": {"path": entry["path"], "file_id": entry["file_id"]},
+                    }
+                    for entry in f["entries"]
+                ],
+                "indices": {
+                    "type": "0x2::table::Table<0x1::string::String, u64>",
+                    "fields": {
+                        "id": {"id": f["indices_id"]},
+                        "size": str(len(f["indices"])),
+                    },
+                },
+            }
+        if obj.type.startswith("0x2::dynamic_field::Field<"):
+            return {
+                "id": uid,
+                "name": list(f["name"]),
+                "value": self.render_field_value(
+                    obj.type.split(", ", 1)[1][:-1], f["value"]
+                ),
+            }
+        rendered = {"id": uid}
+        for key, value in f.items():
+            if isinstance(value, (bytes, bytearray)):
+                rendered[key] = list(value)
+            else:
+                rendered[key] = value
+        return rendered
+
+    def render_field_value(
+        self,
+        value_type: str,
+        value: Any,
+    ) -> dict:
+        if value_type == self.type_of("file", "ChunkIndex"):
+            return {
+                "type": value_type,
+                "fields": {
+                    "chunks": [
+                        {
+                            "type": self.type_of("file", "ManifestEntry"),
+                            "fields": {"hash": list(entry["hash"]), "id": entry["id"]},
+                        }
+                        for entry in value["chunks"]
+                    ],
+                    "indices": {
+                        "type": "0x2::table::Table<vector<u8>, u64>",
+                        "fields": {
+                            "id": {"id": value["indices_id"]},
+                            "size": str(len(value["indices"])),
+                        },
+                    },
+                },
+            }
+        if value_type == self.type_of("file", "CreateChunkCapIds"):
+            return {
+                "type": value_type,
+                "fields": {
+                    "ids": list(value["ids"]),
+                    "unregistered": str(value["unregistered"]),
+                },
+            }
+        # The first version of the package's CreateChunkCap IDs by hash.
+        return {
+            "type": value_type,
+            "fields": {
+                "contents": [
+                    {
+                        "type": "0x2::vec_map::Entry<vector<u8>, 0x2::object::ID>",
+                        "fields": {"key": list(hash), "value": id},
+                    }
+                    for hash, id in value.items()
+                ],
+            },
+        }
+
+    # Queries
+
+    def owned_objects(
+        self,
+        address: str,
+        struct_type: str | None = None,
+    ) -> list[MoveObject]:
+        address = normalize_address(address)
+        owner = {"AddressOwner": address}
+        if struct_type is not None:
+            package, rest = struct_type.split("::", 1)
+            struct_type = f"{normalize_address(package) if package != SUI_FRAMEWORK else package}::{rest}"
+        with self.lock:
+            objs = [
+                obj
+                for obj in self.objects.values()
+                if obj.owner == owner
+                and (
+                    struct_type is None
+                    or obj.type.split("<", 1)[0] == struct_type.split("<", 1)[0]
+                )
+            ]
+        objs.sort(key=lambda o: o.id)
+        return objs
+
+    def dynamic_field_id(
+        self,
+        parent_id: str,
+        name: bytes,
+    ) -> str | None:
+        with self.lock:
+            return self.dynamic_fields.get((normalize_address(parent_id), bytes(name)))
+
+    # Execution
+
+    def execute(
+        self,
+        tx_bytes: bytes,
+        dry_run: bool = False,
+    ) -> dict:
+        if len(tx_bytes) > MAX_TX_SIZE_BYTES:
+            raise RpcError(
+                f"Transaction size {len(tx_bytes)} exceeds maximum of {MAX_TX_SIZE_BYTES}"
+            )
+        tx = decode_transaction_data(tx_bytes)
+        if len(tx.commands) > MAX_PROGRAMMABLE_TX_COMMANDS:
+            raise RpcError(
+                f"Transaction has {len(tx.commands)} commands, maximum is {MAX_PROGRAMMABLE_TX_COMMANDS}"
+            )
+        for kind, command in tx.commands:
+            arguments = _command_argument_count(kind, command)
+            if arguments > MAX_ARGUMENTS:
+                raise RpcError(
+                    f"{kind} command has {arguments} arguments, maximum is {MAX_ARGUMENTS}"
+                )
+        for kind, value in tx.inputs:
+            if kind == "Pure" and len(value) > MAX_PURE_ARGUMENT_SIZE:
+                raise RpcError(
+                    f"Pure argument of {len(value)} bytes exceeds maximum of {MAX_PURE_ARGUMENT_SIZE}"
+                )
+        digest_bytes = blake2b256(b"TransactionData::" + tx_bytes)
+        with self.lock:
+            session = Session(self, tx, digest_bytes, dry_run)
+            return session.run()
+
+    # Move functions
+
+    def _build_functions(
+        self,
+    ) -> dict[tuple[str, str, str], "MoveFunction"]:
+        pkg = self.package_id
+        functions = [
+            MoveFunction(
+                pkg,
+                "file",
+                "new",
+                ["u32", "String", "vector<u8>", "&Clock", "&mut TxContext"],
+                ["File", "VerifyFileCap"],
+                Session.file_new,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "add_chunk_hash",
+                ["&VerifyFileCap", "&mut File", "vector<u8>", "&mut TxContext"],
+                ["CreateChunkCap"],
+                Session.file_add_chunk_hash,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "stage",
+                ["VerifyFileCap", "&mut TxContext"],
+                ["StagedFileCap"],
+                Session.file_stage,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "unstage",
+                ["StagedFileCap"],
+                ["VerifyFileCap"],
+                Session.file_unstage,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "verify",
+                ["VerifyFileCap", "&mut File"],
+                [],
+                Session.file_verify,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "receive_and_register_chunk",
+                ["&mut File", "Receiving<RegisterChunkCap>"],
+                [],
+                Session.file_receive_and_register_chunk,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "receive_and_drop_chunk",
+                ["&mut File", "Receiving<Chunk>"],
+                [],
+                Session.file_receive_and_drop_chunk,
+            ),
+            MoveFunction(
+                pkg, "file", "destroy_empty", ["File"], [], Session.file_destroy_empty
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "begin_update",
+                ["&mut File", "vector<u8>", "&mut TxContext"],
+                ["VerifyFileCap"],
+                Session.file_begin_update,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "migrate",
+                ["&mut File", "&mut TxContext"],
+                [],
+                Session.file_migrate,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "replace_chunk_hash",
+                ["&VerifyFileCap", "&mut File", "u64", "vector<u8>", "&mut TxContext"],
+                ["CreateChunkCap"],
+                Session.file_replace_chunk_hash,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "truncate",
+                ["&VerifyFileCap", "&mut File", "u64"],
+                [],
+                Session.file_truncate,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "add_shared_chunk",
+                ["&VerifyFileCap", "&mut File", "&SharedChunk"],
+                [],
+                Session.file_add_shared_chunk,
+            ),
+            MoveFunction(
+                pkg,
+                "file",
+                "remove_shared_chunk",
+                ["&mut File", "&SharedChunk", "u64"],
+                [],
+                Session.file_remove_shared_chunk,
+            ),
+            MoveFunction(
+                pkg,
+                "directory",
+                "new",
+                ["&mut TxContext"],
+                ["Directory"],
+                Session.directory_new,
+            ),
+            MoveFunction(
+                pkg,
+                "directory",
+                "add",
+                ["&mut Directory", "String", "ID"],
+                [],
+                Session.directory_add,
+            ),
+            MoveFunction(
+                pkg,
+                "directory",
+                "replace",
+                ["&mut Directory", "String", "ID"],
+                ["ID"],
+                Session.directory_replace,
+            ),
+            MoveFunction(
+                pkg,
+                "directory",
+                "remove",
+                ["&mut Directory", "String"],
+                ["ID"],
+                Session.directory_remove,
+            ),
+            MoveFunction(
+                pkg,
+                "directory",
+                "destroy_empty",
+                ["Directory"],
+                [],
+                Session.directory_destroy_empty,
+            ),
+            MoveFunction(
+                pkg,
+                "chunk",
+                "new",
+                ["CreateChunkCap", "&mut TxContext"],
+                ["Chunk", "VerifyChunkCap"],
+                Session.chunk_new,
+            ),
+            MoveFunction(
+                pkg,
+                "chunk",
+                "add_data",
+                ["&mut Chunk", "vector<vector<u8>>"],
+                [],
+                Session.chunk_add_data,
+            ),
+            MoveFunction(
+                pkg,
+                "chunk",
+                "verify",
+                ["VerifyChunkCap", "Chunk", "&mut TxContext"],
+                [],
+                Session.chunk_verify,
+            ),
+            MoveFunction(
+                pkg,
+                "chunk",
+                "verify_and_share",
+                ["VerifyChunkCap", "Chunk", "&mut TxContext"],
+                [],
+                Session.chunk_verify_and_share,
+            ),
+            MoveFunction(
+                normalize_address(SUI_FRAMEWORK),
+                "transfer",
+                "public_freeze_object",
+                ["T"],
+                [],
+                Session.transfer_public_freeze_object,
+            ),
+            MoveFunction(
+                normalize_address(SUI_FRAMEWORK),
+                "transfer",
+                "public_transfer",
+                ["T", "address"],
+                [],
+                Session.transfer_public_transfer,
+            ),
+        ]
+        return {(f.package, f.module, f.name): f for f in functions}
+
+    def normalized_function(
+        self,
+        package: str,
+        module: str,
+        function: str,
+    ) -> dict:
+        f = self.functions.get((normalize_address(package), module, function))
+        if f is None:
+            raise RpcError(f"No function {module}::{function} in package {package}")
+        return f.normalized(self)
+
+
+@dataclass
+class MoveFunction:
+    package: str
+    module: str
+    name: str
+    params: list[str]
+    returns: list[str]
+    implementation: Callable
+
+    STRUCT_MODULES = {
+        "File": "file",
+        "Manifest": "file",
+        "VerifyFileCap": "file",
+        "StagedFileCap": "file",
+        "Chunk": "chunk",
+        "CreateChunkCap": "chunk",
+        "RegisterChunkCap": "chunk",
+        "VerifyChunkCap": "chunk",
+        "SharedChunk": "chunk",
+        "Directory": "directory",
+    }
+    FRAMEWORK_STRUCTS = {
+        "Clock": ("0x2", "clock"),
+        "TxContext": ("0x2", "tx_context"),
+        "String": ("0x1", "string"),
+        "ID": ("0x2", "object"),
+        "Receiving": ("0x2", "transfer"),
+    }
+
+    def normalized(
+        self,
+        ledger: Ledger,
+    ) -> dict:
+        return {
+            "visibility": "Public",
+            "isEntry": False,
+            "typeParameters": [{"abilities": ["Store", "Key"]}]
+            if "T" in self.params
+            else [],
+            "parameters": [self._normalize_type(p, ledger) for p in self.params],
+            "return": [self._normalize_type(r, ledger) for r in self.returns],
+        }
+
+    def _normalize_type(
+        self,
+        spec: str,
+        ledger: Ledger,
+    ) -> Any:
+        if spec.startswith("&mut "):
+            return {"MutableReference": self._normalize_type(spec[5:], ledger)}
+        if spec.startswith("&"):
+            return {"Reference": self._normalize_type(spec[1:], ledger)}
+        if spec.startswith("vector<"):
+            return {"Vector": self._normalize_type(spec[7:-1], ledger)}
+        if spec in ("u8", "u16", "u32", "u64", "bool", "address"):
+            return spec.capitalize() if spec != "address" else "Address"
+        if spec == "T":
+            return {"TypeParameter": 0}
+        name, _, type_arg = spec.partition("<")
+        type_arguments = (
+            [self._normalize_type(type_arg[:-1], ledger)] if type_arg else []
+        )
+        if name in self.FRAMEWORK_STRUCTS:
+            address, module = self.FRAMEWORK_STRUCTS[name]
+        else:
+            address, module = ledger.package_id, self.STRUCT_MODULES[name]
+        return {
+            "Struct": {
+                "address": address,
+                "module": module,
+                "name": name,
+                "typeArguments": type_arguments,
+            }
+        }
+
+
+class Session:
+    """
+    Executes a single programmable transaction against the ledger. All writes are
+    staged and only applied to the ledger when the transaction succeeds.
+    """
+
+    def __init__(
+        self,
+        ledger: Ledger,
+        tx: TransactionData,
+        digest_bytes: bytes,
+        dry_run: bool,
+    ) -> None:
+        self.ledger = ledger
+        self.tx = tx
+        self.digest = b58encode(digest_bytes)
+        self.digest_bytes = digest_bytes
+        self.dry_run = dry_run
+        self.sender = normalize_address(tx.sender)
+        self.loaded: dict[str, MoveObject] = {}
+        self.mutable_ids: set[str] = set()
+        self.created: dict[str, MoveObject] = {}
+        self.deleted_ids: set[str] = set()
+        self.df_added: dict[tuple[str, bytes], str] = {}
+        self.df_removed: set[tuple[str, bytes]] = set()
+        self.potatoes: list[MoveStruct] = []
+        self.events: list[dict] = []
+        self.results: list[list] = []
+        self.id_counter = 0
+        self.command_index = 0
+        self.inputs: list[Any] = []
+        self.gas_coin: MoveObject | None = None
+
+    # Entry point
+
+    def run(
+        self,
+    ) -> dict:
+        self._load_gas()
+        self._load_inputs()
+        lamport = 1 + max([obj.version for obj in self.loaded.values()] + [0])
+        error = None
+        try:
+            for index, (kind, command) in enumerate(self.tx.commands):
+                self.command_index = index
+                self.results.append(self._execute_command(kind, command))
+            self._check_unused_values()
+        except ExecutionError as e:
+            error = f"{e} in command {self.command_index}"
+        return self._finish(lamport, error)
+
+    def _load_gas(
+        self,
+    ) -> None:
+        if self.dry_run and not self.tx.gas_payment:
+            # Dry runs may omit payment, so pay with a virtual coin that,
+            # like the fullnode's, holds far more than any budget.
+            self.gas_coin = MoveObject(
+                id="0x" + "0" * 64,
+                type=COIN_TYPE,
+                fields={"balance": SIMULATION_GAS_COIN_VALUE},
+                owner={"AddressOwner": self.sender},
+            )
+            return
+        if not self.tx.gas_payment:
+            raise RpcError("Transaction has no gas payment")
+        coins = [self._load_ref(ref, mutable=True) for ref in self.tx.gas_payment]
+        for coin in coins:
+            if coin.type != COIN_TYPE:
+                raise RpcError(f"Gas object {coin.id} is not a SUI coin")
+        self.gas_coin = coins[0]
+        for coin in coins[1:]:
+            self.gas_coin.fields["balance"] += coin.fields["balance"]
+            self._delete(coin)
+        if self.gas_coin.fields["balance"] < self.tx.gas_budget:
+            raise RpcError(
+                f"Balance of gas object {self.gas_coin.id} is lower than the needed amount: {self.tx.gas_budget}"
+            )
+
+    def _load_inputs(
+        self,
+    ) -> None:
+        for kind, value in self.tx.inputs:
+            if kind == "Pure":
+                self.inputs.append(("Pure", value))
+            elif kind == "ImmOrOwnedObject":
+                self.inputs.append(("Object", self._load_ref(value, mutable=True)))
+            elif kind == "SharedObject":
+                object_id, _, mutable = value
+                obj = self._load(object_id)
+                if not isinstance(obj.owner, dict) or "Shared" not in obj.owner:
+                    raise RpcError(f"Object {object_id} is not shared")
+                if mutable:
+                    self.mutable_ids.add(obj.id)
+                self.inputs.append(("Object", obj))
+            elif kind == "Receiving":
+                self.inputs.append(("Receiving", value))
+        if len(self.loaded) > MAX_INPUT_OBJECTS:
+            raise RpcError("Too many input objects")
+
+    def _load(
+        self,
+        object_id: str,
+    ) -> MoveObject:
+        object_id = normalize_address(object_id)
+        if object_id in self.loaded:
+            return self.loaded[object_id]
+        if object_id in self.created:
+            return self.created[object_id]
+        obj = self.ledger.objects.get(object_id)
+        if obj is None:
+            raise RpcError(f"Object {object_id} does not exist or was deleted")
+        obj = copy.deepcopy(obj)
+        self.loaded[object_id] = obj
+        return obj
+
+    def _load_ref(
+        self,
+        ref: ObjectRef,
+        mutable: bool,
+    ) -> MoveObject:
+        obj = self._load(ref.id)
+        if obj.version != ref.version or obj.digest != ref.digest:
+            raise RpcError(
+                f"Object {ref.id} version {ref.version} is unavailable for consumption, current version: {obj.version}"
+            )
+        if obj.owner == "Immutable":
+            return obj
+        if obj.owner != {"AddressOwner": self.sender}:
+            raise RpcError(f"Object {ref.id} is not owned by the transaction sender")
+        if mutable:
+            self.mutable_ids.add(obj.id)
+        return obj
+
+    # Commands
+
+    def _execute_command(
+        self,
+        kind: str,
+        command: Any,
+    ) -> list:
+        if kind == "MoveCall":
+            package, module, function, type_arguments, arguments = command
+            f = self.ledger.functions.get(
+                (normalize_address(package), module, function)
+            )
+            if f is None:
+                raise ExecutionError(f"FunctionNotFound({module}::{function})")
+            params = [p for p in f.params if p != "&mut TxContext"]
+            if len(arguments) != len(params):
+                raise ExecutionError(f"ArityMismatch({module}::{function})")
+            values = [
+                self._argument(arg, param) for arg, param in zip(arguments, params)
+            ]
+            return f.implementation(self, *values) or []
+        if kind == "TransferObjects":
+            objects, address = command
+            recipient = self._argument(address, "address")
+            for arg in objects:
+                for obj in self._flatten(self._argument(arg, "T")):
+                    self._transfer(obj, {"AddressOwner": recipient})
+            return []
+        if kind == "SplitCoins":
+            coin_arg, amount_args = command
+            coin = self._argument(coin_arg, "&mut Coin")
+            coins = []
+            for arg in amount_args:
+                amount = self._argument(arg, "u64")
+                if coin.fields["balance"] < amount:
+                    raise MoveAbort("0x2", "balance", "split", 2)
+                coin.fields["balance"] -= amount
+                coins.append(self._new_object(COIN_TYPE, {"balance": amount}))
+            return coins
+        if kind == "MergeCoins":
+            coin_arg, source_args = command
+            coin = self._argument(coin_arg, "&mut Coin")
+            for arg in source_args:
+                source = self._argument(arg, "Coin")
+                coin.fields["balance"] += source.fields["balance"]
+                self._delete(source)
+            return []
+        if kind == "MakeMoveVec":
+            _, element_args = command
+            return [[self._argument(arg, "T") for arg in element_args]]
+        raise ExecutionError(f"Unsupported command {kind}")
+
+    def _flatten(
+        self,
+        value: Any,
+    ) -> list:
+        return value if isinstance(value, list) else [value]
+
+    def _argument(
+        self,
+        arg: tuple,
+        param: str,
+    ) -> Any:
+        by_value = not param.startswith("&")
+        kind = arg[0]
+        if kind == "GasCoin":
+            if by_value and param != "T":
+                raise ExecutionError("InvalidGasCoinUsage")
+            value = self.gas_coin
+        elif kind == "Input":
+            input_kind, value = self.inputs[arg[1]]
+            if input_kind == "Pure":
+                if param.startswith("Receiving<"):
+                    raise ExecutionError("TypeMismatch")
+                return decode_pure(value, param.removeprefix("&"))
+            if input_kind == "Receiving":
+                if not param.startswith("Receiving<"):
+                    raise ExecutionError("TypeMismatch")
+                return value
+            if by_value:
+                if value.owner == "Immutable" or (
+                    isinstance(value.owner, dict) and "Shared" in value.owner
+                ):
+                    raise ExecutionError(f"InvalidObjectByValue({value.id})")
+                value.owner = None
+            elif param.startswith("&mut ") and value.owner == "Immutable":
+                raise ExecutionError(f"InvalidObjectByMutRef({value.id})")
+            return value
+        elif kind == "Result":
+            values = self.results[arg[1]]
+            value = values[0] if len(values) == 1 else values
+        else:
+            value = self.results[arg[1]][arg[2]]
+        if isinstance(value, MoveStruct):
+            if value.consumed:
+                raise ExecutionError("ArgumentWithoutValue")
+            if by_value:
+                value.consumed = True
+        elif isinstance(value, MoveObject) and by_value:
+            value.owner = None
+        return value
+
+    def _check_unused_values(
+        self,
+    ) -> None:
+        for potato in self.potatoes:
+            if not potato.consumed:
+                raise ExecutionError(f"UnusedValueWithoutDrop({potato.type})")
+        for obj in list(self.created.values()) + list(self.loaded.values()):
+            if obj.owner is None and obj.id not in self.deleted_ids:
+                raise ExecutionError(f"UnusedValueWithoutDrop({obj.type})")
+
+    # Object helpers
+
+    def _new_id(
+        self,
+    ) -> str:
+        self.id_counter += 1
+        return (
+            "0x"
+            + blake2b256(
+                self.digest_bytes + self.id_counter.to_bytes(8, "little")
+            ).hex()
+        )
+
+    def _new_object(
+        self,
+        type_: str,
+        fields: dict,
+        has_public_transfer: bool = True,
+    ) -> MoveObject:
+        obj = MoveObject(
+            id=self._new_id(),
+            type=type_,
+            fields=fields,
+            has_public_transfer=has_public_transfer,
+        )
+        self.created[obj.id] = obj
+        return obj
+
+    def _new_struct(
+        self,
+        type_: str,
+        fields: dict,
+    ) -> MoveStruct:
+        potato = MoveStruct(type_, fields)
+        self.potatoes.append(potato)
+        return potato
+
+    def _transfer(
+        self,
+        obj: MoveObject,
+        owner: dict | str,
+    ) -> None:
+        if not isinstance(obj, MoveObject):
+            raise ExecutionError("TypeMismatch: only objects can be transferred")
+        obj.owner = owner
+        self.mutable_ids.add(obj.id)
+
+    def _delete(
+        self,
+        obj: MoveObject,
+    ) -> None:
+        obj.owner = None
+        self.deleted_ids.add(obj.id)
+
+    def _receive(
+        self,
+        parent: MoveObject,
+        ref: ObjectRef,
+        type_: str,
+    ) -> MoveObject:
+        obj = self._load(ref.id)
+        if obj.version != ref.version or obj.digest != ref.digest:
+            raise RpcError(
+                f"Object {ref.id} version {ref.version} is unavailable for consumption"
+            )
+        if obj.owner != {"AddressOwner": parent.id} or obj.type != type_:
+            raise ExecutionError(f"InvalidReceivingObject({ref.id})")
+        self.mutable_ids.add(obj.id)
+        obj.owner = None
+        return obj
+
+    def _df_id(
+        self,
+        parent_id: str,
+        name: bytes,
+    ) -> str | None:
+        key = (parent_id, bytes(name))
+        if key in self.df_added:
+            return self.df_added[key]
+        if key in self.df_removed:
+            return None
+        return self.ledger.dynamic_fields.get(key)
+
+    def _df_add(
+        self,
+        parent: MoveObject,
+        name: bytes,
+        value: Any,
+        value_type: str,
+    ) -> None:
+        if self._df_id(parent.id, name) is not None:
+            raise MoveAbort("0x2", "dynamic_field", "add", 0)
+        # Derived from the parent and the name like Sui does, see derive_dynamic_field_id.
+        name_bcs = uleb128(len(name)) + bytes(name)
+        field_id = (
+            "0x"
+            + blake2b256(
+                b"\xf0"
+                + bytes.fromhex(parent.id[2:])
+                + len(name_bcs).to_bytes(8, "little")
+                + name_bcs
+                + b"\x06\x01"
+            ).hex()
+        )
+        obj = MoveObject(
+            id=field_id,
+            type=f"0x2::dynamic_field::Field<vector<u8>, {value_type}>",
+            fields={"name": bytes(name), "value": value},
+            owner={"ObjectOwner": parent.id},
+            has_public_transfer=False,
+        )
+        self.created[field_id] = obj
+        self.mutable_ids.add(field_id)
+        self.df_added[(parent.id, bytes(name))] = field_id
+        self.df_removed.discard((parent.id, bytes(name)))
+
+    def _df_borrow(
+        self,
+        parent: MoveObject,
+        name: bytes,
+    ) -> MoveObject:
+        field_id = self._df_id(parent.id, name)
+        if field_id is None:
+            raise MoveAbort("0x2", "dynamic_field", "borrow_child_object_mut", 1)
+        obj = self._load(field_id)
+        self.mutable_ids.add(obj.id)
+        return obj
+
+    def _df_remove(
+        self,
+        parent: MoveObject,
+        name: bytes,
+    ) -> Any:
+        obj = self._df_borrow(parent, name)
+        self._delete(obj)
+        self.df_added.pop((parent.id, bytes(name)), None)
+        self.df_removed.add((parent.id, bytes(name)))
+        return obj.fields["value"]
+
+    def _emit(
+        self,
+        module: str,
+        name: str,
+        values: list[tuple[str, str, Any]],
+    ) -> None:
+        parsed = {}
+        for field_name, kind, value in values:
+            if kind == "vector<u8>":
+                parsed[field_name] = list(value)
+            elif kind == "u64":
+                parsed[field_name] = str(value)
+            else:
+                parsed[field_name] = value
+        self.events.append(
+            {
+                "packageId": self.ledger.package_id,
+                "transactionModule": module,
+                "sender": self.sender,
+                "type": self.ledger.type_of(module, name),
+                "parsedJson": parsed,
+                "bcs": b58encode(
+                    _encode_event([(kind, value) for _, kind, value in values])
+                ),
+            }
+        )
+
+    def _abort(
+        self,
+        module: str,
+        function: str,
+        code: int,
+    ) -> MoveAbort:
+        return MoveAbort(self.ledger.package_id, module, function, code)
+
+    # miraifs::file
+
+    def _is_indexed(
+        self,
+        file: MoveObject,
+    ) -> bool:
+        return self._df_id(file.id, b"chunk_index") is not None
+
+    def _chunk_index(
+        self,
+        file: MoveObject,
+    ) -> dict:
+        return self._df_borrow(file, b"chunk_index").fields["value"]
+
+    def _new_chunk_index(
+        self,
+    ) -> dict:
+        # Entries in index order, and the Table of indices by hash. Table entries
+        # are dynamic fields of their own, which aren't modelled.
+        return {"chunks": [], "indices": {}, "indices_id": self._new_id()}
+
+    def file_new(
+        self,
+        chunk_size: int,
+        mime_type: str,
+        chunks_hash: bytes,
+        clock: MoveObject,
+    ) -> list:
+        if chunk_size > MAX_CHUNK_SIZE_BYTES:
+            raise self._abort("file", "new", 4)
+        if len(chunks_hash) != 32:
+            raise self._abort("file", "new", 2)
+        created_at = self.ledger.clock()
+        file = self._new_object(
+            self.ledger.type_of("file", "File"),
+            {
+                "manifest": {
+                    "count": 0,
+                    "hash": bytes(chunks_hash),
+                    # The first version of the package's VecMap of chunks, which
+                    # stays empty for files with a ChunkIndex.
+                    "chunks": [],
+                    "size": chunk_size,
+                },
+                "created_at": created_at,
+                "mime_type": mime_type,
+                "size": 0,
+            },
+        )
+        self._df_add(
+            file,
+            b"chunk_index",
+            self._new_chunk_index(),
+            self.ledger.type_of("file", "ChunkIndex"),
+        )
+        self._df_add(
+            file,
+            b"create_chunk_cap_ids",
+            {"ids": [], "unregistered": 0},
+            self.ledger.type_of("file", "CreateChunkCapIds"),
+        )
+        verify_file_cap = self._new_struct(
+            self.ledger.type_of("file", "VerifyFileCap"), {"file_id": file.id}
+        )
+        self._emit(
+            "file",
+            "FileCreatedEvent",
+            [
+                ("chunk_size", "u32", chunk_size),
+                ("created_at", "u64", created_at),
+                ("file_id", "ID", file.id),
+                ("mime_type", "String", mime_type),
+                ("chunks_hash", "vector<u8>", bytes(chunks_hash)),
+            ],
+        )
+        return [file, verify_file_cap]
+
+    def file_add_chunk_hash(
+        self,
+        verify_file_cap: MoveStruct,
+        file: MoveObject,
+        hash: bytes,
+    ) -> list:
+        if verify_file_cap.fields["file_id"] != file.id:
+            raise self._abort("file", "add_chunk_hash", 3)
+        if len(hash) != 32:
+            raise self._abort("file", "add_chunk_hash", 2)
+        chunk_index = self._chunk_index(file)
+        chunks = chunk_index["chunks"]
+        create_chunk_cap = self._new_object(
+            self.ledger.type_of("chunk", "CreateChunkCap"),
+            {"file_id": file.id, "index": len(chunks), "hash": bytes(hash)},
+        )
+        cap_ids = self._df_borrow(file, b"create_chunk_cap_ids").fields["value"]
+        cap_ids["ids"].append(create_chunk_cap.id)
+        cap_ids["unregistered"] += 1
+        indices = chunk_index["indices"]
+        if bytes(hash) in indices:
+            raise MoveAbort("0x2", "dynamic_field", "add", 0)
+        indices[bytes(hash)] = len(chunks)
+        chunks.append({"hash": bytes(hash), "id": None})
+        return [create_chunk_cap]
+
+    def file_stage(
+        self,
+        verify_file_cap: MoveStruct,
+    ) -> list:
+        staged_file_cap = self._new_object(
+            self.ledger.type_of("file", "StagedFileCap"),
+            {"file_id": verify_file_cap.fields["file_id"]},
+        )
+        return [staged_file_cap]
+
+    def file_unstage(
+        self,
+        staged_file_cap: MoveObject,
+    ) -> list:
+        if staged_file_cap.type != self.ledger.type_of("file", "StagedFileCap"):
+            raise ExecutionError("TypeMismatch")
+        self._delete(staged_file_cap)
+        verify_file_cap = self._new_struct(
+            self.ledger.type_of("file", "VerifyFileCap"),
+            {"file_id": staged_file_cap.fields["file_id"]},
+        )
+        return [verify_file_cap]
+
+    def file_verify(
+        self,
+        verify_file_cap: MoveStruct,
+        file: MoveObject,
+    ) -> list:
+        if verify_file_cap.fields["file_id"] != file.id:
+            raise self._abort("file", "verify", 3)
+        manifest = file.fields["manifest"]
+        chunks = (
+            self._chunk_index(file)["chunks"]
+            if self._is_indexed(file)
+            else manifest["chunks"]
+        )
+        if self._is_indexed(file):
+            indices = self._chunk_index(file)["indices"]
+            if any(entry["hash"] not in indices for entry in chunks):
+                raise self._abort("file", "verify", 8)
+        if blake2b256(b"".join(entry["hash"] for entry in chunks)) != manifest["hash"]:
+            raise self._abort("file", "verify", 5)
+        manifest["count"] = len(chunks)
+        cap_ids_id = self._df_id(file.id, b"create_chunk_cap_ids")
+        if cap_ids_id is not None and self._load(cap_ids_id).type.endswith(
+            "::file::CreateChunkCapIds>"
+        ):
+            if (
+                self._df_borrow(file, b"create_chunk_cap_ids").fields["value"][
+                    "unregistered"
+                ]
+                == 0
+            ):
+                self._df_remove(file, b"create_chunk_cap_ids")
+        return []
+
+    def file_receive_and_register_chunk(
+        self,
+        file: MoveObject,
+        ref: ObjectRef,
+    ) -> list:
+        cap = self._receive(file, ref, self.ledger.type_of("chunk", "RegisterChunkCap"))
+        chunk_hash = cap.fields["hash"]
+        if self._is_indexed(file):
+            chunk_index = self._chunk_index(file)
+            if chunk_hash not in chunk_index["indices"]:
+                raise MoveAbort("0x2", "dynamic_field", "borrow_child_object", 1)
+            entry = chunk_index["chunks"][chunk_index["indices"][chunk_hash]]
+            if entry["id"] is not None:
+                raise MoveAbort("0x1", "option", "fill", 0x40000)
+            entry["id"] = cap.fields["chunk_id"]
+            cap_ids = self._df_borrow(file, b"create_chunk_cap_ids").fields["value"]
+            cap_ids["unregistered"] -= 1
+            if cap_ids["unregistered"] == 0:
+                self._df_remove(file, b"create_chunk_cap_ids")
+        else:
+            cap_ids = self._df_borrow(file, b"create_chunk_cap_ids").fields["value"]
+            if cap_ids.pop(chunk_hash, None) is None:
+                raise MoveAbort("0x2", "vec_map", "remove", 1)
+            if not cap_ids:
+                self._df_remove(file, b"create_chunk_cap_ids")
+            entry = next(
+                entry
+                for entry in file.fields["manifest"]["chunks"]
+                if entry["hash"] == chunk_hash
+            )
+            entry["id"] = cap.fields["chunk_id"]
+        file.fields["size"] += cap.fields["size"]
+        self._emit(
+            "file",
+            "ChunkRegisteredEvent",
+            [
+                ("chunk_hash", "vector<u8>", chunk_hash),
+                ("chunk_id", "ID", cap.fields["chunk_id"]),
+                ("chunk_index", "u16", cap.fields["index"]),
+                ("file_id", "ID", file.id),
+            ],
+        )
+        self._delete(cap)
+        return []
+
+    def file_receive_and_drop_chunk(
+        self,
+        file: MoveObject,
+        ref: ObjectRef,
+    ) -> list:
+        chunk = self._receive(file, ref, self.ledger.type_of("chunk", "Chunk"))
+        if self._is_indexed(file):
+            chunk_index = self._chunk_index(file)
+            if chunk.fields["hash"] not in chunk_index["indices"]:
+                raise MoveAbort("0x2", "dynamic_field", "remove_child_object", 1)
+            index = chunk_index["indices"].pop(chunk.fields["hash"])
+            chunk_index["chunks"][index]["id"] = None
+        else:
+            chunks = file.fields["manifest"]["chunks"]
+            remaining = [
+                entry for entry in chunks if entry["hash"] != chunk.fields["hash"]
+            ]
+            if len(remaining) == len(chunks):
+                raise MoveAbort("0x2", "vec_map", "remove", 1)
+            chunks[:] = remaining
+        file.fields["size"] -= chunk.fields["size"]
+        self._delete(chunk)
+        return []
+
+    def file_add_shared_chunk(
+        self,
+        verify_file_cap: MoveStruct,
+        file: MoveObject,
+        shared_chunk: MoveObject,
+    ) -> list:
+        if verify_file_cap.fields["file_id"] != file.id:
+            raise self._abort("file", "add_shared_chunk", 3)
+        if shared_chunk.type != self.ledger.type_of("chunk", "SharedChunk"):
+            raise ExecutionError("TypeMismatch")
+        chunk_index = self._chunk_index(file)
+        index = len(chunk_index["chunks"])
+        hash = blake2b256(index.to_bytes(2, "big") + shared_chunk.fields["hash"])
+        if hash in chunk_index["indices"]:
+            raise MoveAbort("0x2", "dynamic_field", "add", 0)
+        chunk_index["indices"][hash] = index
+        chunk_index["chunks"].append({"hash": hash, "id": shared_chunk.id})
+        file.fields["size"] += shared_chunk.fields["size"]
+        self._emit(
+            "file",
+            "ChunkRegisteredEvent",
+            [
+                ("chunk_hash", "vector<u8>", hash),
+                ("chunk_id", "ID", shared_chunk.id),
+                ("chunk_index", "u16", index),
+                ("file_id", "ID", file.id),
+            ],
+        )
+        return []
+
+    def file_remove_shared_chunk(
+        self,
+        file: MoveObject,
+        shared_chunk: MoveObject,
+        index: int,
+    ) -> list:
+        chunk_index = self._chunk_index(file)
+        chunks = chunk_index["chunks"]
+        if index >= len(chunks):
+            raise MoveAbort("0x1", "vector", "borrow_mut", 0x20000)
+        if chunks[index]["id"] != shared_chunk.id:
+            raise self._abort("file", "remove_shared_chunk", 6)
+        del chunk_index["indices"][chunks[index]["hash"]]
+        chunks[index]["id"] = None
+        file.fields["size"] -= shared_chunk.fields["size"]
+        return []
+
+    def file_migrate(
+        self,
+        file: MoveObject,
+    ) -> list:
+        if self._is_indexed(file):
+            return []
+        chunk_index = self._new_chunk_index()
+        for index, entry in enumerate(file.fields["manifest"]["chunks"]):
+            chunk_index["indices"][entry["hash"]] = index
+            chunk_index["chunks"].append(dict(entry))
+        file.fields["manifest"]["chunks"] = []
+        self._df_add(
+            file, b"chunk_index", chunk_index, self.ledger.type_of("file", "ChunkIndex")
+        )
+        cap_ids_id = self._df_id(file.id, b"create_chunk_cap_ids")
+        if cap_ids_id is not None and not self._load(cap_ids_id).type.endswith(
+            "::file::CreateChunkCapIds>"
+        ):
+            legacy_ids = self._df_remove(file, b"create_chunk_cap_ids")
+            self._df_add(
+                file,
+                b"create_chunk_cap_ids",
+                {"ids": list(legacy_ids.values()), "unregistered": len(legacy_ids)},
+                self.ledger.type_of("file", "CreateChunkCapIds"),
+            )
+        return []
+
+    def file_begin_update(
+        self,
+        file: MoveObject,
+        chunks_hash: bytes,
+    ) -> list:
+        if len(chunks_hash) != 32:
+            raise self._abort("file", "begin_update", 2)
+        self.file_migrate(file)
+        file.fields["manifest"]["hash"] = bytes(chunks_hash)
+        if self._df_id(file.id, b"create_chunk_cap_ids") is None:
+            self._df_add(
+                file,
+                b"create_chunk_cap_ids",
+                {"ids": [], "unregistered": 0},
+                self.ledger.type_of("file", "CreateChunkCapIds"),
+            )
+        self._emit(
+            "file",
+            "FileUpdatedEvent",
+            [
+                ("file_id", "ID", file.id),
+                ("chunks_hash", "vector<u8>", bytes(chunks_hash)),
+            ],
+        )
+        verify_file_cap = self._new_struct(
+            self.ledger.type_of("file", "VerifyFileCap"), {"file_id": file.id}
+        )
+        return [verify_file_cap]
+
+    def file_replace_chunk_hash(
+        self,
+        verify_file_cap: MoveStruct,
+        file: MoveObject,
+        index: int,
+        hash: bytes,
+    ) -> list:
+        if verify_file_cap.fields["file_id"] != file.id:
+            raise self._abort("file", "replace_chunk_hash", 3)
+        if len(hash) != 32:
+            raise self._abort("file", "replace_chunk_hash", 2)
+        chunk_index = self._chunk_index(file)
+        if index >= len(chunk_index["chunks"]):
+            raise MoveAbort("0x1", "vector", "borrow_mut", 0x20000)
+        entry = chunk_index["chunks"][index]
+        if entry["id"] is not None or entry["hash"] in chunk_index["indices"]:
+            raise self._abort("file", "replace_chunk_hash", 7)
+        entry["hash"] = bytes(hash)
+        if bytes(hash) in chunk_index["indices"]:
+            raise MoveAbort("0x2", "dynamic_field", "add", 0)
+        chunk_index["indices"][bytes(hash)] = index
+        create_chunk_cap = self._new_object(
+            self.ledger.type_of("chunk", "CreateChunkCap"),
+            {"file_id": file.id, "index": index, "hash": bytes(hash)},
+        )
+        cap_ids = self._df_borrow(file, b"create_chunk_cap_ids").fields["value"]
+        cap_ids["ids"].append(create_chunk_cap.id)
+        cap_ids["unregistered"] += 1
+        return [create_chunk_cap]
+
+    def file_truncate(
+        self,
+        verify_file_cap: MoveStruct,
+        file: MoveObject,
+        count: int,
+    ) -> list:
+        if verify_file_cap.fields["file_id"] != file.id:
+            raise self._abort("file", "truncate", 3)
+        chunk_index = self._chunk_index(file)
+        while len(chunk_index["chunks"]) > count:
+            entry = chunk_index["chunks"].pop()
+            if entry["id"] is not None or entry["hash"] in chunk_index["indices"]:
+                raise self._abort("file", "truncate", 7)
+        return []
+
+    def file_destroy_empty(
+        self,
+        file: MoveObject,
+    ) -> list:
+        if file.fields["manifest"]["chunks"]:
+            raise self._abort("file", "destroy_empty", 1)
+        if self._is_indexed(file) and self._df_remove(file, b"chunk_index")["indices"]:
+            raise self._abort("file", "destroy_empty", 1)
+        self._delete(file)
+        return []
+
+    # miraifs::directory
+
+    def directory_new(
+        self,
+    ) -> list:
+        directory = self._new_object(
+            self.ledger.type_of("directory", "Directory"),
+            {"entries": [], "indices": {}, "indices_id": self._new_id()},
+        )
+        return [directory]
+
+    def directory_add(
+        self,
+        directory: MoveObject,
+        path: str,
+        file_id: str,
+    ) -> list:
+        if not path:
+            raise self._abort("directory", "add", 4)
+        indices = directory.fields["indices"]
+        if path in indices:
+            raise self._abort("directory", "add", 1)
+        indices[path] = len(directory.fields["entries"])
+        directory.fields["entries"].append({"path": path, "file_id": file_id})
+        return []
+
+    def directory_replace(
+        self,
+        directory: MoveObject,
+        path: str,
+        file_id: str,
+    ) -> list:
+        index = directory.fields["indices"].get(path)
+        if index is None:
+            raise self._abort("directory", "replace", 2)
+        entry = directory.fields["entries"][index]
+        previous_file_id = entry["file_id"]
+        entry["file_id"] = file_id
+        return [previous_file_id]
+
+    def directory_remove(
+        self,
+        directory: MoveObject,
+        path: str,
+    ) -> list:
+        indices = directory.fields["indices"]
+        entries = directory.fields["entries"]
+        if path not in indices:
+            raise self._abort("directory", "remove", 2)
+        index = indices.pop(path)
+        # swap_remove: the last entry takes the removed entry's place.
+        entries[index], entries[-1] = entries[-1], entries[index]
+        entry = entries.pop()
+        if index < len(entries):
+            indices[entries[index]["path"]] = index
+        return [entry["file_id"]]
+
+    def directory_destroy_empty(
+        self,
+        directory: MoveObject,
+    ) -> list:
+        if directory.fields["entries"]:
+            raise self._abort("directory", "destroy_empty", 3)
+        self._delete(directory)
+        return []
+
+    # miraifs::chunk
+
+    def chunk_new(
+        self,
+        cap: MoveObject,
+    ) -> list:
+        if cap.type != self.ledger.type_of("chunk", "CreateChunkCap"):
+            raise ExecutionError("TypeMismatch")
+        chunk = self._new_object(
+            self.ledger.type_of("chunk", "Chunk"),
+            {
+                "data": bytearray(),
+                "hash": cap.fields["hash"],
+                "index": cap.fields["index"],
+                "size": 0,
+            },
+        )
+        self._emit(
+            "chunk",
+            "ChunkCreatedEvent",
+            [
+                ("chunk_id", "ID", chunk.id),
+                ("chunk_index", "u16", chunk.fields["index"]),
+                ("chunk_hash", "vector<u8>", chunk.fields["hash"]),
+                ("file_id", "ID", cap.fields["file_id"]),
+            ],
+        )
+        verify_chunk_cap = self._new_struct(
+            self.ledger.type_of("chunk", "VerifyChunkCap"),
+            {"chunk_id": chunk.id, "file_id": cap.fields["file_id"]},
+        )
+        self._delete(cap)
+        return [chunk, verify_chunk_cap]
+
+    def chunk_add_data(
+        self,
+        chunk: MoveObject,
+        data: list[bytes],
+    ) -> list:
+        # add_data pops from the back, so the last vector is appended first.
+        for part in reversed(data):
+            chunk.fields["data"] += part
+        return []
+
+    def chunk_verify(
+        self,
+        cap: MoveStruct,
+        chunk: MoveObject,
+    ) -> list:
+        if cap.fields["chunk_id"] != chunk.id:
+            raise self._abort("chunk", "verify", 2)
+        data_hash = blake2b256(bytes(chunk.fields["data"]))
+        identifier_hash = blake2b256(
+            chunk.fields["index"].to_bytes(2, "big") + data_hash
+        )
+        if identifier_hash != chunk.fields["hash"]:
+            raise self._abort("chunk", "verify", 1)
+        chunk.fields["size"] = len(chunk.fields["data"])
+        register_chunk_cap = self._new_object(
+            self.ledger.type_of("chunk", "RegisterChunkCap"),
+            {
+                "chunk_id": chunk.id,
+                "hash": chunk.fields["hash"],
+                "index": chunk.fields["index"],
+                "size": chunk.fields["size"],
+            },
+        )
+        self._emit(
+            "chunk",
+            "ChunkVerifiedEvent",
+            [
+                ("chunk_id", "ID", chunk.id),
+                ("file_id", "ID", cap.fields["file_id"]),
+                ("register_chunk_cap_id", "ID", register_chunk_cap.id),
+            ],
+        )
+        self._transfer(chunk, {"AddressOwner": cap.fields["file_id"]})
+        self._transfer(register_chunk_cap, {"AddressOwner": cap.fields["file_id"]})
+        return []
+
+    def chunk_verify_and_share(
+        self,
+        cap: MoveStruct,
+        chunk: MoveObject,
+    ) -> list:
+        if cap.fields["chunk_id"] != chunk.id:
+            raise self._abort("chunk", "verify_and_share", 2)
+        data_hash = blake2b256(bytes(chunk.fields["data"]))
+        identifier_hash = blake2b256(
+            chunk.fields["index"].to_bytes(2, "big") + data_hash
+        )
+        if identifier_hash != chunk.fields["hash"]:
+            raise self._abort("chunk", "verify_and_share", 1)
+        shared_chunk = self._new_object(
+            self.ledger.type_of("chunk", "SharedChunk"),
+            {
+                "data": chunk.fields["data"],
+                "hash": data_hash,
+                "size": len(chunk.fields["data"]),
+            },
+            has_public_transfer=False,
+        )
+        register_chunk_cap = self._new_object(
+            self.ledger.type_of("chunk", "RegisterChunkCap"),
+            {
+                "chunk_id": shared_chunk.id,
+                "hash": chunk.fields["hash"],
+                "index": chunk.fields["index"],
+                "size": shared_chunk.fields["size"],
+            },
+        )
+        self._emit(
+            "chunk",
+            "ChunkVerifiedEvent",
+            [
+                ("chunk_id", "ID", chunk.id),
+                ("file_id", "ID", cap.fields["file_id"]),
+                ("register_chunk_cap_id", "ID", register_chunk_cap.id),
+            ],
+        )
+        self._emit(
+            "chunk",
+            "SharedChunkCreatedEvent",
+            [
+                ("chunk_id", "ID", shared_chunk.id),
+                ("chunk_hash", "vector<u8>", data_hash),
+                ("size", "u32", shared_chunk.fields["size"]),
+            ],
+        )
+        self._delete(chunk)
+        self._transfer(shared_chunk, "Immutable")
+        self._transfer(register_chunk_cap, {"AddressOwner": cap.fields["file_id"]})
+        return []
+
+    # sui::transfer
+
+    def transfer_public_freeze_object(
+        self,
+        obj: MoveObject,
+    ) -> list:
+        self._transfer(obj, "Immutable")
+        return []
+
+    def transfer_public_transfer(
+        self,
+        obj: MoveObject,
+        recipient: str,
+    ) -> list:
+        self._transfer(obj, {"AddressOwner": recipient})
+        return []
+
+    # Effects
+
+    def _computation_cost(
+        self,
+    ) -> int:
+        units = (
+            1_000
+            + 100 * len(self.tx.commands)
+            + sum(len(value) // 8 for kind, value in self.tx.inputs if kind == "Pure")
+        )
+        for bucket in COMPUTATION_BUCKETS:
+            if units <= bucket:
+                units = bucket
+                break
+        return units * self.tx.gas_price
+
+    def _finish(
+        self,
+        lamport: int,
+        error: str | None,
+    ) -> dict:
+        gas_coin = self.gas_coin
+        computation_cost = self._computation_cost()
+        written: list[MoveObject] = []
+        deleted: list[MoveObject] = []
+        if error is None:
+            for object_id in self.deleted_ids:
+                if object_id in self.loaded:
+                    deleted.append(self.loaded[object_id])
+            written = [
+                obj
+                for obj in list(self.loaded.values()) + list(self.created.values())
+                if obj.id not in self.deleted_ids
+                and (obj.id in self.mutable_ids or obj.id in self.created)
+            ]
+            if not any(obj is gas_coin for obj in written):
+                # A dry run's virtual gas coin is charged like a real one.
+                written.append(gas_coin)
+        else:
+            written = [gas_coin]
+
+        storage_cost = 0
+        storage_rebate = 0
+        for obj in written:
+            previous = self.ledger.objects.get(obj.id)
+            if previous is not None:
+                storage_rebate += previous.storage_rebate
+            obj.storage_rebate = _object_size(obj.fields) * STORAGE_PRICE_PER_BYTE
+            storage_cost += obj.storage_rebate
+        for obj in deleted:
+            storage_rebate += self.ledger.objects[obj.id].storage_rebate
+        non_refundable = int(storage_rebate * (1 - STORAGE_REBATE_RATE))
+        storage_rebate -= non_refundable
+
+        if error is None and computation_cost + storage_cost > self.tx.gas_budget:
+            error = "InsufficientGas"
+            return self._finish_failed(lamport, error, computation_cost)
+
+        gas_coin.fields["balance"] -= computation_cost + storage_cost - storage_rebate
+        if gas_coin.fields["balance"] < 0:
+            return self._finish_failed(lamport, "InsufficientGas", computation_cost)
+        gas_used = {
+            "computationCost": str(computation_cost),
+            "storageCost": str(storage_cost),
+            "storageRebate": str(storage_rebate),
+            "nonRefundableStorageFee": str(non_refundable),
+        }
+        return self._commit(lamport, error, written, deleted, gas_used)
+
+    def _finish_failed(
+        self,
+        lamport: int,
+        error: str,
+        computation_cost: int,
+    ) -> dict:
+        # Restore the gas coin and charge only for computation.
+        original = self.ledger.objects.get(self.gas_coin.id)
+        gas_coin = copy.deepcopy(original) if original is not None else self.gas_coin
+        gas_coin.fields["balance"] -= min(computation_cost, self.tx.gas_budget)
+        self.gas_coin = gas_coin
+        gas_used = {
+            "computationCost": str(min(computation_cost, self.tx.gas_budget)),
+            "storageCost": "0",
+            "storageRebate": "0",
+            "nonRefundableStorageFee": "0",
+        }
+        return self._commit(lamport, error, [gas_coin], [], gas_used)
+
+    def _commit(
+        self,
+        lamport: int,
+        error: str | None,
+        written: list[MoveObject],
+        deleted: list[MoveObject],
+        gas_used: dict,
+    ) -> dict:
+        if error is not None:
+            self.events = []
+        created = []
+        mutated = []
+        for obj in written:
+            obj.version = lamport
+            obj.previous_transaction = self.digest
+            obj.digest = b58encode(
+                blake2b256(
+                    bytes.fromhex(obj.id[2:])
+                    + lamport.to_bytes(8, "little")
+                    + self.digest_bytes
+                )
+            )
+            change = {
+                "owner": obj.owner,
+                "reference": {
+                    "objectId": obj.id,
+                    "version": obj.version,
+                    "digest": obj.digest,
+                },
+            }
+            if obj.id in self.ledger.objects:
+                mutated.append(change)
+            else:
+                created.append(change)
+        deleted_refs = [
+            {
+                "objectId": obj.id,
+                "version": lamport,
+                "digest": "7gyGAp71YXQRoxmFBaHxofQXAipvgHyBKPyxmdSJxyvz",
+            }
+            for obj in deleted
+        ]
+
+        timestamp = self.ledger.clock()
+        events = []
+        for seq, event in enumerate(self.events):
+            event = dict(event)
+            event["id"] = {"txDigest": self.digest, "eventSeq": str(seq)}
+            event["timestampMs"] = str(timestamp)
+            events.append(event)
+
+        if not self.dry_run:
+            ledger = self.ledger
+            for obj in written:
+                if obj.id != "0x" + "0" * 64:
+                    ledger.objects[obj.id] = obj
+            for obj in deleted:
+                ledger.deleted[obj.id] = ledger.objects.pop(obj.id)
+            if error is None:
+                for key, field_id in self.df_added.items():
+                    ledger.dynamic_fields[key] = field_id
+                for key in self.df_removed:
+                    ledger.dynamic_fields.pop(key, None)
+                ledger.events.extend(events)
+            ledger.checkpoint += 1
+
+        gas_coin = self.gas_coin
+        effects = {
+            "messageVersion": "v1",
+            "status": {"status": "success"}
+            if error is None
+            else {"status": "failure", "error": error},
+            "executedEpoch": "0",
+            "gasUsed": gas_used,
+            "transactionDigest": self.digest,
+            "created": created,
+            "mutated": mutated,
+            "deleted": deleted_refs,
+            "gasObject": {
+                "owner": gas_coin.owner,
+                "reference": {
+                    "objectId": gas_coin.id,
+                    "version": gas_coin.version,
+                    "digest": gas_coin.digest,
+                },
+            },
+            "dependencies": [],
+        }
+        if self.dry_run:
+            return {
+                "effects": effects,
+                "events": events,
+                "input": {},
+                "objectChanges": [],
+                "balanceChanges": [],
+            }
+        return {
+            "digest": self.digest,
+            "effects": effects,
+            "events": events,
+            "objectChanges": [],
+            "balanceChanges": [],
+            "confirmedLocalExecution": True,
+            "checkpoint": str(self.ledger.checkpoint),
+            "timestampMs": str(timestamp),
+        }
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Every worker thread of a client opens its own connection, often all at
+    # once, which would overflow the default listen backlog of 5.
+    request_queue_size = 1024
+
+
+class Fullnode:
+    """
+    Serves a Ledger over JSON-RPC on a local port from a background thread.
+    Every request is delayed by the configured latency before it is handled,
+    outside of the ledger lock, so concurrent requests overlap as they would
+    against a real fullnode. Several nodes can serve the same ledger to stand
+    in for multiple fullnodes of one network.
+    """
+
+    def __init__(
+        self,
+        package_id: str | None = None,
+        latency: Latency | None = None,
+        faults: Faults | None = None,
+        ledger: Ledger | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.ledger = ledger or Ledger(package_id or os.environ["MIRAIFS_PACKAGE_ID"])
+        self.latency = latency or Latency()
+        self.faults = faults or Faults()
+        self.stats: dict[str, int] = {}
+        self.stats_lock = threading.Lock()
+        self.pending = 0
+        self.write_slots = (
+            threading.Semaphore(self.latency.capacity)
+            if self.latency.capacity
+            else None
+        )
+        self.server = Server((host, port), self._handler_class())
+        self.thread: threading.Thread | None = None
+        self.handlers = {
+            "rpc.discover": self.rpc_discover,
+            "suix_getReferenceGasPrice": lambda: str(REFERENCE_GAS_PRICE),
+            "sui_getProtocolConfig": self.get_protocol_config,
+            "sui_getObject": self.get_object,
+            "sui_multiGetObjects": self.multi_get_objects,
+            "suix_getCoins": self.get_coins,
+            "suix_getBalance": self.get_balance,
+            "suix_getOwnedObjects": self.get_owned_objects,
+            "suix_getDynamicFieldObject": self.get_dynamic_field_object,
+            "suix_queryEvents": self.query_events,
+            "sui_getNormalizedMoveFunction": self.ledger.normalized_function,
+            "sui_executeTransactionBlock": self.execute_transaction_block,
+            "sui_dryRunTransactionBlock": self.dry_run_transaction_block,
+        }
+
+    @property
+    def url(
+        self,
+    ) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(
+        self,
+    ) -> "Fullnode":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(
+        self,
+    ) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "Fullnode":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def fund(
+        self,
+        address: str,
+        balance: int,
+        count: int = 1,
+    ) -> list[str]:
+        return self.ledger.fund(address, balance, count)
+
+    def reset_stats(
+        self,
+    ) -> None:
+        with self.stats_lock:
+            self.stats = {}
+
+    # Dispatch
+
+    def _handler_class(
+        self,
+    ) -> type[BaseHTTPRequestHandler]:
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, which Nagle's algorithm
+            # would otherwise delay by a full delayed-ACK timeout per response.
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length))
+                status = node.faults.status()
+                if status != 200:
+                    with node.stats_lock:
+                        node.stats[str(status)] = node.stats.get(str(status), 0) + 1
+                    self.send_response(status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(node.handle(request)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+    def handle(
+        self,
+        request: dict,
+    ) -> dict:
+        method = request.get("method")
+        params = request.get("params") or []
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        with self.stats_lock:
+            self.stats[method] = self.stats.get(method, 0) + 1
+        handler = self.handlers.get(method)
+        if handler is None:
+            response["error"] = {
+                "code": -32601,
+                "message": f"Method not found: {method}",
+            }
+            return response
+        write = method in WRITE_METHODS
+        if write and self.faults.max_pending is not None:
+            with self.stats_lock:
+                overloaded = self.pending >= self.faults.max_pending
+                if overloaded:
+                    self.stats["overloaded"] = self.stats.get("overloaded", 0) + 1
+                else:
+                    self.pending += 1
+            if overloaded:
+                response["error"] = {
+                    "code": TRANSIENT_ERROR_CODE,
+                    "message": "Transaction execution request is rejected because the server is overloaded",
+                }
+                return response
+        try:
+            return self._handle(handler, params, write, response)
+        finally:
+            if write and self.faults.max_pending is not None:
+                with self.stats_lock:
+                    self.pending -= 1
+
+    def _handle(
+        self,
+        handler: Callable,
+        params: list,
+        write: bool,
+        response: dict,
+    ) -> dict:
+        slots = self.write_slots if write else None
+        if slots:
+            slots.acquire()
+        try:
+            delay = self.latency.delay(write)
+            if delay:
+                time.sleep(delay)
+            response["result"] = handler(*params)
+        except RpcError as e:
+            response["error"] = {"code": e.code, "message": str(e)}
+        except (ExecutionError, ValueError, KeyError, IndexError) as e:
+            response["error"] = {
+                "code": -32602,
+                "message": f"{e.__class__.__name__}: {e}",
+            }
+        finally:
+            if slots:
+                slots.release()
+        return response
+
+    # Methods
+
+    def rpc_discover(
+        self,
+    ) -> dict:
+        methods = []
+        for name, params in RPC_METHODS.items():
+            methods.append(
+                {
+                    "name": name,
+                    "params": [
+                        {
+                            "name": p[0] if isinstance(p, tuple) else p,
+                            "required": False,
+                            "schema": {"type": "array", "items": {"type": "string"}}
+                            if isinstance(p, tuple)
+                            else {"type": "object"},
+                        }
+                        for p in params
+                    ],
+                    "result": {"name": "Result", "schema": {"type": "object"}},
+                }
+            )
+        return {
+            "openrpc": "1.2.6",
+            "info": {"title": "MiraiFS Fullnode Stand-in", "version": RPC_VERSION},
+            "methods": methods,
+            "components": {"schemas": {}},
+        }
+
+    def get_protocol_config(
+        self,
+        version: str | None = None,
+    ) -> dict:
+        return {
+            "minSupportedProtocolVersion": "1",
+            "maxSupportedProtocolVersion": PROTOCOL_VERSION,
+            "protocolVersion": PROTOCOL_VERSION,
+            "featureFlags": {"receive_objects": True},
+            "attributes": PROTOCOL_ATTRIBUTES,
+        }
+
+    def get_object(
+        self,
+        object_id: str,
+        options: dict | None = None,
+    ) -> dict:
+        return self.ledger.render_object(object_id, options)
+
+    def multi_get_objects(
+        self,
+        object_ids: list[str],
+        options: dict | None = None,
+    ) -> list[dict]:
+        if len(object_ids) > 50:
+            raise RpcError("multiGetObjects accepts a maximum of 50 object IDs")
+        return [self.ledger.render_object(id, options) for id in object_ids]
+
+    def get_coins(
+        self,
+        owner: str,
+        coin_type: str | None = None,
+        cursor: str | None = None,
+        limit: int | None = None,
+    ) -> dict:
+        limit = min(limit or 50, 50)
+        coins = self.ledger.owned_objects(owner, COIN_TYPE)
+        if cursor:
+            coins = [c for c in coins if c.id > normalize_address(cursor)]
+        page = coins[:limit]
+        return {
+            "data": [
+                {
+                    "coinType": "0x2::sui::SUI",
+                    "coinObjectId": c.id,
+                    "version": str(c.version),
+                    "digest": c.digest,
+                    "balance": str(c.fields["balance"]),
+                    "previousTransaction": c.previous_transaction,
+                }
+                for c in page
+            ],
+            "nextCursor": page[-1].id if page else None,
+            "hasNextPage": len(coins) > limit,
+        }
+
+    def get_balance(
+        self,
+        owner: str,
+        coin_type: str | None = None,
+    ) -> dict:
+        coins = self.ledger.owned_objects(owner, COIN_TYPE)
+        return {
+            "coinType": "0x2::sui::SUI",
+            "coinObjectCount": len(coins),
+            "totalBalance": str(sum(c.fields["balance"] for c in coins)),
+            "lockedBalance": {},
+        }
+
+    def get_owned_objects(
+        self,
+        address: str,
+        query: dict | None = None,
+        cursor: str | None = None,
+        limit: int | None = None,
+    ) -> dict:
+        query = query or {}
+        struct_type = (query.get("filter") or {}).get("StructType")
+        limit = min(limit or 50, 50)
+        objs = self.ledger.owned_objects(address, struct_type)
+        if cursor:
+            objs = [o for o in objs if o.id > normalize_address(cursor)]
+        page = objs[:limit]
+        return {
+            "data": [
+                self.ledger.render_object(o.id, query.get("options")) for o in page
+            ],
+            "nextCursor": page[-1].id if page else None,
+            "hasNextPage": len(objs) > limit,
+        }
+
+    def get_dynamic_field_object(
+        self,
+        parent_object_id: str,
+        name: dict,
+    ) -> dict:
+        field_id = self.ledger.dynamic_field_id(parent_object_id, bytes(name["value"]))
+        if field_id is None:
+            return {
+                "error": {
+                    "code": "dynamicFieldNotFound",
+                    "object_id": normalize_address(parent_object_id),
+                }
+            }
+        return self.ledger.render_object(
+            field_id,
+            {"showType": True, "showOwner": True, "showContent": True},
+        )
+
+    def query_events(
+        self,
+        query: dict,
+        cursor: dict | None = None,
+        limit: int | None = None,
+        descending_order: bool | None = None,
+    ) -> dict:
+        limit = min(limit or 50, 50)
+        module_filter = (
+            query.get("MoveEventModule") if isinstance(query, dict) else None
+        )
+        with self.ledger.lock:
+            events = list(self.ledger.events)
+        if module_filter:
+            package = normalize_address(module_filter["package"])
+            events = [
+                e
+                for e in events
+                if e["packageId"] == package
+                and e["type"].split("::")[1] == module_filter["module"]
+            ]
+        if descending_order:
+            events.reverse()
+        if cursor:
+            ids = [(e["id"]["txDigest"], e["id"]["eventSeq"]) for e in events]
+            try:
+                events = events[
+                    ids.index((cursor["txDigest"], str(cursor["eventSeq"]))) + 1 :
+                ]
+            except ValueError:
+                raise RpcError("Unknown event cursor")
+        page = events[:limit]
+        return {
+            "data": page,
+            "nextCursor": page[-1]["id"] if page else cursor,
+            "hasNextPage": len(events) > limit,
+        }
+
+    def execute_transaction_block(
+        self,
+        tx_bytes: str,
+        signatures: list[str],
+        options: dict | None = None,
+        request_type: str | None = None,
+    ) -> dict:
+        if not signatures:
+            raise RpcError("Transaction is not signed")
+        return self.ledger.execute(base64.b64decode(tx_bytes))
+
+    def dry_run_transaction_block(
+        self,
+        tx_bytes: str,
+    ) -> dict:
+        return self.ledger.execute(base64.b64decode(tx_bytes), dry_run=True)
@@ -1,18 +1,90 @@
 import os
-
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
-
-MIRAIFS_PACKAGE_ID = os.environ["MIRAIFS_PACKAGE_ID"]
 
 PROJECT_DIR = Path(__file__).resolve().parent
 DOWNLOADS_DIR = PROJECT_DIR / "downloads"
-
-DOWNLOADS_DIR.mkdir(
-    parents=True,
-    exist_ok=True,
-)
+INDEX_DB_PATH = PROJECT_DIR / "index.db"
+SYNC_STATE_FILE_NAME = ".mfs-sync.json"
 
 MAX_CHUNK_SIZE_BYTES = 128_000
+
+# The name of the File dynamic field that holds its ChunkIndex.
+CHUNK_INDEX_FIELD_NAME = b"chunk_index"
+
+# Chunks added to or registered with a file per transaction, within the limits
+# of 1,024 commands per PTB and 512 arguments per command.
+MAX_CHUNKS_PER_TX = 500
+
+# Files frozen per transaction, with one public_freeze_object command and one
+# input object each.
+MAX_FREEZES_PER_TX = 500
+
+# Paths added to a directory per transaction, with one add command each. Their
+# path and file ID inputs keep 500 entries under the 128 KiB transaction size
+# limit for paths of up to around 200 bytes.
+MAX_DIRECTORY_ENTRIES_PER_TX = 500
+
+# Coins merged per transaction, gas coin included. Sui accepts up to 2,048 input
+# objects per transaction, but the 128 KiB transaction size limit is reached at
+# around 1,600 coin references.
+MERGE_BATCH_SIZE = 500
+
+# Coins split off per transaction. The SplitCoins command takes one argument per
+# coin, and so does each TransferObjects command, plus one for the recipient,
+# within the limit of 512 arguments per command.
+SPLIT_BATCH_SIZE = 500
+
+# The zstd CLI's default dictionary size.
+DEFAULT_DICTIONARY_SIZE = 112_640
+
+DEFAULT_CHUNK_CACHE_MAX_BYTES = 1024**3
+
+
+def _split_env(name: str) -> list[str]:
+    return [value for value in os.environ.get(name, "").split(",") if value]
+
+
+def _chunk_cache_dir() -> Path:
+    if os.environ.get("MIRAIFS_CHUNK_CACHE_DIR"):
+        return Path(os.environ["MIRAIFS_CHUNK_CACHE_DIR"])
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "miraifs" / "chunks"
+
+
+# Settings read from the environment, and .env, the first time they're used rather
+# than at import, so that the CLI starts without them. Comma-separated fullnode RPC
+# URLs: endpoints in MIRAIFS_RPC_URLS serve reads and transactions,
+# MIRAIFS_READ_RPC_URLS only reads and MIRAIFS_WRITE_RPC_URLS only transactions,
+# and the Sui client config's RPC URL is used when none are set.
+# MIRAIFS_SIGNER_ADDRESSES are keystore addresses that sign chunk uploads in
+# parallel, the active address signs them when none are set. MIRAIFS_ENCRYPTION_KEY
+# is a base64 AES-256 key for encrypted uploads and downloads, see `mfs file keygen`.
+# SharedChunk data is cached in MIRAIFS_CHUNK_CACHE_DIR, $XDG_CACHE_HOME/miraifs/chunks
+# by default, up to MIRAIFS_CHUNK_CACHE_MAX_BYTES.
+_SETTINGS = {
+    "MIRAIFS_PACKAGE_ID": lambda: os.environ["MIRAIFS_PACKAGE_ID"],
+    "RPC_URLS": lambda: _split_env("MIRAIFS_RPC_URLS"),
+    "READ_RPC_URLS": lambda: _split_env("MIRAIFS_READ_RPC_URLS"),
+    "WRITE_RPC_URLS": lambda: _split_env("MIRAIFS_WRITE_RPC_URLS"),
+    "SIGNER_ADDRESSES": lambda: _split_env("MIRAIFS_SIGNER_ADDRESSES"),
+    "ENCRYPTION_KEY": lambda: os.environ.get("MIRAIFS_ENCRYPTION_KEY"),
+    "CHUNK_CACHE_DIR": _chunk_cache_dir,
+    "CHUNK_CACHE_MAX_BYTES": lambda: int(
+        os.environ.get("MIRAIFS_CHUNK_CACHE_MAX_BYTES", DEFAULT_CHUNK_CACHE_MAX_BYTES)
+    ),
+}
+_dotenv_loaded = False
+
+
+def __getattr__(name: str):
+    global _dotenv_loaded
+    if name not in _SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _dotenv_loaded = True
+    value = _SETTINGS[name]()
+    globals()[name] = value
+    return value
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import threading
+from contextlib import suppress
+from pathlib import Path
+
+import miraifs_sdk
+
+# Eviction frees space down to this fraction of max_bytes, so that a full cache
+# isn't scanned again on every put.
+EVICTION_TARGET = 0.9
+
+
+class ChunkCache:
+    """
+    An on-disk cache of SharedChunk data by chunk ID. SharedChunks are immutable,
+    so entries never go stale, and every file that references a chunk, in this
+    process or a later one, reads it from the same entry. Once the cache holds
+    more than max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        self.path = path or miraifs_sdk.CHUNK_CACHE_DIR
+        self.max_bytes = (
+            miraifs_sdk.CHUNK_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        )
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        # The bytes cached, scanned on the first put and rescanned on eviction,
+        # which also picks up what other processes cached.
+        self.size: int | None = None
+
+    def get(
+        self,
+        chunk_id: str,
+    ) -> bytes | None:
+        path = self.path / chunk_id
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Entries are used in mtime order, as atime isn't updated on every mount.
+        with suppress(FileNotFoundError):
+            os.utime(path)
+        return data
+
+    def put(
+        self,
+        chunk_id: str,
+        data: bytes,
+    ) -> None:
+        if len(data) > self.max_bytes:
+            return
+        # Written to a temporary file first, so concurrent readers never see a partial entry.
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path / chunk_id)
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self._entries())
+            else:
+                self.size += len(data)
+            if self.size > self.max_bytes:
+                self.evict(int(self.max_bytes * EVICTION_TARGET))
+
+    def evict(
+        self,
+        max_bytes: int,
+    ) -> None:
+        """Remove the least recently used entries until the cache holds at most max_bytes."""
+        entries = sorted(self._entries())
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= max_bytes:
+                break
+            with suppress(FileNotFoundError):
+                os.remove(path)
+            self.size -= size
+
+    def _entries(
+        self,
+    ) -> list[tuple[float, int, str]]:
+        """The (mtime, size, path) of every entry, skipping temporary files."""
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.startswith("."):
+                continue
+            with suppress(FileNotFoundError):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
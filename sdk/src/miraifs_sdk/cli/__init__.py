@@ -1,8 +1,20 @@
 import typer
 
-from miraifs_sdk.cli import file, gas
+from miraifs_sdk.cli import directory, file, gas, index, sync
 
 app = typer.Typer()
 
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+) -> None:
+    ctx.call_on_close(file.close_clients)
+    ctx.call_on_close(file.end_report)
+
+
+app.add_typer(directory.app, name="directory")
 app.add_typer(file.app, name="file")
 app.add_typer(gas.app, name="gas")
+app.add_typer(index.app, name="index")
+app.command(name="sync")(sync.sync)
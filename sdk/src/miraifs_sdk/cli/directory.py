@@ -0,0 +1,124 @@
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import typer
+from miraifs_sdk import SYNC_STATE_FILE_NAME
+from miraifs_sdk.cli.file import open_miraifs
+from rich import print
+
+if TYPE_CHECKING:
+    from miraifs_sdk.models import Directory, File
+
+app = typer.Typer()
+
+
+@app.command()
+def create(
+    directory: Path = typer.Argument(..., help="A directory uploaded with `mfs sync`"),
+    state_file: Path = typer.Option(None, help=f"Defaults to {SYNC_STATE_FILE_NAME} in the directory"),
+    recipient: str = typer.Option(None, help="Defaults to the active address"),
+    gas_budget: int = typer.Option(5_000_000_000, help="Gas budget in MIST"),
+):  # fmt: skip
+    """
+    Create a directory object that maps the paths of a synced directory to the
+    IDs of their files, so that clients resolve every file from one object.
+    """
+    from pysui.sui.sui_types import SuiAddress
+
+    entries = get_entries(directory, state_file)
+    mfs = open_miraifs()
+    typer.confirm(
+        f"Please confirm you'd like to create a directory of {len(entries)} files:",
+        abort=True,
+    )
+    gas_coin = mfs.allocate_gas_coins(1, gas_budget)[0]
+    result = mfs.create_directory(
+        entries, gas_coin, SuiAddress(recipient) if recipient else None
+    )
+    mfs.consolidate_coins(mfs.get_all_gas_coins(mfs.config.active_address))
+    print(f"Created directory {result.id} with {len(result.entries)} files")
+    return
+
+
+@app.command()
+def update(
+    directory_id: str = typer.Argument(),
+    directory: Path = typer.Argument(..., help="A directory uploaded with `mfs sync`"),
+    state_file: Path = typer.Option(None, help=f"Defaults to {SYNC_STATE_FILE_NAME} in the directory"),
+    gas_budget: int = typer.Option(5_000_000_000, help="Gas budget in MIST"),
+):  # fmt: skip
+    """
+    Update a directory object to the files a directory was last synced as.
+    """
+
+    entries = get_entries(directory, state_file)
+    mfs = open_miraifs()
+    current = mfs.get_directory(directory_id)
+    added = [path for path in entries if path not in current.entries]
+    removed = [path for path in current.entries if path not in entries]
+    changed = [
+        path
+        for path in entries
+        if path in current.entries and current.entries[path] != entries[path]
+    ]
+    print(f"Added: {len(added)}, changed: {len(changed)}, removed: {len(removed)}")
+    if not (added or removed or changed):
+        print("Nothing to update.")
+        return
+    typer.confirm("Please confirm the directory update:", abort=True)
+    gas_coin = mfs.allocate_gas_coins(1, gas_budget)[0]
+    result = mfs.update_directory(current, entries, gas_coin)
+    mfs.consolidate_coins(mfs.get_all_gas_coins(mfs.config.active_address))
+    print(f"Updated directory {result.id}, {len(result.entries)} files")
+    return
+
+
+@app.command()
+def view(
+    directory_id: str = typer.Argument(),
+    resolve: bool = typer.Option(True, help="Fetch the metadata of every file"),
+    concurrency: int = typer.Option(8),
+):
+    mfs = open_miraifs()
+    directory = mfs.get_directory(directory_id)
+    files = mfs.resolve_directory(directory, concurrency) if resolve else {}
+    print_directory(directory, files)
+    return
+
+
+def get_entries(
+    directory: Path,
+    state_file: Path | None,
+) -> dict[str, str]:
+    from miraifs_sdk.sync import read_file_ids
+
+    state_file = state_file or directory / SYNC_STATE_FILE_NAME
+    if not state_file.exists():
+        raise typer.BadParameter(
+            f"{state_file} not found, upload the directory with `mfs sync` first"
+        )
+    # The state keeps removed paths until their files are pruned.
+    return {
+        path: id
+        for path, id in read_file_ids(state_file).items()
+        if (directory / path).is_file()
+    }
+
+
+def print_directory(
+    directory: "Directory",
+    files: dict[str, "File"],
+) -> None:
+    from rich.table import Table
+
+    table = Table("Path", "File ID", "Mime Type", "Size")
+    for path, file_id in directory.entries.items():
+        file = files.get(path)
+        table.add_row(
+            path,
+            file_id,
+            file.mime_type if file else "",
+            str(file.size) if file else "",
+        )
+    print(f"Directory: {directory.id}")
+    print(table)
@@ -1,38 +1,82 @@
+import itertools
+import json
 import mimetypes
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
 
 import typer
-from miraifs_sdk import DOWNLOADS_DIR, MAX_CHUNK_SIZE_BYTES
-from miraifs_sdk.miraifs import MiraiFs
-from miraifs_sdk.utils import load_chunks
-from pysui import SuiConfig, SyncClient
+from miraifs_sdk import DEFAULT_DICTIONARY_SIZE, DOWNLOADS_DIR, MAX_CHUNK_SIZE_BYTES
+from miraifs_sdk.metrics import RecordingInstrumentation, set_instrumentation
 from rich import print
 
+# The SDK modules that pull in pysui, pydantic, libmagic and cryptography are
+# imported by the commands that use them, so that `mfs --help` and every other
+# command only pay for their own.
+if TYPE_CHECKING:
+    from miraifs_sdk.compression import EncodedFile
+    from miraifs_sdk.concurrency import AimdController
+    from miraifs_sdk.index import EventIndex
+    from miraifs_sdk.miraifs import MiraiFs
+    from miraifs_sdk.models import ChunkRaw, File, FileBatch, GasCoin
+    from miraifs_sdk.sui import Sui
+    from pysui.sui.sui_txresults.single_tx import ObjectRead
+
 app = typer.Typer()
 
-config = SuiConfig.default_config()
-client = SyncClient(config)
+# The clients opened by the running command, closed when it finishes.
+OPEN_CLIENTS: list["Sui"] = []
+
+# The stdout of a command that emits a report. Its progress goes to stderr, so
+# that stdout only holds the report.
+REPORT_STDOUT: list[TextIO] = []
 
 
 @app.command()
 def freeze(
-    file_id: str = typer.Argument(),
-):
-    mfs = MiraiFs()
-    file = mfs.get_file(file_id)
-    result = mfs.freeze_file(file)
-    print(result)
+    file_ids: list[str] = typer.Argument(...),
+    concurrency: int = typer.Option(4, help="Number of freeze transactions to run at once"),
+    gas_budget: int = typer.Option(5_000_000_000, help="Gas budget per transaction in MIST"),
+):  # fmt: skip
+    """
+    Freeze files, packing up to 500 into each transaction.
+    """
+    from miraifs_sdk import MAX_FREEZES_PER_TX
+
+    mfs = open_miraifs()
+    file_ids = list(dict.fromkeys(file_ids))
+    typer.confirm(
+        f"Please confirm you'd like to freeze {len(file_ids)} files:", abort=True
+    )
+    transactions = -(-len(file_ids) // MAX_FREEZES_PER_TX)
+    gas_coins = mfs.allocate_gas_coins(min(concurrency, transactions), gas_budget)
+    batches = mfs.freeze_many(file_ids, gas_coins)
+    print_batches(batches, "Froze")
+    mfs.consolidate_coins(mfs.get_all_gas_coins(mfs.config.active_address))
     return
 
 
 @app.command()
 def delete(
-    file_id: str = typer.Argument(),
-):
-    mfs = MiraiFs()
-    file = mfs.get_file(file_id)
-    result = mfs.delete_file(file)
-    print(result)
+    file_ids: list[str] = typer.Argument(...),
+    concurrency: int = typer.Option(4, help="Number of files to delete at once"),
+    gas_budget: int = typer.Option(5_000_000_000, help="Gas budget per transaction in MIST"),
+):  # fmt: skip
+    """
+    Delete files and their chunks, recovering their storage rebates. Chunks are
+    dropped up to 500 per transaction, and files are deleted concurrently.
+    """
+    mfs = open_miraifs()
+    files = mfs.get_files(list(dict.fromkeys(file_ids)))
+    chunk_count = sum(1 for file in files for item in file.chunks.manifest if item.id)
+    typer.confirm(
+        f"Please confirm you'd like to delete {len(files)} files with {chunk_count} chunks:",
+        abort=True,
+    )
+    gas_coins = mfs.allocate_gas_coins(min(concurrency, len(files)), gas_budget)
+    batches = mfs.delete_many(files, gas_coins)
+    print_batches(batches, "Deleted")
+    mfs.consolidate_coins(mfs.get_all_gas_coins(mfs.config.active_address))
     return
 
 
@@ -40,29 +84,104 @@ def delete(
 def view(
     file_id: str = typer.Argument(),
 ):
-    mfs = MiraiFs()
+    mfs = open_miraifs()
     file = mfs.get_file(file_id)
     print(file)
     return
 
 
+@app.command()
+def ls(
+    owner: str = typer.Option(None, help="Defaults to the active address"),
+    mime_type: str = typer.Option(None, help="Exact mime type, or a prefix like image/"),
+    frozen: bool = typer.Option(None),
+    limit: int = typer.Option(None),
+    refresh: bool = typer.Option(True, help="Refresh the local index before listing"),
+    concurrency: int = typer.Option(8),
+):  # fmt: skip
+    from rich.table import Table
+
+    mfs = open_miraifs()
+    if not owner:
+        owner = str(mfs.config.active_address)
+    files = mfs.list_files(
+        owner,
+        refresh=refresh,
+        concurrency=concurrency,
+        mime_type=mime_type,
+        frozen=frozen,
+        limit=limit,
+    )
+    table = Table("ID", "Mime Type", "Size", "Chunks", "Created At", "Frozen")
+    for file in files:
+        table.add_row(
+            file.id,
+            file.mime_type,
+            str(file.size),
+            str(file.chunk_count),
+            file.created_at.isoformat(timespec="seconds"),
+            "yes" if file.frozen else "no",
+        )
+    print(table)
+    return
+
+
 @app.command()
 def download(
     file_id: str = typer.Argument(),
     file_name: str = typer.Option(None),
     file_ext: str = typer.Option(None),
-):
-    mfs = MiraiFs()
-    file = mfs.get_file(file_id)
-    chunks = mfs.get_chunks_for_file(file)
-    file_bytes = b"".join(bytes(chunk.data) for chunk in chunks)
+    use_index: bool = typer.Option(False, help="Read the manifest from the local event index"),
+    key_file: Path = typer.Option(None, help="File with the base64 key of an encrypted file. Defaults to MIRAIFS_ENCRYPTION_KEY"),
+    offset: int = typer.Option(None, help="Download only the bytes from this offset on"),
+    length: int = typer.Option(None, help="Download only this many bytes"),
+    report: str = typer.Option(None, help="Emit a run report in the given format (json)"),
+):  # fmt: skip
+    from miraifs_sdk.compression import get_base_mime_type, get_codec
+    from miraifs_sdk.encryption import get_encryption
+    from miraifs_sdk.index import EventIndex
+
+    instrumentation = start_report(report)
+    mfs = open_miraifs()
+    file = None
+    if use_index:
+        index = EventIndex()
+        file = mfs.get_file_from_index(file_id, index)
+        index.close()
+    if file is None:
+        file = mfs.get_file(file_id)
     if not file_name:
         file_name = file.id
     if not file_ext:
-        file_ext = mimetypes.guess_extension(file.mime_type).removeprefix(".")
+        file_ext = mimetypes.guess_extension(
+            get_base_mime_type(file.mime_type)
+        ).removeprefix(".")
+    if (offset is not None or length is not None) and get_codec(
+        file.mime_type
+    ) is not None:
+        raise typer.BadParameter(
+            f"File {file.id} is compressed, --offset and --length can't be used with it"
+        )
+    key = get_key(key_file) if get_encryption(file.mime_type) else None
+    if offset is not None or length is not None:
+        offset = offset or 0
+        parts = [
+            mfs.read_range(
+                file, offset, length if length is not None else file.size - offset, key
+            )
+        ]
+    else:
+        parts = mfs.read_file(file, key)
+    DOWNLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    byte_count = 0
     with open(DOWNLOADS_DIR / f"{file_name}.{file_ext}", "wb") as f:
-        f.write(file_bytes)
+        for data in parts:
+            f.write(data)
+            byte_count += len(data)
     print(f"File downloaded to {DOWNLOADS_DIR / f'{file_name}.{file_ext}'}")
+    if instrumentation:
+        instrumentation.count("bytes", byte_count)
+        emit_report(instrumentation)
 
 
 @app.command()
@@ -70,44 +189,412 @@ def upload(
     path: Path = typer.Argument(...),
     chunk_size: int = typer.Option(MAX_CHUNK_SIZE_BYTES),
     recipient: str = typer.Option(None),
-    concurrency: int = typer.Option(16),
+    concurrency: int = typer.Option(None, help="Fixed number of concurrent chunk uploads, adapts to the fullnode by default"),
+    signer: list[str] = typer.Option(None, help="Keystore address to create chunks with, repeatable. Defaults to MIRAIFS_SIGNER_ADDRESSES or the active address"),
     gas_budget_per_chunk: int = typer.Option(5_000_000_000, help="Gas budget per chunk in MIST"),
+    compress: bool = typer.Option(False, help="Compress compressible files with zstd before upload"),
+    compression_level: int = typer.Option(None, help="zstd level, chosen from the file size by default"),
+    dedup: bool = typer.Option(False, help="Reference chunks already stored by other files, and store new ones so later files can"),
+    encrypt: bool = typer.Option(False, help="Encrypt each chunk with AES-256-GCM before upload"),
+    key_file: Path = typer.Option(None, help="File with the base64 encryption key. Defaults to MIRAIFS_ENCRYPTION_KEY"),
+    report: str = typer.Option(None, help="Emit a run report in the given format (json)"),
 ):  # fmt: skip
-    mfs = MiraiFs()
+    from miraifs_sdk import SIGNER_ADDRESSES
+    from miraifs_sdk.compression import encode_file
+    from miraifs_sdk.encryption import encrypt_file, get_encryption
+    from miraifs_sdk.index import EventIndex
+    from miraifs_sdk.utils import build_chunks
+
+    instrumentation = start_report(report)
+    mfs = open_miraifs()
+    signers = signer or SIGNER_ADDRESSES
+    mfs.check_signers(signers)
 
-    chunks = load_chunks(path, chunk_size)
+    encoded = encode_file(path, compress, compression_level)
+    if encrypt:
+        encoded = encrypt_file(encoded, get_key(key_file), chunk_size)
+    chunks = build_chunks(encoded.data, chunk_size)
+    preflight(chunks, chunk_size, encoded.mime_type, signers)
+
+    index = EventIndex() if dedup else None
+    shared_chunks = mfs.find_shared_chunks(chunks, index) if dedup else {}
+    new_chunk_count = len(chunks) - len(shared_chunks)
 
     gas_coins = mfs.allocate_gas_coins(
         # Add two more gas coins, one for create_file, one fore register_chunks.
-        len(chunks) + 2,
+        new_chunk_count + 2,
         gas_budget_per_chunk,
+        mfs.upload_gas_recipients(new_chunk_count, signers),
     )
 
-    if len(gas_coins) != len(chunks) + 2:
-        raise typer.Exit(f"Unable to allocate {len(chunks) + 2} gas coins.")
+    if len(gas_coins) != new_chunk_count + 2:
+        raise typer.Exit(f"Unable to allocate {new_chunk_count + 2} gas coins.")
 
     print(f"File Path: {path}")
     print(f"Chunk Size: {chunk_size}")
     print(f"File Recipient: {recipient}")
-    print(f"Upload Concurrency: {concurrency}")
+    print(f"Upload Concurrency: {concurrency or 'adaptive'}")
+    if signers:
+        print(f"Chunk Signers: {', '.join(signers)}")
+    print(f"Gas Budget Per Chunk: {gas_budget_per_chunk / 10**9} SUI")
+    if encoded.codec:
+        print(
+            f"Compression: {encoded.codec}, {encoded.original_size} -> {len(encoded.data)} bytes ({format_saved(encoded.original_size, len(encoded.data))})"
+        )
+    elif compress:
+        print(
+            "Compression: skipped, the file type is already compressed or didn't shrink"
+        )
+    if dedup:
+        print(
+            f"Deduplication: {len(shared_chunks)} of {len(chunks)} chunks already stored"
+        )
+    if encrypt:
+        print(f"Encryption: {get_encryption(encoded.mime_type)}")
+    typer.confirm("Please confirm the upload settings:", abort=True)
+    if instrumentation:
+        instrumentation.start()
+
+    file = upload_encoded(
+        mfs,
+        path,
+        encoded,
+        chunks,
+        chunk_size,
+        concurrency,
+        gas_coins,
+        signers=signers,
+        shared_chunks=shared_chunks,
+        index=index,
+    )
+    if index is not None:
+        index.close()
+
+    return_signer_gas(mfs, signers)
+    gas_coins = mfs.get_all_gas_coins(mfs.config.active_address)
+    mfs.consolidate_coins(gas_coins)
+
+    print("File was uploaded successfully!")
+    print(f"Download Link: https://mfs.sm.xyz/{file.id}/")
+    if instrumentation:
+        emit_report(instrumentation)
+
+    return
+
+
+@app.command()
+def update(
+    file_id: str = typer.Argument(),
+    path: Path = typer.Argument(...),
+    concurrency: int = typer.Option(None, help="Fixed number of concurrent chunk uploads, adapts to the fullnode by default"),
+    signer: list[str] = typer.Option(None, help="Keystore address to create chunks with, repeatable. Defaults to MIRAIFS_SIGNER_ADDRESSES or the active address"),
+    gas_budget_per_chunk: int = typer.Option(5_000_000_000, help="Gas budget per chunk in MIST"),
+    compression_level: int = typer.Option(None, help="zstd level, chosen from the file size by default"),
+    key_file: Path = typer.Option(None, help="File with the base64 key of an encrypted file. Defaults to MIRAIFS_ENCRYPTION_KEY"),
+    report: str = typer.Option(None, help="Emit a run report in the given format (json)"),
+):  # fmt: skip
+    """
+    Update a file to the contents of path, uploading only the chunks that changed.
+    The file keeps its ID, and its unchanged chunks stay as they are.
+    """
+    from miraifs_sdk import SIGNER_ADDRESSES
+    from miraifs_sdk.compression import encode_file, get_codec, get_dictionary_id
+    from miraifs_sdk.encryption import encrypt_file, get_encryption
+    from miraifs_sdk.utils import build_chunks
+
+    instrumentation = start_report(report)
+    mfs = open_miraifs()
+    signers = signer or SIGNER_ADDRESSES
+    mfs.check_signers(signers)
+
+    file = mfs.get_file(file_id)
+    # The file is encoded the way it was uploaded, so that unchanged chunks match.
+    if get_codec(file.mime_type) is not None:
+        dictionary_id = get_dictionary_id(file.mime_type)
+        dictionary = mfs.get_dictionary(dictionary_id) if dictionary_id else None
+        encoded = encode_file(path, True, compression_level, dictionary)
+    else:
+        encoded = encode_file(path)
+    # Nonces are derived from each chunk's index and plaintext, and the file's
+    # salt is reused, so unchanged chunks encrypt to the same bytes again.
+    if get_encryption(file.mime_type) is not None:
+        key = get_key(key_file)
+        encoded = encrypt_file(encoded, key, file.chunks.size, mime_type=file.mime_type)
+    if encoded.mime_type != file.mime_type:
+        raise typer.BadParameter(
+            f"{path} encodes to {encoded.mime_type}, but file {file.id} is {file.mime_type}"
+        )
+
+    chunks = build_chunks(encoded.data, file.chunks.size)
+    preflight(chunks, file.chunks.size, file.mime_type, signers)
+    changed, removed = mfs.diff_chunks(file, chunks)
+    if not changed and not removed:
+        print(f"File {file.id} is already up to date.")
+        return
+
+    gas_coins = mfs.allocate_gas_coins(
+        # Add two more gas coins, one for update_file, one for register_chunks.
+        len(changed) + 2,
+        gas_budget_per_chunk,
+        mfs.upload_gas_recipients(len(changed), signers),
+    )
+    if len(gas_coins) != len(changed) + 2:
+        raise typer.Exit(f"Unable to allocate {len(changed) + 2} gas coins.")
+
+    print(f"File: {file.id}")
+    print(f"File Path: {path}")
+    print(
+        f"Chunks: {len(changed)} of {len(chunks)} to upload, {len(removed)} to remove"
+    )
+    print(f"Upload Concurrency: {concurrency or 'adaptive'}")
+    if signers:
+        print(f"Chunk Signers: {', '.join(signers)}")
+    print(f"Gas Budget Per Chunk: {gas_budget_per_chunk / 10**9} SUI")
+    typer.confirm("Please confirm the update settings:", abort=True)
+    if instrumentation:
+        instrumentation.start()
+
+    file = update_encoded(
+        mfs, path, file, chunks, len(changed), concurrency, gas_coins, signers=signers
+    )
+
+    return_signer_gas(mfs, signers)
+    gas_coins = mfs.get_all_gas_coins(mfs.config.active_address)
+    mfs.consolidate_coins(gas_coins)
+
+    print("File was updated successfully!")
+    print(f"Download Link: https://mfs.sm.xyz/{file.id}/")
+    if instrumentation:
+        emit_report(instrumentation)
+
+
+@app.command()
+def upload_collection(
+    directory: Path = typer.Argument(..., help="A directory of structurally similar files, e.g. SVG layers or JSON metadata"),
+    chunk_size: int = typer.Option(MAX_CHUNK_SIZE_BYTES),
+    concurrency: int = typer.Option(None, help="Fixed number of concurrent chunk uploads, adapts to the fullnode by default"),
+    signer: list[str] = typer.Option(None, help="Keystore address to create chunks with, repeatable. Defaults to MIRAIFS_SIGNER_ADDRESSES or the active address"),
+    gas_budget_per_chunk: int = typer.Option(5_000_000_000, help="Gas budget per chunk in MIST"),
+    dictionary_id: str = typer.Option(None, help="Compress against an existing dictionary file instead of training one"),
+    dictionary_size: int = typer.Option(DEFAULT_DICTIONARY_SIZE, help="Maximum size of the trained dictionary in bytes"),
+    compression_level: int = typer.Option(None, help="zstd level, chosen from the file size by default"),
+    create_directory: bool = typer.Option(False, help="Create a directory object mapping each file's path to its ID"),
+    report: str = typer.Option(None, help="Emit a run report in the given format (json)"),
+):  # fmt: skip
+    """
+    Upload every file in a directory compressed against a shared zstd dictionary.
+    The dictionary is trained over the directory and stored as a MiraiFS file,
+    which each uploaded file references by ID. With --create-directory, the
+    uploaded files are also listed by path in a directory object.
+    """
+    import zstandard as zstd
+    from miraifs_sdk import SIGNER_ADDRESSES
+    from miraifs_sdk.compression import (
+        DICTIONARY_MIME_TYPE,
+        CompressionDictionary,
+        encode_data,
+        encode_file,
+        train_dictionary,
+    )
+    from miraifs_sdk.concurrency import AimdController
+    from miraifs_sdk.utils import build_chunks, split_into_gas_batches
+
+    instrumentation = start_report(report)
+    mfs = open_miraifs()
+    signers = signer or SIGNER_ADDRESSES
+    mfs.check_signers(signers)
+
+    paths = sorted(path for path in directory.rglob("*") if path.is_file())
+    if not paths:
+        raise typer.BadParameter(f"No files found in {directory}")
+
+    dictionary_data = None
+    if dictionary_id:
+        dictionary = mfs.get_dictionary(dictionary_id)
+    else:
+        try:
+            dictionary_data = train_dictionary(paths, dictionary_size)
+        except zstd.ZstdError as e:
+            raise typer.BadParameter(
+                f"Unable to train a dictionary over {directory}: {e}"
+            )
+
+    print(f"Directory: {directory}")
+    print(f"Files: {len(paths)} ({sum(path.stat().st_size for path in paths)} bytes)")
+    if dictionary_data is not None:
+        print(f"Dictionary: trained, {len(dictionary_data)} bytes")
+    else:
+        print(f"Dictionary: {dictionary_id}")
+    print(f"Upload Concurrency: {concurrency or 'adaptive'}")
+    if signers:
+        print(f"Chunk Signers: {', '.join(signers)}")
     print(f"Gas Budget Per Chunk: {gas_budget_per_chunk / 10**9} SUI")
     typer.confirm("Please confirm the upload settings:", abort=True)
+    if instrumentation:
+        instrumentation.start()
+
+    # One controller for the whole collection, so that what it learns about the
+    # fullnode carries over from file to file.
+    controller = (
+        AimdController() if concurrency is None else AimdController.fixed(concurrency)
+    )
+
+    if dictionary_data is not None:
+        encoded = encode_data(dictionary_data, DICTIONARY_MIME_TYPE, compress=True)
+        chunks = build_chunks(encoded.data, chunk_size)
+        preflight(chunks, chunk_size, encoded.mime_type, signers)
+        recipients = mfs.upload_gas_recipients(len(chunks), signers)
+        gas_coins = mfs.allocate_gas_coins(
+            len(chunks) + 2, gas_budget_per_chunk, recipients
+        )
+        file = upload_encoded(
+            mfs,
+            directory,
+            encoded,
+            chunks,
+            chunk_size,
+            concurrency,
+            gas_coins,
+            controller,
+            signers,
+        )
+        dictionary = CompressionDictionary(file_id=file.id, data=dictionary_data)
+        print(f"Uploaded dictionary {dictionary.file_id}")
+
+    members = []
+    for path in paths:
+        encoded = encode_file(path, level=compression_level, dictionary=dictionary)
+        members.append((path, encoded, build_chunks(encoded.data, chunk_size)))
+        preflight(members[-1][2], chunk_size, encoded.mime_type, signers, path)
+
+    # Gas coins are allocated for batches of files in a single split.
+    original_size = 0
+    stored_size = 0
+    entries: dict[str, str] = {}
+    coin_counts = [len(chunks) + 2 for _, _, chunks in members]
+    for batch in split_into_gas_batches(members, coin_counts):
+        coin_count = sum(len(chunks) + 2 for _, _, chunks in batch)
+        recipients = [
+            r
+            for _, _, chunks in batch
+            for r in mfs.upload_gas_recipients(len(chunks), signers)
+        ]
+        gas_coins = mfs.allocate_gas_coins(coin_count, gas_budget_per_chunk, recipients)
+        for path, encoded, chunks in batch:
+            file = upload_encoded(
+                mfs,
+                path,
+                encoded,
+                chunks,
+                chunk_size,
+                concurrency,
+                gas_coins,
+                controller,
+                signers,
+            )
+            original_size += encoded.original_size
+            stored_size += len(encoded.data)
+            entries[path.relative_to(directory).as_posix()] = file.id
+            print(
+                f"{path}: {file.id} ({encoded.original_size} -> {len(encoded.data)} bytes)"
+            )
+
+    if create_directory:
+        gas_coin = mfs.allocate_gas_coins(1, gas_budget_per_chunk)[0]
+        print(f"Directory: {mfs.create_directory(entries, gas_coin).id}")
+
+    return_signer_gas(mfs, signers)
+    gas_coins = mfs.get_all_gas_coins(mfs.config.active_address)
+    mfs.consolidate_coins(gas_coins)
+
+    print(f"Uploaded {len(members)} files with dictionary {dictionary.file_id}")
+    print(
+        f"Stored {stored_size} of {original_size} bytes ({format_saved(original_size, stored_size)})"
+    )
+    if instrumentation:
+        emit_report(instrumentation)
+
+
+@app.command()
+def keygen(
+    key_file: Path = typer.Argument(...),
+):
+    """
+    Write a new base64 AES-256 key for encrypted uploads to key_file.
+    """
+    from miraifs_sdk.encryption import generate_key
+
+    if key_file.exists():
+        raise typer.BadParameter(f"{key_file} already exists")
+    key_file.touch(mode=0o600)
+    key_file.write_text(generate_key())
+    print(f"Key written to {key_file}")
+
 
+def get_key(
+    key_file: Path | None,
+) -> bytes:
+    from miraifs_sdk import ENCRYPTION_KEY
+    from miraifs_sdk.encryption import load_key
+
+    if key_file is not None:
+        return load_key(key_file.read_text())
+    if ENCRYPTION_KEY:
+        return load_key(ENCRYPTION_KEY)
+    raise typer.BadParameter(
+        "No encryption key, pass --key-file or set MIRAIFS_ENCRYPTION_KEY"
+    )
+
+
+def upload_encoded(
+    mfs: "MiraiFs",
+    path: Path,
+    encoded: "EncodedFile",
+    chunks: list["ChunkRaw"],
+    chunk_size: int,
+    concurrency: int | None,
+    gas_coins: list["GasCoin"],
+    controller: "AimdController | None" = None,
+    signers: list[str] | None = None,
+    shared_chunks: "dict[bytes, ObjectRead] | None" = None,
+    index: "EventIndex | None" = None,
+) -> "File":
+    """
+    Create, upload and register a file, using a gas coin per chunk not in
+    shared_chunks, plus 2. With an index, the new chunks are stored as
+    SharedChunks and recorded in it, see MiraiFs.find_shared_chunks. The chunks
+    are expected to have passed preflight before their gas was allocated.
+    """
+    new_chunk_count = len(chunks) - len(shared_chunks or {})
     print("Creating file...")
-    file, path = mfs.create_file(
+    stages = mfs.create_file_stages(
         path,
         chunks,
         chunk_size,
         recipient=mfs.config.active_address,
         gas_coin=gas_coins.pop(0),
+        mime_type=encoded.mime_type,
+        signers=signers,
+        shared_chunks=shared_chunks,
+        preflight=False,
     )
+    file, create_chunk_caps = next(stages)
 
     print(f"Uploading chunks for file {file.id}")
+    # Files with more chunks than fit in one transaction are still being created
+    # while the chunks of earlier stages upload.
     mfs.upload_chunks(
         file,
         path,
         concurrency,
-        [gas_coins.pop(0) for _ in range(len(chunks))],
+        [gas_coins.pop(0) for _ in range(new_chunk_count)],
+        chunks,
+        controller,
+        create_chunk_caps=itertools.chain(
+            create_chunk_caps, itertools.chain.from_iterable(caps for _, caps in stages)
+        ),
+        share=index is not None,
+        index=index,
     )
     print(f"Registering chunks for file {file.id}")
     mfs.register_chunks(
@@ -115,12 +602,151 @@ def upload(
         gas_coin=gas_coins.pop(0),
     )
 
-    file = mfs.get_file(file.id)
+    return mfs.get_file(file.id)
 
-    gas_coins = mfs.get_all_gas_coins(mfs.config.active_address)
-    mfs.merge_coins(gas_coins)
 
-    print("File was uploaded successfully!")
-    print(f"Download Link: https://mfs.sm.xyz/{file.id}/")
+def update_encoded(
+    mfs: "MiraiFs",
+    path: Path,
+    file: "File",
+    chunks: list["ChunkRaw"],
+    changed_count: int,
+    concurrency: int | None,
+    gas_coins: list["GasCoin"],
+    controller: "AimdController | None" = None,
+    signers: list[str] | None = None,
+) -> "File":
+    """
+    Update a file in place to the given chunks, uploading and registering only
+    the changed_count chunks that changed, see MiraiFs.diff_chunks. Uses a gas
+    coin per changed chunk, plus 2. The chunks are expected to have passed
+    preflight before their gas was allocated.
+    """
+    print(f"Updating file {file.id}...")
+    stages = mfs.update_file_stages(
+        file, chunks, gas_coins.pop(0), signers, preflight=False
+    )
+    file, create_chunk_caps = next(stages)
+    print(f"Uploading chunks for file {file.id}")
+    mfs.upload_chunks(
+        file,
+        path,
+        concurrency,
+        [gas_coins.pop(0) for _ in range(changed_count)],
+        chunks,
+        controller,
+        create_chunk_caps=itertools.chain(
+            create_chunk_caps, itertools.chain.from_iterable(caps for _, caps in stages)
+        ),
+    )
+    print(f"Registering chunks for file {file.id}")
+    mfs.register_chunks(
+        file,
+        gas_coin=gas_coins.pop(0),
+    )
 
-    return
+    return mfs.get_file(file.id)
+
+
+def preflight(
+    chunks: list["ChunkRaw"],
+    chunk_size: int,
+    mime_type: str,
+    signers: list[str] | None = None,
+    path: Path | None = None,
+) -> None:
+    """
+    Check that a file's transactions would succeed before any gas is spent on
+    them, and exit with what would abort otherwise.
+    """
+    from miraifs_sdk.preflight import PreflightError, check_file
+
+    failures = check_file(chunks, chunk_size, mime_type, signers=signers)
+    if failures:
+        raise typer.Exit(
+            f"{path}: {PreflightError(failures)}"
+            if path
+            else str(PreflightError(failures))
+        )
+
+
+def format_saved(
+    original_size: int,
+    stored_size: int,
+) -> str:
+    # Collections of empty files have nothing to save.
+    saved = 1 - stored_size / original_size if original_size else 0
+    return f"{saved:.1%} saved"
+
+
+def print_batches(
+    batches: list["FileBatch"],
+    verb: str,
+) -> None:
+    """Print the transactions of delete_many or freeze_many, and the storage rebate they recovered."""
+    for batch in batches:
+        if batch.error:
+            print(
+                f"Failed {', '.join(batch.file_ids)} after {batch.transactions} transactions: {batch.error}"
+            )
+    done = sum(len(batch.file_ids) for batch in batches if not batch.error)
+    transactions = sum(batch.transactions for batch in batches)
+    gas_used = sum(batch.gas_used for batch in batches)
+    storage_rebate = sum(batch.storage_rebate for batch in batches)
+    print(f"{verb} {done} files in {transactions} transactions")
+    print(
+        f"Gas: {gas_used / 10**9:.6f} SUI, storage rebate: {storage_rebate / 10**9:.6f} SUI, net: {(storage_rebate - gas_used) / 10**9:+.6f} SUI"
+    )
+
+
+def return_signer_gas(
+    mfs: "MiraiFs",
+    signers: list[str],
+) -> None:
+    """
+    Send the gas left over on the chunk signers back to the active address.
+    """
+    for signer in signers:
+        if signer != str(mfs.config.active_address):
+            mfs.sweep_gas_coins(signer)
+
+
+def start_report(
+    report: str | None,
+) -> RecordingInstrumentation | None:
+    if report is None:
+        return None
+    if report != "json":
+        raise typer.BadParameter(f"Unsupported report format: {report}")
+    instrumentation = RecordingInstrumentation()
+    set_instrumentation(instrumentation)
+    REPORT_STDOUT.append(sys.stdout)
+    sys.stdout = sys.stderr
+    return instrumentation
+
+
+def emit_report(
+    instrumentation: RecordingInstrumentation,
+) -> None:
+    end_report()
+    typer.echo(json.dumps(instrumentation.report(), indent=2))
+
+
+def end_report() -> None:
+    """Send output back to stdout after start_report."""
+    while REPORT_STDOUT:
+        sys.stdout = REPORT_STDOUT.pop()
+
+
+def open_miraifs() -> "MiraiFs":
+    """Create a MiraiFs client whose connections are closed when the command finishes."""
+    from miraifs_sdk.miraifs import MiraiFs
+
+    mfs = MiraiFs()
+    OPEN_CLIENTS.append(mfs)
+    return mfs
+
+
+def close_clients() -> None:
+    while OPEN_CLIENTS:
+        OPEN_CLIENTS.pop().close()
@@ -1,16 +1,51 @@
 import typer
-
-from miraifs_sdk.sui import Sui
+from miraifs_sdk import MERGE_BATCH_SIZE
+from miraifs_sdk.cli.file import OPEN_CLIENTS
+from rich import print
 
 app = typer.Typer()
 
 
 @app.command()
-def merge():
+def merge(
+    batch_size: int = typer.Option(MERGE_BATCH_SIZE, help="Input objects per transaction, gas coin included"),
+    concurrency: int = typer.Option(8, help="Number of batches to merge at once"),
+    dry_run: bool = typer.Option(False, help="Dry-run the batches without executing them"),
+):  # fmt: skip
+    from miraifs_sdk.sui import MergeError, Sui
+    from rich.table import Table
+
     sui = Sui()
+    OPEN_CLIENTS.append(sui)
     gas_coins = sui.get_all_gas_coins(sui.config.active_address)
-    result = sui.merge_coins(gas_coins)
-    print(result)
+    if len(gas_coins) < 2:
+        print(f"Nothing to merge, the address has {len(gas_coins)} gas coin(s).")
+        return
+    try:
+        batches = sui.consolidate_coins(gas_coins, batch_size, concurrency, dry_run)
+    except MergeError as e:
+        batches = e.batches
+    table = Table("Round", "Gas Coin", "Input Objects", "Gas (SUI)", "Digest", "Error")
+    for batch in batches:
+        table.add_row(
+            str(batch.round),
+            batch.gas_coin.id,
+            str(batch.input_objects),
+            f"{batch.gas_used / 10**9:.6f}" if batch.gas_used is not None else "",
+            batch.digest or ("dry run" if dry_run else ""),
+            batch.error or "",
+        )
+    print(table)
+    failed = [batch for batch in batches if batch.error]
+    if failed:
+        print(
+            f"{len(failed)} of {len(batches)} merge transactions failed, see the errors above."
+        )
+        raise typer.Exit(1)
+    total = sum(batch.gas_used or 0 for batch in batches)
+    print(
+        f"{'Would merge' if dry_run else 'Merged'} {len(gas_coins)} gas coins into {gas_coins[0].id} in {len(batches)} transactions ({total / 10**9:.6f} SUI)"
+    )
     return
 
 
@@ -21,6 +56,8 @@ def split(
     denomination: str = typer.Option("sui"),
     auto_merge: bool = typer.Option(True),
 ):
+    from miraifs_sdk.sui import Sui
+
     if denomination == "sui":
         typer.confirm(
             f"Please confirm you'd like to create {quantity}x {value} SUI coins.",
@@ -29,9 +66,10 @@ def split(
         value = value * 10**9
 
     sui = Sui()
+    OPEN_CLIENTS.append(sui)
     gas_coins = sui.get_all_gas_coins(sui.config.active_address)
     if len(gas_coins) > 1 and auto_merge:
-        sui.merge_coins(gas_coins)
+        sui.consolidate_coins(gas_coins)
     result = sui.split_coin(gas_coins[0], quantity, value)
     print(result)
     return
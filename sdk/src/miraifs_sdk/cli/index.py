@@ -0,0 +1,49 @@
+import logging
+
+import typer
+from miraifs_sdk.cli.file import open_miraifs
+from rich import print
+
+app = typer.Typer()
+
+
+@app.command()
+def run(
+    poll_interval: float = typer.Option(2.0, help="Seconds to wait when there are no new events"),
+    once: bool = typer.Option(False, help="Index all pending events and exit"),
+):  # fmt: skip
+    from miraifs_sdk.index import EventIndex
+    from miraifs_sdk.indexer import Indexer
+
+    logging.basicConfig(level=logging.INFO)
+    index = EventIndex()
+    indexer = Indexer(open_miraifs(), index)
+    try:
+        if once:
+            count = indexer.poll()
+            print(f"Indexed {count} events.")
+        else:
+            indexer.run(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        index.close()
+    return
+
+
+@app.command()
+def show(
+    file_id: str = typer.Argument(),
+):
+    from miraifs_sdk.index import EventIndex
+
+    index = EventIndex()
+    status = index.get_file_status(file_id)
+    if status is None:
+        index.close()
+        raise typer.Exit(f"File {file_id} is not indexed.")
+    print(status)
+    for i, (hash, chunk_id) in enumerate(index.get_manifest(file_id)):
+        print(f"{i}: {hash.hex()} {chunk_id}")
+    index.close()
+    return
@@ -0,0 +1,282 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import typer
+from miraifs_sdk import MAX_CHUNK_SIZE_BYTES, SYNC_STATE_FILE_NAME
+from miraifs_sdk.cli.file import (
+    emit_report,
+    open_miraifs,
+    preflight,
+    print_batches,
+    return_signer_gas,
+    start_report,
+    update_encoded,
+    upload_encoded,
+)
+from rich import print
+
+if TYPE_CHECKING:
+    from miraifs_sdk.models import File, GasCoin
+    from miraifs_sdk.sync import LocalFile
+
+# --prune modes, with how they're reported.
+PRUNE_MODES = {"delete": "Deleted", "freeze": "Froze"}
+
+
+def sync(
+    directory: Path = typer.Argument(...),
+    chunk_size: int = typer.Option(MAX_CHUNK_SIZE_BYTES),
+    compress: bool = typer.Option(False, help="Compress compressible files with zstd before upload"),
+    compression_level: int = typer.Option(None, help="zstd level, chosen from the file size by default"),
+    concurrency: int = typer.Option(None, help="Fixed number of concurrent chunk uploads, adapts to the fullnode by default"),
+    file_concurrency: int = typer.Option(4, help="Number of files to upload at once"),
+    signer: list[str] = typer.Option(None, help="Keystore address to create chunks with, repeatable. Defaults to MIRAIFS_SIGNER_ADDRESSES or the active address"),
+    gas_budget_per_chunk: int = typer.Option(5_000_000_000, help="Gas budget per chunk in MIST"),
+    prune: str = typer.Option(None, help="delete or freeze the files of removed paths and the previous versions of files uploaded again"),
+    state_file: Path = typer.Option(None, help=f"Defaults to {SYNC_STATE_FILE_NAME} in the directory"),
+    dry_run: bool = typer.Option(False, help="Show what would be uploaded and pruned without doing it"),
+    report: str = typer.Option(None, help="Emit a run report in the given format (json)"),
+):  # fmt: skip
+    """
+    Upload the new and changed files in a directory. Files are only read and hashed
+    again when their mtime or size changed, and are uploaded when their manifest
+    hash doesn't match the file they were last uploaded as. Changed files are
+    updated in place, keeping their file IDs, unless that file is frozen.
+    """
+    from miraifs_sdk import SIGNER_ADDRESSES
+    from miraifs_sdk.concurrency import AimdController
+    from miraifs_sdk.miraifs import file_from_object_read
+    from miraifs_sdk.sync import SyncState
+    from miraifs_sdk.utils import split_into_gas_batches
+    from pysui.sui.sui_txresults.single_tx import ImmutableOwner
+
+    if prune is not None and prune not in PRUNE_MODES:
+        raise typer.BadParameter(f"--prune must be one of {', '.join(PRUNE_MODES)}")
+    if not directory.is_dir():
+        raise typer.BadParameter(f"{directory} is not a directory")
+    instrumentation = start_report(report)
+    mfs = open_miraifs()
+    signers = signer or SIGNER_ADDRESSES
+    mfs.check_signers(signers)
+
+    state = SyncState(
+        state_file or directory / SYNC_STATE_FILE_NAME, chunk_size, compress
+    )
+    local_files = state.scan(directory, compression_level)
+    local_paths = {local_file.entry.path for local_file in local_files}
+    gone_entries = [
+        entry for path, entry in state.entries.items() if path not in local_paths
+    ]
+
+    # The manifest hash of every file uploaded before.
+    file_ids = [
+        e.file_id for e in [f.entry for f in local_files] + gone_entries if e.file_id
+    ]
+    onchain = mfs.get_file_objects(file_ids)
+    chunk_indexes = mfs.get_chunk_indexes(list(onchain))
+
+    uploads: list["LocalFile"] = []
+    # The onchain file and changed chunk count of each file updated in place, by path.
+    updates: dict[str, tuple["File", int]] = {}
+    superseded: list[str] = []
+    for local_file in local_files:
+        entry = local_file.entry
+        obj = onchain.get(entry.file_id) if entry.file_id else None
+        file = (
+            file_from_object_read(obj, chunk_indexes.get(obj.object_id))
+            if obj
+            else None
+        )
+        if file is not None and is_synced(file, entry.manifest_hash):
+            state.entries[entry.path] = entry
+            continue
+        if local_file.encoded is None:
+            local_file = state.hash_file(
+                directory / entry.path, entry.path, compression_level
+            )
+        preflight(
+            local_file.chunks,
+            chunk_size,
+            local_file.encoded.mime_type,
+            signers,
+            directory / entry.path,
+        )
+        if file is not None and can_update(
+            file,
+            obj.owner,
+            str(mfs.config.active_address),
+            chunk_size,
+            local_file.encoded.mime_type,
+        ):
+            changed, _ = mfs.diff_chunks(file, local_file.chunks)
+            updates[entry.path] = (file, len(changed))
+        elif obj is not None:
+            superseded.append(obj.object_id)
+        uploads.append(local_file)
+    # Frozen files can be neither deleted nor frozen again.
+    prunable = [e.file_id for e in gone_entries if e.file_id in onchain] + superseded
+    prunable = [
+        id for id in prunable if not isinstance(onchain[id].owner, ImmutableOwner)
+    ]
+    # Removed paths are remembered until their files are pruned.
+    forgotten = [e for e in gone_entries if prune or e.file_id not in prunable]
+
+    print(f"Directory: {directory}")
+    print(f"Files: {len(local_files)}, {len(uploads)} to upload")
+    for local_file in uploads:
+        if local_file.entry.path in updates:
+            file, changed_count = updates[local_file.entry.path]
+            print(
+                f"  {local_file.entry.path} ({local_file.entry.size} bytes, {changed_count} of {len(local_file.chunks)} chunks changed in {file.id})"
+            )
+        else:
+            print(
+                f"  {local_file.entry.path} ({local_file.entry.size} bytes, {len(local_file.chunks)} chunks)"
+            )
+    if gone_entries:
+        print(f"Removed: {len(gone_entries)}")
+        for entry in gone_entries:
+            print(f"  {entry.path} ({entry.file_id})")
+    if prunable:
+        print(f"To {prune or 'leave in place'}: {', '.join(prunable)}")
+    if dry_run:
+        return
+    if not uploads and not (prune and prunable):
+        for entry in forgotten:
+            del state.entries[entry.path]
+        state.save()
+        print("Nothing to upload or prune.")
+        return
+    typer.confirm("Please confirm the sync settings:", abort=True)
+    if instrumentation:
+        instrumentation.start()
+
+    controller = (
+        AimdController() if concurrency is None else AimdController.fixed(concurrency)
+    )
+    state_lock = threading.Lock()
+
+    def new_chunk_count(
+        local_file: "LocalFile",
+    ) -> int:
+        if local_file.entry.path in updates:
+            return updates[local_file.entry.path][1]
+        return len(local_file.chunks)
+
+    def upload(
+        local_file: "LocalFile",
+        gas_coins: list["GasCoin"],
+    ) -> None:
+        path = directory / local_file.entry.path
+        if local_file.entry.path in updates:
+            file, changed_count = updates[local_file.entry.path]
+            file = update_encoded(
+                mfs,
+                path,
+                file,
+                local_file.chunks,
+                changed_count,
+                concurrency,
+                gas_coins,
+                controller,
+                signers,
+            )
+        else:
+            file = upload_encoded(
+                mfs,
+                path,
+                local_file.encoded,
+                local_file.chunks,
+                chunk_size,
+                concurrency,
+                gas_coins,
+                controller,
+                signers,
+            )
+        local_file.entry.file_id = file.id
+        print(f"{local_file.entry.path}: {file.id}")
+        with state_lock:
+            state.entries[local_file.entry.path] = local_file.entry
+            state.save()
+
+    # Gas coins are allocated for batches of files in a single split, and the
+    # files of a batch upload concurrently.
+    coin_counts = [new_chunk_count(f) + 2 for f in uploads]
+    for batch in split_into_gas_batches(uploads, coin_counts):
+        coin_count = sum(new_chunk_count(f) + 2 for f in batch)
+        recipients = [
+            r
+            for f in batch
+            for r in mfs.upload_gas_recipients(new_chunk_count(f), signers)
+        ]
+        gas_coins = mfs.allocate_gas_coins(coin_count, gas_budget_per_chunk, recipients)
+        with ThreadPoolExecutor(max_workers=file_concurrency) as executor:
+            futures = []
+            for f in batch:
+                futures.append(
+                    executor.submit(upload, f, gas_coins[: new_chunk_count(f) + 2])
+                )
+                gas_coins = gas_coins[new_chunk_count(f) + 2 :]
+            for future in futures:
+                future.result()
+
+    if prune and prunable:
+        gas_coins = mfs.allocate_gas_coins(
+            min(file_concurrency, len(prunable)), gas_budget_per_chunk
+        )
+        if prune == "delete":
+            batches = mfs.delete_many(mfs.get_files(prunable), gas_coins)
+        else:
+            batches = mfs.freeze_many(prunable, gas_coins)
+        print_batches(batches, PRUNE_MODES[prune])
+        # Removed paths whose files couldn't be pruned are tried again next time.
+        failed = {id for batch in batches if batch.error for id in batch.file_ids}
+        forgotten = [e for e in forgotten if e.file_id not in failed]
+    for entry in forgotten:
+        del state.entries[entry.path]
+    state.save()
+
+    return_signer_gas(mfs, signers)
+    gas_coins = mfs.get_all_gas_coins(mfs.config.active_address)
+    mfs.consolidate_coins(gas_coins)
+
+    print(
+        f"Synced {len(uploads)} files from {directory}, {len(updates)} updated in place"
+    )
+    if instrumentation:
+        emit_report(instrumentation)
+
+
+def is_synced(
+    file: "File",
+    manifest_hash: str,
+) -> bool:
+    """Whether a file has the given manifest hash and all of its chunks."""
+    if bytes(file.chunks.hash).hex() != manifest_hash:
+        return False
+    return all(item.id for item in file.chunks.manifest)
+
+
+def can_update(
+    file: "File",
+    owner: object,
+    address: str,
+    chunk_size: int,
+    mime_type: str,
+) -> bool:
+    """
+    Whether a file can be updated in place: it's owned by address rather than
+    frozen, all of its chunks were registered, and it has the same chunk size and
+    encoding as the new contents, so that unchanged chunks match.
+    """
+    from pysui.sui.sui_txresults.single_tx import AddressOwner
+
+    return (
+        isinstance(owner, AddressOwner)
+        and owner.address_owner == address
+        and all(item.id for item in file.chunks.manifest)
+        and file.chunks.size == chunk_size
+        and file.mime_type == mime_type
+    )
@@ -0,0 +1,245 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import zstandard as zstd
+from miraifs_sdk import DEFAULT_DICTIONARY_SIZE
+from miraifs_sdk.metrics import get_instrumentation
+from miraifs_sdk.utils import compress_data, get_mime_type_for_file
+
+ZSTD = "zstd"
+# The codec is recorded on-chain as a parameter of the File's mime type,
+# e.g. "application/json; compression=zstd". Files compressed against a
+# trained dictionary also reference the dictionary's file ID.
+COMPRESSION_PARAM = "compression"
+DICTIONARY_PARAM = "dictionary"
+DICTIONARY_MIME_TYPE = "application/x-zstd-dictionary"
+
+# Content that is already compressed gains nothing from another pass.
+INCOMPRESSIBLE_MIME_TYPES = {
+    "application/gzip",
+    "application/pdf",
+    "application/vnd.rar",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-gzip",
+    "application/x-rar",
+    "application/x-xz",
+    "application/x-zstd",
+    "application/zip",
+    "application/zstd",
+    "font/woff",
+    "font/woff2",
+}
+INCOMPRESSIBLE_MIME_PREFIXES = (
+    "audio/",
+    "image/",
+    "video/",
+    # Office documents are zip containers.
+    "application/vnd.oasis.opendocument.",
+    "application/vnd.openxmlformats-officedocument.",
+)
+COMPRESSIBLE_MIME_TYPES = {
+    "audio/wav",
+    "audio/x-wav",
+    "image/bmp",
+    "image/svg+xml",
+    "image/x-ms-bmp",
+    "image/tiff",
+}
+
+
+@dataclass(slots=True, frozen=True)
+class EncodedFile:
+    data: bytes
+    mime_type: str
+    original_size: int
+    codec: str | None = None
+    dictionary_id: str | None = None
+
+
+@dataclass(slots=True, frozen=True)
+class CompressionDictionary:
+    """A trained zstd dictionary and the ID of the MiraiFS file that stores it."""
+
+    file_id: str
+    data: bytes
+
+    def as_zstd_dict(
+        self,
+    ) -> zstd.ZstdCompressionDict:
+        return zstd.ZstdCompressionDict(self.data)
+
+
+def parse_mime_type(
+    mime_type: str,
+) -> tuple[str, dict[str, str]]:
+    """
+    Split a mime type into its base type and parameters.
+    """
+    base, *params = [part.strip() for part in mime_type.split(";")]
+    parsed = {}
+    for param in params:
+        key, _, value = param.partition("=")
+        parsed[key.strip().lower()] = value.strip()
+    return base, parsed
+
+
+def format_mime_type(
+    base: str,
+    params: dict[str, str],
+) -> str:
+    return "; ".join([base] + [f"{key}={value}" for key, value in params.items()])
+
+
+def get_codec(
+    mime_type: str,
+) -> str | None:
+    return parse_mime_type(mime_type)[1].get(COMPRESSION_PARAM)
+
+
+def get_dictionary_id(
+    mime_type: str,
+) -> str | None:
+    return parse_mime_type(mime_type)[1].get(DICTIONARY_PARAM)
+
+
+def get_base_mime_type(
+    mime_type: str,
+) -> str:
+    return parse_mime_type(mime_type)[0]
+
+
+def is_compressible(
+    mime_type: str,
+) -> bool:
+    base = get_base_mime_type(mime_type).lower()
+    if base in COMPRESSIBLE_MIME_TYPES:
+        return True
+    if base in INCOMPRESSIBLE_MIME_TYPES or "zip" in base:
+        return False
+    return not base.startswith(INCOMPRESSIBLE_MIME_PREFIXES)
+
+
+def select_level(
+    size: int,
+) -> int:
+    """
+    Pick a zstd level for a file size. On-chain storage costs far more than CPU,
+    so small files get the strongest levels and only large files trade ratio for speed.
+    """
+    if size <= 1_000_000:
+        return 19
+    if size <= 8_000_000:
+        return 15
+    return 9
+
+
+def encode_file(
+    path: Path,
+    compress: bool = False,
+    level: int | None = None,
+    dictionary: CompressionDictionary | None = None,
+) -> EncodedFile:
+    """
+    Read a file for upload, compressing it with zstd when requested and worthwhile.
+    The file is stored uncompressed if its type is already compressed or if
+    compression doesn't make it smaller. Passing a dictionary implies compression.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    return encode_data(
+        data,
+        get_mime_type_for_file(path),
+        compress,
+        level,
+        dictionary,
+    )
+
+
+def encode_data(
+    data: bytes,
+    mime_type: str,
+    compress: bool = False,
+    level: int | None = None,
+    dictionary: CompressionDictionary | None = None,
+) -> EncodedFile:
+    compress = compress or dictionary is not None
+    if not compress or not data or not is_compressible(mime_type):
+        return EncodedFile(data=data, mime_type=mime_type, original_size=len(data))
+
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("compress"):
+        compressed = compress_data(
+            data,
+            level or select_level(len(data)),
+            dictionary.as_zstd_dict() if dictionary else None,
+        )
+    if len(compressed) >= len(data):
+        return EncodedFile(data=data, mime_type=mime_type, original_size=len(data))
+
+    instrumentation.count("compression.bytes_in", len(data))
+    instrumentation.count("compression.bytes_out", len(compressed))
+    instrumentation.count("compression.bytes_saved", len(data) - len(compressed))
+    base, params = parse_mime_type(mime_type)
+    params[COMPRESSION_PARAM] = ZSTD
+    if dictionary:
+        params[DICTIONARY_PARAM] = dictionary.file_id
+    return EncodedFile(
+        data=compressed,
+        mime_type=format_mime_type(base, params),
+        original_size=len(data),
+        codec=ZSTD,
+        dictionary_id=dictionary.file_id if dictionary else None,
+    )
+
+
+def train_dictionary(
+    paths: list[Path],
+    size: int = DEFAULT_DICTIONARY_SIZE,
+) -> bytes:
+    """
+    Train a zstd dictionary over a set of structurally similar files, e.g. the
+    SVG layers or JSON metadata of an NFT collection. zstd needs a reasonable
+    number of samples, and raises a ZstdError if there are too few.
+    """
+    samples = []
+    for path in paths:
+        with open(path, "rb") as f:
+            samples.append(f.read())
+    with get_instrumentation().timer("train_dictionary"):
+        dictionary = zstd.train_dictionary(size, samples)
+    return dictionary.as_bytes()
+
+
+def decode_stream(
+    parts: Iterable[bytes],
+    mime_type: str,
+    dictionary: CompressionDictionary | None = None,
+) -> Iterator[bytes]:
+    """
+    Decode stored file data part by part, e.g. chunk by chunk as it is downloaded.
+    Data without a compression codec is passed through unchanged. Files compressed
+    against a dictionary must be decoded with the dictionary they reference.
+    """
+    codec = get_codec(mime_type)
+    if codec is None:
+        yield from parts
+        return
+    if codec != ZSTD:
+        raise ValueError(f"Unsupported compression codec: {codec}")
+    dictionary_id = get_dictionary_id(mime_type)
+    if dictionary_id is not None and (
+        dictionary is None or dictionary.file_id != dictionary_id
+    ):
+        raise ValueError(f"File was compressed with dictionary {dictionary_id}")
+
+    instrumentation = get_instrumentation()
+    decompressor = zstd.ZstdDecompressor(
+        dict_data=dictionary.as_zstd_dict() if dictionary_id else None,
+    ).decompressobj()
+    for part in parts:
+        with instrumentation.timer("decompress"):
+            data = decompressor.decompress(part)
+        if data:
+            yield data
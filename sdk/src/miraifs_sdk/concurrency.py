@@ -0,0 +1,133 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from miraifs_sdk.metrics import get_instrumentation
+
+
+class RetryableError(Exception):
+    """
+    A transaction was turned away by the fullnode without being executed,
+    e.g. because it is throttling or overloaded, and can be submitted again.
+    """
+
+
+class AimdController:
+    """
+    Limits the number of transactions in flight with additive-increase,
+    multiplicative-decrease (AIMD), like TCP congestion control.
+
+    While confirmations come back within `tolerance` times the baseline latency,
+    the limit grows by one per window of `limit` confirmations, or doubles per
+    window until the first sign of congestion (slow start). A confirmation
+    slower than that, or a retryable rejection, cuts the limit by `backoff`.
+    The baseline is `target_latency` if given, and otherwise the fastest
+    confirmation seen, i.e. the latency of an unloaded fullnode. After a cut,
+    the transactions that were already in flight are not counted again, so one
+    burst of congestion only cuts the limit once.
+
+    Every decision is reported through the instrumentation as the
+    `concurrency.increases` and `concurrency.decreases` counters and the
+    `concurrency.limit` gauge, and kept in `history` as (seconds, limit) pairs.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 64,
+        target_latency: float | None = None,
+        tolerance: float = 2.0,
+        backoff: float = 0.5,
+    ) -> None:
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError("Expected 1 <= minimum <= initial <= maximum.")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.baseline = target_latency
+        self.slow_start = True
+        # Completions to ignore after a decrease, from transactions already in flight.
+        self.cooldown = 0
+        self.condition = threading.Condition()
+        self.started_at = time.perf_counter()
+        self.history: list[tuple[float, int]] = [(0.0, initial)]
+        get_instrumentation().gauge("concurrency.limit", initial)
+
+    @classmethod
+    def fixed(
+        cls,
+        concurrency: int,
+    ) -> "AimdController":
+        """A controller that never changes its limit, but still retries rejections."""
+        return cls(initial=concurrency, minimum=concurrency, maximum=concurrency)
+
+    @property
+    def current_limit(
+        self,
+    ) -> int:
+        return int(self.limit)
+
+    @contextmanager
+    def slot(
+        self,
+    ) -> Iterator[None]:
+        """Wait until a transaction can be sent within the limit, and hold its place."""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def record(
+        self,
+        latency: float,
+        rejected: bool = False,
+    ) -> None:
+        """Feed back how long a transaction took to confirm, or that it was rejected."""
+        with self.condition:
+            if not rejected and self.target_latency is None:
+                self.baseline = (
+                    latency if self.baseline is None else min(self.baseline, latency)
+                )
+            if self.cooldown > 0:
+                self.cooldown -= 1
+            elif rejected or latency > self.baseline * self.tolerance:
+                self.slow_start = False
+                self._set_limit(max(self.minimum, self.limit * self.backoff))
+                # This transaction still holds its slot.
+                self.cooldown = self.in_flight - 1
+            elif self.in_flight * 2 >= int(self.limit):
+                # Only grow while the limit is actually being used.
+                step = 1 if self.slow_start else 1 / int(self.limit)
+                self._set_limit(min(self.maximum, self.limit + step))
+
+    def _set_limit(
+        self,
+        limit: float,
+    ) -> None:
+        previous = int(self.limit)
+        self.limit = limit
+        if int(limit) == previous:
+            return
+        instrumentation = get_instrumentation()
+        instrumentation.count(
+            "concurrency.increases"
+            if int(limit) > previous
+            else "concurrency.decreases"
+        )
+        instrumentation.gauge("concurrency.limit", int(limit))
+        self.history.append(
+            (round(time.perf_counter() - self.started_at, 3), int(limit))
+        )
+        self.condition.notify_all()
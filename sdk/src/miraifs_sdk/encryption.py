@@ -0,0 +1,242 @@
+import base64
+import dataclasses
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+from miraifs_sdk.compression import EncodedFile, format_mime_type, parse_mime_type
+from miraifs_sdk.metrics import get_instrumentation
+
+AES_256_GCM = "aes-256-gcm"
+# Like the compression codec, the cipher is recorded on-chain as a parameter
+# of the File's mime type, e.g. "application/pdf; encryption=aes-256-gcm".
+ENCRYPTION_PARAM = "encryption"
+# The chunk keys are derived from the file key and a random per-file salt with
+# HKDF, recorded as "kdf=hkdf-sha256; salt=<hex>". Files encrypted without the
+# parameters used the file key for both the nonces and AES-GCM, and can still be
+# decrypted and updated.
+KDF_PARAM = "kdf"
+HKDF_SHA256 = "hkdf-sha256"
+SALT_PARAM = "salt"
+SALT_SIZE = 16
+KEY_SIZE = 32
+NONCE_SIZE = 12
+TAG_SIZE = 16
+# Each chunk is stored as its nonce, its ciphertext and its tag.
+CHUNK_OVERHEAD = NONCE_SIZE + TAG_SIZE
+
+
+@dataclasses.dataclass(frozen=True)
+class ChunkKeys:
+    nonce: bytes
+    cipher: bytes
+    # The file's salt, authenticated with each chunk. Empty for files encrypted
+    # without key derivation, whose chunks only authenticate their index.
+    salt: bytes = b""
+
+
+def get_encryption(
+    mime_type: str,
+) -> str | None:
+    return parse_mime_type(mime_type)[1].get(ENCRYPTION_PARAM)
+
+
+def derive_keys(
+    key: bytes,
+    salt: bytes,
+    kdf: str | None = HKDF_SHA256,
+) -> ChunkKeys:
+    """
+    Derive the keys for a file's chunks from its key and salt, one for the
+    synthetic nonces and one for AES-GCM, so that neither key is used for two
+    purposes and files encrypted with the same key don't share chunk keys.
+    """
+    if kdf is None:
+        return ChunkKeys(nonce=key, cipher=key)
+    if kdf != HKDF_SHA256:
+        raise ValueError(f"Unsupported key derivation: {kdf}")
+    if len(salt) != SALT_SIZE:
+        raise ValueError(f"Expected a {SALT_SIZE} byte salt, got {len(salt)} bytes")
+    return ChunkKeys(
+        nonce=_hkdf(key, salt, b"miraifs chunk nonce"),
+        cipher=_hkdf(key, salt, b"miraifs chunk cipher"),
+        salt=salt,
+    )
+
+
+def get_chunk_keys(
+    key: bytes,
+    mime_type: str,
+) -> ChunkKeys:
+    """The chunk keys of a file encrypted with key, derived as its mime type records."""
+    params = parse_mime_type(mime_type)[1]
+    salt = bytes.fromhex(params.get(SALT_PARAM, ""))
+    return derive_keys(key, salt, params.get(KDF_PARAM))
+
+
+def generate_key() -> str:
+    return base64.b64encode(os.urandom(KEY_SIZE)).decode()
+
+
+def load_key(
+    encoded: str,
+) -> bytes:
+    """
+    Decode a base64 AES-256 key, e.g. from MIRAIFS_ENCRYPTION_KEY.
+    """
+    key = base64.b64decode(encoded.strip(), validate=True)
+    if len(key) != KEY_SIZE:
+        raise ValueError(f"Encryption keys are {KEY_SIZE} bytes, got {len(key)}")
+    return key
+
+
+def plaintext_chunk_size(
+    chunk_size: int,
+) -> int:
+    """The plaintext bytes per chunk of an encrypted file with the given chunk size."""
+    if chunk_size <= CHUNK_OVERHEAD:
+        raise ValueError(
+            f"Encrypted files need chunks of more than {CHUNK_OVERHEAD} bytes"
+        )
+    return chunk_size - CHUNK_OVERHEAD
+
+
+def encrypt_chunk(
+    data: bytes,
+    index: int,
+    keys: ChunkKeys,
+    final: bool = False,
+) -> bytes:
+    """
+    Encrypt the plaintext of one chunk, final if it's the file's last. The nonce
+    is the chunk's index followed by a MAC of its associated data and plaintext,
+    so a nonce is never reused for different data, while unchanged chunks encrypt
+    to the same bytes and can be diffed by hash. The file's salt, the index and
+    whether the chunk is the last are authenticated, so chunks can't be moved
+    between files or positions, and trailing chunks can't be cut off.
+    """
+    associated_data = _associated_data(keys, index, final)
+    mac = hmac.digest(keys.nonce, associated_data + data, "sha256")
+    nonce = index.to_bytes(4, "big") + mac[: NONCE_SIZE - 4]
+    return nonce + _cipher(keys.cipher).encrypt(nonce, data, associated_data)
+
+
+def decrypt_chunk(
+    data: bytes,
+    index: int,
+    keys: ChunkKeys,
+    final: bool = False,
+) -> bytes:
+    """
+    Decrypt one chunk. Raises cryptography's InvalidTag if the key is wrong or the
+    chunk was modified, isn't the chunk at index of this file, or is or isn't the
+    last chunk when final says otherwise.
+    """
+    nonce = data[:NONCE_SIZE]
+    associated_data = _associated_data(keys, index, final)
+    return _cipher(keys.cipher).decrypt(nonce, data[NONCE_SIZE:], associated_data)
+
+
+def encrypt_file(
+    encoded: EncodedFile,
+    key: bytes,
+    chunk_size: int,
+    max_workers: int | None = None,
+    mime_type: str | None = None,
+) -> EncodedFile:
+    """
+    Encrypt encoded file data chunk by chunk, across threads. Each encrypted chunk
+    is exactly chunk_size bytes, except the last, so splitting the result into
+    chunks of chunk_size yields one encrypted chunk each. New files get a random
+    salt. Updates pass the mime type of the file they update, whose salt and key
+    derivation are reused, so that unchanged chunks encrypt to the same bytes.
+    """
+    size = plaintext_chunk_size(chunk_size)
+    if mime_type is None:
+        keys = derive_keys(key, os.urandom(SALT_SIZE))
+    else:
+        keys = get_chunk_keys(key, mime_type)
+    pieces = [encoded.data[i : i + size] for i in range(0, len(encoded.data), size)]
+    finals = [i == len(pieces) - 1 for i in range(len(pieces))]
+    with get_instrumentation().timer("encrypt"):
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            encrypted = list(
+                executor.map(
+                    encrypt_chunk,
+                    pieces,
+                    range(len(pieces)),
+                    [keys] * len(pieces),
+                    finals,
+                )
+            )
+    base, params = parse_mime_type(encoded.mime_type)
+    params[ENCRYPTION_PARAM] = AES_256_GCM
+    if keys.salt:
+        params[KDF_PARAM] = HKDF_SHA256
+        params[SALT_PARAM] = keys.salt.hex()
+    return dataclasses.replace(
+        encoded,
+        data=b"".join(encrypted),
+        mime_type=format_mime_type(base, params),
+    )
+
+
+def decrypt_stream(
+    parts: Iterable[bytes],
+    mime_type: str,
+    key: bytes | None,
+    count: int,
+    start: int = 0,
+) -> Iterator[bytes]:
+    """
+    Decrypt stored file data chunk by chunk, where parts are consecutive chunks
+    from index start on of a file of count chunks. Data without encryption is
+    passed through unchanged.
+    """
+    params = parse_mime_type(mime_type)[1]
+    encryption = params.get(ENCRYPTION_PARAM)
+    if encryption is None:
+        yield from parts
+        return
+    if encryption != AES_256_GCM:
+        raise ValueError(f"Unsupported encryption: {encryption}")
+    if key is None:
+        raise ValueError("File is encrypted, but no key was given")
+    keys = get_chunk_keys(key, mime_type)
+
+    instrumentation = get_instrumentation()
+    for index, part in enumerate(parts, start):
+        with instrumentation.timer("decrypt"):
+            data = decrypt_chunk(part, index, keys, index == count - 1)
+        yield data
+
+
+def _cipher(
+    key: bytes,
+):
+    # cryptography is loaded on first use rather than with the SDK.
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    return AESGCM(key)
+
+
+def _associated_data(
+    keys: ChunkKeys,
+    index: int,
+    final: bool,
+) -> bytes:
+    if not keys.salt:
+        return index.to_bytes(4, "big")
+    return keys.salt + index.to_bytes(4, "big") + bytes([final])
+
+
+def _hkdf(
+    key: bytes,
+    salt: bytes,
+    info: bytes,
+) -> bytes:
+    from cryptography.hazmat.primitives.hashes import SHA256
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+    return HKDF(algorithm=SHA256(), length=KEY_SIZE, salt=salt, info=info).derive(key)
@@ -0,0 +1,379 @@
+import ast
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Callable
+
+from miraifs_sdk import MIRAIFS_PACKAGE_ID
+from pysui.sui.sui_txresults.complex_tx import Event
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {c: i for i, c in enumerate(B58_ALPHABET)}
+
+
+@dataclass(slots=True, frozen=True)
+class FileCreatedEvent:
+    chunk_size: int
+    created_at: int
+    file_id: str
+    mime_type: str
+    chunks_hash: bytes
+
+
+@dataclass(slots=True, frozen=True)
+class FileUpdatedEvent:
+    file_id: str
+    chunks_hash: bytes
+
+
+@dataclass(slots=True, frozen=True)
+class ChunkCreatedEvent:
+    chunk_id: str
+    chunk_index: int
+    chunk_hash: bytes
+    file_id: str
+
+
+@dataclass(slots=True, frozen=True)
+class ChunkVerifiedEvent:
+    chunk_id: str
+    file_id: str
+    register_chunk_cap_id: str
+
+
+@dataclass(slots=True, frozen=True)
+class ChunkRegisteredEvent:
+    chunk_hash: bytes
+    chunk_id: str
+    chunk_index: int
+    file_id: str
+
+
+@dataclass(slots=True, frozen=True)
+class SharedChunkCreatedEvent:
+    chunk_id: str
+    chunk_hash: bytes
+    size: int
+
+
+MiraiFsEvent = (
+    FileCreatedEvent
+    | FileUpdatedEvent
+    | ChunkCreatedEvent
+    | ChunkVerifiedEvent
+    | ChunkRegisteredEvent
+    | SharedChunkCreatedEvent
+)
+
+
+class BcsReader:
+    """A minimal BCS reader for the field types used by MiraiFS events."""
+
+    __slots__ = ("data", "pos")
+
+    def __init__(
+        self,
+        data: bytes,
+    ) -> None:
+        self.data = data
+        self.pos = 0
+
+    def u16(self) -> int:
+        value = int.from_bytes(self.data[self.pos : self.pos + 2], "little")
+        self.pos += 2
+        return value
+
+    def u32(self) -> int:
+        value = int.from_bytes(self.data[self.pos : self.pos + 4], "little")
+        self.pos += 4
+        return value
+
+    def u64(self) -> int:
+        value = int.from_bytes(self.data[self.pos : self.pos + 8], "little")
+        self.pos += 8
+        return value
+
+    def uleb128(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def id(self) -> str:
+        value = "0x" + self.data[self.pos : self.pos + 32].hex()
+        self.pos += 32
+        return value
+
+    def bytes(self) -> bytes:
+        length = self.uleb128()
+        value = self.data[self.pos : self.pos + length]
+        self.pos += length
+        return value
+
+    def string(self) -> str:
+        return self.bytes().decode("utf-8")
+
+    def done(self) -> bool:
+        return self.pos == len(self.data)
+
+
+def normalize_sui_address(
+    address: str,
+) -> str:
+    return "0x" + address.removeprefix("0x").rjust(64, "0")
+
+
+def b58decode(
+    data: str,
+) -> bytes:
+    value = 0
+    for c in data:
+        value = value * 58 + B58_INDEX[c]
+    leading_zeros = len(data) - len(data.lstrip("1"))
+    return b"\x00" * leading_zeros + value.to_bytes(
+        (value.bit_length() + 7) // 8, "big"
+    )
+
+
+def _decode_file_created_bcs(r: BcsReader) -> FileCreatedEvent:
+    return FileCreatedEvent(
+        chunk_size=r.u32(),
+        created_at=r.u64(),
+        file_id=r.id(),
+        mime_type=r.string(),
+        chunks_hash=r.bytes(),
+    )
+
+
+def _decode_file_updated_bcs(r: BcsReader) -> FileUpdatedEvent:
+    return FileUpdatedEvent(
+        file_id=r.id(),
+        chunks_hash=r.bytes(),
+    )
+
+
+def _decode_chunk_created_bcs(r: BcsReader) -> ChunkCreatedEvent:
+    return ChunkCreatedEvent(
+        chunk_id=r.id(),
+        chunk_index=r.u16(),
+        chunk_hash=r.bytes(),
+        file_id=r.id(),
+    )
+
+
+def _decode_chunk_verified_bcs(r: BcsReader) -> ChunkVerifiedEvent:
+    return ChunkVerifiedEvent(
+        chunk_id=r.id(),
+        file_id=r.id(),
+        register_chunk_cap_id=r.id(),
+    )
+
+
+def _decode_chunk_registered_bcs(r: BcsReader) -> ChunkRegisteredEvent:
+    return ChunkRegisteredEvent(
+        chunk_hash=r.bytes(),
+        chunk_id=r.id(),
+        chunk_index=r.u16(),
+        file_id=r.id(),
+    )
+
+
+def _decode_shared_chunk_created_bcs(r: BcsReader) -> SharedChunkCreatedEvent:
+    return SharedChunkCreatedEvent(
+        chunk_id=r.id(),
+        chunk_hash=r.bytes(),
+        size=r.u32(),
+    )
+
+
+def _decode_file_created_json(d: dict) -> FileCreatedEvent:
+    return FileCreatedEvent(
+        chunk_size=int(d["chunk_size"]),
+        created_at=int(d["created_at"]),
+        file_id=d["file_id"],
+        mime_type=d["mime_type"],
+        chunks_hash=bytes(d["chunks_hash"]),
+    )
+
+
+def _decode_file_updated_json(d: dict) -> FileUpdatedEvent:
+    return FileUpdatedEvent(
+        file_id=d["file_id"],
+        chunks_hash=bytes(d["chunks_hash"]),
+    )
+
+
+def _decode_chunk_created_json(d: dict) -> ChunkCreatedEvent:
+    return ChunkCreatedEvent(
+        chunk_id=d["chunk_id"],
+        chunk_index=int(d["chunk_index"]),
+        chunk_hash=bytes(d["chunk_hash"]),
+        file_id=d["file_id"],
+    )
+
+
+def _decode_chunk_verified_json(d: dict) -> ChunkVerifiedEvent:
+    return ChunkVerifiedEvent(
+        chunk_id=d["chunk_id"],
+        file_id=d["file_id"],
+        register_chunk_cap_id=d["register_chunk_cap_id"],
+    )
+
+
+def _decode_chunk_registered_json(d: dict) -> ChunkRegisteredEvent:
+    return ChunkRegisteredEvent(
+        chunk_hash=bytes(d["chunk_hash"]),
+        chunk_id=d["chunk_id"],
+        chunk_index=int(d["chunk_index"]),
+        file_id=d["file_id"],
+    )
+
+
+def _decode_shared_chunk_created_json(d: dict) -> SharedChunkCreatedEvent:
+    return SharedChunkCreatedEvent(
+        chunk_id=d["chunk_id"],
+        chunk_hash=bytes(d["chunk_hash"]),
+        size=int(d["size"]),
+    )
+
+
+class EventDecoderRegistry:
+    """
+    Decodes MiraiFS events into typed records, dispatching on the exact
+    event type. Each struct has a BCS decoder and a structured-data decoder.
+    Structured data is used when it can be read back as JSON directly,
+    otherwise the event's BCS bytes are decoded.
+    """
+
+    def __init__(
+        self,
+        package_id: str,
+    ) -> None:
+        self.package_id = normalize_sui_address(package_id)
+        self.decoders: dict[
+            str,
+            tuple[Callable[[BcsReader], MiraiFsEvent], Callable[[dict], MiraiFsEvent]],
+        ] = {}
+
+    def register(
+        self,
+        module: str,
+        struct: str,
+        bcs_decoder: Callable[[BcsReader], MiraiFsEvent],
+        json_decoder: Callable[[dict], MiraiFsEvent],
+    ) -> None:
+        self.decoders[f"{self.package_id}::{module}::{struct}"] = (
+            bcs_decoder,
+            json_decoder,
+        )
+
+    def decode(
+        self,
+        event: Event,
+    ) -> MiraiFsEvent | None:
+        """
+        Decode a single event. Returns None for events that aren't MiraiFS events.
+        """
+        decoders = self.decoders.get(event.event_type)
+        if decoders is None:
+            return None
+        bcs_decoder, json_decoder = decoders
+        data = event.parsed_json
+        if isinstance(data, dict):
+            return json_decoder(data)
+        # pysui stores parsed JSON as the repr() of a dict. When no string field
+        # contains a quote or an escape, swapping quotes yields valid JSON, which
+        # is the fastest path by far.
+        if '"' not in data and "\\" not in data:
+            try:
+                return json_decoder(json.loads(data.replace("'", '"')))
+            except ValueError:
+                pass
+        if event.bcs:
+            for bcs_data in _bcs_candidates(event.bcs):
+                reader = BcsReader(bcs_data)
+                try:
+                    record = bcs_decoder(reader)
+                except (IndexError, UnicodeDecodeError):
+                    continue
+                if reader.done():
+                    return record
+        return json_decoder(ast.literal_eval(data))
+
+    def decode_all(
+        self,
+        events: list[Event],
+    ) -> list[MiraiFsEvent]:
+        decoded = []
+        for event in events:
+            record = self.decode(event)
+            if record is not None:
+                decoded.append(record)
+        return decoded
+
+
+def _bcs_candidates(
+    encoded: str,
+):
+    # The JSON-RPC API has returned event BCS as Base58 and, more recently,
+    # as Base64. Both are tried and the one that decodes exactly is used.
+    try:
+        yield b58decode(encoded)
+    except KeyError:
+        pass
+    try:
+        yield base64.b64decode(encoded, validate=True)
+    except binascii.Error:
+        pass
+
+
+def new_event_registry(
+    package_id: str,
+) -> EventDecoderRegistry:
+    registry = EventDecoderRegistry(package_id)
+    registry.register(
+        "file", "FileCreatedEvent", _decode_file_created_bcs, _decode_file_created_json
+    )
+    registry.register(
+        "file", "FileUpdatedEvent", _decode_file_updated_bcs, _decode_file_updated_json
+    )
+    registry.register(
+        "chunk",
+        "ChunkCreatedEvent",
+        _decode_chunk_created_bcs,
+        _decode_chunk_created_json,
+    )
+    registry.register(
+        "chunk",
+        "ChunkVerifiedEvent",
+        _decode_chunk_verified_bcs,
+        _decode_chunk_verified_json,
+    )
+    registry.register(
+        "file",
+        "ChunkRegisteredEvent",
+        _decode_chunk_registered_bcs,
+        _decode_chunk_registered_json,
+    )
+    registry.register(
+        "chunk",
+        "SharedChunkCreatedEvent",
+        _decode_shared_chunk_created_bcs,
+        _decode_shared_chunk_created_json,
+    )
+    return registry
+
+
+EVENT_REGISTRY = new_event_registry(MIRAIFS_PACKAGE_ID)
+
+
+def decode_events(
+    events: list[Event],
+) -> list[MiraiFsEvent]:
+    return EVENT_REGISTRY.decode_all(events)
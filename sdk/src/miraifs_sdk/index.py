@@ -0,0 +1,451 @@
+import sqlite3
+from datetime import UTC, datetime
+from pathlib import Path
+
+from miraifs_sdk import INDEX_DB_PATH
+from miraifs_sdk.models import IndexedFile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    manifest_hash TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    frozen INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_owner_created_at ON files (owner, created_at);
+CREATE INDEX IF NOT EXISTS files_mime_type ON files (mime_type);
+"""
+
+FILE_COLUMNS = (
+    "id",
+    "owner",
+    "version",
+    "chunk_count",
+    "chunk_size",
+    "created_at",
+    "manifest_hash",
+    "mime_type",
+    "size",
+    "frozen",
+)
+
+
+class FileIndex:
+    """
+    A local SQLite index of File object metadata, used to list and filter
+    files without paging through the fullnode.
+    """
+
+    def __init__(
+        self,
+        path: Path = INDEX_DB_PATH,
+    ) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(
+        self,
+    ) -> None:
+        self.conn.close()
+
+    def get_versions(
+        self,
+        owner: str,
+    ) -> dict[str, int]:
+        """
+        Return a mapping of file ID to the last indexed object version
+        for all unfrozen files owned by an address.
+        """
+        rows = self.conn.execute(
+            "SELECT id, version FROM files WHERE owner = ? AND frozen = 0",
+            (owner,),
+        )
+        return {id: version for id, version in rows}
+
+    def upsert_files(
+        self,
+        files: list[IndexedFile],
+    ) -> None:
+        placeholders = ", ".join("?" for _ in FILE_COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in FILE_COLUMNS[1:])
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO files ({', '.join(FILE_COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (id) DO UPDATE SET {updates}",
+                [
+                    (
+                        file.id,
+                        file.owner,
+                        file.version,
+                        file.chunk_count,
+                        file.chunk_size,
+                        int(file.created_at.timestamp() * 1000),
+                        file.manifest_hash,
+                        file.mime_type,
+                        file.size,
+                        int(file.frozen),
+                    )
+                    for file in files
+                ],
+            )
+
+    def mark_frozen(
+        self,
+        file_ids: list[str],
+    ) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE files SET frozen = 1 WHERE id = ?",
+                [(id,) for id in file_ids],
+            )
+
+    def remove_files(
+        self,
+        file_ids: list[str],
+    ) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM files WHERE id = ?",
+                [(id,) for id in file_ids],
+            )
+
+    def list_files(
+        self,
+        owner: str,
+        mime_type: str | None = None,
+        frozen: bool | None = None,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        limit: int | None = None,
+    ) -> list[IndexedFile]:
+        """
+        List indexed files for an owner, newest first.
+
+        Args:
+            owner (str): The address that owns (or froze) the files.
+            mime_type (str, optional): Exact mime type, or a prefix ending in "/" (e.g. "image/").
+            frozen (bool, optional): Only return frozen or unfrozen files.
+            min_size (int, optional): Minimum file size in bytes.
+            max_size (int, optional): Maximum file size in bytes.
+            limit (int, optional): Maximum number of files to return.
+        """
+        query = f"SELECT {', '.join(FILE_COLUMNS)} FROM files WHERE owner = ?"
+        params: list = [owner]
+        if mime_type is not None:
+            if mime_type.endswith("/"):
+                query += " AND mime_type LIKE ?"
+                params.append(f"{mime_type}%")
+            else:
+                # Also match the same type with parameters, e.g. a compression codec.
+                query += " AND (mime_type = ? OR mime_type LIKE ?)"
+                params.extend([mime_type, f"{mime_type};%"])
+        if frozen is not None:
+            query += " AND frozen = ?"
+            params.append(int(frozen))
+        if min_size is not None:
+            query += " AND size >= ?"
+            params.append(min_size)
+        if max_size is not None:
+            query += " AND size <= ?"
+            params.append(max_size)
+        query += " ORDER BY created_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [
+            IndexedFile(
+                id=row[0],
+                owner=row[1],
+                version=row[2],
+                chunk_count=row[3],
+                chunk_size=row[4],
+                created_at=datetime.fromtimestamp(row[5] / 1000, tz=UTC),
+                manifest_hash=row[6],
+                mime_type=row[7],
+                size=row[8],
+                frozen=bool(row[9]),
+            )
+            for row in self.conn.execute(query, params)
+        ]
+
+
+EVENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS event_files (
+    id TEXT PRIMARY KEY,
+    creator TEXT NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    manifest_hash TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    chunk_count INTEGER,
+    size INTEGER,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS event_chunks (
+    file_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    verified INTEGER NOT NULL DEFAULT 0,
+    registered INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (file_id, chunk_index)
+);
+CREATE INDEX IF NOT EXISTS event_chunks_chunk_id ON event_chunks (chunk_id);
+CREATE TABLE IF NOT EXISTS shared_chunks (
+    hash TEXT PRIMARY KEY,
+    chunk_id TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_cursors (
+    name TEXT PRIMARY KEY,
+    tx_digest TEXT NOT NULL,
+    event_seq TEXT NOT NULL
+);
+"""
+
+
+class EventIndex:
+    """
+    A local SQLite index of files and chunks built from MiraiFS events,
+    so manifest and chunk lookups can be served without fullnode reads.
+    """
+
+    def __init__(
+        self,
+        path: Path = INDEX_DB_PATH,
+    ) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(EVENT_SCHEMA)
+
+    def close(
+        self,
+    ) -> None:
+        self.conn.close()
+
+    def get_cursor(
+        self,
+        name: str,
+    ) -> tuple[str, str] | None:
+        row = self.conn.execute(
+            "SELECT tx_digest, event_seq FROM event_cursors WHERE name = ?",
+            (name,),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set_cursor(
+        self,
+        name: str,
+        tx_digest: str,
+        event_seq: str,
+    ) -> None:
+        self.conn.execute(
+            "INSERT INTO event_cursors (name, tx_digest, event_seq) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET tx_digest = excluded.tx_digest, event_seq = excluded.event_seq",
+            (name, tx_digest, event_seq),
+        )
+
+    def add_file(
+        self,
+        file_id: str,
+        creator: str,
+        chunk_size: int,
+        created_at: int,
+        manifest_hash: str,
+        mime_type: str,
+    ) -> None:
+        self.conn.execute(
+            "INSERT OR IGNORE INTO event_files (id, creator, chunk_size, created_at, manifest_hash, mime_type) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (file_id, creator, chunk_size, created_at, manifest_hash, mime_type),
+        )
+
+    def add_chunk(
+        self,
+        file_id: str,
+        chunk_index: int,
+        chunk_hash: str,
+        chunk_id: str,
+    ) -> None:
+        # A chunk with a new hash at an existing index replaces the chunk of an
+        # updated file. The same hash means registration was indexed first.
+        self.conn.execute(
+            "INSERT INTO event_chunks (file_id, chunk_index, hash, chunk_id) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (file_id, chunk_index) DO UPDATE SET hash = excluded.hash, chunk_id = excluded.chunk_id, verified = 0, registered = 0 "
+            "WHERE event_chunks.hash != excluded.hash",
+            (file_id, chunk_index, chunk_hash, chunk_id),
+        )
+
+    def set_chunk_verified(
+        self,
+        chunk_id: str,
+    ) -> None:
+        self.conn.execute(
+            "UPDATE event_chunks SET verified = 1 WHERE chunk_id = ?",
+            (chunk_id,),
+        )
+
+    def set_chunk_registered(
+        self,
+        file_id: str,
+        chunk_index: int,
+        chunk_hash: str,
+        chunk_id: str,
+    ) -> None:
+        # Registration implies creation and verification, so upsert in case
+        # the indexer started after the chunk was created.
+        self.conn.execute(
+            "INSERT INTO event_chunks (file_id, chunk_index, hash, chunk_id, verified, registered) "
+            "VALUES (?, ?, ?, ?, 1, 1) "
+            "ON CONFLICT (file_id, chunk_index) DO UPDATE SET hash = excluded.hash, chunk_id = excluded.chunk_id, verified = 1, registered = 1",
+            (file_id, chunk_index, chunk_hash, chunk_id),
+        )
+        self.conn.execute(
+            "UPDATE event_files SET synced = 0 WHERE id = ?",
+            (file_id,),
+        )
+
+    def add_shared_chunk(
+        self,
+        chunk_hash: str,
+        chunk_id: str,
+        size: int,
+    ) -> None:
+        # The first SharedChunk for some data is kept, so every file that
+        # dedups against it points to the same object.
+        self.conn.execute(
+            "INSERT OR IGNORE INTO shared_chunks (hash, chunk_id, size) VALUES (?, ?, ?)",
+            (chunk_hash, chunk_id, size),
+        )
+
+    def get_shared_chunk_ids(
+        self,
+        chunk_hashes: list[str],
+    ) -> dict[str, str]:
+        """
+        Return the SharedChunk IDs of the chunk data hashes that have one.
+        """
+        shared_chunk_ids = {}
+        # SQLite allows at most 999 parameters in older builds.
+        for i in range(0, len(chunk_hashes), 900):
+            bucket = chunk_hashes[i : i + 900]
+            rows = self.conn.execute(
+                f"SELECT hash, chunk_id FROM shared_chunks WHERE hash IN ({', '.join('?' * len(bucket))})",
+                bucket,
+            )
+            shared_chunk_ids.update(rows)
+        return shared_chunk_ids
+
+    def set_file_updated(
+        self,
+        file_id: str,
+        manifest_hash: str,
+    ) -> None:
+        self.conn.execute(
+            "UPDATE event_files SET manifest_hash = ?, synced = 0 WHERE id = ?",
+            (manifest_hash, file_id),
+        )
+
+    def get_unsynced_file_ids(
+        self,
+    ) -> list[str]:
+        rows = self.conn.execute("SELECT id FROM event_files WHERE synced = 0")
+        return [row[0] for row in rows]
+
+    def set_file_synced(
+        self,
+        file_id: str,
+        chunk_count: int | None,
+        size: int | None,
+    ) -> None:
+        self.conn.execute(
+            "UPDATE event_files SET chunk_count = COALESCE(?, chunk_count), size = COALESCE(?, size), synced = 1 "
+            "WHERE id = ?",
+            (chunk_count, size, file_id),
+        )
+        if chunk_count is not None:
+            # Chunks past the end of a file that an update truncated.
+            self.conn.execute(
+                "DELETE FROM event_chunks WHERE file_id = ? AND chunk_index >= ?",
+                (file_id, chunk_count),
+            )
+
+    def commit(
+        self,
+    ) -> None:
+        self.conn.commit()
+
+    def get_file_status(
+        self,
+        file_id: str,
+    ) -> dict | None:
+        """
+        Return the indexed metadata and upload completeness of a file.
+        """
+        row = self.conn.execute(
+            "SELECT id, creator, chunk_size, created_at, manifest_hash, mime_type, chunk_count, size "
+            "FROM event_files WHERE id = ?",
+            (file_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        created, verified, registered = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(verified), 0), COALESCE(SUM(registered), 0) "
+            "FROM event_chunks WHERE file_id = ?",
+            (file_id,),
+        ).fetchone()
+        return {
+            "id": row[0],
+            "creator": row[1],
+            "chunk_size": row[2],
+            "created_at": datetime.fromtimestamp(row[3] / 1000, tz=UTC),
+            "manifest_hash": row[4],
+            "mime_type": row[5],
+            "chunk_count": row[6],
+            "size": row[7],
+            "chunks_created": created,
+            "chunks_verified": verified,
+            "chunks_registered": registered,
+            "complete": row[6] is not None and registered == row[6],
+        }
+
+    def get_manifest(
+        self,
+        file_id: str,
+    ) -> list[tuple[bytes, str | None]]:
+        """
+        Return the (chunk hash, chunk ID) pairs of a file ordered by chunk index.
+        Chunk IDs are None until the chunk has been registered with the file.
+        """
+        rows = self.conn.execute(
+            "SELECT hash, chunk_id, registered FROM event_chunks WHERE file_id = ? ORDER BY chunk_index",
+            (file_id,),
+        )
+        return [
+            (bytes.fromhex(hash), chunk_id if registered else None)
+            for hash, chunk_id, registered in rows
+        ]
+
+    def get_chunk_location(
+        self,
+        chunk_id: str,
+    ) -> tuple[str, int] | None:
+        """
+        Return the (file ID, chunk index) of a chunk.
+        """
+        row = self.conn.execute(
+            "SELECT file_id, chunk_index FROM event_chunks WHERE chunk_id = ?",
+            (chunk_id,),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
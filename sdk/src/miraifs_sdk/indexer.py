@@ -0,0 +1,159 @@
+import logging
+import time
+
+from miraifs_sdk import MIRAIFS_PACKAGE_ID
+from miraifs_sdk.events import (
+    EVENT_REGISTRY,
+    ChunkCreatedEvent,
+    ChunkRegisteredEvent,
+    ChunkVerifiedEvent,
+    FileCreatedEvent,
+    FileUpdatedEvent,
+    SharedChunkCreatedEvent,
+)
+from miraifs_sdk.index import EventIndex
+from miraifs_sdk.miraifs import MiraiFs
+from miraifs_sdk.utils import split_lists_into_sublists
+from pysui import handle_result
+from pysui.sui.sui_builders.get_builders import QueryEvents
+from pysui.sui.sui_txresults.complex_tx import EventQueryEnvelope
+from pysui.sui.sui_txresults.single_tx import ObjectRead
+from pysui.sui.sui_types.collections import EventID
+from pysui.sui.sui_types.event_filter import MoveEventModuleQuery
+
+# Events are followed per emitting module, each with its own cursor.
+EVENT_MODULES = ("file", "chunk")
+
+
+class Indexer:
+    """
+    Follows MiraiFS events by cursor and maintains a local EventIndex of files,
+    chunk IDs and upload completeness. Cursors are committed together with the
+    events they cover, so the indexer can be stopped and resumed at any time.
+    """
+
+    def __init__(
+        self,
+        mfs: MiraiFs,
+        index: EventIndex,
+        page_size: int = 50,
+    ) -> None:
+        self.mfs = mfs
+        self.index = index
+        self.page_size = page_size
+
+    def run(
+        self,
+        poll_interval: float = 2.0,
+    ) -> None:
+        while True:
+            count = self.poll()
+            if count == 0:
+                time.sleep(poll_interval)
+
+    def poll(
+        self,
+    ) -> int:
+        """
+        Index all new events for every MiraiFS module, then sync file metadata
+        that can't be derived from events. Returns the number of events indexed.
+        """
+        count = 0
+        for module in EVENT_MODULES:
+            count += self.poll_module(module)
+        self.sync_files()
+        return count
+
+    def poll_module(
+        self,
+        module: str,
+    ) -> int:
+        count = 0
+        while True:
+            cursor = self.index.get_cursor(module)
+            builder = QueryEvents(
+                query=MoveEventModuleQuery(module, MIRAIFS_PACKAGE_ID),
+                cursor=EventID(cursor[1], cursor[0]) if cursor else None,
+                limit=self.page_size,
+            )
+            result = handle_result(self.mfs.client.execute(builder))
+            if not isinstance(result, EventQueryEnvelope) or not result.data:
+                break
+
+            for event in result.data:
+                self.apply_event(event)
+            last_event_id = result.data[-1].event_id
+            self.index.set_cursor(
+                module,
+                last_event_id["txDigest"],
+                last_event_id["eventSeq"],
+            )
+            self.index.commit()
+            count += len(result.data)
+            logging.info(f"Indexed {len(result.data)} {module} events")
+
+            if not result.has_next_page:
+                break
+        return count
+
+    def apply_event(
+        self,
+        event,
+    ) -> None:
+        record = EVENT_REGISTRY.decode(event)
+        if isinstance(record, FileCreatedEvent):
+            self.index.add_file(
+                file_id=record.file_id,
+                creator=event.sender,
+                chunk_size=record.chunk_size,
+                created_at=record.created_at,
+                manifest_hash=record.chunks_hash.hex(),
+                mime_type=record.mime_type,
+            )
+        elif isinstance(record, FileUpdatedEvent):
+            self.index.set_file_updated(record.file_id, record.chunks_hash.hex())
+        elif isinstance(record, ChunkCreatedEvent):
+            self.index.add_chunk(
+                file_id=record.file_id,
+                chunk_index=record.chunk_index,
+                chunk_hash=record.chunk_hash.hex(),
+                chunk_id=record.chunk_id,
+            )
+        elif isinstance(record, ChunkVerifiedEvent):
+            self.index.set_chunk_verified(record.chunk_id)
+        elif isinstance(record, ChunkRegisteredEvent):
+            self.index.set_chunk_registered(
+                file_id=record.file_id,
+                chunk_index=record.chunk_index,
+                chunk_hash=record.chunk_hash.hex(),
+                chunk_id=record.chunk_id,
+            )
+        elif isinstance(record, SharedChunkCreatedEvent):
+            self.index.add_shared_chunk(
+                chunk_hash=record.chunk_hash.hex(),
+                chunk_id=record.chunk_id,
+                size=record.size,
+            )
+
+    def sync_files(
+        self,
+    ) -> None:
+        """
+        Fetch the chunk count and size of new or changed files. Neither is part of
+        any event, so each file is read once after creation and once after every
+        batch of chunk registrations, 50 files per request.
+        """
+        file_ids = self.index.get_unsynced_file_ids()
+        for bucket in split_lists_into_sublists(file_ids, 50):
+            for obj in self.mfs._get_objects(bucket):
+                if isinstance(obj, ObjectRead):
+                    manifest = obj.content.fields["manifest"]["fields"]
+                    self.index.set_file_synced(
+                        obj.object_id,
+                        chunk_count=manifest["count"],
+                        size=int(obj.content.fields["size"]),
+                    )
+                else:
+                    # Deleted files keep whatever was last indexed.
+                    self.index.set_file_synced(obj.object_id, None, None)
+            self.index.commit()
@@ -0,0 +1,278 @@
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+# pysui takes a large part of the CLI's startup time, and is only imported once
+# there are transactions to record.
+if TYPE_CHECKING:
+    from pysui.sui.sui_txresults.complex_tx import TxResponse
+
+
+class Instrumentation:
+    """
+    The instrumentation surface used across the SDK's I/O and CPU phases.
+    This base class records nothing; subclasses override `count`, `observe` and `gauge`.
+    Durations are reported to `observe` as seconds under the phase name, and
+    values that move up and down, like a concurrency limit, to `gauge`.
+    """
+
+    def count(
+        self,
+        name: str,
+        value: int = 1,
+    ) -> None:
+        pass
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+    ) -> None:
+        pass
+
+    def gauge(
+        self,
+        name: str,
+        value: float,
+    ) -> None:
+        pass
+
+    @contextmanager
+    def timer(
+        self,
+        name: str,
+    ) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def record_transaction(
+        self,
+        name: str,
+        result: "TxResponse",
+    ) -> None:
+        from pysui.sui.sui_txresults.complex_tx import TxResponse
+
+        if not isinstance(result, TxResponse):
+            return
+        gas_used = result.effects.gas_used
+        self.count("transactions")
+        self.count(f"transactions.{name}")
+        self.count(
+            "gas_used_mist",
+            int(gas_used.computation_cost)
+            + int(gas_used.storage_cost)
+            - int(gas_used.storage_rebate),
+        )
+
+
+class NoopInstrumentation(Instrumentation):
+    @contextmanager
+    def timer(
+        self,
+        name: str,
+    ) -> Iterator[None]:
+        yield
+
+    def record_transaction(
+        self,
+        name: str,
+        result: "TxResponse",
+    ) -> None:
+        pass
+
+
+class RecordingInstrumentation(Instrumentation):
+    """
+    Keeps every observation in memory so a run can be summarized into a report.
+    """
+
+    def __init__(
+        self,
+    ) -> None:
+        self.lock = threading.Lock()
+        self.counters: dict[str, int] = defaultdict(int)
+        self.histograms: dict[str, list[float]] = defaultdict(list)
+        self.gauges: dict[str, list[float]] = defaultdict(list)
+        self.started_at = time.perf_counter()
+
+    def start(
+        self,
+    ) -> None:
+        """
+        Restart the wall clock used for the report's duration and throughput,
+        e.g. after waiting for user confirmation.
+        """
+        self.started_at = time.perf_counter()
+
+    def count(
+        self,
+        name: str,
+        value: int = 1,
+    ) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+    ) -> None:
+        with self.lock:
+            self.histograms[name].append(value)
+
+    def gauge(
+        self,
+        name: str,
+        value: float,
+    ) -> None:
+        with self.lock:
+            self.gauges[name].append(value)
+
+    def report(
+        self,
+    ) -> dict:
+        """
+        Summarize the run into per-phase latency percentiles (in milliseconds),
+        counters, the range and last value of each gauge, throughput,
+        transaction count and net gas spent.
+        """
+        elapsed = time.perf_counter() - self.started_at
+        with self.lock:
+            phases = {
+                name: summarize(values)
+                for name, values in sorted(self.histograms.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+            gauges = {
+                name: {"last": values[-1], "min": min(values), "max": max(values)}
+                for name, values in sorted(self.gauges.items())
+            }
+        bytes_total = counters.get("bytes", 0)
+        return {
+            "duration_s": round(elapsed, 3),
+            "bytes": bytes_total,
+            "bytes_per_s": round(bytes_total / elapsed, 1) if elapsed > 0 else 0,
+            "transactions": counters.get("transactions", 0),
+            "gas_used_mist": counters.get("gas_used_mist", 0),
+            "phases": phases,
+            "counters": counters,
+            "gauges": gauges,
+        }
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Exports counters, histograms and gauges through an OpenTelemetry meter.
+    Requires the optional `opentelemetry-api` package; the meter provider
+    and exporters are configured by the application.
+    """
+
+    def __init__(
+        self,
+        meter=None,
+    ) -> None:
+        try:
+            from opentelemetry import metrics
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryInstrumentation requires the opentelemetry-api package."
+            ) from e
+        self.meter = meter or metrics.get_meter("miraifs_sdk")
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+
+    def count(
+        self,
+        name: str,
+        value: int = 1,
+    ) -> None:
+        with self.lock:
+            counter = self.counters.get(name)
+            if counter is None:
+                counter = self.counters[name] = self.meter.create_counter(
+                    f"miraifs.{name}"
+                )
+        counter.add(value)
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+    ) -> None:
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = self.meter.create_histogram(
+                    f"miraifs.{name}", unit="s"
+                )
+        histogram.record(value)
+
+    def gauge(
+        self,
+        name: str,
+        value: float,
+    ) -> None:
+        with self.lock:
+            gauge = self.gauges.get(name)
+            if gauge is None:
+                gauge = self.gauges[name] = self.meter.create_gauge(f"miraifs.{name}")
+        gauge.set(value)
+
+
+def summarize(
+    values: list[float],
+) -> dict:
+    ordered = sorted(values)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "total_ms": round(sum(ordered) * 1000, 3),
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+_instrumentation: Instrumentation = NoopInstrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
+
+
+def set_instrumentation(
+    instrumentation: Instrumentation,
+) -> None:
+    global _instrumentation
+    _instrumentation = instrumentation
+
+
+def timed(
+    name: str,
+):
+    """
+    Decorator that times every call of a function as the given phase.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_instrumentation().timer(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,40 +1,92 @@
+import queue
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import UTC, datetime
 from pathlib import Path
+from typing import Iterable, Iterator
 
-from miraifs_sdk import MIRAIFS_PACKAGE_ID
+from miraifs_sdk import (
+    CHUNK_INDEX_FIELD_NAME,
+    MAX_CHUNKS_PER_TX,
+    MAX_DIRECTORY_ENTRIES_PER_TX,
+    MAX_FREEZES_PER_TX,
+    MIRAIFS_PACKAGE_ID,
+)
+from miraifs_sdk.cache import ChunkCache
+from miraifs_sdk.compression import (
+    CompressionDictionary,
+    decode_stream,
+    encode_file,
+    get_codec,
+    get_dictionary_id,
+)
+from miraifs_sdk.concurrency import AimdController, RetryableError
+from miraifs_sdk.encryption import decrypt_stream, get_encryption, plaintext_chunk_size
+from miraifs_sdk.events import (
+    ChunkCreatedEvent,
+    FileCreatedEvent,
+    SharedChunkCreatedEvent,
+    decode_events,
+)
+from miraifs_sdk.index import EventIndex, FileIndex
+from miraifs_sdk.metrics import get_instrumentation, timed
 from miraifs_sdk.miraifs.txb.chunk import create_chunk_txb, register_chunks_txb
-from miraifs_sdk.miraifs.txb.file import create_file_txb
+from miraifs_sdk.miraifs.txb.directory import create_directory_txb, update_directory_txb
+from miraifs_sdk.miraifs.txb.file import (
+    create_file_txb,
+    delete_file_txb,
+    freeze_files_txb,
+    update_file_txb,
+)
 from miraifs_sdk.models import (
     Chunk,
+    ChunkRaw,
     CreateChunkCap,
+    Directory,
     File,
+    FileBatch,
     ManifestItem,
     FileChunks,
     GasCoin,
+    IndexedFile,
     RegisterChunkCap,
 )
+from miraifs_sdk.preflight import preflight_file
 from miraifs_sdk.sui import Sui
+from miraifs_sdk.transport import Transport
 from miraifs_sdk.utils import (
+    build_chunks,
     calculate_chunks_manifest_hash,
+    calculate_hash_str,
+    derive_dynamic_field_id,
     get_mime_type_for_file,
     load_chunks,
-    parse_events,
     split_lists_into_sublists,
 )
-from pysui import handle_result
+from pysui import SuiConfig, handle_result
 from pysui.sui.sui_builders.get_builders import (
     GetDynamicFieldObject,
     GetMultipleObjects,
 )
 from pysui.sui.sui_txresults.complex_tx import TxResponse
-from pysui.sui.sui_txresults.single_tx import ObjectRead
+from pysui.sui.sui_txresults.single_tx import AddressOwner, ImmutableOwner, ObjectRead
 from pysui.sui.sui_types import ObjectID, SuiAddress, SuiString
 
+# Compression dictionaries are fetched once per process and shared by all clients.
+_dictionaries: dict[str, CompressionDictionary] = {}
+_dictionaries_lock = threading.Lock()
+
 
 class MiraiFs(Sui):
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(
+        self,
+        config: SuiConfig | None = None,
+        transport: Transport | None = None,
+        chunk_cache: ChunkCache | None = None,
+    ) -> None:
+        super().__init__(config, transport)
+        self.chunk_cache = chunk_cache or ChunkCache()
 
     # File Write Methods
 
@@ -45,73 +97,450 @@ class MiraiFs(Sui):
         chunk_size: int,
         recipient: SuiAddress,
         gas_coin: GasCoin,
+        mime_type: str | None = None,
+        signers: list[str] | None = None,
+        shared_chunks: dict[bytes, ObjectRead] | None = None,
     ) -> tuple[File, Path]:
+        """
+        Create a file and its CreateChunkCaps. With signers, the caps are sent to the
+        signers round-robin instead of the recipient, see upload_chunks. Chunks in
+        shared_chunks get no cap, see find_shared_chunks.
+        """
+        for file, _ in self.create_file_stages(
+            path,
+            chunks,
+            chunk_size,
+            recipient,
+            gas_coin,
+            mime_type,
+            signers,
+            shared_chunks=shared_chunks,
+        ):
+            pass
+        return file, path
+
+    def create_file_stages(
+        self,
+        path: Path,
+        chunks: list[Chunk],
+        chunk_size: int,
+        recipient: SuiAddress,
+        gas_coin: GasCoin,
+        mime_type: str | None = None,
+        signers: list[str] | None = None,
+        stage_size: int = MAX_CHUNKS_PER_TX,
+        shared_chunks: dict[bytes, ObjectRead] | None = None,
+        preflight: bool = True,
+    ) -> Iterator[tuple[File, list[CreateChunkCap]]]:
+        """
+        Create a file in stages of up to stage_size chunks, one transaction each,
+        and yield the file and the CreateChunkCaps of each stage as it's created.
+        The caps of a stage can be uploaded while the next stages are created,
+        e.g. by passing them to upload_chunks as they are yielded.
+
+        Every stage pays with gas_coin. The file yielded last is verified, the
+        ones before it only hold the chunks of the stages so far. Unless preflight
+        is False, the chunks are checked first, and PreflightError is raised
+        before any transaction if one would abort, see preflight_file.
+        """
+        self.check_signers(signers)
         chunks_manifest_hash = calculate_chunks_manifest_hash(chunks)
+        mime_type = mime_type or get_mime_type_for_file(path)
+        if preflight:
+            preflight_file(
+                chunks,
+                chunk_size,
+                mime_type,
+                chunks_manifest_hash.digest(),
+                stage_size,
+                signers,
+            )
+
+        file = None
+        file_obj = None
+        staged_file_cap_obj = None
+        create_chunk_caps_count = 0
+        for start in range(0, max(len(chunks), 1), stage_size):
+            final = start + stage_size >= len(chunks)
+            result = create_file_txb(
+                chunk_size=chunk_size,
+                chunks=chunks[start : start + stage_size],
+                chunks_manifest_hash=chunks_manifest_hash,
+                mime_type=mime_type,
+                recipient=recipient,
+                client=self.client,
+                gas_coin=gas_coin,
+                signers=signers,
+                start=create_chunk_caps_count,
+                final=final,
+                file=file_obj,
+                staged_file_cap=staged_file_cap_obj,
+                shared_chunks=shared_chunks,
+            )
+            gas_coin.balance -= net_gas_used(result)
+            # A stage that aborted leaves nothing for the next one to build on.
+            if not result.succeeded:
+                raise Exception(
+                    f"FAIL: {result.effects.transaction_digest}: {result.effects.status.error}"
+                )
 
-        result = create_file_txb(
-            chunk_size=chunk_size,
-            chunks=chunks,
-            chunks_manifest_hash=chunks_manifest_hash,
-            mime_type=get_mime_type_for_file(path),
-            recipient=recipient,
-            client=self.client,
-            gas_coin=gas_coin,
+            if file is None:
+                events = decode_events(result.events)
+                file_id = next(
+                    (
+                        event.file_id
+                        for event in events
+                        if isinstance(event, FileCreatedEvent)
+                    ),
+                    None,
+                )
+                if file_id is None:
+                    raise Exception(f"FAIL: {result.effects.transaction_digest}")
+                file = self.get_file(file_id)
+            elif final:
+                file = self.get_file(file.id)
+
+            create_chunk_caps, staged_file_cap_obj = self._get_created_caps(result)
+            create_chunk_caps_count += len(create_chunk_caps)
+            if not final:
+                # The next stage passes in the latest version of the file.
+                file_obj = self._get_objects([file.id])[0]
+            yield file, create_chunk_caps
+
+    def diff_chunks(
+        self,
+        file: File,
+        chunks: list[ChunkRaw],
+    ) -> tuple[list[ChunkRaw], list[tuple[int, str]]]:
+        """
+        Compare the chunks of a file's new contents with its manifest. Returns the
+        chunks that changed or were appended, and the (index, chunk ID) pairs of the
+        chunks to remove because they changed or were cut off. Chunk hashes cover
+        the chunk's index, so equal hashes mean the same data in the same place.
+        """
+        manifest = file.chunks.manifest
+        changed = [
+            chunk
+            for chunk in chunks
+            if chunk.index >= len(manifest)
+            or bytes(chunk.hash) != bytes(manifest[chunk.index].hash)
+        ]
+        removed = []
+        for i, item in enumerate(manifest):
+            if i < len(chunks) and bytes(chunks[i].hash) == bytes(item.hash):
+                continue
+            if item.id is None:
+                raise ValueError(
+                    f"Chunk {i} of file {file.id} isn't registered, finish uploading the file before updating it."
+                )
+            removed.append((i, item.id))
+        return changed, removed
+
+    def update_file_stages(
+        self,
+        file: File,
+        chunks: list[ChunkRaw],
+        gas_coin: GasCoin,
+        signers: list[str] | None = None,
+        stage_size: int = MAX_CHUNKS_PER_TX,
+        preflight: bool = True,
+    ) -> Iterator[tuple[File, list[CreateChunkCap]]]:
+        """
+        Update a file to the given chunks, keeping its ID and unchanged chunks, and
+        yield the file and the CreateChunkCaps of the changed chunks like
+        create_file_stages. Upload and register the changed chunks to complete it.
+        """
+        self.check_signers(signers)
+        chunks_manifest_hash = calculate_chunks_manifest_hash(chunks)
+        if preflight:
+            preflight_file(
+                chunks,
+                file.chunks.size,
+                file.mime_type,
+                chunks_manifest_hash.digest(),
+                stage_size,
+                signers,
+            )
+        changed, removed = self.diff_chunks(file, chunks)
+        shared_chunk_ids = self.get_shared_chunk_ids(
+            [chunk_id for _, chunk_id in removed]
         )
 
-        events = parse_events(result.events)
+        changed_by_index = {chunk.index: chunk for chunk in changed}
+        removed_by_index = dict(removed)
+        indices = sorted(changed_by_index.keys() | removed_by_index.keys())
+        # A changed chunk takes two commands, one to remove it and one to add its replacement.
+        step = max(stage_size // 2, 1)
 
-        if len(events) == 0:
-            raise Exception(f"FAIL: {result.effects.transaction_digest}")
+        staged_file_cap_obj = None
+        create_chunk_caps_count = 0
+        for start in range(0, max(len(indices), 1), step):
+            stage = indices[start : start + step]
+            final = start + step >= len(indices)
+            result = update_file_txb(
+                file=self._get_objects([file.id])[0],
+                manifest_length=len(file.chunks.manifest),
+                chunks=[changed_by_index[i] for i in stage if i in changed_by_index],
+                removed=[
+                    (i, removed_by_index[i]) for i in stage if i in removed_by_index
+                ],
+                client=self.client,
+                gas_coin=gas_coin,
+                chunks_manifest_hash=chunks_manifest_hash,
+                count=len(chunks) if final else None,
+                signers=signers,
+                start=create_chunk_caps_count,
+                shared_chunk_ids=shared_chunk_ids,
+                staged_file_cap=staged_file_cap_obj,
+            )
+            gas_coin.balance -= net_gas_used(result)
+            if not result.succeeded:
+                raise Exception(
+                    f"FAIL: {result.effects.transaction_digest}: {result.effects.status.error}"
+                )
+            create_chunk_caps, staged_file_cap_obj = self._get_created_caps(result)
+            create_chunk_caps_count += len(create_chunk_caps)
+            file = self.get_file(file.id)
+            yield file, create_chunk_caps
 
-        for event in events:
-            if event.event_type.endswith("FileCreatedEvent"):
-                file_id = event.event_data["file_id"]
-                file = self.get_file(file_id)
-                return file, path
+    def _get_created_caps(
+        self,
+        result: TxResponse,
+    ) -> tuple[list[CreateChunkCap], ObjectRead | None]:
+        """The CreateChunkCaps by index and the StagedFileCap a transaction created."""
+        create_chunk_caps: list[CreateChunkCap] = []
+        staged_file_cap_obj = None
+        created_ids = [obj.reference.object_id for obj in result.effects.created]
+        for bucket in split_lists_into_sublists(created_ids, 50):
+            for obj in self._get_objects(bucket):
+                if not isinstance(obj, ObjectRead):
+                    continue
+                if obj.object_type.endswith("::chunk::CreateChunkCap"):
+                    create_chunk_caps.append(create_chunk_cap_from_object_read(obj))
+                elif obj.object_type.endswith("::file::StagedFileCap"):
+                    staged_file_cap_obj = obj
+        create_chunk_caps.sort(key=lambda x: x.index)
+        return create_chunk_caps, staged_file_cap_obj
+
+    def find_shared_chunks(
+        self,
+        chunks: list[ChunkRaw],
+        index: EventIndex,
+    ) -> dict[bytes, ObjectRead]:
+        """
+        Find the SharedChunks that already store the data of chunks, by chunk hash,
+        for create_file to reference instead of uploading the data again. Candidates
+        come from the index (see upload_chunks and Indexer) and are only used if
+        they're still frozen SharedChunks with the same data hash on chain.
+        """
+        data_hashes = {
+            bytes(chunk.hash): calculate_hash_str(bytes(chunk.data)) for chunk in chunks
+        }
+        shared_chunk_ids = index.get_shared_chunk_ids(sorted(set(data_hashes.values())))
+        shared_chunk_objs: dict[str, ObjectRead] = {}
+        for bucket in split_lists_into_sublists(
+            sorted(set(shared_chunk_ids.values())), 50
+        ):
+            for obj in self._get_objects(bucket):
+                if (
+                    isinstance(obj, ObjectRead)
+                    and isinstance(obj.owner, ImmutableOwner)
+                    and obj.object_type.endswith("::chunk::SharedChunk")
+                ):
+                    shared_chunk_objs[bytes(obj.content.fields["hash"]).hex()] = obj
+        return {
+            chunk_hash: shared_chunk_objs[data_hash]
+            for chunk_hash, data_hash in data_hashes.items()
+            if data_hash in shared_chunk_objs
+        }
+
+    def check_signers(
+        self,
+        signers: list[str] | None,
+    ) -> None:
+        """Signers must be keystore addresses, or their chunks can't be uploaded."""
+        addresses = {str(address) for address in self.config.addresses}
+        for signer in signers or []:
+            if signer not in addresses:
+                raise ValueError(f"Signer {signer} is not an address in the keystore.")
+
+    def upload_gas_recipients(
+        self,
+        chunk_count: int,
+        signers: list[str] | None,
+    ) -> list[str]:
+        """
+        The owners of the gas coins to allocate for a file: the active address for
+        create_file and register_chunks, and each chunk's signer in between.
+        """
+        active_address = str(self.config.active_address)
+        signers = signers or [active_address]
+        chunk_signers = [signers[i % len(signers)] for i in range(chunk_count)]
+        return [active_address, *chunk_signers, active_address]
 
     def upload_chunks(
         self,
         file: File,
         path: Path,
-        concurrency: int,
+        concurrency: int | None,
         gas_coins: list[GasCoin],
+        chunks: list[ChunkRaw] | None = None,
+        controller: AimdController | None = None,
+        max_retries: int = 5,
+        create_chunk_caps: Iterable[CreateChunkCap] | None = None,
+        share: bool = False,
+        index: EventIndex | None = None,
     ) -> File:
         """
-        Uploads the chunks of a file to the MiraiFS network.
+        Uploads the chunks of a file to the MiraiFS network. Chunks the fullnode
+        rejects without executing, e.g. when it's throttling, are retried with
+        exponential backoff.
+
+        Each chunk is created by the owner of its CreateChunkCap, with a gas coin
+        of the same owner. A file created with signers is uploaded by all of them
+        in parallel, given gas coins allocated to them (see allocate_gas_coins),
+        and each signer's throughput is reported.
 
         Args:
             file (File): The file object to upload chunks for.
             path (Path): The path to the file on disk.
-            concurrency (int, optional): The number of concurrent uploads to perform. Defaults to 8.
-            gas_budget_per_chunk (int, optional): The gas budget per chunk in MIST. Defaults to 3_000_000_000.
+            concurrency (int, optional): The number of concurrent uploads to perform.
+                Defaults to adapting to the fullnode's confirmation latency and rejections.
+            gas_coins (list[GasCoin]): One gas coin per chunk, owned by the chunk's signer.
+            chunks (list[ChunkRaw], optional): The chunks the file was created with.
+                Defaults to reading and, for compressed files, recompressing the file at path.
+            controller (AimdController, optional): Controls the number of concurrent uploads
+                instead of concurrency, e.g. to inspect its decisions afterwards.
+            max_retries (int, optional): Attempts per chunk after a rejection. Defaults to 5.
+            create_chunk_caps (Iterable[CreateChunkCap], optional): The caps to create chunks
+                with, uploaded as they are iterated, e.g. from create_file_stages.
+                Defaults to all of the file's remaining caps.
+            share (bool, optional): Store the chunks as SharedChunks, which later files with
+                the same chunk data can reference instead of uploading it again.
+            index (EventIndex, optional): Records the SharedChunks created with share, for
+                find_shared_chunks to look up.
         """
-        chunks = load_chunks(path, file.chunks.size)
+        if chunks is None:
+            if get_codec(file.mime_type) is not None:
+                dictionary_id = get_dictionary_id(file.mime_type)
+                encoded = encode_file(
+                    path,
+                    compress=True,
+                    dictionary=self.get_dictionary(dictionary_id)
+                    if dictionary_id
+                    else None,
+                )
+                chunks = build_chunks(encoded.data, file.chunks.size)
+            else:
+                chunks = load_chunks(path, file.chunks.size)
         chunks_by_hash = {bytes(chunk.hash): chunk for chunk in chunks}
+        if controller is None:
+            controller = (
+                AimdController()
+                if concurrency is None
+                else AimdController.fixed(concurrency)
+            )
+
+        if create_chunk_caps is None:
+            create_chunk_caps = self.get_create_chunk_caps(file.id)
+        active_address = str(self.config.active_address)
+        gas_coins_by_owner: dict[str, list[GasCoin]] = {}
+        for gas_coin in gas_coins:
+            gas_coins_by_owner.setdefault(gas_coin.owner or active_address, []).append(
+                gas_coin
+            )
 
-        create_chunk_caps = self.get_create_chunk_caps(file.id)
+        # Per signer: chunks, bytes, and the time of the first and last chunk.
+        throughput: dict[str, list] = {}
+        throughput_lock = threading.Lock()
+
+        def create_chunk(
+            create_chunk_cap: CreateChunkCap,
+            chunk: ChunkRaw,
+            gas_coin: GasCoin,
+        ) -> TxResponse:
+            start = time.perf_counter()
+            for attempt in range(max_retries + 1):
+                with controller.slot():
+                    try:
+                        result = create_chunk_txb(
+                            create_chunk_cap,
+                            chunk,
+                            self.client,
+                            gas_coin,
+                            controller,
+                            create_chunk_cap.owner,
+                            share,
+                        )
+                        break
+                    except RetryableError:
+                        if attempt == max_retries:
+                            raise
+                get_instrumentation().count("concurrency.retries")
+                time.sleep(min(8.0, 0.25 * 2**attempt))
+            signer = create_chunk_cap.owner or active_address
+            with throughput_lock:
+                stats = throughput.setdefault(signer, [0, 0, start, start])
+                stats[0] += 1
+                stats[1] += len(chunk.data)
+                stats[2] = min(stats[2], start)
+                stats[3] = time.perf_counter()
+            return result
 
         transaction_digests: list[str] = []
-        with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = []
-            for create_chunk_cap, gas_coin in zip(create_chunk_caps, gas_coins):
+        # Threads wait for the controller's limit, so the pool only bounds how high it can go.
+        with ThreadPoolExecutor(max_workers=controller.maximum) as executor:
+            futures = {}
+            for create_chunk_cap in create_chunk_caps:
+                owner_gas_coins = gas_coins_by_owner.get(
+                    create_chunk_cap.owner or active_address
+                )
+                if not owner_gas_coins:
+                    raise ValueError(
+                        f"No gas coin owned by {create_chunk_cap.owner} for chunk {create_chunk_cap.index}"
+                    )
+                gas_coin = owner_gas_coins.pop(0)
                 print(f"Creating chunk {create_chunk_cap.index} with gas coin {gas_coin.id}")  # fmt: skip
+                chunk = chunks_by_hash[bytes(create_chunk_cap.hash)]
                 future = executor.submit(
-                    create_chunk_txb,
+                    create_chunk,
                     create_chunk_cap,
-                    chunks_by_hash[bytes(create_chunk_cap.hash)],
-                    self.client,
+                    chunk,
                     gas_coin,
                 )
-                futures.append(future)
+                futures[future] = chunk
             for future in as_completed(futures):
                 result = future.result()
                 if isinstance(result, TxResponse):
                     transaction_digests.append(result.effects.transaction_digest)
-                    events = parse_events(result.events)
+                    get_instrumentation().count("chunks")
+                    get_instrumentation().count("bytes", len(futures[future].data))
+                    events = decode_events(result.events)
                     for event in events:
-                        if event.event_type.endswith("ChunkCreatedEvent"):
-                            chunk_id = event.event_data["chunk_id"]
-                            print(f"Created chunk {chunk_id}: {result.effects.transaction_digest}")  # fmt: skip
+                        if isinstance(event, ChunkCreatedEvent):
+                            print(
+                                f"Created chunk {event.chunk_id}: {result.effects.transaction_digest}"
+                            )
+                        elif (
+                            isinstance(event, SharedChunkCreatedEvent)
+                            and index is not None
+                        ):
+                            index.add_shared_chunk(
+                                event.chunk_hash.hex(), event.chunk_id, event.size
+                            )
+            if index is not None:
+                index.commit()
+
+        if set(throughput) - {active_address}:
+            instrumentation = get_instrumentation()
+            for signer, (count, size, first, last) in sorted(throughput.items()):
+                bytes_per_s = size / (last - first) if last > first else 0.0
+                instrumentation.count(f"signers.{signer}.chunks", count)
+                instrumentation.count(f"signers.{signer}.bytes", size)
+                instrumentation.gauge(f"signers.{signer}.bytes_per_s", bytes_per_s)
+                print(
+                    f"Signer {signer}: {count} chunks, {size} bytes in {last - first:.1f}s ({bytes_per_s / 1000:.1f} KB/s)"
+                )
 
         return file
 
@@ -120,68 +549,625 @@ class MiraiFs(Sui):
         file: File,
         gas_coin: GasCoin,
     ):
+        """
+        Register the file's verified chunks, in as many transactions as it takes to
+        stay within the PTB limits, all paid for with gas_coin.
+        """
         register_chunk_caps = self.get_register_chunk_caps(file)
-        result = register_chunks_txb(
-            file,
-            register_chunk_caps,
-            self.client,
-            gas_coin,
-        )
+        result = None
+        for bucket in split_lists_into_sublists(register_chunk_caps, MAX_CHUNKS_PER_TX):
+            result = register_chunks_txb(
+                file,
+                bucket,
+                self.client,
+                gas_coin,
+            )
+            gas_coin.balance -= net_gas_used(result)
         return result
 
+    def delete_file(
+        self,
+        file: File,
+        gas_coin: GasCoin,
+        shared_chunk_ids: set[str] | None = None,
+        batch_size: int = MAX_CHUNKS_PER_TX,
+    ) -> FileBatch:
+        """
+        Drop the file's chunks and delete it, batch_size chunks per transaction, all
+        paid for with gas_coin. SharedChunks are only removed from its manifest, so
+        other files that reference them keep working. Stops at the first failed
+        transaction, which is reported as the batch's error.
+        """
+        if shared_chunk_ids is None:
+            shared_chunk_ids = self.get_shared_chunk_ids(
+                item.id for item in file.chunks.manifest if item.id
+            )
+        indices = [i for i, item in enumerate(file.chunks.manifest) if item.id]
+        buckets = split_lists_into_sublists(indices, batch_size) or [[]]
+        batch = FileBatch(file_ids=[file.id])
+        for i, bucket in enumerate(buckets):
+            result = delete_file_txb(
+                file,
+                self.client,
+                gas_coin,
+                shared_chunk_ids,
+                indices=bucket,
+                destroy=i == len(buckets) - 1,
+            )
+            if not self._record_batch_transaction(batch, result, gas_coin):
+                break
+        return batch
+
+    def delete_many(
+        self,
+        files: list[File],
+        gas_coins: list[GasCoin],
+        batch_size: int = MAX_CHUNKS_PER_TX,
+    ) -> list[FileBatch]:
+        """
+        Delete files concurrently, one per gas coin. Each file leases a coin for all
+        of its transactions, see delete_file, and returns it for the next file.
+        Returns each file's transactions, gas and storage rebate, in file order.
+        """
+        if not files:
+            return []
+        if not gas_coins:
+            raise ValueError(
+                f"Deleting {len(files)} files needs at least one gas coin."
+            )
+        shared_chunk_ids = self.get_shared_chunk_ids(
+            item.id for file in files for item in file.chunks.manifest if item.id
+        )
+        leases: queue.Queue[GasCoin] = queue.Queue()
+        for gas_coin in gas_coins:
+            leases.put(gas_coin)
+
+        def delete(
+            file: File,
+        ) -> FileBatch:
+            gas_coin = leases.get()
+            try:
+                return self.delete_file(file, gas_coin, shared_chunk_ids, batch_size)
+            finally:
+                leases.put(gas_coin)
+
+        with ThreadPoolExecutor(max_workers=len(gas_coins)) as executor:
+            return list(executor.map(delete, files))
+
+    def freeze_file(
+        self,
+        file: File,
+        gas_coin: GasCoin,
+    ) -> FileBatch:
+        return self.freeze_many([file.id], [gas_coin])[0]
+
+    def freeze_many(
+        self,
+        file_ids: list[str],
+        gas_coins: list[GasCoin],
+        batch_size: int = MAX_FREEZES_PER_TX,
+    ) -> list[FileBatch]:
+        """
+        Freeze files batch_size at a time, with the batches running concurrently,
+        one per gas coin. Returns each batch's gas and storage rebate.
+        """
+        if not file_ids:
+            return []
+        if not gas_coins:
+            raise ValueError(
+                f"Freezing {len(file_ids)} files needs at least one gas coin."
+            )
+        leases: queue.Queue[GasCoin] = queue.Queue()
+        for gas_coin in gas_coins:
+            leases.put(gas_coin)
+
+        def freeze(
+            bucket: list[str],
+        ) -> FileBatch:
+            gas_coin = leases.get()
+            try:
+                batch = FileBatch(file_ids=bucket)
+                result = freeze_files_txb(bucket, self.client, gas_coin)
+                self._record_batch_transaction(batch, result, gas_coin)
+                return batch
+            finally:
+                leases.put(gas_coin)
+
+        buckets = split_lists_into_sublists(file_ids, batch_size)
+        with ThreadPoolExecutor(max_workers=len(gas_coins)) as executor:
+            return list(executor.map(freeze, buckets))
+
+    def _record_batch_transaction(
+        self,
+        batch: FileBatch,
+        result: TxResponse,
+        gas_coin: GasCoin,
+    ) -> bool:
+        """Add a transaction's gas to a batch, and return whether it succeeded."""
+        gas_used = result.effects.gas_used
+        batch.transactions += 1
+        batch.gas_used += int(gas_used.computation_cost) + int(gas_used.storage_cost)
+        batch.storage_rebate += int(gas_used.storage_rebate)
+        batch.digest = result.effects.transaction_digest
+        gas_coin.balance -= net_gas_used(result)
+        if not result.succeeded:
+            batch.error = result.effects.status.error or "failed"
+            return False
+        return True
+
+    @timed("get_chunks_for_file")
     def get_chunks_for_file(
         self,
         file: File,
     ):
-        chunk_ids = [chunk.id for chunk in file.chunks.manifest]
-        builder = GetMultipleObjects(object_ids=[ObjectID(id) for id in chunk_ids])
-        chunk_objs = handle_result(self.client.execute(builder))
         chunks: list[Chunk] = []
-        for obj in chunk_objs:
-            if isinstance(obj, ObjectRead):
-                chunk = Chunk(
-                    id=obj.object_id,
-                    index=obj.content.fields["index"],
-                    hash=obj.content.fields["hash"],
-                    data=obj.content.fields["data"],
-                    size=obj.content.fields["size"],
-                )
-                chunks.append(chunk)
-        chunks.sort(key=lambda x: x.index)
+        for i, bucket in enumerate(split_lists_into_sublists(file.chunks.manifest, 50)):
+            chunks_data = self._get_chunks_data([item.id for item in bucket if item.id])
+            for j, item in enumerate(bucket):
+                if item.id in chunks_data:
+                    data = chunks_data[item.id]
+                    chunks.append(
+                        Chunk(
+                            id=item.id,
+                            data=list(data),
+                            hash=item.hash,
+                            index=i * 50 + j,
+                            size=len(data),
+                        )
+                    )
         return chunks
 
+    def read_file(
+        self,
+        file: File,
+        key: bytes | None = None,
+    ) -> Iterator[bytes]:
+        """
+        Stream the contents of a file in order, 50 chunks per request, decrypting
+        them with key and decompressing them on the fly if the file was uploaded
+        encrypted or compressed. SharedChunks are read from the chunk cache when
+        another file already fetched them.
+        """
+        dictionary_id = get_dictionary_id(file.mime_type)
+        dictionary = self.get_dictionary(dictionary_id) if dictionary_id else None
+        parts = decrypt_stream(
+            self._read_chunks(file.chunks.manifest),
+            file.mime_type,
+            key,
+            len(file.chunks.manifest),
+        )
+        return decode_stream(parts, file.mime_type, dictionary)
+
+    def read_range(
+        self,
+        file: File,
+        offset: int,
+        length: int,
+        key: bytes | None = None,
+    ) -> bytes:
+        """
+        Read length bytes of a file from offset, fetching and decrypting only the
+        chunks the range touches. Compressed files can only be read as a whole.
+        """
+        if get_codec(file.mime_type) is not None:
+            raise ValueError(
+                f"File {file.id} is compressed and can only be read as a whole."
+            )
+        if length <= 0:
+            return b""
+        chunk_size = file.chunks.size
+        if get_encryption(file.mime_type) is not None:
+            chunk_size = plaintext_chunk_size(chunk_size)
+        first = offset // chunk_size
+        last = (offset + length - 1) // chunk_size
+        parts = self._read_chunks(file.chunks.manifest[first : last + 1])
+        count = len(file.chunks.manifest)
+        data = b"".join(decrypt_stream(parts, file.mime_type, key, count, first))
+        start = offset - first * chunk_size
+        return data[start : start + length]
+
+    def _read_chunks(
+        self,
+        manifest: list[ManifestItem],
+    ) -> Iterator[bytes]:
+        for bucket in split_lists_into_sublists(manifest, 50):
+            chunks_data = self._get_chunks_data([item.id for item in bucket if item.id])
+            for item in bucket:
+                if item.id is None:
+                    raise ValueError(f"Chunk {bytes(item.hash).hex()} isn't registered")
+                if item.id not in chunks_data:
+                    raise ValueError(f"Chunk {item.id} wasn't found")
+                yield chunks_data[item.id]
+
+    def get_dictionary(
+        self,
+        file_id: str,
+    ) -> CompressionDictionary:
+        """
+        Fetch the compression dictionary stored in a file, caching it for the
+        lifetime of the process.
+        """
+        with _dictionaries_lock:
+            dictionary = _dictionaries.get(file_id)
+            if dictionary is None:
+                file = self.get_file(file_id)
+                dictionary = CompressionDictionary(
+                    file_id=file_id,
+                    data=b"".join(self.read_file(file)),
+                )
+                _dictionaries[file_id] = dictionary
+        return dictionary
+
+    def _get_chunks_data(
+        self,
+        chunk_ids: list[str],
+    ) -> dict[str, bytes]:
+        """
+        Return the data of up to 50 chunks by ID. A file can reference a SharedChunk
+        more than once, and other files can too, so SharedChunks are fetched once
+        and kept in the chunk cache. Deleted chunks are left out.
+        """
+        chunks_data: dict[str, bytes] = {}
+        for chunk_id in chunk_ids:
+            data = self.chunk_cache.get(chunk_id)
+            if data is not None:
+                chunks_data[chunk_id] = data
+        get_instrumentation().count("chunk_cache.hits", len(chunks_data))
+        missing_ids = list(
+            dict.fromkeys(id for id in chunk_ids if id not in chunks_data)
+        )
+        if missing_ids:
+            for obj in self._get_objects(missing_ids):
+                if isinstance(obj, ObjectRead):
+                    data = bytes(obj.content.fields["data"])
+                    chunks_data[obj.object_id] = data
+                    if obj.object_type.endswith("::chunk::SharedChunk"):
+                        self.chunk_cache.put(obj.object_id, data)
+        return chunks_data
+
+    def get_shared_chunk_ids(
+        self,
+        chunk_ids: Iterable[str],
+    ) -> set[str]:
+        """
+        Return the IDs of the SharedChunks among a file's chunk_ids, e.g. for
+        delete_file_txb, which removes them instead of dropping them.
+        """
+        chunk_ids = sorted(set(chunk_ids))
+        shared_chunk_ids: set[str] = set()
+        for bucket in split_lists_into_sublists(chunk_ids, 50):
+            for obj in self._get_objects(bucket):
+                if isinstance(obj, ObjectRead) and obj.object_type.endswith(
+                    "::chunk::SharedChunk"
+                ):
+                    shared_chunk_ids.add(obj.object_id)
+        return shared_chunk_ids
+
+    @timed("get_file")
     def get_file(
         self,
         file_id: str,
     ) -> File:
-        file_obj = handle_result(self.client.get_object(ObjectID(file_id)))
-        if isinstance(file_obj, ObjectRead):
-            manifest: list[ManifestItem] = []
-            for p in file_obj.content.fields["manifest"]["fields"]["chunks"]["fields"]["contents"]:  # fmt: skip
-                partition = ManifestItem(
-                    hash=p["fields"]["key"], id=p["fields"]["value"]
+        return self.get_files([file_id])[0]
+
+    def get_files(
+        self,
+        file_ids: list[str],
+    ) -> list[File]:
+        """
+        Fetch files with their chunk indexes 25 files per request, in the order of
+        file_ids. Raises ValueError if any of them doesn't exist or isn't a File.
+        """
+        files: list[File] = []
+        for bucket in split_lists_into_sublists(file_ids, 25):
+            chunk_index_ids = [
+                derive_dynamic_field_id(file_id, CHUNK_INDEX_FIELD_NAME)
+                for file_id in bucket
+            ]
+            objs = self._get_objects(bucket + chunk_index_ids)
+            for file_id, obj, chunk_index in zip(bucket, objs, objs[len(bucket) :]):
+                if not isinstance(obj, ObjectRead) or not obj.object_type.endswith(
+                    "::file::File"
+                ):
+                    raise ValueError(f"{file_id} is not a MiraiFS file.")
+                files.append(
+                    file_from_object_read(
+                        obj,
+                        chunk_index if isinstance(chunk_index, ObjectRead) else None,
+                    )
                 )
-                manifest.append(partition)
-            file_chunks = FileChunks(
-                count=file_obj.content.fields["manifest"]["fields"]["count"],
-                hash=file_obj.content.fields["manifest"]["fields"]["hash"],
-                manifest=manifest,
-                size=file_obj.content.fields["manifest"]["fields"]["size"],
+        return files
+
+    def get_file_objects(
+        self,
+        file_ids: list[str],
+    ) -> dict[str, ObjectRead]:
+        """
+        Fetch the objects of files by file ID, 50 per request, with their owners.
+        Files that no longer exist, e.g. because they were deleted, are left out.
+        """
+        objs: dict[str, ObjectRead] = {}
+        for bucket in split_lists_into_sublists(file_ids, 50):
+            for obj in self._get_objects(bucket):
+                if isinstance(obj, ObjectRead):
+                    objs[obj.object_id] = obj
+        return objs
+
+    def get_chunk_indexes(
+        self,
+        file_ids: list[str],
+    ) -> dict[str, ObjectRead]:
+        """
+        Fetch the ChunkIndex dynamic fields of files by file ID, 50 per request.
+        Files created by the first version of the package have none until they're
+        migrated, and are left out.
+        """
+        chunk_indexes: dict[str, ObjectRead] = {}
+        for bucket in split_lists_into_sublists(file_ids, 50):
+            chunk_index_ids = [
+                derive_dynamic_field_id(file_id, CHUNK_INDEX_FIELD_NAME)
+                for file_id in bucket
+            ]
+            for file_id, obj in zip(bucket, self._get_objects(chunk_index_ids)):
+                if isinstance(obj, ObjectRead):
+                    chunk_indexes[file_id] = obj
+        return chunk_indexes
+
+    # Directory Methods
+
+    def create_directory(
+        self,
+        entries: dict[str, str],
+        gas_coin: GasCoin,
+        recipient: SuiAddress | None = None,
+        batch_size: int = MAX_DIRECTORY_ENTRIES_PER_TX,
+    ) -> Directory:
+        """
+        Create a directory of file IDs by path, e.g. for the files of a site or a
+        collection, batch_size entries per transaction. The directory stays with the
+        active address until its last entries are added, then goes to recipient.
+        """
+        recipient = recipient or self.config.active_address
+        buckets = split_lists_into_sublists(list(entries.items()), batch_size) or [[]]
+        result = create_directory_txb(
+            dict(buckets[0]),
+            recipient if len(buckets) == 1 else self.config.active_address,
+            self.client,
+            gas_coin,
+        )
+        gas_coin.balance -= net_gas_used(result)
+        if not result.succeeded:
+            raise Exception(
+                f"FAIL: {result.effects.transaction_digest}: {result.effects.status.error}"
+            )
+        created_ids = [obj.reference.object_id for obj in result.effects.created]
+        directory_id = next(
+            obj.object_id
+            for obj in self._get_objects(created_ids)
+            if isinstance(obj, ObjectRead)
+            and obj.object_type.endswith("::directory::Directory")
+        )
+        for i, bucket in enumerate(buckets[1:], 2):
+            self._update_directory(
+                directory_id,
+                gas_coin,
+                added=dict(bucket),
+                recipient=recipient if i == len(buckets) else None,
             )
-            file = File(
-                id=file_obj.object_id,
-                chunks=file_chunks,
-                created_at=datetime.fromtimestamp(int(file_obj.content.fields["created_at"]) / 1000, tz=UTC),
-                mime_type=file_obj.content.fields["mime_type"],
-                size=file_obj.content.fields["size"],
+        return self.get_directory(directory_id)
+
+    def update_directory(
+        self,
+        directory: Directory,
+        entries: dict[str, str],
+        gas_coin: GasCoin,
+        batch_size: int = MAX_DIRECTORY_ENTRIES_PER_TX,
+    ) -> Directory:
+        """
+        Make a directory's entries match entries, removing the paths that aren't in
+        it, pointing the paths whose file changed to the new file and adding new
+        paths, batch_size changes per transaction.
+        """
+        changes = [(path, None) for path in directory.entries if path not in entries]
+        changes += [
+            (path, id)
+            for path, id in entries.items()
+            if directory.entries.get(path, id) != id
+        ]
+        changes += [
+            (path, id) for path, id in entries.items() if path not in directory.entries
+        ]
+        for bucket in split_lists_into_sublists(changes, batch_size):
+            self._update_directory(
+                directory.id,
+                gas_coin,
+                added={path: id for path, id in bucket if id and path not in directory.entries},
+                replaced={path: id for path, id in bucket if id and path in directory.entries},
+                removed=[path for path, id in bucket if id is None],
             )  # fmt: skip
-        return file
+        return self.get_directory(directory.id)
+
+    def _update_directory(
+        self,
+        directory_id: str,
+        gas_coin: GasCoin,
+        added: dict[str, str] | None = None,
+        replaced: dict[str, str] | None = None,
+        removed: list[str] | None = None,
+        recipient: SuiAddress | None = None,
+    ) -> None:
+        result = update_directory_txb(
+            directory_id, self.client, gas_coin, added, replaced, removed, recipient
+        )
+        gas_coin.balance -= net_gas_used(result)
+        if not result.succeeded:
+            raise Exception(
+                f"FAIL: {result.effects.transaction_digest}: {result.effects.status.error}"
+            )
+
+    def get_directory(
+        self,
+        directory_id: str,
+    ) -> Directory:
+        obj = self._get_objects([directory_id])[0]
+        if not isinstance(obj, ObjectRead) or not obj.object_type.endswith(
+            "::directory::Directory"
+        ):
+            raise ValueError(f"{directory_id} is not a MiraiFS directory.")
+        return directory_from_object_read(obj)
+
+    def resolve_directory(
+        self,
+        directory: Directory,
+        concurrency: int = 8,
+    ) -> dict[str, File]:
+        """
+        Fetch the files of every path in a directory, 50 per request with up to
+        concurrency requests at once, so that a directory of hundreds of files
+        resolves in a few round trips. Raises ValueError if a file no longer exists.
+        """
+        file_ids = list(directory.entries.values())
+        buckets = split_lists_into_sublists(file_ids, 50)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            files = [
+                file
+                for bucket in executor.map(self.get_files, buckets)
+                for file in bucket
+            ]
+        return dict(zip(directory.entries, files))
+
+    def get_file_from_index(
+        self,
+        file_id: str,
+        index: EventIndex,
+    ) -> File | None:
+        """
+        Build a File from the local event index without reading from the fullnode.
+        Returns None if the file isn't indexed or its upload isn't complete.
+        """
+        status = index.get_file_status(file_id)
+        if status is None or not status["complete"] or status["size"] is None:
+            return None
+        manifest = [
+            ManifestItem(hash=list(hash), id=chunk_id)
+            for hash, chunk_id in index.get_manifest(file_id)
+        ]
+        return File(
+            id=status["id"],
+            chunks=FileChunks(
+                count=status["chunk_count"],
+                hash=list(bytes.fromhex(status["manifest_hash"])),
+                manifest=manifest,
+                size=status["chunk_size"],
+            ),
+            created_at=status["created_at"],
+            mime_type=status["mime_type"],
+            size=status["size"],
+        )
 
     def list_files(
         self,
-    ):
-        return
+        owner: str,
+        refresh: bool = True,
+        concurrency: int = 8,
+        mime_type: str | None = None,
+        frozen: bool | None = None,
+        limit: int | None = None,
+    ) -> list[IndexedFile]:
+        """
+        List the files owned by an address from the local file index.
+
+        Args:
+            owner (str): The address to list files for.
+            refresh (bool, optional): Refresh the index from the fullnode before listing. Defaults to True.
+            concurrency (int, optional): The number of concurrent object fetches during a refresh. Defaults to 8.
+            mime_type (str, optional): Filter by exact mime type, or by prefix when ending in "/".
+            frozen (bool, optional): Filter by frozen status.
+            limit (int, optional): Maximum number of files to return.
+        """
+        index = FileIndex()
+        try:
+            if refresh:
+                self.refresh_file_index(index, owner, concurrency)
+            return index.list_files(
+                owner,
+                mime_type=mime_type,
+                frozen=frozen,
+                limit=limit,
+            )
+        finally:
+            index.close()
+
+    def refresh_file_index(
+        self,
+        index: FileIndex,
+        owner: str,
+        concurrency: int = 8,
+    ) -> int:
+        """
+        Incrementally refresh the local file index for an owner. Owned File object
+        versions are listed without content, and only new or changed files are fetched
+        in concurrent batches. Files that are no longer owned are marked as frozen or
+        removed from the index. Returns the number of files fetched.
+        """
+        owned_objs = self.get_owned_objects(
+            address=owner,
+            struct_type=f"{MIRAIFS_PACKAGE_ID}::file::File",
+        )
+        owned_versions = {obj.object_id: int(obj.version) for obj in owned_objs}
+        indexed_versions = index.get_versions(owner)
+
+        changed_ids = [
+            id
+            for id, version in owned_versions.items()
+            if indexed_versions.get(id) != version
+        ]
+        gone_ids = [id for id in indexed_versions if id not in owned_versions]
+
+        files: list[IndexedFile] = []
+        frozen_ids: list[str] = []
+        removed_ids: list[str] = []
+        # GetMultipleObjects accepts a maximum of 50 object IDs at a time.
+        buckets = split_lists_into_sublists(changed_ids + gone_ids, 50)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(self._get_objects, bucket) for bucket in buckets]
+            for future in as_completed(futures):
+                for obj in future.result():
+                    if not isinstance(obj, ObjectRead):
+                        removed_ids.append(obj.object_id)
+                    elif (
+                        isinstance(obj.owner, AddressOwner)
+                        and obj.owner.address_owner == owner
+                    ):
+                        files.append(indexed_file_from_object_read(obj, owner))
+                    elif isinstance(obj.owner, ImmutableOwner):
+                        frozen_ids.append(obj.object_id)
+                    else:
+                        removed_ids.append(obj.object_id)
+
+        index.upsert_files(files)
+        index.mark_frozen(frozen_ids)
+        index.remove_files(removed_ids)
+        return len(files)
 
+    def _get_objects(
+        self,
+        object_ids: list[str],
+    ) -> list:
+        return handle_result(
+            self.client.execute(
+                GetMultipleObjects(
+                    object_ids=[ObjectID(id) for id in object_ids],
+                    options={
+                        "showType": True,
+                        "showOwner": True,
+                        "showContent": True,
+                    },
+                )
+            )
+        )
+
+    @timed("get_create_chunk_caps")
     def get_create_chunk_caps(
         self,
         file_id: str,
@@ -220,34 +1206,41 @@ class MiraiFs(Sui):
             )
         )
         if isinstance(create_chunk_cap_df_obj, ObjectRead):
-            create_chunk_cap_ids: list[str] = [
-                obj["fields"]["value"]
-                for obj in create_chunk_cap_df_obj.content.fields["value"]["fields"]["contents"] # fmt: skip
-            ]  # fmt: skip
-            # Split create_chunk_cap_ids into lists of 50 IDs
-            # because GetMultipleObjects accepts a maximum of 50 object IDs at a time.
-            create_chunk_cap_id_buckets: list[list[str]] = split_lists_into_sublists(
-                create_chunk_cap_ids, 50
+            # Caps that were already used are deleted, and skipped below.
+            value = create_chunk_cap_df_obj.content.fields["value"]["fields"]
+            if "contents" in value:
+                # Files that aren't migrated keep a VecMap of the unregistered caps by hash.
+                create_chunk_cap_ids: list[str] = [
+                    e["fields"]["value"] for e in value["contents"]
+                ]
+            else:
+                create_chunk_cap_ids = value["ids"]
+            create_chunk_cap_objs = self.get_create_chunk_caps_by_id(
+                create_chunk_cap_ids
             )
-            for bucket in create_chunk_cap_id_buckets:
-                create_chunk_cap_objs_raw = handle_result(
-                    self.client.execute(
-                        GetMultipleObjects(object_ids=[ObjectID(id) for id in bucket])
-                    )
-                )
-                for obj in create_chunk_cap_objs_raw:
-                    if isinstance(obj, ObjectRead):
-                        create_chunk_cap = CreateChunkCap(
-                            id=obj.object_id,
-                            file_id=obj.content.fields["file_id"],
-                            hash=obj.content.fields["hash"],
-                            index=obj.content.fields["index"],
-                            owner=obj.owner.address_owner,
-                        )
-                        create_chunk_cap_objs.append(create_chunk_cap)
-            create_chunk_cap_objs.sort(key=lambda x: x.index)
         return create_chunk_cap_objs
 
+    def get_create_chunk_caps_by_id(
+        self,
+        object_ids: list[str],
+    ) -> list[CreateChunkCap]:
+        """
+        Fetch the CreateChunkCaps among object_ids, sorted by index. Other objects
+        and caps that were already used are skipped.
+        """
+        create_chunk_cap_objs: list[CreateChunkCap] = []
+        # Split object_ids into lists of 50 IDs
+        # because GetMultipleObjects accepts a maximum of 50 object IDs at a time.
+        for bucket in split_lists_into_sublists(object_ids, 50):
+            for obj in self._get_objects(bucket):
+                if isinstance(obj, ObjectRead) and obj.object_type.endswith(
+                    "::chunk::CreateChunkCap"
+                ):
+                    create_chunk_cap_objs.append(create_chunk_cap_from_object_read(obj))
+        create_chunk_cap_objs.sort(key=lambda x: x.index)
+        return create_chunk_cap_objs
+
+    @timed("get_register_chunk_caps")
     def get_register_chunk_caps(
         self,
         file: File,
@@ -268,3 +1261,93 @@ class MiraiFs(Sui):
                 )
                 register_chunk_caps.append(register_chunk_cap)
         return register_chunk_caps
+
+
+def net_gas_used(
+    result: TxResponse,
+) -> int:
+    """What a transaction took from its gas coin, after the storage rebate."""
+    gas_used = result.effects.gas_used
+    return (
+        int(gas_used.computation_cost)
+        + int(gas_used.storage_cost)
+        - int(gas_used.storage_rebate)
+    )
+
+
+def file_from_object_read(
+    obj: ObjectRead,
+    chunk_index: ObjectRead | None = None,
+) -> File:
+    """
+    Build a File from its object and its ChunkIndex dynamic field. Files created
+    by the first version of the package have no ChunkIndex until they're migrated,
+    and keep their chunks in the manifest's VecMap instead.
+    """
+    fields = obj.content.fields
+    # Manifest entries are in chunk index order.
+    if chunk_index is not None:
+        manifest = [
+            ManifestItem(hash=p["fields"]["hash"], id=p["fields"]["id"])
+            for p in chunk_index.content.fields["value"]["fields"]["chunks"]
+        ]
+    else:
+        manifest = [
+            ManifestItem(hash=p["fields"]["key"], id=p["fields"]["value"])
+            for p in fields["manifest"]["fields"]["chunks"]["fields"]["contents"]
+        ]
+    return File(
+        id=obj.object_id,
+        chunks=FileChunks(
+            count=fields["manifest"]["fields"]["count"],
+            hash=fields["manifest"]["fields"]["hash"],
+            manifest=manifest,
+            size=fields["manifest"]["fields"]["size"],
+        ),
+        created_at=datetime.fromtimestamp(int(fields["created_at"]) / 1000, tz=UTC),
+        mime_type=fields["mime_type"],
+        size=fields["size"],
+    )
+
+
+def directory_from_object_read(
+    obj: ObjectRead,
+) -> Directory:
+    entries = obj.content.fields["entries"]
+    return Directory(
+        id=obj.object_id,
+        entries={e["fields"]["path"]: e["fields"]["file_id"] for e in entries},
+    )
+
+
+def create_chunk_cap_from_object_read(
+    obj: ObjectRead,
+) -> CreateChunkCap:
+    return CreateChunkCap(
+        id=obj.object_id,
+        file_id=obj.content.fields["file_id"],
+        hash=obj.content.fields["hash"],
+        index=obj.content.fields["index"],
+        owner=obj.owner.address_owner,
+    )
+
+
+def indexed_file_from_object_read(
+    obj: ObjectRead,
+    owner: str,
+) -> IndexedFile:
+    manifest = obj.content.fields["manifest"]["fields"]
+    return IndexedFile(
+        id=obj.object_id,
+        owner=owner,
+        version=int(obj.version),
+        chunk_count=manifest["count"],
+        chunk_size=manifest["size"],
+        created_at=datetime.fromtimestamp(
+            int(obj.content.fields["created_at"]) / 1000, tz=UTC
+        ),
+        manifest_hash=bytes(manifest["hash"]).hex(),
+        mime_type=obj.content.fields["mime_type"],
+        size=int(obj.content.fields["size"]),
+        frozen=isinstance(obj.owner, ImmutableOwner),
+    )
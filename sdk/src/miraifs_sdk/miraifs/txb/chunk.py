@@ -1,10 +1,16 @@
+import time
+
 from miraifs_sdk import MIRAIFS_PACKAGE_ID
+from miraifs_sdk.concurrency import AimdController, RetryableError
+from miraifs_sdk.metrics import get_instrumentation
+from miraifs_sdk.transport import is_rejected
 from pysui import SyncClient, handle_result
 from miraifs_sdk.utils import split_list
 from pysui.sui.sui_txn.sync_transaction import SuiTransaction
 from pysui.sui.sui_txresults.complex_tx import TxResponse
 from pysui.sui.sui_types import (
     ObjectID,
+    SuiAddress,
     SuiU8,
 )
 from miraifs_sdk.models import (
@@ -21,6 +27,9 @@ def create_chunk_txb(
     chunk: ChunkRaw,
     client: SyncClient,
     gas_coin: GasCoin,
+    controller: AimdController | None = None,
+    sender: str | None = None,
+    share: bool = False,
 ) -> TxResponse:
     """
     Create a MiraiFS chunk. This transaction requires an explicit gas coin to be provided
@@ -32,39 +41,59 @@ def create_chunk_txb(
         chunk (ChunkRaw): The chunk to create.
         client (SyncClient): The Sui client.
         gas_coin (GasCoin): The gas coin to use for the transaction.
+        controller (AimdController, optional): Fed the confirmation latency of the transaction.
+        sender (str, optional): The keystore address that owns the cap and gas coin.
+            Defaults to the active address.
+        share (bool, optional): Store the chunk as a SharedChunk that other files can reference.
+
+    Raises:
+        RetryableError: The fullnode rejected the transaction without executing it.
     """
-    txer = SuiTransaction(
-        client=client,
-        merge_gas_budget=True,
-    )
-    chunk_arg, verify_chunk_cap_arg = txer.move_call(
-        target=f"{MIRAIFS_PACKAGE_ID}::chunk::new",
-        arguments=[ObjectID(create_chunk_cap.id)],
-    )
-    for bucket in split_list(chunk.data):
-        vec = [[SuiU8(n) for n in subbucket] for subbucket in bucket]
-        # Reverse the chunks because the add_data() function in the smart contract uses pop_back() instead of remove(0).
-        vec.reverse()
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("create_chunk.build"):
+        txer = SuiTransaction(
+            client=client,
+            merge_gas_budget=True,
+            initial_sender=SuiAddress(sender) if sender else None,
+        )
+        chunk_arg, verify_chunk_cap_arg = txer.move_call(
+            target=f"{MIRAIFS_PACKAGE_ID}::chunk::new",
+            arguments=[ObjectID(create_chunk_cap.id)],
+        )
+        for bucket in split_list(chunk.data):
+            vec = [[SuiU8(n) for n in subbucket] for subbucket in bucket]
+            # Reverse the chunks because the add_data() function in the smart contract uses pop_back() instead of remove(0).
+            vec.reverse()
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::chunk::add_data",
+                arguments=[
+                    chunk_arg,
+                    vec,
+                ],
+            )
         txer.move_call(
-            target=f"{MIRAIFS_PACKAGE_ID}::chunk::add_data",
+            target=f"{MIRAIFS_PACKAGE_ID}::chunk::verify_and_share"
+            if share
+            else f"{MIRAIFS_PACKAGE_ID}::chunk::verify",
             arguments=[
+                verify_chunk_cap_arg,
                 chunk_arg,
-                vec,
             ],
         )
-    txer.move_call(
-        target=f"{MIRAIFS_PACKAGE_ID}::chunk::verify",
-        arguments=[
-            verify_chunk_cap_arg,
-            chunk_arg,
-        ],
-    )
-    result = handle_result(
-        txer.execute(
+    with instrumentation.timer("create_chunk.submit"):
+        start = time.perf_counter()
+        response = txer.execute(
             gas_budget=gas_coin.balance,
             use_gas_object=ObjectID(gas_coin.id),
-        ),
-    )
+        )
+        latency = time.perf_counter() - start
+    rejected = is_rejected(response)
+    if controller:
+        controller.record(latency, rejected)
+    if rejected:
+        raise RetryableError(response.result_string)
+    result = handle_result(response)
+    instrumentation.record_transaction("create_chunk", result)
     return result
 
 
@@ -74,21 +103,25 @@ def register_chunks_txb(
     client: SyncClient,
     gas_coin: GasCoin,
 ) -> TxResponse:
-    txer = SuiTransaction(
-        client=client,
-    )
-    for cap in register_chunk_caps:
-        txer.move_call(
-            target=f"{MIRAIFS_PACKAGE_ID}::file::receive_and_register_chunk",
-            arguments=[
-                ObjectID(file.id),
-                ObjectID(cap.id),
-            ],
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("register_chunks.build"):
+        txer = SuiTransaction(
+            client=client,
         )
-    result = handle_result(
-        txer.execute(
-            gas_budget=gas_coin.balance,
-            use_gas_object=ObjectID(gas_coin.id),
-        ),
-    )
+        for cap in register_chunk_caps:
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::receive_and_register_chunk",
+                arguments=[
+                    ObjectID(file.id),
+                    ObjectID(cap.id),
+                ],
+            )
+    with instrumentation.timer("register_chunks.submit"):
+        result = handle_result(
+            txer.execute(
+                gas_budget=gas_coin.balance,
+                use_gas_object=ObjectID(gas_coin.id),
+            ),
+        )
+    instrumentation.record_transaction("register_chunks", result)
     return result
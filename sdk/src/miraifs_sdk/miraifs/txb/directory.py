@@ -0,0 +1,117 @@
+from miraifs_sdk import MIRAIFS_PACKAGE_ID
+from miraifs_sdk.metrics import get_instrumentation
+from miraifs_sdk.models import GasCoin
+from pysui import SyncClient, handle_result
+from pysui.sui.sui_txn.sync_transaction import SuiTransaction
+from pysui.sui.sui_txresults.complex_tx import TxResponse
+from pysui.sui.sui_types import ObjectID, SuiAddress, SuiString
+
+
+def create_directory_txb(
+    entries: dict[str, str],
+    recipient: SuiAddress,
+    client: SyncClient,
+    gas_coin: GasCoin,
+) -> TxResponse:
+    """
+    Create a directory with entries of path to file ID, and send it to recipient.
+    Directories with more entries than fit in one transaction are created with the
+    first of them, and the rest are added with update_directory_txb.
+    """
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("create_directory.build"):
+        txer = SuiTransaction(
+            client=client,
+            compress_inputs=True,
+            merge_gas_budget=True,
+        )
+        directory = txer.move_call(
+            target=f"{MIRAIFS_PACKAGE_ID}::directory::new",
+            arguments=[],
+        )
+        _add_entries(txer, directory, entries)
+        txer.transfer_objects(
+            transfers=[directory],
+            recipient=recipient,
+        )
+    with instrumentation.timer("create_directory.submit"):
+        result = handle_result(
+            txer.execute(
+                gas_budget=gas_coin.balance,
+                use_gas_object=ObjectID(gas_coin.id),
+            ),
+        )
+    instrumentation.record_transaction("create_directory", result)
+    return result
+
+
+def update_directory_txb(
+    directory_id: str,
+    client: SyncClient,
+    gas_coin: GasCoin,
+    added: dict[str, str] | None = None,
+    replaced: dict[str, str] | None = None,
+    removed: list[str] | None = None,
+    recipient: SuiAddress | None = None,
+) -> TxResponse:
+    """
+    Remove paths from a directory, point existing paths to other files and add new
+    ones, in that order. With a recipient, the directory is sent to it afterwards.
+    """
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("update_directory.build"):
+        txer = SuiTransaction(
+            client=client,
+            compress_inputs=True,
+            merge_gas_budget=True,
+        )
+        directory = ObjectID(directory_id)
+        for path in removed or []:
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::directory::remove",
+                arguments=[
+                    directory,
+                    SuiString(path),
+                ],
+            )
+        for path, file_id in (replaced or {}).items():
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::directory::replace",
+                arguments=[
+                    directory,
+                    SuiString(path),
+                    SuiAddress(file_id),
+                ],
+            )
+        _add_entries(txer, directory, added or {})
+        if recipient is not None:
+            txer.transfer_objects(
+                transfers=[directory],
+                recipient=recipient,
+            )
+    with instrumentation.timer("update_directory.submit"):
+        result = handle_result(
+            txer.execute(
+                gas_budget=gas_coin.balance,
+                use_gas_object=ObjectID(gas_coin.id),
+            ),
+        )
+    instrumentation.record_transaction("update_directory", result)
+    return result
+
+
+def _add_entries(
+    txer: SuiTransaction,
+    directory,
+    entries: dict[str, str],
+) -> None:
+    for path, file_id in entries.items():
+        # File IDs are passed as pure addresses, which have the same BCS encoding as an ID.
+        txer.move_call(
+            target=f"{MIRAIFS_PACKAGE_ID}::directory::add",
+            arguments=[
+                directory,
+                SuiString(path),
+                SuiAddress(file_id),
+            ],
+        )
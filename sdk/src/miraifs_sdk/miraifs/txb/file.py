@@ -1,10 +1,12 @@
 from hashlib import blake2b
 from miraifs_sdk import MIRAIFS_PACKAGE_ID
-from miraifs_sdk.models import Chunk, File, GasCoin
+from miraifs_sdk.metrics import get_instrumentation
+from miraifs_sdk.models import Chunk, ChunkRaw, File, GasCoin
 from pysui import SyncClient, handle_result
 from pysui.sui.sui_txn.sync_transaction import SuiTransaction
 from pysui.sui.sui_txresults.complex_tx import TxResponse
-from pysui.sui.sui_types import ObjectID, SuiAddress, SuiString, SuiU8, SuiU32
+from pysui.sui.sui_txresults.single_tx import ObjectRead
+from pysui.sui.sui_types import ObjectID, SuiAddress, SuiString, SuiU8, SuiU32, SuiU64
 
 
 def create_file_txb(
@@ -15,52 +17,243 @@ def create_file_txb(
     recipient: SuiAddress,
     client: SyncClient,
     gas_coin: GasCoin,
+    signers: list[str] | None = None,
+    start: int = 0,
+    final: bool = True,
+    file: ObjectRead | None = None,
+    staged_file_cap: ObjectRead | None = None,
+    shared_chunks: dict[bytes, ObjectRead] | None = None,
 ) -> TxResponse:
-    txer = SuiTransaction(
-        client=client,
-        merge_gas_budget=True,
-    )
-    file, verify_file_cap = txer.move_call(
-        target=f"{MIRAIFS_PACKAGE_ID}::file::new",
-        arguments=[
-            SuiU32(chunk_size),
-            SuiString(mime_type),
-            [SuiU8(e) for e in list(chunks_manifest_hash.digest())],
-            ObjectID("0x6"),
-        ],
-    )
-    create_chunk_caps = []
-    for chunk in chunks:
-        create_chunk_cap = txer.move_call(
-            target=f"{MIRAIFS_PACKAGE_ID}::file::add_chunk_hash",
-            arguments=[
-                verify_file_cap,
-                file,
-                [SuiU8(e) for e in list(chunk.hash)],
-            ],
+    """
+    Create a MiraiFS file and a CreateChunkCap for each of its chunks. The caps go to
+    the recipient, or round-robin to the signers that will create the chunks.
+
+    Files with more chunks than fit in one transaction are created in stages: the
+    first stage creates the file, each stage adds the hashes of the next chunks and
+    all but the final one keep verification open with a StagedFileCap. Until the
+    final stage the file and StagedFileCap stay with the sender, and later stages
+    pass them in. start is the number of caps earlier stages created, so that the
+    signers take turns across stages.
+
+    Chunks whose hash is in shared_chunks reference that SharedChunk instead of
+    getting a cap, see find_shared_chunks.
+    """
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("create_file.build"):
+        txer = SuiTransaction(
+            client=client,
+            compress_inputs=True,
+            merge_gas_budget=True,
+        )
+        if file is None:
+            file, verify_file_cap = txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::new",
+                arguments=[
+                    SuiU32(chunk_size),
+                    SuiString(mime_type),
+                    [SuiU8(e) for e in list(chunks_manifest_hash.digest())],
+                    ObjectID("0x6"),
+                ],
+            )
+            new_file = True
+        else:
+            verify_file_cap = txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::unstage",
+                arguments=[staged_file_cap],
+            )
+            new_file = False
+        create_chunk_caps = []
+        for chunk in chunks:
+            shared_chunk = (shared_chunks or {}).get(bytes(chunk.hash))
+            if shared_chunk is not None:
+                txer.move_call(
+                    target=f"{MIRAIFS_PACKAGE_ID}::file::add_shared_chunk",
+                    arguments=[
+                        verify_file_cap,
+                        file,
+                        shared_chunk,
+                    ],
+                )
+                continue
+            create_chunk_cap = txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::add_chunk_hash",
+                arguments=[
+                    verify_file_cap,
+                    file,
+                    [SuiU8(e) for e in list(chunk.hash)],
+                ],
+            )
+            create_chunk_caps.append(create_chunk_cap)
+        if signers:
+            for i, signer in enumerate(signers):
+                offset = (i - start) % len(signers)
+                if offset < len(create_chunk_caps):
+                    txer.transfer_objects(
+                        transfers=create_chunk_caps[offset :: len(signers)],
+                        recipient=SuiAddress(signer),
+                    )
+        else:
+            txer.transfer_objects(
+                transfers=create_chunk_caps,
+                recipient=recipient,
+            )
+        if final:
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::verify",
+                arguments=[
+                    verify_file_cap,
+                    file,
+                ],
+            )
+            txer.transfer_objects(
+                transfers=[file],
+                recipient=recipient,
+            )
+        else:
+            staged_file_cap = txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::stage",
+                arguments=[verify_file_cap],
+            )
+            txer.transfer_objects(
+                transfers=[staged_file_cap, file] if new_file else [staged_file_cap],
+                recipient=client.config.active_address,
+            )
+    with instrumentation.timer("create_file.submit"):
+        result = handle_result(
+            txer.execute(
+                gas_budget=gas_coin.balance,
+                use_gas_object=ObjectID(gas_coin.id),
+            ),
+        )
+    instrumentation.record_transaction("create_file", result)
+    return result
+
+
+def update_file_txb(
+    file: ObjectRead,
+    manifest_length: int,
+    chunks: list[ChunkRaw],
+    removed: list[tuple[int, str]],
+    client: SyncClient,
+    gas_coin: GasCoin,
+    chunks_manifest_hash: blake2b | None = None,
+    count: int | None = None,
+    signers: list[str] | None = None,
+    start: int = 0,
+    shared_chunk_ids: set[str] | None = None,
+    staged_file_cap: ObjectRead | None = None,
+) -> TxResponse:
+    """
+    Update a MiraiFS file in place: drop the removed (index, chunk ID) pairs, then
+    add a CreateChunkCap for each of chunks, replacing the chunk at its index if
+    it's among the manifest_length entries of the file's manifest or appending it.
+    Chunks that aren't removed stay as they are.
+
+    Like create_file_txb, large updates are made in stages. The first stage begins
+    the update with chunks_manifest_hash, the final one cuts the file off after
+    count chunks and verifies it, and the ones in between pass a StagedFileCap on.
+    """
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("update_file.build"):
+        txer = SuiTransaction(
+            client=client,
+            compress_inputs=True,
+            merge_gas_budget=True,
+        )
+        if staged_file_cap is None:
+            verify_file_cap = txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::begin_update",
+                arguments=[
+                    file,
+                    [SuiU8(e) for e in list(chunks_manifest_hash.digest())],
+                ],
+            )
+        else:
+            verify_file_cap = txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::unstage",
+                arguments=[staged_file_cap],
+            )
+        for index, chunk_id in removed:
+            if chunk_id in (shared_chunk_ids or set()):
+                txer.move_call(
+                    target=f"{MIRAIFS_PACKAGE_ID}::file::remove_shared_chunk",
+                    arguments=[
+                        file,
+                        ObjectID(chunk_id),
+                        SuiU64(index),
+                    ],
+                )
+            else:
+                txer.move_call(
+                    target=f"{MIRAIFS_PACKAGE_ID}::file::receive_and_drop_chunk",
+                    arguments=[
+                        file,
+                        ObjectID(chunk_id),
+                    ],
+                )
+        create_chunk_caps = []
+        for chunk in chunks:
+            if chunk.index < manifest_length:
+                create_chunk_cap = txer.move_call(
+                    target=f"{MIRAIFS_PACKAGE_ID}::file::replace_chunk_hash",
+                    arguments=[
+                        verify_file_cap,
+                        file,
+                        SuiU64(chunk.index),
+                        [SuiU8(e) for e in list(chunk.hash)],
+                    ],
+                )
+            else:
+                create_chunk_cap = txer.move_call(
+                    target=f"{MIRAIFS_PACKAGE_ID}::file::add_chunk_hash",
+                    arguments=[
+                        verify_file_cap,
+                        file,
+                        [SuiU8(e) for e in list(chunk.hash)],
+                    ],
+                )
+            create_chunk_caps.append(create_chunk_cap)
+        recipients = signers or [client.config.active_address]
+        for i, recipient in enumerate(recipients):
+            offset = (i - start) % len(recipients)
+            if offset < len(create_chunk_caps):
+                txer.transfer_objects(
+                    transfers=create_chunk_caps[offset :: len(recipients)],
+                    recipient=SuiAddress(recipient) if signers else recipient,
+                )
+        if count is not None:
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::truncate",
+                arguments=[
+                    verify_file_cap,
+                    file,
+                    SuiU64(count),
+                ],
+            )
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::verify",
+                arguments=[
+                    verify_file_cap,
+                    file,
+                ],
+            )
+        else:
+            staged_file_cap = txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::stage",
+                arguments=[verify_file_cap],
+            )
+            txer.transfer_objects(
+                transfers=[staged_file_cap],
+                recipient=client.config.active_address,
+            )
+    with instrumentation.timer("update_file.submit"):
+        result = handle_result(
+            txer.execute(
+                gas_budget=gas_coin.balance,
+                use_gas_object=ObjectID(gas_coin.id),
+            ),
         )
-        create_chunk_caps.append(create_chunk_cap)
-    txer.transfer_objects(
-        transfers=create_chunk_caps,
-        recipient=recipient,
-    )
-    txer.move_call(
-        target=f"{MIRAIFS_PACKAGE_ID}::file::verify",
-        arguments=[
-            verify_file_cap,
-            file,
-        ],
-    )
-    txer.transfer_objects(
-        transfers=[file],
-        recipient=recipient,
-    )
-    result = handle_result(
-        txer.execute(
-            gas_budget=gas_coin.balance,
-            use_gas_object=ObjectID(gas_coin.id),
-        ),
-    )
+    instrumentation.record_transaction("update_file", result)
     return result
 
 
@@ -68,52 +261,92 @@ def delete_file_txb(
     file: File,
     client: SyncClient,
     gas_coin: GasCoin,
+    shared_chunk_ids: set[str] | None = None,
+    indices: list[int] | None = None,
+    destroy: bool = True,
 ) -> TxResponse:
-    txer = SuiTransaction(
-        client=client,
-        merge_gas_budget=True,
-    )
-    for item in file.chunks.manifest:
-        txer.move_call(
-            target=f"{MIRAIFS_PACKAGE_ID}::file::receive_and_drop_chunk",
-            arguments=[
-                ObjectID(file.id),
-                ObjectID(item.id),
-            ],
+    """
+    Drop the file's chunks and delete it. The chunks in shared_chunk_ids are
+    SharedChunks, which are only removed from the manifest, see get_shared_chunk_ids.
+
+    Files with more chunks than fit in one transaction are deleted in batches:
+    each drops the chunks at the next indices of the manifest, and only the last
+    one destroys the file.
+    """
+    if indices is None:
+        indices = list(range(len(file.chunks.manifest)))
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("delete_file.build"):
+        txer = SuiTransaction(
+            client=client,
+            compress_inputs=True,
+            merge_gas_budget=True,
+        )
+        for i in indices:
+            item = file.chunks.manifest[i]
+            if item.id is None:
+                continue
+            if item.id in (shared_chunk_ids or set()):
+                txer.move_call(
+                    target=f"{MIRAIFS_PACKAGE_ID}::file::remove_shared_chunk",
+                    arguments=[
+                        ObjectID(file.id),
+                        ObjectID(item.id),
+                        SuiU64(i),
+                    ],
+                )
+                continue
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::receive_and_drop_chunk",
+                arguments=[
+                    ObjectID(file.id),
+                    ObjectID(item.id),
+                ],
+            )
+        if destroy:
+            txer.move_call(
+                target=f"{MIRAIFS_PACKAGE_ID}::file::destroy_empty",
+                arguments=[
+                    ObjectID(file.id),
+                ],
+            )
+    with instrumentation.timer("delete_file.submit"):
+        result = handle_result(
+            txer.execute(
+                gas_budget=gas_coin.balance,
+                use_gas_object=ObjectID(gas_coin.id),
+            ),
         )
-    txer.move_call(
-        target=f"{MIRAIFS_PACKAGE_ID}::file::destroy_empty",
-        arguments=[
-            ObjectID(file.id),
-        ],
-    )
-    result = handle_result(
-        txer.execute(
-            gas_budget=gas_coin.balance,
-            use_gas_object=ObjectID(gas_coin.id),
-        ),
-    )
+    instrumentation.record_transaction("delete_file", result)
     return result
 
 
-def freeze_file_txb(
-    file: File,
+def freeze_files_txb(
+    file_ids: list[str],
     client: SyncClient,
     gas_coin: GasCoin,
-):
-    txer = SuiTransaction(
-        client=client,
-        merge_gas_budget=True,
-    )
-    txer.move_call(
-        target="0x2::transfer::public_freeze_object",
-        arguments=[ObjectID(file.id)],
-        type_arguments=[f"{MIRAIFS_PACKAGE_ID}::file::File"],
-    )
-    result = handle_result(
-        txer.execute(
-            gas_budget=gas_coin.balance,
-            use_gas_object=ObjectID(gas_coin.id),
-        ),
-    )
+) -> TxResponse:
+    """
+    Freeze any number of files that fit in one transaction, see MAX_FREEZES_PER_TX.
+    """
+    instrumentation = get_instrumentation()
+    with instrumentation.timer("freeze_file.build"):
+        txer = SuiTransaction(
+            client=client,
+            merge_gas_budget=True,
+        )
+        for file_id in file_ids:
+            txer.move_call(
+                target="0x2::transfer::public_freeze_object",
+                arguments=[ObjectID(file_id)],
+                type_arguments=[f"{MIRAIFS_PACKAGE_ID}::file::File"],
+            )
+    with instrumentation.timer("freeze_file.submit"):
+        result = handle_result(
+            txer.execute(
+                gas_budget=gas_coin.balance,
+                use_gas_object=ObjectID(gas_coin.id),
+            ),
+        )
+    instrumentation.record_transaction("freeze_file", result)
     return result
@@ -23,6 +23,25 @@ class File(BaseModel):
     size: int
 
 
+class Directory(BaseModel):
+    id: str
+    # File IDs by path, in the directory's entry order.
+    entries: dict[str, str]
+
+
+class IndexedFile(BaseModel):
+    id: str
+    owner: str
+    version: int
+    chunk_count: int
+    chunk_size: int
+    created_at: datetime
+    manifest_hash: str
+    mime_type: str
+    size: int
+    frozen: bool
+
+
 class Chunk(BaseModel):
     id: str
     data: list[int]
@@ -42,6 +61,7 @@ class CreateChunkCap(BaseModel):
     file_id: str
     hash: list[int]
     index: int
+    owner: Optional[str] = None
 
 
 class RegisterChunkCap(BaseModel):
@@ -54,6 +74,28 @@ class RegisterChunkCap(BaseModel):
 class GasCoin(BaseModel):
     id: str
     balance: int
+    # None for coins owned by the active address.
+    owner: Optional[str] = None
+
+
+class FileBatch(BaseModel):
+    file_ids: list[str]
+    transactions: int = 0
+    # Computation and storage cost, before the storage rebate.
+    gas_used: int = 0
+    storage_rebate: int = 0
+    digest: Optional[str] = None
+    error: Optional[str] = None
+
+
+class MergeBatch(BaseModel):
+    round: int
+    gas_coin: GasCoin
+    coins: list[GasCoin]
+    input_objects: int
+    gas_used: Optional[int] = None
+    digest: Optional[str] = None
+    error: Optional[str] = None
 
 
 class ParsedEvent(BaseModel):
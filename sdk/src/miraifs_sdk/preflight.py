@@ -0,0 +1,433 @@
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from miraifs_sdk import MAX_CHUNK_SIZE_BYTES, MAX_CHUNKS_PER_TX, SPLIT_BATCH_SIZE
+from miraifs_sdk.metrics import timed
+from miraifs_sdk.models import ChunkRaw
+from miraifs_sdk.utils import (
+    calculate_chunks_manifest_hash,
+    calculate_hash,
+    calculate_unique_chunk_hash,
+    split_list,
+)
+
+# Sui protocol limits that MiraiFS transactions run into.
+MAX_TX_SIZE_BYTES = 131_072
+MAX_PURE_ARGUMENT_SIZE = 16_384
+MAX_PROGRAMMABLE_TX_COMMANDS = 1_024
+MAX_ARGUMENTS = 512
+MAX_INPUT_OBJECTS = 2_048
+
+HASH_LENGTH = 32
+# Chunk indices are cast to u16 on-chain.
+MAX_CHUNK_COUNT = 2**16
+
+# The BCS size of a transaction besides its inputs and commands: its sender, gas
+# payment, owner, price, budget and expiration, rounded up.
+TX_OVERHEAD_BYTES = 256
+# An owned object input: its ID, version and digest.
+OBJECT_INPUT_BYTES = 75
+# A command argument, at most a NestedResult of a tag and two u16s.
+ARGUMENT_BYTES = 5
+
+
+@dataclass
+class PreflightFailure:
+    """
+    A check that would fail on-chain: the Move function that would abort and its
+    error constant, or "ptb" and the protocol limit a transaction would exceed.
+    Chunks larger than their file's chunk size are accepted on-chain, but break
+    range reads, and fail as "chunk".
+    """
+
+    function: str
+    error: str
+    message: str
+    index: int | None = None
+
+    def __str__(self) -> str:
+        chunk = f"chunk {self.index}: " if self.index is not None else ""
+        return f"{self.function} {self.error}: {chunk}{self.message}"
+
+
+class PreflightError(ValueError):
+    """An upload failed its preflight checks, before any transaction was submitted."""
+
+    def __init__(
+        self,
+        failures: list[PreflightFailure],
+    ) -> None:
+        self.failures = failures
+        lines = [str(failure) for failure in failures[:10]]
+        if len(failures) > 10:
+            lines.append(f"... and {len(failures) - 10} more")
+        super().__init__("Preflight failed:\n" + "\n".join(lines))
+
+
+@timed("preflight")
+def check_file(
+    chunks: list[ChunkRaw],
+    chunk_size: int,
+    mime_type: str,
+    chunks_hash: bytes | None = None,
+    stage_size: int = MAX_CHUNKS_PER_TX,
+    signers: list[str] | None = None,
+    max_workers: int | None = None,
+) -> list[PreflightFailure]:
+    """
+    Run the checks the Move package makes while a file is created, verified and
+    its chunks are created, and the protocol limits of the transactions that do
+    it, without submitting anything. chunks_hash is the manifest hash the file is
+    created with, calculated from the chunks by default. Chunks are checked across
+    threads. Returns the failures, in chunk order.
+    """
+    if chunks_hash is None:
+        chunks_hash = calculate_chunks_manifest_hash(chunks).digest()
+    failures: list[PreflightFailure] = []
+
+    # file::new
+    if chunk_size > MAX_CHUNK_SIZE_BYTES:
+        failures.append(
+            PreflightFailure(
+                "file::new",
+                "EMaxChunkSizeExceeded",
+                f"chunk size {chunk_size} exceeds {MAX_CHUNK_SIZE_BYTES}",
+            )
+        )
+    if len(chunks_hash) != HASH_LENGTH:
+        failures.append(
+            PreflightFailure(
+                "file::new",
+                "EInvalidHashLength",
+                f"manifest hash is {len(chunks_hash)} bytes",
+            )
+        )
+    if _pure_size(len(mime_type.encode())) > MAX_PURE_ARGUMENT_SIZE:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_PURE_ARGUMENT_SIZE",
+                f"mime type is {len(mime_type.encode())} bytes",
+            )
+        )
+
+    # file::add_chunk_hash
+    if len(chunks) > MAX_CHUNK_COUNT:
+        failures.append(
+            PreflightFailure(
+                "file::add_chunk_hash",
+                "ArithmeticError",
+                f"{len(chunks)} chunks don't fit a u16 index",
+            )
+        )
+    seen: set[bytes] = set()
+    for i, chunk in enumerate(chunks):
+        hash = bytes(chunk.hash)
+        if len(hash) != HASH_LENGTH:
+            failures.append(
+                PreflightFailure(
+                    "file::add_chunk_hash",
+                    "EInvalidHashLength",
+                    f"hash is {len(hash)} bytes",
+                    i,
+                )
+            )
+        if hash in seen:
+            failures.append(
+                PreflightFailure(
+                    "file::add_chunk_hash",
+                    "EFieldAlreadyExists",
+                    "duplicate chunk hash",
+                    i,
+                )
+            )
+        seen.add(hash)
+        if chunk.index != i:
+            failures.append(
+                PreflightFailure(
+                    "chunk::verify",
+                    "EChunkHashMismatch",
+                    f"chunk was hashed for index {chunk.index}",
+                    i,
+                )
+            )
+
+    # file::verify
+    if calculate_chunks_manifest_hash(chunks).digest() != bytes(chunks_hash):
+        failures.append(
+            PreflightFailure(
+                "file::verify",
+                "EVerificationHashMismatch",
+                "chunk hashes don't match the manifest hash",
+            )
+        )
+
+    failures += check_file_stage(
+        len(mime_type.encode()), min(len(chunks), stage_size), len(signers or [])
+    )
+
+    # chunk::verify and the create_chunk transactions, one per chunk.
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        for chunk_failures in executor.map(
+            check_chunk, chunks, [chunk_size] * len(chunks)
+        ):
+            failures += chunk_failures
+    return failures
+
+
+def preflight_file(
+    chunks: list[ChunkRaw],
+    chunk_size: int,
+    mime_type: str,
+    chunks_hash: bytes | None = None,
+    stage_size: int = MAX_CHUNKS_PER_TX,
+    signers: list[str] | None = None,
+    max_workers: int | None = None,
+) -> None:
+    """Like check_file, but raises PreflightError if any check fails."""
+    failures = check_file(
+        chunks, chunk_size, mime_type, chunks_hash, stage_size, signers, max_workers
+    )
+    if failures:
+        raise PreflightError(failures)
+
+
+def check_chunk(
+    chunk: ChunkRaw,
+    chunk_size: int,
+) -> list[PreflightFailure]:
+    """
+    Check a chunk the way chunk::verify does, and the size of the transaction
+    that creates it, see create_chunk_txb.
+    """
+    failures: list[PreflightFailure] = []
+    data = bytes(chunk.data)
+    if len(data) > chunk_size:
+        failures.append(
+            PreflightFailure(
+                "chunk",
+                "ChunkSizeExceeded",
+                f"{len(data)} bytes exceed the chunk size of {chunk_size}",
+                chunk.index,
+            )
+        )
+    # calculate_chunk_identifier_hash reverses the u16's little-endian BCS bytes,
+    # i.e. hashes the index big-endian, like calculate_unique_chunk_hash.
+    if 0 <= chunk.index < MAX_CHUNK_COUNT:
+        identifier_hash = calculate_unique_chunk_hash(
+            calculate_hash(data).digest(), chunk.index
+        ).digest()
+        if identifier_hash != bytes(chunk.hash):
+            failures.append(
+                PreflightFailure(
+                    "chunk::verify",
+                    "EChunkHashMismatch",
+                    "data doesn't match the chunk hash",
+                    chunk.index,
+                )
+            )
+
+    commands, size, pure_size = _create_chunk_size(len(data))
+    if pure_size > MAX_PURE_ARGUMENT_SIZE:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_PURE_ARGUMENT_SIZE",
+                f"add_data argument is {pure_size} bytes",
+                chunk.index,
+            )
+        )
+    if commands > MAX_PROGRAMMABLE_TX_COMMANDS:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_PROGRAMMABLE_TX_COMMANDS",
+                f"create_chunk has {commands} commands",
+                chunk.index,
+            )
+        )
+    if size > MAX_TX_SIZE_BYTES:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_TX_SIZE_BYTES",
+                f"create_chunk is around {size} bytes",
+                chunk.index,
+            )
+        )
+    return failures
+
+
+def check_file_stage(
+    mime_type_size: int,
+    chunk_count: int,
+    signer_count: int = 0,
+) -> list[PreflightFailure]:
+    """
+    Check the limits of the largest transaction that creates a file or a stage of
+    it, with chunk_count add_chunk_hash calls and their caps sent to the signers,
+    see create_file_txb. Updates take one command per removed or added chunk,
+    within the same stage size.
+    """
+    failures: list[PreflightFailure] = []
+    transfers = min(signer_count, chunk_count) if signer_count else 1
+    # file::new, the hashes, the cap transfers, and file::verify and the file's transfer.
+    commands = 1 + chunk_count + transfers + 2
+    if commands > MAX_PROGRAMMABLE_TX_COMMANDS:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_PROGRAMMABLE_TX_COMMANDS",
+                f"create_file stage has {commands} commands",
+            )
+        )
+    caps_per_transfer = -(-chunk_count // transfers) if chunk_count else 0
+    if caps_per_transfer + 1 > MAX_ARGUMENTS:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_ARGUMENTS",
+                f"create_file transfers {caps_per_transfer} caps in one command",
+            )
+        )
+    if chunk_count + 2 > MAX_INPUT_OBJECTS:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_INPUT_OBJECTS",
+                f"create_file stage has {chunk_count + 2} input objects",
+            )
+        )
+    size = TX_OVERHEAD_BYTES + 2 * OBJECT_INPUT_BYTES
+    size += (
+        _move_call_size("file", "new", 4)
+        + _pure_size(mime_type_size)
+        + _pure_size(1 + HASH_LENGTH)
+    )
+    size += chunk_count * (
+        _move_call_size("file", "add_chunk_hash", 3) + _pure_size(1 + HASH_LENGTH)
+    )
+    size += transfers * (
+        1
+        + _uleb128_size(caps_per_transfer)
+        + (caps_per_transfer + 1) * ARGUMENT_BYTES
+        + _pure_size(32)
+    )
+    size += _move_call_size("file", "verify", 2) + 1 + 2 * ARGUMENT_BYTES
+    if size > MAX_TX_SIZE_BYTES:
+        failures.append(
+            PreflightFailure(
+                "ptb", "MAX_TX_SIZE_BYTES", f"create_file stage is around {size} bytes"
+            )
+        )
+    return failures
+
+
+def check_gas_split(
+    coin_count: int,
+    recipient_count: int = 0,
+    batch_size: int = SPLIT_BATCH_SIZE,
+) -> list[PreflightFailure]:
+    """
+    Check the limits of the transactions that split coin_count gas coins off a
+    coin for recipient_count recipients, batch_size coins per transaction, see
+    Sui.split_coin. Each transaction has a SplitCoins command with an amount per
+    coin, and a TransferObjects command per recipient with its coins.
+    """
+    failures: list[PreflightFailure] = []
+    batch = min(coin_count, batch_size)
+    if not batch:
+        return failures
+    transfers = min(recipient_count, batch) if recipient_count else 1
+    coins_per_transfer = -(-batch // transfers)
+    # The coin and the amounts, or the recipient and the coins.
+    arguments = max(batch, coins_per_transfer) + 1
+    if arguments > MAX_ARGUMENTS:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_ARGUMENTS",
+                f"split_coin has {arguments} arguments in one command",
+            )
+        )
+    if 1 + transfers > MAX_PROGRAMMABLE_TX_COMMANDS:
+        failures.append(
+            PreflightFailure(
+                "ptb",
+                "MAX_PROGRAMMABLE_TX_COMMANDS",
+                f"split_coin has {1 + transfers} commands",
+            )
+        )
+    # The amounts are equal, and share one compressed pure input.
+    size = TX_OVERHEAD_BYTES + _pure_size(8) + transfers * _pure_size(32)
+    size += 1 + (batch + 1) * ARGUMENT_BYTES + _uleb128_size(batch)
+    size += transfers * (
+        1
+        + _uleb128_size(coins_per_transfer)
+        + (coins_per_transfer + 1) * ARGUMENT_BYTES
+    )
+    if size > MAX_TX_SIZE_BYTES:
+        failures.append(
+            PreflightFailure(
+                "ptb", "MAX_TX_SIZE_BYTES", f"split_coin is around {size} bytes"
+            )
+        )
+    return failures
+
+
+@functools.cache
+def _create_chunk_size(
+    length: int,
+) -> tuple[int, int, int]:
+    """
+    The commands, size and largest pure argument of the transaction that creates
+    a chunk of length bytes: chunk::new, an add_data call per bucket of data, as
+    create_chunk_txb splits it, and chunk::verify.
+    """
+    buckets = split_list(range(length))
+    size = TX_OVERHEAD_BYTES + OBJECT_INPUT_BYTES
+    size += _move_call_size("chunk", "new", 1) + _move_call_size(
+        "chunk", "verify_and_share", 2
+    )
+    pure_size = 0
+    for bucket in buckets:
+        value_size = _uleb128_size(len(bucket)) + sum(
+            _uleb128_size(len(sub)) + len(sub) for sub in bucket
+        )
+        pure_size = max(pure_size, _pure_size(value_size))
+        size += _pure_size(value_size) + _move_call_size("chunk", "add_data", 2)
+    return 2 + len(buckets), size, pure_size
+
+
+def _move_call_size(
+    module: str,
+    function: str,
+    argument_count: int,
+) -> int:
+    # The command tag, package ID, module and function names, no type arguments and the arguments.
+    return (
+        1
+        + 32
+        + 1
+        + len(module)
+        + 1
+        + len(function)
+        + 1
+        + 1
+        + argument_count * ARGUMENT_BYTES
+    )
+
+
+def _pure_size(
+    value_size: int,
+) -> int:
+    # The input's tag and length prefix.
+    return 1 + _uleb128_size(value_size) + value_size
+
+
+def _uleb128_size(
+    value: int,
+) -> int:
+    return max(1, -(-value.bit_length() // 7))
@@ -1,8 +1,18 @@
-from miraifs_sdk.models import GasCoin
-from pysui import SuiConfig, SyncClient, handle_result
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Self
+
+import miraifs_sdk
+from miraifs_sdk import MERGE_BATCH_SIZE, SPLIT_BATCH_SIZE
+from miraifs_sdk.metrics import get_instrumentation, timed
+from miraifs_sdk.models import GasCoin, MergeBatch
+from miraifs_sdk.preflight import PreflightError, check_gas_split
+from miraifs_sdk.transport import Transport, TransportClient
+from pysui import SuiConfig, handle_result
+from pysui.sui.sui_builders.exec_builders import DryRunTransaction
 from pysui.sui.sui_builders.get_builders import GetCoins, GetObjectsOwnedByAddress
 from pysui.sui.sui_txn.sync_transaction import SuiTransaction
-from pysui.sui.sui_txresults.complex_tx import TxResponse
+from pysui.sui.sui_txresults.complex_tx import DryRunTxResult, TxResponse
 from pysui.sui.sui_txresults.single_tx import (
     AddressOwner,
     ObjectRead,
@@ -11,28 +21,108 @@ from pysui.sui.sui_txresults.single_tx import (
 )
 from pysui.sui.sui_types import ObjectID, SuiAddress
 
+# Coins smaller than this are merged, but not used to pay for a merge.
+MERGE_MIN_GAS_BALANCE = 100_000_000
+
+
+class MergeError(Exception):
+    """A merge batch failed, so the coins weren't consolidated."""
+
+    def __init__(
+        self,
+        batches: list[MergeBatch],
+    ) -> None:
+        self.batches = batches
+        failed = [batch for batch in batches if batch.error]
+        lines = [
+            f"Round {batch.round} with gas coin {batch.gas_coin.id}: {batch.error}"
+            for batch in failed
+        ]
+        super().__init__(f"{len(failed)} merge batch(es) failed:\n" + "\n".join(lines))
+
 
 class Sui:
-    def __init__(self) -> None:
-        self.config = SuiConfig.default_config()
-        self.client = SyncClient(self.config)
+    """
+    The Sui config, transport and client are created on first use rather than
+    on construction, as loading the config reads the keystore and creating the
+    client fetches the fullnode's RPC method descriptors. close() closes their
+    connections, except a transport's that was passed in.
+    """
+
+    def __init__(
+        self,
+        config: SuiConfig | None = None,
+        transport: Transport | None = None,
+    ) -> None:
+        self._config = config
+        self._transport = transport
+
+    def __enter__(
+        self,
+    ) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        *exc_info,
+    ) -> None:
+        self.close()
+
+    def close(
+        self,
+    ) -> None:
+        # The client is created again if used afterwards, the transport reopens its connections.
+        client = self.__dict__.pop("client", None)
+        if client is not None:
+            client.close()
+        if self._transport is None and "transport" in self.__dict__:
+            self.transport.close()
+
+    @cached_property
+    def config(
+        self,
+    ) -> SuiConfig:
+        return self._config or SuiConfig.default_config()
+
+    @cached_property
+    def transport(
+        self,
+    ) -> Transport:
+        if self._transport is not None:
+            return self._transport
+        urls = miraifs_sdk.RPC_URLS
+        read_urls = miraifs_sdk.READ_RPC_URLS
+        write_urls = miraifs_sdk.WRITE_RPC_URLS
+        if not urls and not (read_urls and write_urls):
+            urls = [self.config.rpc_url]
+        return Transport.from_urls(urls, read_urls, write_urls)
+
+    @cached_property
+    def client(
+        self,
+    ) -> TransportClient:
+        return TransportClient(self.config, self.transport)
 
     def allocate_gas_coins(
         self,
         quantity: int,
         value: int,
+        recipients: list[str] | None = None,
     ) -> list[GasCoin]:
         gas_coins = self.get_all_gas_coins(self.config.active_address)
+        # Coins are consolidated into the largest one.
         merged_gas_coin = gas_coins[0]
         if len(gas_coins) > 1:
-            merged_gas_coin = self.merge_coins(gas_coins)
+            self.consolidate_coins(gas_coins)
         split_gas_coins = self.split_coin(
             merged_gas_coin,
             quantity,
             value,
+            recipients,
         )
         return split_gas_coins
 
+    @timed("get_all_gas_coins")
     def get_all_gas_coins(
         self,
         address: SuiAddress,
@@ -69,11 +159,14 @@ class Sui:
         all_gas_coins.sort(key=lambda x: x.balance, reverse=True)
         return all_gas_coins
 
+    @timed("split_coin")
     def split_coin(
         self,
         coin: GasCoin,
         quantity: int,
         value: int,
+        recipients: list[str] | None = None,
+        batch_size: int = SPLIT_BATCH_SIZE,
     ) -> list[GasCoin]:
         """
         Split a coin into multiple coins of the specified value,
@@ -83,7 +176,35 @@ class Sui:
             coin (GasCoin): The coin to split.
             quantity (int): The number of coins to split the coin into.
             value (int): The value of each coin.
+            recipients (list[str], optional): Owners of the new coins, round-robin.
+                The returned coins are in the same order. Defaults to the active address.
+            batch_size (int, optional): Coins split off per transaction. Defaults to 500.
+
+        Raises PreflightError before any transaction if a batch would exceed Sui's
+        limits, see check_gas_split.
         """
+        failures = check_gas_split(quantity, len(set(recipients or [])), batch_size)
+        if failures:
+            raise PreflightError(failures)
+        coins: list[GasCoin] = []
+        for start in range(0, quantity, batch_size):
+            count = min(batch_size, quantity - start)
+            batch_recipients = (
+                [recipients[i % len(recipients)] for i in range(start, start + count)]
+                if recipients
+                else None
+            )
+            coins += self._split_coin_batch(coin, count, value, batch_recipients)
+        return coins
+
+    def _split_coin_batch(
+        self,
+        coin: GasCoin,
+        quantity: int,
+        value: int,
+        recipients: list[str] | None,
+    ) -> list[GasCoin]:
+        """Split quantity coins off coin in one transaction, the ith one for recipients[i]."""
         txer = SuiTransaction(
             client=self.client,
             compress_inputs=True,
@@ -94,10 +215,19 @@ class Sui:
             amounts=[value for _ in range(quantity)],
         )
 
-        txer.transfer_objects(
-            transfers=coins,
-            recipient=self.config.active_address,
-        )
+        if recipients:
+            for recipient in dict.fromkeys(recipients):
+                txer.transfer_objects(
+                    transfers=[
+                        coins[i] for i in range(quantity) if recipients[i] == recipient
+                    ],
+                    recipient=SuiAddress(recipient),
+                )
+        else:
+            txer.transfer_objects(
+                transfers=coins,
+                recipient=self.config.active_address,
+            )
 
         result = handle_result(
             txer.execute(
@@ -105,46 +235,203 @@ class Sui:
             )
         )
 
+        get_instrumentation().record_transaction("split_coin", result)
+
         if isinstance(result, TxResponse):
-            coins: list[GasCoin] = []
+            if not result.succeeded:
+                effects = result.effects
+                raise Exception(
+                    f"FAIL: {effects.transaction_digest}: {effects.status.error}"
+                )
+            active_address = str(self.config.active_address)
+            coins_by_owner: dict[str, list[GasCoin]] = {}
             created_objs = result.effects.created
             for obj in created_objs:
+                owner = obj.owner
                 coin = GasCoin(
                     id=obj.reference.object_id,
                     balance=value,
+                    owner=None if owner == active_address else owner,
                 )
-                coins.append(coin)
+                coins_by_owner.setdefault(owner, []).append(coin)
+            if not recipients:
+                return [
+                    coin
+                    for owner_coins in coins_by_owner.values()
+                    for coin in owner_coins
+                ]
+            coins: list[GasCoin] = []
+            for recipient in recipients:
+                coins.append(coins_by_owner[recipient].pop(0))
 
         return coins
 
-    from rich import print
-
-    def merge_coins(
+    @timed("consolidate_coins")
+    def consolidate_coins(
         self,
         coins: list[GasCoin],
-    ) -> GasCoin:
+        batch_size: int = MERGE_BATCH_SIZE,
+        concurrency: int = 8,
+        dry_run: bool = False,
+        min_gas_balance: int = MERGE_MIN_GAS_BALANCE,
+        sender: str | None = None,
+    ) -> list[MergeBatch]:
+        """
+        Merge any number of coins into the largest one, in rounds of bounded batches.
+        Each round pays for one batch with each of its largest coins, spreads the
+        other coins over the batches and merges the batches in parallel. The coins
+        they were merged into go on to the next round, with any coins that didn't
+        fit, until a final fan-in leaves the largest coin. Returns every batch with
+        its input object count and gas.
+
+        Raises MergeError with the batches so far once a round has a failed batch,
+        whose coins are left unmerged.
+
+        Args:
+            coins (list[GasCoin]): The coins to merge, e.g. from get_all_gas_coins().
+            batch_size (int, optional): Input objects per transaction, gas coin included. Defaults to 500.
+            concurrency (int, optional): The number of batches to merge at once. Defaults to 8.
+            dry_run (bool, optional): Dry-run every batch against the current state instead
+                of executing it, to preview the batches and their gas. Defaults to False.
+            min_gas_balance (int, optional): Coins below this balance in MIST never pay for a batch.
+            sender (str, optional): The keystore address that owns the coins. Defaults to the active address.
+        """
+        if batch_size < 2:
+            raise ValueError("A merge batch needs at least two input objects.")
+        coins = sorted(coins, key=lambda x: x.balance, reverse=True)
+        batches: list[MergeBatch] = []
+        round = 0
+        while len(coins) > 1:
+            round += 1
+            payers = max(1, sum(1 for coin in coins if coin.balance >= min_gas_balance))
+            count = min(payers, -(-len(coins) // batch_size))
+            heads, rest = coins[:count], coins[count:]
+            rest, leftover = (
+                rest[: count * (batch_size - 1)],
+                rest[count * (batch_size - 1) :],
+            )
+            round_batches = [
+                MergeBatch(
+                    round=round,
+                    gas_coin=head,
+                    coins=rest[i::count],
+                    input_objects=len(rest[i::count]) + 1,
+                )
+                for i, head in enumerate(heads)
+            ]
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                round_batches = list(
+                    executor.map(
+                        lambda batch: (
+                            self._merge_batch(batch, dry_run, sender)
+                            if batch.coins
+                            else batch
+                        ),
+                        round_batches,
+                    )
+                )
+            batches += [batch for batch in round_batches if batch.coins]
+            if any(batch.error for batch in round_batches):
+                raise MergeError(batches)
+            # Heads keep their order, so the largest coin pays for the final fan-in.
+            coins = [
+                GasCoin(
+                    id=batch.gas_coin.id,
+                    balance=batch.gas_coin.balance
+                    + sum(coin.balance for coin in batch.coins)
+                    - (batch.gas_used or 0),
+                    owner=sender,
+                )
+                for batch in round_batches
+            ] + leftover
+        return batches
+
+    def _merge_batch(
+        self,
+        batch: MergeBatch,
+        dry_run: bool,
+        sender: str | None = None,
+    ) -> MergeBatch:
         txer = SuiTransaction(
             client=self.client,
             compress_inputs=True,
+            initial_sender=SuiAddress(sender) if sender else None,
         )
 
-        gas_coin = coins.pop(0)
-
         txer.merge_coins(
             merge_to=txer.gas,
-            merge_from=[ObjectID(coin.id) for coin in coins],
+            merge_from=[ObjectID(coin.id) for coin in batch.coins],
+        )
+
+        if dry_run:
+            tx_bytes = txer.deferred_execution(
+                use_gas_object=ObjectID(batch.gas_coin.id)
+            )
+            result = handle_result(
+                self.client.execute(DryRunTransaction(tx_bytes=tx_bytes))
+            )
+        else:
+            result = handle_result(
+                txer.execute(
+                    use_gas_object=ObjectID(batch.gas_coin.id),
+                ),
+            )
+            get_instrumentation().record_transaction("merge_coins", result)
+
+        if not isinstance(result, (TxResponse, DryRunTxResult)):
+            return batch
+        gas_used = result.effects.gas_used
+        status = result.effects.status
+        return batch.model_copy(
+            update={
+                "gas_used": int(gas_used.computation_cost)
+                + int(gas_used.storage_cost)
+                - int(gas_used.storage_rebate),
+                "digest": None if dry_run else result.effects.transaction_digest,
+                "error": None if status.succeeded else status.error or "failed",
+            }
+        )
+
+    def sweep_gas_coins(
+        self,
+        address: str,
+        recipient: str | None = None,
+    ) -> GasCoin | None:
+        """
+        Merge every gas coin of a keystore address and send the result to the
+        recipient, e.g. to return a chunk signer's leftover gas to the active address.
+
+        Args:
+            address (str): The keystore address to sweep.
+            recipient (str, optional): Defaults to the active address.
+        """
+        coins = self.get_all_gas_coins(SuiAddress(address))
+        if not coins:
+            return None
+        if len(coins) > 1:
+            self.consolidate_coins(coins, sender=address)
+
+        txer = SuiTransaction(
+            client=self.client,
+            initial_sender=SuiAddress(address),
+        )
+
+        txer.transfer_objects(
+            transfers=[txer.gas],
+            recipient=SuiAddress(recipient)
+            if recipient
+            else self.config.active_address,
         )
 
         result = handle_result(
             txer.execute(
-                use_gas_object=ObjectID(gas_coin.id),
+                use_gas_object=ObjectID(coins[0].id),
             ),
         )
 
-        if isinstance(result, TxResponse):
-            pass
+        get_instrumentation().record_transaction("sweep_gas_coins", result)
 
-        return gas_coin
+        return coins[0]
 
     def get_owner_address(
         self,
@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from miraifs_sdk.compression import EncodedFile, encode_file
+from miraifs_sdk.models import ChunkRaw
+from miraifs_sdk.utils import build_chunks, calculate_chunks_manifest_hash
+
+
+@dataclass
+class SyncEntry:
+    path: str
+    mtime_ns: int
+    size: int
+    manifest_hash: str
+    file_id: str | None = None
+
+
+@dataclass
+class LocalFile:
+    """A file in a synced directory, with its encoding if it had to be hashed."""
+
+    entry: SyncEntry
+    encoded: EncodedFile | None = None
+    chunks: list[ChunkRaw] | None = None
+
+
+class SyncState:
+    """
+    The state of a directory synced with `mfs sync`: for each file, its mtime and
+    size when it was last hashed, its manifest hash and the ID of the file it was
+    uploaded as. Entries are only valid for the chunk size and compression they
+    were hashed with, so changing either rehashes every file.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        chunk_size: int,
+        compress: bool,
+    ) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.entries: dict[str, SyncEntry] = {}
+        self.stale = False
+        if path.exists():
+            state = json.loads(path.read_text())
+            self.entries = {
+                entry["path"]: SyncEntry(**entry) for entry in state["files"]
+            }
+            self.stale = (
+                state["chunk_size"] != chunk_size or state["compress"] != compress
+            )
+
+    def scan(
+        self,
+        directory: Path,
+        compression_level: int | None = None,
+    ) -> list[LocalFile]:
+        """
+        List the files in directory, reading and hashing only those whose mtime or
+        size changed since the last sync. Dotfiles and the contents of dot
+        directories, like .git or the state file and its temporary files, are
+        skipped.
+        """
+        files: list[LocalFile] = []
+        for path in sorted(directory.rglob("*")):
+            if not path.is_file() or path == self.path:
+                continue
+            relative_path = path.relative_to(directory)
+            if any(part.startswith(".") for part in relative_path.parts):
+                continue
+            name = relative_path.as_posix()
+            stat = path.stat()
+            entry = self.entries.get(name)
+            if (
+                entry is not None
+                and not self.stale
+                and entry.mtime_ns == stat.st_mtime_ns
+                and entry.size == stat.st_size
+            ):
+                files.append(LocalFile(entry))
+                continue
+            local_file = self.hash_file(path, name, compression_level)
+            local_file.entry.file_id = entry.file_id if entry else None
+            files.append(local_file)
+        return files
+
+    def hash_file(
+        self,
+        path: Path,
+        name: str,
+        compression_level: int | None = None,
+    ) -> LocalFile:
+        stat = path.stat()
+        encoded = encode_file(path, self.compress, compression_level)
+        chunks = build_chunks(encoded.data, self.chunk_size)
+        entry = SyncEntry(
+            path=name,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            manifest_hash=calculate_chunks_manifest_hash(chunks).hexdigest(),
+        )
+        return LocalFile(entry, encoded, chunks)
+
+    def save(
+        self,
+    ) -> None:
+        state = {
+            "chunk_size": self.chunk_size,
+            "compress": self.compress,
+            "files": [
+                asdict(entry)
+                for entry in sorted(self.entries.values(), key=lambda e: e.path)
+            ],
+        }
+        # Written to a temporary file first, so an interrupted sync never leaves a partial state.
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def read_file_ids(
+    path: Path,
+) -> dict[str, str]:
+    """The ID of the file each path in a sync state file was last uploaded as."""
+    state = json.loads(path.read_text())
+    return {
+        entry["path"]: entry["file_id"] for entry in state["files"] if entry["file_id"]
+    }
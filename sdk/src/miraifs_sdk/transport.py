@@ -0,0 +1,293 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from json import JSONDecodeError
+from typing import Iterator
+
+import httpx
+from miraifs_sdk.metrics import get_instrumentation
+from pysui import SuiConfig, SuiRpcResult, SyncClient
+from pysui.sui.sui_builders.base_builder import SuiBaseBuilder
+
+# Responses that mean the endpoint is unavailable or throttling us,
+# rather than that the request itself was invalid.
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+WRITE_METHODS = {"sui_executeTransactionBlock"}
+# Failures that mean a request never reached an endpoint or was turned away,
+# as reported by TransportClient.
+REJECTED_ERRORS = {"ConnectError", "ConnectTimeout", "HTTPStatusError", "PoolTimeout"}
+# The JSON-RPC error code Sui fullnodes answer with when they are overloaded,
+# e.g. with too many transactions pending execution.
+TRANSIENT_ERROR_CODE = -32050
+
+
+@dataclass
+class Endpoint:
+    """
+    A fullnode RPC endpoint and its observed health. Latency is tracked as an
+    exponentially weighted moving average of successful requests.
+    """
+
+    url: str
+    reads: bool = True
+    writes: bool = True
+    latency: float = 0.0
+    in_flight: int = 0
+    failures: int = 0
+    down_until: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def is_up(
+        self,
+        now: float,
+    ) -> bool:
+        return self.down_until <= now
+
+    def score(
+        self,
+    ) -> float:
+        # Untried endpoints score 0 so that every endpoint gets measured.
+        return self.latency * (self.in_flight + 1)
+
+
+class Transport:
+    """
+    Routes JSON-RPC requests over a set of fullnode endpoints. Each worker thread
+    gets its own pooled HTTP client per endpoint. Requests go to the healthy
+    endpoint with the lowest latency-weighted load, and fail over to the next one
+    on connection errors, throttling and server errors. Failing endpoints are
+    taken out of rotation with exponential backoff until a request or health
+    check succeeds. Reads and transaction submission can use different endpoints.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        timeout: float = 120.0,
+        latency_alpha: float = 0.2,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ) -> None:
+        if not any(endpoint.reads for endpoint in endpoints):
+            raise ValueError("At least one endpoint must serve reads.")
+        if not any(endpoint.writes for endpoint in endpoints):
+            raise ValueError("At least one endpoint must accept transactions.")
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.latency_alpha = latency_alpha
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.local = threading.local()
+        self.clients: list[httpx.Client] = []
+        self.clients_lock = threading.Lock()
+
+    def __enter__(
+        self,
+    ) -> "Transport":
+        return self
+
+    def __exit__(
+        self,
+        *exc_info,
+    ) -> None:
+        self.close()
+
+    @classmethod
+    def from_urls(
+        cls,
+        urls: list[str],
+        read_urls: list[str] | None = None,
+        write_urls: list[str] | None = None,
+        **kwargs,
+    ) -> "Transport":
+        """
+        Build a transport from endpoint URLs. URLs in `urls` serve both reads and
+        writes, `read_urls` only serve reads and `write_urls` only accept transactions.
+        """
+        endpoints = [Endpoint(url) for url in urls]
+        endpoints += [Endpoint(url, writes=False) for url in read_urls or []]
+        endpoints += [Endpoint(url, reads=False) for url in write_urls or []]
+        return cls(endpoints, **kwargs)
+
+    def http_client(
+        self,
+        endpoint: Endpoint,
+    ) -> httpx.Client:
+        clients = getattr(self.local, "clients", None)
+        if clients is None:
+            clients = self.local.clients = {}
+        client = clients.get(endpoint.url)
+        if client is None:
+            client = clients[endpoint.url] = httpx.Client(
+                http2=True,
+                timeout=self.timeout,
+            )
+            with self.clients_lock:
+                self.clients.append(client)
+        return client
+
+    def close(
+        self,
+    ) -> None:
+        with self.clients_lock:
+            clients, self.clients = self.clients, []
+            self.local = threading.local()
+        for client in clients:
+            client.close()
+
+    def candidates(
+        self,
+        write: bool,
+    ) -> Iterator[Endpoint]:
+        """
+        Yield the endpoints to try for a request, best first. Endpoints that are
+        backing off are only tried once every healthy endpoint has failed.
+        """
+        now = time.monotonic()
+        endpoints = [e for e in self.endpoints if (e.writes if write else e.reads)]
+        up = sorted((e for e in endpoints if e.is_up(now)), key=Endpoint.score)
+        down = sorted(
+            (e for e in endpoints if not e.is_up(now)), key=lambda e: e.down_until
+        )
+        yield from up
+        yield from down
+
+    def post(
+        self,
+        payload: dict,
+        headers: dict,
+        write: bool,
+    ) -> httpx.Response:
+        instrumentation = get_instrumentation()
+        error: Exception | None = None
+        for attempt, endpoint in enumerate(self.candidates(write)):
+            if attempt > 0:
+                instrumentation.count("transport.failovers")
+            with endpoint.lock:
+                endpoint.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = self.http_client(endpoint).post(
+                    endpoint.url,
+                    headers=headers,
+                    json=payload,
+                )
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise httpx.HTTPStatusError(
+                        f"{endpoint.url} responded with {response.status_code}",
+                        request=response.request,
+                        response=response,
+                    )
+            except httpx.HTTPError as e:
+                self.mark_down(endpoint)
+                instrumentation.count("transport.errors")
+                error = e
+                continue
+            finally:
+                with endpoint.lock:
+                    endpoint.in_flight -= 1
+            self.mark_up(endpoint, time.perf_counter() - start)
+            return response
+        raise error or httpx.ConnectError("No endpoints available")
+
+    def mark_up(
+        self,
+        endpoint: Endpoint,
+        latency: float,
+    ) -> None:
+        with endpoint.lock:
+            if endpoint.latency == 0.0:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.latency_alpha * (latency - endpoint.latency)
+            endpoint.failures = 0
+            endpoint.down_until = 0.0
+
+    def mark_down(
+        self,
+        endpoint: Endpoint,
+    ) -> None:
+        with endpoint.lock:
+            delay = min(self.max_backoff, self.backoff * 2**endpoint.failures)
+            endpoint.failures += 1
+            endpoint.down_until = time.monotonic() + delay
+
+    def check_health(
+        self,
+    ) -> dict[str, bool]:
+        """
+        Probe every endpoint with a cheap request, updating its latency or taking
+        it out of rotation. Returns whether each endpoint is healthy.
+        """
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "suix_getReferenceGasPrice",
+            "params": [],
+        }
+        health = {}
+        for endpoint in self.endpoints:
+            start = time.perf_counter()
+            try:
+                response = self.http_client(endpoint).post(endpoint.url, json=payload)
+                healthy = response.status_code == 200 and "result" in response.json()
+            except (httpx.HTTPError, JSONDecodeError):
+                healthy = False
+            if healthy:
+                self.mark_up(endpoint, time.perf_counter() - start)
+            else:
+                self.mark_down(endpoint)
+            health[endpoint.url] = healthy
+        return health
+
+
+class TransportClient(SyncClient):
+    """
+    A pysui SyncClient that sends every request through a Transport, so that
+    transactions built with SuiTransaction are routed and failed over as well.
+    Method descriptors are fetched once from the config's RPC URL.
+    """
+
+    def __init__(
+        self,
+        config: SuiConfig,
+        transport: Transport,
+    ) -> None:
+        self.transport = transport
+        super().__init__(config)
+
+    def _execute(
+        self,
+        builder: SuiBaseBuilder,
+    ) -> SuiRpcResult:
+        payload = self._validate_builder(builder)
+        try:
+            response = self.transport.post(
+                payload,
+                headers=builder.header,
+                write=builder.method in WRITE_METHODS,
+            )
+            return SuiRpcResult(True, None, response.json())
+        except JSONDecodeError as e:
+            return SuiRpcResult(False, f"JSON Decoder Error {e.msg}", vars(e))
+        except httpx.HTTPError as e:
+            return SuiRpcResult(False, f"HTTPX error: {e.__class__.__name__}", vars(e))
+
+
+def is_rejected(
+    result: SuiRpcResult,
+) -> bool:
+    """
+    Whether a failed request was rejected before it could be executed, e.g. by
+    throttling or an overloaded fullnode, so that it is safe to send again.
+    Timeouts after a transaction was sent are not, as it may have executed.
+    """
+    if result.is_ok():
+        return False
+    error = result.result_string
+    if isinstance(error, dict):
+        return error.get("code") == TRANSIENT_ERROR_CODE
+    return (
+        isinstance(error, str)
+        and error.removeprefix("HTTPX error: ") in REJECTED_ERRORS
+    )
@@ -5,17 +5,23 @@ import logging
 import subprocess
 from hashlib import blake2b
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import magic
 import zstandard as zstd
+from miraifs_sdk import SPLIT_BATCH_SIZE
+from miraifs_sdk.metrics import timed
 from miraifs_sdk.models import Chunk, ChunkRaw, ParsedEvent
-from pysui.sui.sui_txresults.complex_tx import Event
+
+if TYPE_CHECKING:
+    from pysui.sui.sui_txresults.complex_tx import Event
 
 
 def get_mime_type_for_file(
     path: Path,
 ) -> str:
+    # libmagic is loaded on first use rather than with the SDK.
+    import magic
+
     mime = magic.Magic(mime=True)
     mime_type = str(mime.from_file(path))
     return mime_type
@@ -25,17 +31,26 @@ def calculate_unique_chunk_hash(
     chunk_hash: bytes,
     chunk_index: int,
 ) -> blake2b:
-    chunk_index_bytes = b"\x00" + int_to_bytes(chunk_index)
+    # The Move package hashes the u16 index big-endian.
+    chunk_index_bytes = chunk_index.to_bytes(2, "big")
     logging.debug(f"Identifier Hash Input: {list(chunk_index_bytes + chunk_hash)}")
     return calculate_hash(chunk_index_bytes + chunk_hash)
 
 
+@timed("load_chunks")
 def load_chunks(
     path: Path,
     chunk_size: int,
 ) -> list[ChunkRaw]:
     with open(path, "rb") as f:
         data = f.read()
+    return build_chunks(data, chunk_size)
+
+
+def build_chunks(
+    data: bytes,
+    chunk_size: int,
+) -> list[ChunkRaw]:
     chunked_data = chunk_data(data, chunk_size)
     chunks: list[ChunkRaw] = []
     for i, data_chunk in enumerate(chunked_data):
@@ -140,6 +155,40 @@ def calculate_hash(
     return hashlib.blake2b(data, digest_size=32)
 
 
+def derive_dynamic_field_id(
+    parent_id: str,
+    name: bytes,
+) -> str:
+    """
+    The object ID of parent_id's dynamic field with the vector<u8> name, which
+    Sui derives from the parent and the BCS of the name and its type, so that
+    dynamic fields can be fetched with other objects in one request.
+    """
+    name_bcs = uleb128(len(name)) + name
+    # 0xf0 is the ChildObjectId intent scope, and 0x06 0x01 the type tag of vector<u8>.
+    data = (
+        b"\xf0"
+        + bytes.fromhex(parent_id.removeprefix("0x").zfill(64))
+        + len(name_bcs).to_bytes(8, "little")
+        + name_bcs
+        + b"\x06\x01"
+    )
+    return "0x" + calculate_hash(data).hexdigest()
+
+
+def uleb128(
+    n: int,
+) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if not n:
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+
 def chunk_bytes(
     data: bytes,
     chunk_size: int,
@@ -151,16 +200,18 @@ def chunk_bytes(
 def compress_data(
     data: bytes,
     level: int,
+    dictionary: zstd.ZstdCompressionDict | None = None,
 ):
-    cctx = zstd.ZstdCompressor(level=level)
+    cctx = zstd.ZstdCompressor(level=level, dict_data=dictionary)
     compressed_data = cctx.compress(data)
     return compressed_data
 
 
 def decompress_data(
     data: bytes,
+    dictionary: zstd.ZstdCompressionDict | None = None,
 ):
-    dctx = zstd.ZstdDecompressor()
+    dctx = zstd.ZstdDecompressor(dict_data=dictionary)
     decompressed_data = dctx.decompress(data)
     return decompressed_data
 
@@ -193,6 +244,30 @@ def split_lists_into_sublists(
     return [list[i : i + sublist_size] for i in range(0, len(list), sublist_size)]
 
 
+def split_into_gas_batches(
+    items: list,
+    coin_counts: list[int],
+    max_coins: int = SPLIT_BATCH_SIZE,
+) -> list[list[Any]]:
+    """
+    Group consecutive items into batches whose gas coins, coin_counts[i] for the
+    ith item, are allocated in a single split of at most max_coins. An item that
+    needs more coins than that gets a batch of its own.
+    """
+    batches: list[list[Any]] = []
+    batch: list[Any] = []
+    batch_coins = 0
+    for item, coin_count in zip(items, coin_counts):
+        if batch and batch_coins + coin_count > max_coins:
+            batches.append(batch)
+            batch, batch_coins = [], 0
+        batch.append(item)
+        batch_coins += coin_count
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 def to_mist(
     value: float,
 ) -> int:
@@ -212,7 +287,7 @@ def estimate_upload_cost_in_mist(
 
 
 def parse_events(
-    events: list[Event],
+    events: list["Event"],
 ) -> list[ParsedEvent]:
     parsed_events: list[ParsedEvent] = []
     for event in events:
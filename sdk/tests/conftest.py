@@ -0,0 +1,28 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules such as miraifs_sdk.events read the package ID at import.
+os.environ.setdefault("MIRAIFS_PACKAGE_ID", "0x" + "ab" * 32)
+
+# The local fullnode stand-in lives with the benchmarks.
+sys.path.insert(0, str(Path(__file__).parents[1] / "benchmarks"))
+
+
+@pytest.fixture
+def mfs(monkeypatch, tmp_path):
+    """A client of a local fullnode stand-in, also used by the CLI commands."""
+    from bench_upload import FUNDS, new_config
+    from fullnode import Fullnode
+    from miraifs_sdk.cache import ChunkCache
+    from miraifs_sdk.miraifs import MiraiFs
+
+    with Fullnode() as node:
+        mfs = MiraiFs(
+            new_config(node.url, 0), chunk_cache=ChunkCache(tmp_path / "chunks")
+        )
+        node.fund(mfs.config.active_address, FUNDS)
+        monkeypatch.setattr("miraifs_sdk.miraifs.MiraiFs", lambda: mfs)
+        yield mfs
@@ -0,0 +1,19 @@
+import pytest
+from miraifs_sdk.cache import ChunkCache
+from miraifs_sdk.miraifs import MiraiFs
+
+
+@pytest.fixture
+def mfs(tmp_path):
+    # Empty inputs return before the client is created.
+    return MiraiFs(chunk_cache=ChunkCache(tmp_path))
+
+
+def test_empty_inputs_need_no_transactions(mfs):
+    assert mfs.delete_many([], []) == []
+    assert mfs.freeze_many([], []) == []
+
+
+def test_files_need_gas_coins(mfs):
+    with pytest.raises(ValueError, match="at least one gas coin"):
+        mfs.freeze_many(["0x" + "ff" * 32], [])
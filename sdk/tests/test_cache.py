@@ -0,0 +1,38 @@
+import os
+
+from miraifs_sdk import _chunk_cache_dir
+from miraifs_sdk.cache import ChunkCache
+
+
+def test_round_trip(tmp_path):
+    cache = ChunkCache(tmp_path, max_bytes=100)
+    assert cache.get("0x1") is None
+    cache.put("0x1", b"data")
+    assert cache.get("0x1") == b"data"
+    assert [path.name for path in tmp_path.iterdir()] == ["0x1"]
+
+
+def test_default_dir_follows_xdg_cache_home(tmp_path, monkeypatch):
+    monkeypatch.delenv("MIRAIFS_CHUNK_CACHE_DIR", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert _chunk_cache_dir() == tmp_path / "miraifs" / "chunks"
+    monkeypatch.setenv("MIRAIFS_CHUNK_CACHE_DIR", str(tmp_path / "other"))
+    assert _chunk_cache_dir() == tmp_path / "other"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ChunkCache(tmp_path, max_bytes=35)
+    for i in range(3):
+        cache.put(f"0x{i}", bytes(10))
+        os.utime(tmp_path / f"0x{i}", (i, i))
+    # Reading 0x0 makes 0x1 the least recently used.
+    assert cache.get("0x0") is not None
+    cache.put("0x3", bytes(10))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["0x0", "0x2", "0x3"]
+    assert cache.size == 30
+
+
+def test_skips_entries_larger_than_the_cache(tmp_path):
+    cache = ChunkCache(tmp_path, max_bytes=10)
+    cache.put("0x1", bytes(11))
+    assert cache.get("0x1") is None
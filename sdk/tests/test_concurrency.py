@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from miraifs_sdk.concurrency import AimdController
+
+
+def test_rejects_invalid_bounds():
+    with pytest.raises(ValueError):
+        AimdController(initial=8, maximum=4)
+
+
+def test_slow_start_grows_by_one_per_confirmation():
+    controller = AimdController(initial=4)
+    controller.in_flight = 4
+    for _ in range(4):
+        controller.record(1.0)
+    assert controller.current_limit == 8
+
+
+def test_limit_only_grows_while_used():
+    controller = AimdController(initial=8)
+    controller.in_flight = 1
+    controller.record(1.0)
+    assert controller.current_limit == 8
+
+
+def test_slow_confirmation_cuts_once_per_burst():
+    controller = AimdController(initial=16, target_latency=1.0)
+    controller.in_flight = 16
+    controller.record(3.0)
+    assert controller.current_limit == 8
+    assert not controller.slow_start
+    # The other 15 transactions were already in flight.
+    for _ in range(15):
+        controller.record(3.0)
+    assert controller.current_limit == 8
+    controller.record(3.0)
+    assert controller.current_limit == 4
+
+
+def test_congestion_avoidance_grows_by_one_per_window():
+    controller = AimdController(initial=8, target_latency=1.0)
+    controller.slow_start = False
+    controller.in_flight = 8
+    for _ in range(8):
+        controller.record(1.0)
+    assert controller.current_limit == 9
+
+
+def test_rejections_cut_down_to_the_minimum():
+    controller = AimdController(initial=4, minimum=2)
+    for _ in range(3):
+        controller.record(0.0, rejected=True)
+    assert controller.current_limit == 2
+    assert [limit for _, limit in controller.history] == [4, 2]
+
+
+def test_baseline_is_the_fastest_confirmation():
+    controller = AimdController(initial=4)
+    controller.in_flight = 1
+    controller.record(2.0)
+    controller.record(1.0)
+    assert controller.baseline == 1.0
+    controller.record(2.5)
+    assert controller.current_limit == 2
+
+
+def test_fixed_never_changes():
+    controller = AimdController.fixed(3)
+    controller.in_flight = 3
+    controller.record(1.0)
+    controller.record(100.0, rejected=True)
+    assert controller.current_limit == 3
+
+
+def test_slots_block_at_the_limit():
+    controller = AimdController.fixed(2)
+    entered = threading.Event()
+
+    def send():
+        with controller.slot():
+            entered.set()
+
+    with controller.slot(), controller.slot():
+        thread = threading.Thread(target=send)
+        thread.start()
+        assert not entered.wait(0.1)
+    assert entered.wait(1.0)
+    thread.join()
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+from miraifs_sdk.cache import ChunkCache
+from miraifs_sdk.miraifs import MiraiFs
+from miraifs_sdk.models import File, FileChunks, ManifestItem
+from miraifs_sdk.utils import build_chunks, calculate_chunks_manifest_hash
+
+DATA = bytes(range(250)) * 2
+
+
+def chunk_id(index: int) -> str:
+    return "0x" + f"{index:064x}"
+
+
+def new_file(data: bytes, chunk_size: int = 100) -> File:
+    chunks = build_chunks(data, chunk_size)
+    return File(
+        id="0x" + "ff" * 32,
+        chunks=FileChunks(
+            count=len(chunks),
+            hash=list(calculate_chunks_manifest_hash(chunks).digest()),
+            manifest=[
+                ManifestItem(hash=chunk.hash, id=chunk_id(chunk.index))
+                for chunk in chunks
+            ],
+            size=chunk_size,
+        ),
+        created_at=datetime.now(timezone.utc),
+        mime_type="application/octet-stream",
+        size=len(data),
+    )
+
+
+@pytest.fixture
+def mfs(tmp_path):
+    # diff_chunks doesn't touch the network, so the client is never created.
+    return MiraiFs(chunk_cache=ChunkCache(tmp_path))
+
+
+def test_unchanged(mfs):
+    assert mfs.diff_chunks(new_file(DATA), build_chunks(DATA, 100)) == ([], [])
+
+
+def test_changed_chunk(mfs):
+    data = bytearray(DATA)
+    data[250] ^= 1
+    changed, removed = mfs.diff_chunks(new_file(DATA), build_chunks(bytes(data), 100))
+    assert [chunk.index for chunk in changed] == [2]
+    assert removed == [(2, chunk_id(2))]
+
+
+def test_appended_chunks(mfs):
+    changed, removed = mfs.diff_chunks(
+        new_file(DATA), build_chunks(DATA + bytes(150), 100)
+    )
+    # 150 bytes fill two more chunks.
+    assert [chunk.index for chunk in changed] == [5, 6]
+    assert removed == []
+
+
+def test_truncated_chunks(mfs):
+    changed, removed = mfs.diff_chunks(new_file(DATA), build_chunks(DATA[:250], 100))
+    assert [chunk.index for chunk in changed] == [2]
+    assert removed == [(2, chunk_id(2)), (3, chunk_id(3)), (4, chunk_id(4))]
+
+
+def test_same_data_at_another_index_changes(mfs):
+    # Chunk hashes cover the index, so shifted data isn't matched.
+    changed, removed = mfs.diff_chunks(
+        new_file(DATA), build_chunks(bytes(100) + DATA, 100)
+    )
+    assert [chunk.index for chunk in changed] == [0, 1, 2, 3, 4, 5]
+    assert [index for index, _ in removed] == [0, 1, 2, 3, 4]
+
+
+def test_unregistered_chunk_raises(mfs):
+    file = new_file(DATA)
+    file.chunks.manifest[1].id = None
+    data = bytearray(DATA)
+    data[150] ^= 1
+    with pytest.raises(ValueError, match="isn't registered"):
+        mfs.diff_chunks(file, build_chunks(bytes(data), 100))
+    # Unchanged unregistered chunks are fine.
+    assert mfs.diff_chunks(file, build_chunks(DATA, 100)) == ([], [])
@@ -0,0 +1,183 @@
+from datetime import datetime, timezone
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from miraifs_sdk.cache import ChunkCache
+from miraifs_sdk.compression import EncodedFile, parse_mime_type
+from miraifs_sdk.encryption import (
+    CHUNK_OVERHEAD,
+    ChunkKeys,
+    decrypt_chunk,
+    decrypt_stream,
+    derive_keys,
+    encrypt_chunk,
+    encrypt_file,
+    generate_key,
+    load_key,
+    plaintext_chunk_size,
+)
+from miraifs_sdk.miraifs import MiraiFs
+from miraifs_sdk.models import File, FileChunks, ManifestItem
+
+KEY = bytes(range(32))
+SALT = bytes(16)
+CHUNK_SIZE = 100
+DATA = bytes(i % 251 for i in range(1000))
+
+
+def encrypt(
+    data: bytes = DATA,
+    key: bytes = KEY,
+    mime_type: str | None = None,
+) -> EncodedFile:
+    encoded = EncodedFile(data=data, mime_type="text/plain", original_size=len(data))
+    return encrypt_file(encoded, key, CHUNK_SIZE, mime_type=mime_type)
+
+
+def split(data: bytes) -> list[bytes]:
+    return [data[i : i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+
+def test_round_trip():
+    encrypted = encrypt()
+    params = parse_mime_type(encrypted.mime_type)[1]
+    assert params.keys() == {"encryption", "kdf", "salt"}
+    assert params["encryption"] == "aes-256-gcm" and params["kdf"] == "hkdf-sha256"
+    assert len(bytes.fromhex(params["salt"])) == 16
+    parts = split(encrypted.data)
+    # 1000 bytes at 72 plaintext bytes per chunk.
+    assert len(parts) == 14 and len(parts[-1]) == 1000 - 13 * 72 + CHUNK_OVERHEAD
+    assert b"".join(decrypt_stream(parts, encrypted.mime_type, KEY, 14)) == DATA
+
+
+def test_unchanged_chunks_encrypt_to_the_same_bytes():
+    data = bytearray(DATA)
+    data[500] ^= 1
+    encrypted = encrypt()
+    updated = encrypt(bytes(data), mime_type=encrypted.mime_type)
+    assert updated.mime_type == encrypted.mime_type
+    before, after = split(encrypted.data), split(updated.data)
+    assert [i for i, (a, b) in enumerate(zip(before, after)) if a != b] == [500 // 72]
+
+
+def test_files_get_their_own_salt():
+    # The same data under the same key encrypts differently per file.
+    assert encrypt().mime_type != encrypt().mime_type
+    assert not set(split(encrypt().data)) & set(split(encrypt().data))
+
+
+def test_subkeys_differ_from_the_key():
+    keys = derive_keys(KEY, SALT)
+    assert len({KEY, keys.nonce, keys.cipher}) == 3
+    assert derive_keys(KEY, b"", None) == ChunkKeys(nonce=KEY, cipher=KEY)
+    with pytest.raises(ValueError, match="key derivation"):
+        derive_keys(KEY, SALT, "scrypt")
+    with pytest.raises(ValueError, match="salt"):
+        derive_keys(KEY, b"")
+
+
+def test_decrypts_files_without_key_derivation():
+    keys = ChunkKeys(nonce=KEY, cipher=KEY)
+    pieces = [DATA[i : i + 72] for i in range(0, len(DATA), 72)]
+    parts = [encrypt_chunk(piece, i, keys) for i, piece in enumerate(pieces)]
+    mime_type = "text/plain; encryption=aes-256-gcm"
+    assert b"".join(decrypt_stream(parts, mime_type, KEY, len(parts))) == DATA
+    # Updates keep encrypting them the same way.
+    encrypted = encrypt(mime_type=mime_type)
+    assert encrypted.mime_type == mime_type and split(encrypted.data) == parts
+
+
+def test_chunks_are_bound_to_their_index():
+    keys = derive_keys(KEY, SALT)
+    part = encrypt_chunk(b"data", 3, keys)
+    assert decrypt_chunk(part, 3, keys) == b"data"
+    with pytest.raises(InvalidTag):
+        decrypt_chunk(part, 4, keys)
+    with pytest.raises(InvalidTag):
+        decrypt_chunk(part, 3, derive_keys(bytes(32), SALT))
+
+
+def test_chunks_are_bound_to_their_file():
+    first, second = encrypt(), encrypt()
+    parts = split(first.data)
+    parts[1] = split(second.data)[1]
+    with pytest.raises(InvalidTag):
+        b"".join(decrypt_stream(parts, first.mime_type, KEY, len(parts)))
+
+
+def test_truncated_files_fail_to_decrypt():
+    encrypted = encrypt()
+    parts = split(encrypted.data)[:-1]
+    with pytest.raises(InvalidTag):
+        b"".join(decrypt_stream(parts, encrypted.mime_type, KEY, len(parts)))
+    # The last chunk can't be passed off as an earlier one either.
+    parts = split(encrypted.data)
+    with pytest.raises(InvalidTag):
+        b"".join(decrypt_stream(parts, encrypted.mime_type, KEY, len(parts) + 1))
+
+
+def test_decrypt_stream_errors():
+    assert list(decrypt_stream([b"a", b"b"], "text/plain", None, 2)) == [b"a", b"b"]
+    with pytest.raises(ValueError, match="no key"):
+        list(decrypt_stream([b"a"], "text/plain; encryption=aes-256-gcm", None, 1))
+    with pytest.raises(ValueError, match="Unsupported encryption"):
+        list(decrypt_stream([b"a"], "text/plain; encryption=rot13", KEY, 1))
+
+
+def test_keys():
+    assert len(load_key(generate_key())) == 32
+    with pytest.raises(ValueError):
+        load_key("c2hvcnQ=")
+    assert plaintext_chunk_size(CHUNK_SIZE) == CHUNK_SIZE - CHUNK_OVERHEAD
+    with pytest.raises(ValueError):
+        plaintext_chunk_size(CHUNK_OVERHEAD)
+
+
+@pytest.fixture
+def encrypted_file(tmp_path, monkeypatch):
+    encrypted = encrypt()
+    parts = {"0x" + f"{i:064x}": part for i, part in enumerate(split(encrypted.data))}
+    file = File(
+        id="0x" + "ff" * 32,
+        chunks=FileChunks(
+            count=len(parts),
+            hash=[],
+            manifest=[ManifestItem(hash=[], id=chunk_id) for chunk_id in parts],
+            size=CHUNK_SIZE,
+        ),
+        created_at=datetime.now(timezone.utc),
+        mime_type=encrypted.mime_type,
+        size=len(encrypted.data),
+    )
+    mfs = MiraiFs(chunk_cache=ChunkCache(tmp_path))
+    fetched = []
+
+    def get_chunks_data(chunk_ids):
+        fetched.extend(chunk_ids)
+        return {chunk_id: parts[chunk_id] for chunk_id in chunk_ids}
+
+    monkeypatch.setattr(mfs, "_get_chunks_data", get_chunks_data)
+    return mfs, file, fetched
+
+
+@pytest.mark.parametrize(
+    "offset, length, chunks",
+    [
+        (0, 10, [0]),
+        (70, 4, [0, 1]),
+        (72, 72, [1]),
+        (500, 300, [6, 7, 8, 9, 10, 11]),
+        (990, 100, [13]),
+    ],
+)
+def test_read_range_fetches_only_covered_chunks(encrypted_file, offset, length, chunks):
+    mfs, file, fetched = encrypted_file
+    assert mfs.read_range(file, offset, length, KEY) == DATA[offset : offset + length]
+    assert fetched == [file.chunks.manifest[i].id for i in chunks]
+
+
+def test_read_file_raises_on_missing_chunks(encrypted_file, monkeypatch):
+    mfs, file, _ = encrypted_file
+    monkeypatch.setattr(mfs, "_get_chunks_data", lambda chunk_ids: {})
+    with pytest.raises(ValueError, match="wasn't found"):
+        b"".join(mfs.read_file(file, KEY))
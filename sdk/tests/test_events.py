@@ -0,0 +1,197 @@
+import base64
+
+import pytest
+from miraifs_sdk import MIRAIFS_PACKAGE_ID
+from miraifs_sdk.events import (
+    B58_ALPHABET,
+    BcsReader,
+    ChunkCreatedEvent,
+    ChunkRegisteredEvent,
+    ChunkVerifiedEvent,
+    FileCreatedEvent,
+    FileUpdatedEvent,
+    SharedChunkCreatedEvent,
+    b58decode,
+    new_event_registry,
+    normalize_sui_address,
+)
+from pysui.sui.sui_txresults.complex_tx import Event
+
+FILE_ID = bytes(range(32))
+CHUNK_ID = bytes(range(32, 64))
+CAP_ID = bytes(range(64, 96))
+HASH = bytes(range(96, 128))
+
+
+def b58encode(data: bytes) -> str:
+    value = int.from_bytes(data, "big")
+    encoded = ""
+    while value:
+        value, rem = divmod(value, 58)
+        encoded = B58_ALPHABET[rem] + encoded
+    return "1" * (len(data) - len(data.lstrip(b"\x00"))) + encoded
+
+
+def uleb128(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if not n:
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+
+def vector(data: bytes) -> bytes:
+    return uleb128(len(data)) + data
+
+
+def make_event(
+    event_type: str,
+    bcs: bytes,
+    parsed: dict | str,
+    encoding: str = "base58",
+    package_id: str = MIRAIFS_PACKAGE_ID,
+) -> Event:
+    return Event.from_dict(
+        {
+            "bcs": b58encode(bcs)
+            if encoding == "base58"
+            else base64.b64encode(bcs).decode(),
+            "packageId": package_id,
+            "parsedJson": parsed,
+            "sender": "0x" + "00" * 32,
+            "transactionModule": event_type.split("::")[0],
+            "type": f"{normalize_sui_address(package_id)}::{event_type}",
+            "id": {"txDigest": "digest", "eventSeq": "0"},
+        }
+    )
+
+
+def file_created(mime_type: str = "text/plain", **kwargs) -> Event:
+    bcs = (
+        (128_000).to_bytes(4, "little")
+        + (1_700_000_000_000).to_bytes(8, "little")
+        + FILE_ID
+        + vector(mime_type.encode())
+        + vector(HASH)
+    )
+    parsed = {
+        "chunk_size": 128_000,
+        "created_at": "1700000000000",
+        "file_id": "0x" + FILE_ID.hex(),
+        "mime_type": mime_type,
+        "chunks_hash": list(HASH),
+    }
+    return make_event("file::FileCreatedEvent", bcs, parsed, **kwargs)
+
+
+EXPECTED_FILE_CREATED = FileCreatedEvent(
+    chunk_size=128_000,
+    created_at=1_700_000_000_000,
+    file_id="0x" + FILE_ID.hex(),
+    mime_type="text/plain",
+    chunks_hash=HASH,
+)
+
+
+@pytest.fixture
+def registry():
+    return new_event_registry(MIRAIFS_PACKAGE_ID)
+
+
+def test_decodes_parsed_json(registry):
+    assert registry.decode(file_created()) == EXPECTED_FILE_CREATED
+
+
+@pytest.mark.parametrize("encoding", ["base58", "base64"])
+def test_decodes_bcs_when_strings_contain_quotes(registry, encoding):
+    event = file_created('text/it\'s "quoted"', encoding=encoding)
+    assert registry.decode(event).mime_type == 'text/it\'s "quoted"'
+
+
+def test_falls_back_to_literal_eval_without_bcs(registry):
+    event = file_created("text/it's")
+    event.bcs = ""
+    assert registry.decode(event).mime_type == "text/it's"
+
+
+def test_dispatches_on_exact_type(registry):
+    # Same module and struct, but another package.
+    assert registry.decode(file_created(package_id="0x" + "cd" * 32)) is None
+    assert registry.decode(make_event("file::FileCreatedEventV2", b"", {})) is None
+
+
+@pytest.mark.parametrize(
+    "event_type, bcs, expected",
+    [
+        (
+            "file::FileUpdatedEvent",
+            FILE_ID + vector(HASH),
+            FileUpdatedEvent(file_id="0x" + FILE_ID.hex(), chunks_hash=HASH),
+        ),
+        (
+            "chunk::ChunkCreatedEvent",
+            CHUNK_ID + (513).to_bytes(2, "little") + vector(HASH) + FILE_ID,
+            ChunkCreatedEvent(
+                chunk_id="0x" + CHUNK_ID.hex(),
+                chunk_index=513,
+                chunk_hash=HASH,
+                file_id="0x" + FILE_ID.hex(),
+            ),
+        ),
+        (
+            "chunk::ChunkVerifiedEvent",
+            CHUNK_ID + FILE_ID + CAP_ID,
+            ChunkVerifiedEvent(
+                chunk_id="0x" + CHUNK_ID.hex(),
+                file_id="0x" + FILE_ID.hex(),
+                register_chunk_cap_id="0x" + CAP_ID.hex(),
+            ),
+        ),
+        (
+            "file::ChunkRegisteredEvent",
+            vector(HASH) + CHUNK_ID + (7).to_bytes(2, "little") + FILE_ID,
+            ChunkRegisteredEvent(
+                chunk_hash=HASH,
+                chunk_id="0x" + CHUNK_ID.hex(),
+                chunk_index=7,
+                file_id="0x" + FILE_ID.hex(),
+            ),
+        ),
+        (
+            "chunk::SharedChunkCreatedEvent",
+            CHUNK_ID + vector(HASH) + (128_000).to_bytes(4, "little"),
+            SharedChunkCreatedEvent(
+                chunk_id="0x" + CHUNK_ID.hex(), chunk_hash=HASH, size=128_000
+            ),
+        ),
+    ],
+)
+def test_bcs_and_json_decoders_agree(registry, event_type, bcs, expected):
+    parsed = {}
+    for field in expected.__dataclass_fields__:
+        value = getattr(expected, field)
+        parsed[field] = list(value) if isinstance(value, bytes) else value
+    bcs_decoder, _ = registry.decoders[f"{registry.package_id}::{event_type}"]
+    reader = BcsReader(bcs)
+    assert bcs_decoder(reader) == expected
+    assert reader.done()
+    assert registry.decode(make_event(event_type, bcs, parsed)) == expected
+
+
+def test_decode_all_skips_other_events(registry):
+    other = make_event("coin::Other", b"", {}, package_id="0x2")
+    assert registry.decode_all([other, file_created()]) == [EXPECTED_FILE_CREATED]
+
+
+def test_b58decode_keeps_leading_zeros():
+    data = b"\x00\x00" + bytes(range(1, 40))
+    assert b58decode(b58encode(data)) == data
+
+
+def test_bcs_reader_uleb128():
+    reader = BcsReader(uleb128(300) + uleb128(0) + uleb128(2**21))
+    assert (reader.uleb128(), reader.uleb128(), reader.uleb128()) == (300, 0, 2**21)
+    assert reader.done()
@@ -0,0 +1,42 @@
+import pytest
+from miraifs_sdk.cache import ChunkCache
+from miraifs_sdk.miraifs import MiraiFs
+from miraifs_sdk.models import GasCoin
+from miraifs_sdk.sui import MergeError
+
+
+@pytest.fixture
+def mfs(tmp_path):
+    return MiraiFs(chunk_cache=ChunkCache(tmp_path))
+
+
+def coins(count: int) -> list[GasCoin]:
+    return [
+        GasCoin(id=f"0x{i:064x}", balance=10**9 * (count - i)) for i in range(count)
+    ]
+
+
+def test_failed_batches_stop_the_merge(mfs, monkeypatch):
+    def merge_batch(batch, dry_run, sender=None):
+        error = "InsufficientGas" if batch.gas_coin.id == coins(1)[0].id else None
+        return batch.model_copy(update={"gas_used": 1000, "error": error})
+
+    monkeypatch.setattr(mfs, "_merge_batch", merge_batch)
+    with pytest.raises(
+        MergeError, match="Round 1 with gas coin 0x0+: Insufficient"
+    ) as e:
+        mfs.consolidate_coins(coins(10), batch_size=3)
+    # The failed round is the last, so no later batch merges its unmerged coins.
+    assert {batch.round for batch in e.value.batches} == {1}
+    assert [batch.error for batch in e.value.batches] == [
+        "InsufficientGas",
+        None,
+        None,
+        None,
+    ]
+
+
+def test_successful_batches_are_returned(mfs, monkeypatch):
+    monkeypatch.setattr(mfs, "_merge_batch", lambda batch, dry_run, sender=None: batch)
+    batches = mfs.consolidate_coins(coins(10), batch_size=3)
+    assert batches[-1].round == 3 and not any(batch.error for batch in batches)
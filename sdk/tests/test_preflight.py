@@ -0,0 +1,92 @@
+import pytest
+from miraifs_sdk.models import ChunkRaw
+from miraifs_sdk.preflight import (
+    MAX_ARGUMENTS,
+    PreflightError,
+    check_chunk,
+    check_file,
+    check_file_stage,
+    check_gas_split,
+    preflight_file,
+)
+from miraifs_sdk.utils import build_chunks
+
+DATA = bytes(i % 251 for i in range(1000))
+
+
+def errors(failures):
+    return [(failure.function, failure.error, failure.index) for failure in failures]
+
+
+def test_valid_file_passes():
+    assert check_file(build_chunks(DATA, 100), 100, "text/plain") == []
+    preflight_file(build_chunks(DATA, 100), 100, "text/plain")
+
+
+def test_chunk_size_limit():
+    chunks = build_chunks(DATA, 1000)
+    assert ("file::new", "EMaxChunkSizeExceeded", None) in errors(
+        check_file(chunks, 10**9, "text/plain")
+    )
+
+
+def test_duplicate_and_misplaced_chunks():
+    chunks = build_chunks(DATA, 100)
+    chunks[3].hash = chunks[2].hash
+    assert ("file::add_chunk_hash", "EFieldAlreadyExists", 3) in errors(
+        check_file(chunks, 100, "text/plain")
+    )
+    chunks = build_chunks(DATA, 100)
+    chunks[4].index = 5
+    assert ("chunk::verify", "EChunkHashMismatch", 4) in errors(
+        check_file(chunks, 100, "text/plain")
+    )
+
+
+def test_manifest_hash_mismatch():
+    failures = check_file(build_chunks(DATA, 100), 100, "text/plain", bytes(32))
+    assert errors(failures) == [("file::verify", "EVerificationHashMismatch", None)]
+    with pytest.raises(PreflightError, match="EVerificationHashMismatch"):
+        preflight_file(build_chunks(DATA, 100), 100, "text/plain", bytes(32))
+
+
+def test_mime_type_too_large():
+    assert ("ptb", "MAX_PURE_ARGUMENT_SIZE", None) in errors(
+        check_file(build_chunks(DATA, 100), 100, "x" * 20_000)
+    )
+
+
+def test_check_chunk():
+    chunk = build_chunks(DATA, 100)[1]
+    assert check_chunk(chunk, 100) == []
+    assert errors(check_chunk(chunk, 50)) == [("chunk", "ChunkSizeExceeded", 1)]
+    tampered = ChunkRaw(data=[0] + chunk.data[1:], hash=chunk.hash, index=1)
+    assert errors(check_chunk(tampered, 100)) == [
+        ("chunk::verify", "EChunkHashMismatch", 1)
+    ]
+
+
+def test_check_file_stage_cap_transfers():
+    # Without signers, every cap goes to the recipient in one TransferObjects command.
+    assert check_file_stage(10, MAX_ARGUMENTS - 1) == []
+    assert errors(check_file_stage(10, MAX_ARGUMENTS)) == [
+        ("ptb", "MAX_ARGUMENTS", None)
+    ]
+    assert check_file_stage(10, MAX_ARGUMENTS, signer_count=2) == []
+
+
+def test_check_file_stage_commands():
+    assert ("ptb", "MAX_PROGRAMMABLE_TX_COMMANDS", None) in errors(
+        check_file_stage(10, 1_000, signer_count=100)
+    )
+
+
+def test_check_gas_split():
+    assert check_gas_split(0) == []
+    # Batches of 500 coins stay within the argument limit however many coins there are.
+    assert check_gas_split(10_000) == []
+    assert check_gas_split(10_000, recipient_count=4) == []
+    assert errors(check_gas_split(600, batch_size=600)) == [
+        ("ptb", "MAX_ARGUMENTS", None)
+    ]
+    assert check_gas_split(600, recipient_count=2, batch_size=MAX_ARGUMENTS - 1) == []
@@ -0,0 +1,56 @@
+import pytest
+from bench_upload import GAS_BUDGET_PER_CHUNK, deterministic_bytes
+from miraifs_sdk.utils import build_chunks
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(deterministic_bytes(1000, 1))
+    return path
+
+
+def test_aborted_create_stage_raises(mfs, path):
+    chunks = build_chunks(path.read_bytes(), 100)
+    # A duplicate hash in the second stage aborts add_chunk_hash.
+    chunks[7].hash = chunks[2].hash
+    gas_coin = mfs.allocate_gas_coins(1, 10 * GAS_BUDGET_PER_CHUNK)[0]
+    stages = mfs.create_file_stages(
+        path,
+        chunks,
+        100,
+        mfs.config.active_address,
+        gas_coin,
+        stage_size=5,
+        preflight=False,
+    )
+    file, caps = next(stages)
+    assert len(caps) == 5
+    with pytest.raises(Exception, match="FAIL: .*MoveAbort"):
+        next(stages)
+
+
+def test_aborted_update_stage_raises(mfs, path):
+    chunks = build_chunks(path.read_bytes(), 100)
+    gas_coins = mfs.allocate_gas_coins(len(chunks) + 3, GAS_BUDGET_PER_CHUNK)
+    stages = mfs.create_file_stages(
+        path, chunks, 100, mfs.config.active_address, gas_coins.pop()
+    )
+    file, caps = next(stages)
+    mfs.upload_chunks(
+        file, path, 4, gas_coins[: len(chunks)], chunks, create_chunk_caps=caps
+    )
+    mfs.register_chunks(file, gas_coins[len(chunks)])
+    file = mfs.get_file(file.id)
+
+    data = bytearray(path.read_bytes())
+    data[150] ^= 1
+    updated = build_chunks(bytes(data), 100)
+    # Chunk 1 is replaced with a hash the file already has.
+    updated[1].hash = updated[2].hash
+    with pytest.raises(Exception, match="FAIL: .*MoveAbort"):
+        next(
+            mfs.update_file_stages(
+                file, updated, gas_coins[len(chunks) + 1], preflight=False
+            )
+        )
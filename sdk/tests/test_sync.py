@@ -0,0 +1,147 @@
+import json
+import os
+
+from bench_upload import deterministic_bytes
+from miraifs_sdk.cli import app
+from miraifs_sdk.sync import SyncState, read_file_ids
+from miraifs_sdk.utils import split_into_gas_batches
+from typer.testing import CliRunner
+
+
+def write_files(directory):
+    (directory / "sub").mkdir(parents=True)
+    (directory / "a.bin").write_bytes(deterministic_bytes(300, 1))
+    (directory / "sub" / "b.bin").write_bytes(deterministic_bytes(500, 2))
+
+
+def test_scan_hashes_new_files(tmp_path):
+    write_files(tmp_path)
+    state = SyncState(tmp_path / ".mfs-sync.json", 128, False)
+    files = state.scan(tmp_path)
+    assert [f.entry.path for f in files] == ["a.bin", "sub/b.bin"]
+    assert all(f.encoded is not None and f.entry.file_id is None for f in files)
+    assert [len(f.chunks) for f in files] == [3, 4]
+
+
+def test_scan_skips_dotfiles(tmp_path):
+    write_files(tmp_path)
+    (tmp_path / ".git" / "objects").mkdir(parents=True)
+    (tmp_path / ".git" / "objects" / "ab").write_bytes(b"object")
+    (tmp_path / "sub" / ".env").write_bytes(b"secret")
+    # A temporary state file left by an interrupted save.
+    (tmp_path / ".mfs-sync.json.x1y2z3").write_text("{}")
+    state = SyncState(tmp_path / ".mfs-sync.json", 128, False)
+    state.save()
+    assert [f.entry.path for f in state.scan(tmp_path)] == ["a.bin", "sub/b.bin"]
+
+
+def test_files_are_batched_by_gas_coins():
+    assert split_into_gas_batches([], []) == []
+    items = ["a", "b", "c", "d", "e"]
+    batches = split_into_gas_batches(items, [200, 300, 1, 600, 5])
+    # A file that needs more coins than one split has a batch of its own.
+    assert batches == [["a", "b"], ["c"], ["d"], ["e"]]
+    batches = split_into_gas_batches(items, [1] * 5, max_coins=2)
+    assert batches == [["a", "b"], ["c", "d"], ["e"]]
+
+
+def test_scan_only_rehashes_changed_files(tmp_path):
+    write_files(tmp_path)
+    state = SyncState(tmp_path / ".mfs-sync.json", 128, False)
+    for f in state.scan(tmp_path):
+        f.entry.file_id = "0x" + f.entry.path.encode().hex()
+        state.entries[f.entry.path] = f.entry
+    state.save()
+
+    (tmp_path / "a.bin").write_bytes(deterministic_bytes(301, 1))
+    state = SyncState(tmp_path / ".mfs-sync.json", 128, False)
+    changed, unchanged = state.scan(tmp_path)
+    assert changed.encoded is not None and unchanged.encoded is None
+    # The changed file keeps the ID it was uploaded as, to be updated.
+    assert changed.entry.file_id == "0x" + b"a.bin".hex()
+    assert unchanged.entry == state.entries["sub/b.bin"]
+
+
+def test_touched_files_are_rehashed(tmp_path):
+    write_files(tmp_path)
+    state = SyncState(tmp_path / ".mfs-sync.json", 128, False)
+    for f in state.scan(tmp_path):
+        state.entries[f.entry.path] = f.entry
+    stat = (tmp_path / "a.bin").stat()
+    os.utime(tmp_path / "a.bin", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    files = state.scan(tmp_path)
+    assert [f.encoded is not None for f in files] == [True, False]
+    # Same contents, same manifest hash.
+    assert files[0].entry.manifest_hash == state.entries["a.bin"].manifest_hash
+
+
+def test_chunk_size_change_makes_the_state_stale(tmp_path):
+    write_files(tmp_path)
+    state = SyncState(tmp_path / ".mfs-sync.json", 128, False)
+    for f in state.scan(tmp_path):
+        state.entries[f.entry.path] = f.entry
+    state.save()
+    assert not SyncState(tmp_path / ".mfs-sync.json", 128, False).stale
+    state = SyncState(tmp_path / ".mfs-sync.json", 256, False)
+    assert state.stale
+    assert all(f.encoded is not None for f in state.scan(tmp_path))
+
+
+def test_save_round_trips(tmp_path):
+    write_files(tmp_path)
+    path = tmp_path / "state.json"
+    state = SyncState(path, 128, False)
+    for f in state.scan(tmp_path):
+        f.entry.file_id = "0x1" if f.entry.path == "a.bin" else None
+        state.entries[f.entry.path] = f.entry
+    state.save()
+    assert SyncState(path, 128, False).entries == state.entries
+    assert read_file_ids(path) == {"a.bin": "0x1"}
+    # The state file isn't synced itself.
+    assert [f.entry.path for f in SyncState(path, 128, False).scan(tmp_path)] == [
+        "a.bin",
+        "sub/b.bin",
+    ]
+
+
+def sync(directory, *args):
+    result = CliRunner().invoke(
+        app,
+        [
+            "sync",
+            str(directory),
+            "--chunk-size",
+            "128",
+            "--gas-budget-per-chunk",
+            "50000000",
+            *args,
+        ],
+        input="y\n",
+    )
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_sync_updates_changed_files_in_place(mfs, tmp_path):
+    directory = tmp_path / "site"
+    write_files(directory)
+    state_path = directory / ".mfs-sync.json"
+    sync(directory)
+    file_ids = read_file_ids(state_path)
+    assert set(file_ids) == {"a.bin", "sub/b.bin"}
+
+    data = bytearray((directory / "a.bin").read_bytes())
+    data[200] ^= 1
+    (directory / "a.bin").write_bytes(bytes(data))
+    state = state_path.read_text()
+    assert "1 of 3 chunks changed" in sync(directory, "--dry-run")
+    assert state_path.read_text() == state
+
+    sync(directory)
+    assert read_file_ids(state_path) == file_ids
+    file = mfs.get_file(file_ids["a.bin"])
+    assert b"".join(mfs.read_file(file)) == bytes(data)
+    entry = next(
+        e for e in json.loads(state_path.read_text())["files"] if e["path"] == "a.bin"
+    )
+    assert entry["manifest_hash"] == bytes(file.chunks.hash).hex()
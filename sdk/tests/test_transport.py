@@ -0,0 +1,119 @@
+import httpx
+import pytest
+from miraifs_sdk.transport import Endpoint, Transport
+
+
+class MockTransport(Transport):
+    """A Transport whose endpoints answer with handler(url) instead of over HTTP."""
+
+    def __init__(self, endpoints, handler, **kwargs):
+        super().__init__(endpoints, **kwargs)
+        self.handler = handler
+
+    def http_client(self, endpoint):
+        clients = getattr(self.local, "clients", None)
+        if clients is None:
+            clients = self.local.clients = {}
+        if endpoint.url not in clients:
+            clients[endpoint.url] = httpx.Client(
+                transport=httpx.MockTransport(
+                    lambda request: self.handler(str(request.url))
+                ),
+            )
+            with self.clients_lock:
+                self.clients.append(clients[endpoint.url])
+        return clients[endpoint.url]
+
+
+def ok(url: str) -> httpx.Response:
+    return httpx.Response(200, json={"jsonrpc": "2.0", "id": 1, "result": url})
+
+
+def test_from_urls_assigns_roles():
+    transport = Transport.from_urls(["http://a"], ["http://r"], ["http://w"])
+    roles = {e.url: (e.reads, e.writes) for e in transport.endpoints}
+    assert roles == {
+        "http://a": (True, True),
+        "http://r": (True, False),
+        "http://w": (False, True),
+    }
+    with pytest.raises(ValueError):
+        Transport.from_urls([], [], ["http://w"])
+
+
+def test_latency_is_an_ewma():
+    transport = Transport([Endpoint("http://a")], latency_alpha=0.5)
+    endpoint = transport.endpoints[0]
+    transport.mark_up(endpoint, 1.0)
+    assert endpoint.latency == 1.0
+    transport.mark_up(endpoint, 3.0)
+    assert endpoint.latency == 2.0
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    transport = Transport([Endpoint("http://a")], backoff=1.0, max_backoff=4.0)
+    endpoint = transport.endpoints[0]
+    delays = []
+    for _ in range(4):
+        transport.mark_down(endpoint)
+        delays.append(endpoint.down_until)
+    assert endpoint.failures == 4
+    assert delays[1] - delays[0] == pytest.approx(1.0, abs=0.1)
+    assert delays[3] - delays[2] == pytest.approx(0.0, abs=0.1)
+    transport.mark_up(endpoint, 0.1)
+    assert endpoint.failures == 0 and endpoint.is_up(0.0)
+
+
+def test_candidates_prefer_healthy_low_latency_endpoints():
+    endpoints = [
+        Endpoint("http://slow", latency=2.0),
+        Endpoint("http://fast", latency=1.0),
+        Endpoint("http://down"),
+        Endpoint("http://read", writes=False),
+    ]
+    transport = Transport(endpoints)
+    transport.mark_down(endpoints[2])
+    assert [e.url for e in transport.candidates(write=False)] == [
+        "http://read",
+        "http://fast",
+        "http://slow",
+        "http://down",
+    ]
+    assert [e.url for e in transport.candidates(write=True)] == [
+        "http://fast",
+        "http://slow",
+        "http://down",
+    ]
+
+
+def test_post_fails_over_and_marks_endpoints_down():
+    def handler(url):
+        return httpx.Response(503) if "bad" in url else ok(url)
+
+    endpoints = [
+        Endpoint("http://bad", latency=0.1),
+        Endpoint("http://good", latency=1.0),
+    ]
+    transport = MockTransport(endpoints, handler)
+    response = transport.post({}, {}, write=False)
+    assert response.json()["result"] == "http://good"
+    assert not endpoints[0].is_up(0.0) and endpoints[0].failures == 1
+    assert endpoints[0].in_flight == endpoints[1].in_flight == 0
+
+
+def test_post_raises_the_last_error_when_every_endpoint_fails():
+    def handler(url):
+        raise httpx.ConnectError("refused")
+
+    transport = MockTransport([Endpoint("http://a"), Endpoint("http://b")], handler)
+    with pytest.raises(httpx.ConnectError):
+        transport.post({}, {}, write=True)
+    assert all(endpoint.failures == 1 for endpoint in transport.endpoints)
+
+
+def test_close_closes_clients_and_reopens_on_use():
+    with MockTransport([Endpoint("http://a")], ok) as transport:
+        client = transport.http_client(transport.endpoints[0])
+    assert client.is_closed and transport.clients == []
+    transport.post({}, {}, write=False)
+    assert transport.http_client(transport.endpoints[0]) is not client
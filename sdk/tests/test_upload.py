@@ -0,0 +1,35 @@
+import json
+import re
+
+from bench_upload import deterministic_bytes
+from miraifs_sdk.cli import app
+from typer.testing import CliRunner
+
+
+def test_upload_more_chunks_than_arguments_per_command(mfs, tmp_path):
+    # More gas coins than one SplitCoins command takes arguments.
+    data = deterministic_bytes(600 * 50, 1)
+    path = tmp_path / "file.bin"
+    path.write_bytes(data)
+    result = CliRunner().invoke(
+        app, ["file", "upload", str(path), "--chunk-size", "50"], input="y\n"
+    )
+    assert result.exit_code == 0, result.output
+    file_id = re.search(r"/(0x[0-9a-f]{64})/", result.output.replace("\n", "")).group(1)
+    file = mfs.get_file(file_id)
+    assert file.chunks.count == 600
+    assert b"".join(mfs.read_file(file)) == data
+
+
+def test_report_is_the_only_stdout(mfs, tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(deterministic_bytes(500, 2))
+    result = CliRunner().invoke(
+        app,
+        ["file", "upload", str(path), "--chunk-size", "100", "--report", "json"],
+        input="y\n",
+    )
+    assert result.exit_code == 0, result.output
+    report = json.loads(result.stdout)
+    assert report["transactions"]
+    assert "Creating chunk" in result.stderr